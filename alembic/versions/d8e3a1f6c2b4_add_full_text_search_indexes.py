@@ -0,0 +1,50 @@
+"""add full text search indexes
+
+Revision ID: d8e3a1f6c2b4
+Revises: c4f1d2a7b9e3
+Create Date: 2025-08-14 09:31:27.514092
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from letta.settings import settings
+
+# revision identifiers, used by Alembic.
+revision: str = "d8e3a1f6c2b4"
+down_revision: Union[str, None] = "c4f1d2a7b9e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Skip this migration for SQLite, which creates FTS5 tables at runtime
+    if not settings.letta_pg_uri_no_default:
+        return
+
+    op.create_index(
+        "ix_archival_passages_text_tsv",
+        "archival_passages",
+        [sa.text("to_tsvector('english', text)")],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_messages_content_tsv",
+        "messages",
+        [sa.text("""to_tsvector('english', jsonb_path_query_array(content::jsonb, '$[*] ? (@.type == "text").text'))""")],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    # Skip this migration for SQLite
+    if not settings.letta_pg_uri_no_default:
+        return
+
+    op.drop_index("ix_messages_content_tsv", table_name="messages", postgresql_using="gin")
+    op.drop_index("ix_archival_passages_text_tsv", table_name="archival_passages", postgresql_using="gin")
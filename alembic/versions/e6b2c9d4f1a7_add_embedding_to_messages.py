@@ -0,0 +1,44 @@
+"""add embedding to messages
+
+Revision ID: e6b2c9d4f1a7
+Revises: d8e3a1f6c2b4
+Create Date: 2025-08-18 15:02:36.127584
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from letta.constants import MAX_EMBEDDING_DIM, MESSAGE_EMBEDDING_INDEX_DIM
+from letta.orm.custom_columns import CommonVector
+
+# revision identifiers, used by Alembic.
+revision: str = "e6b2c9d4f1a7"
+down_revision: Union[str, None] = "d8e3a1f6c2b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.add_column("messages", sa.Column("embedding", CommonVector, nullable=True))
+    else:
+        from pgvector.sqlalchemy import Vector
+
+        op.add_column("messages", sa.Column("embedding", Vector(MAX_EMBEDDING_DIM), nullable=True))
+        # hnsw indexes at most 2000 dimensions, so the index is built on the first ones of the padded embeddings
+        op.create_index(
+            "ix_messages_embedding_hnsw",
+            "messages",
+            [sa.text(f"(((embedding::real[])[1:{MESSAGE_EMBEDDING_INDEX_DIM}])::vector({MESSAGE_EMBEDDING_INDEX_DIM})) vector_cosine_ops")],
+            unique=False,
+            postgresql_using="hnsw",
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        op.drop_index("ix_messages_embedding_hnsw", table_name="messages", postgresql_using="hnsw")
+    op.drop_column("messages", "embedding")
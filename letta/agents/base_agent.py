@@ -17,7 +17,11 @@ from letta.schemas.message import Message, MessageCreate, MessageUpdate
 from letta.schemas.usage import LettaUsageStatistics
 from letta.schemas.user import User
 from letta.services.agent_manager import AgentManager
-from letta.services.helpers.agent_manager_helper import get_system_message_from_compiled_memory
+from letta.services.helpers.agent_manager_helper import (
+    get_system_message_from_compiled_memory,
+    record_system_message_fingerprint,
+    system_message_matches_memory_fingerprint,
+)
 from letta.services.message_manager import MessageManager
 from letta.services.passage_manager import PassageManager
 from letta.utils import united_diff
@@ -119,6 +123,16 @@ class BaseAgent(ABC):
                     return text[start_idx:end_idx]
                 return text  # fallback to full text if markers not found
 
+            # skip rendering entirely if the system message was built from identical memory
+            memory_fingerprint = agent_state.memory.fingerprint(
+                tool_usage_rules=tool_constraint_block, sources=agent_state.sources, max_files_open=agent_state.max_files_open
+            )
+            if system_message_matches_memory_fingerprint(curr_system_message.id, curr_system_message_text, memory_fingerprint):
+                logger.debug(
+                    f"Memory fingerprint unchanged for agent id={agent_state.id} and actor=({self.actor.id}, {self.actor.name}), skipping system prompt rebuild"
+                )
+                return in_context_messages
+
             curr_dynamic_section = extract_dynamic_section(curr_system_message_text)
 
             # generate just the memory string with current state for comparison
@@ -132,6 +146,7 @@ class BaseAgent(ABC):
                 logger.debug(
                     f"Memory and sources haven't changed for agent id={agent_state.id} and actor=({self.actor.id}, {self.actor.name}), skipping system prompt rebuild"
                 )
+                record_system_message_fingerprint(curr_system_message.id, curr_system_message_text, memory_fingerprint)
                 return in_context_messages
 
             memory_edit_timestamp = get_utc_time()
@@ -159,6 +174,7 @@ class BaseAgent(ABC):
                 new_system_message = await self.message_manager.update_message_by_id_async(
                     curr_system_message.id, message_update=MessageUpdate(content=new_system_message_str), actor=self.actor
                 )
+                record_system_message_fingerprint(curr_system_message.id, new_system_message_str, memory_fingerprint)
                 return [new_system_message] + in_context_messages[1:]
 
             else:
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import uuid
 from collections.abc import AsyncGenerator
@@ -22,6 +23,7 @@ from letta.constants import DEFAULT_MAX_STEPS, NON_USER_MSG_PREFIX
 from letta.errors import ContextWindowExceededError
 from letta.helpers import ToolRulesSolver
 from letta.helpers.datetime_helpers import AsyncTimer, get_utc_time, get_utc_timestamp_ns, ns_to_ms
+from letta.helpers.message_helper import count_in_context_tokens
 from letta.helpers.reasoning_helper import scrub_inner_thoughts_from_messages
 from letta.helpers.tool_execution_helper import enable_strict_mode
 from letta.interfaces.anthropic_streaming_interface import AnthropicStreamingInterface
@@ -44,16 +46,19 @@ from letta.schemas.message import Message, MessageCreate
 from letta.schemas.openai.chat_completion_response import ToolCall, UsageStatistics
 from letta.schemas.provider_trace import ProviderTraceCreate
 from letta.schemas.step import StepProgression
+from letta.schemas.tool import Tool
 from letta.schemas.tool_execution_result import ToolExecutionResult
 from letta.schemas.usage import LettaUsageStatistics
 from letta.schemas.user import User
-from letta.server.rest_api.utils import create_letta_messages_from_llm_response
+from letta.server.rest_api.utils import create_letta_messages_from_llm_response, create_letta_messages_from_parallel_llm_response
 from letta.services.agent_manager import AgentManager
 from letta.services.block_manager import BlockManager
 from letta.services.helpers.tool_parser_helper import runtime_override_tool_json_schema
 from letta.services.job_manager import JobManager
 from letta.services.message_manager import MessageManager
 from letta.services.passage_manager import PassageManager
+from letta.services.per_agent_lock_manager import get_per_agent_lock_manager, serialize_agent_runs
+from letta.services.run_cancellation_bus import get_run_cancellation_bus
 from letta.services.step_manager import NoopStepManager, StepManager
 from letta.services.summarizer.enums import SummarizationMode
 from letta.services.summarizer.summarizer import Summarizer
@@ -67,6 +72,17 @@ from letta.utils import log_telemetry, validate_function_response
 logger = get_logger(__name__)
 
 DEFAULT_SUMMARY_BLOCK_LABEL = "conversation_summary"
+# relationships of the agent state a step is run with
+STEP_AGENT_RELATIONSHIPS = ["tools", "memory", "tool_exec_environment_variables", "sources"]
+
+# Tools that mutate the shared agent state (memory blocks, open files) run one at a time even in parallel mode
+SERIAL_TOOL_TYPES = {
+    ToolType.LETTA_CORE,
+    ToolType.LETTA_MEMORY_CORE,
+    ToolType.LETTA_SLEEPTIME_CORE,
+    ToolType.LETTA_VOICE_SLEEPTIME_CORE,
+    ToolType.LETTA_FILES_CORE,
+}
 
 
 class LettaAgent(BaseAgent):
@@ -148,6 +164,10 @@ class LettaAgent(BaseAgent):
         if not self.job_manager or not self.current_run_id:
             return False
 
+        cancellation_bus = get_run_cancellation_bus()
+        if cancellation_bus is not None:
+            return cancellation_bus.is_cancelled(self.current_run_id)
+
         try:
             job = await self.job_manager.get_job_by_id_async(job_id=self.current_run_id, actor=self.actor)
             return job.status == JobStatus.cancelled
@@ -156,7 +176,22 @@ class LettaAgent(BaseAgent):
             logger.warning(f"Failed to check job cancellation status for job {self.current_run_id}: {e}")
             return False
 
+    async def _load_step_agent_state(self, agent_state: AgentState | None = None) -> AgentState:
+        """
+        Load the state a run starts from. Callers that already loaded it (e.g. for many agents in one query) can pass it,
+        with at least the `STEP_AGENT_RELATIONSHIPS`; it is reloaded anyway when runs are serialized, since it was not
+        loaded under the agent's lock.
+        """
+        if agent_state is None or agent_state.id != self.agent_id or get_per_agent_lock_manager() is not None:
+            agent_state = await self.agent_manager.get_agent_by_id_async(
+                agent_id=self.agent_id,
+                include_relationships=STEP_AGENT_RELATIONSHIPS,
+                actor=self.actor,
+            )
+        return agent_state
+
     @trace_method
+    @serialize_agent_runs
     async def step(
         self,
         input_messages: list[MessageCreate],
@@ -166,13 +201,10 @@ class LettaAgent(BaseAgent):
         request_start_timestamp_ns: int | None = None,
         include_return_message_types: list[MessageType] | None = None,
         dry_run: bool = False,
+        agent_state: AgentState | None = None,
     ) -> Union[LettaResponse, dict]:
         # TODO (cliandy): pass in run_id and use at send_message endpoints for all step functions
-        agent_state = await self.agent_manager.get_agent_by_id_async(
-            agent_id=self.agent_id,
-            include_relationships=["tools", "memory", "tool_exec_environment_variables", "sources"],
-            actor=self.actor,
-        )
+        agent_state = await self._load_step_agent_state(agent_state)
         result = await self._step(
             agent_state=agent_state,
             input_messages=input_messages,
@@ -196,6 +228,7 @@ class LettaAgent(BaseAgent):
         )
 
     @trace_method
+    @serialize_agent_runs
     async def step_stream_no_tokens(
         self,
         input_messages: list[MessageCreate],
@@ -203,12 +236,9 @@ class LettaAgent(BaseAgent):
         use_assistant_message: bool = True,
         request_start_timestamp_ns: int | None = None,
         include_return_message_types: list[MessageType] | None = None,
+        agent_state: AgentState | None = None,
     ):
-        agent_state = await self.agent_manager.get_agent_by_id_async(
-            agent_id=self.agent_id,
-            include_relationships=["tools", "memory", "tool_exec_environment_variables", "sources"],
-            actor=self.actor,
-        )
+        agent_state = await self._load_step_agent_state(agent_state)
         current_in_context_messages, new_in_context_messages = await _prepare_in_context_messages_no_persist_async(
             input_messages, agent_state, self.message_manager, self.actor
         )
@@ -320,6 +350,7 @@ class LettaAgent(BaseAgent):
                     initial_messages=initial_messages,
                     agent_step_span=agent_step_span,
                     is_final_step=(i == max_steps - 1),
+                    parallel_tool_calls=response.choices[0].message.tool_calls if settings.enable_parallel_tool_calls else None,
                 )
                 step_progression = StepProgression.STEP_LOGGED
 
@@ -445,6 +476,7 @@ class LettaAgent(BaseAgent):
                 in_context_messages=current_in_context_messages,
                 new_letta_messages=new_in_context_messages,
                 llm_config=agent_state.llm_config,
+                tools=agent_state.tools,
                 total_tokens=usage.total_tokens,
                 force=False,
             )
@@ -587,6 +619,7 @@ class LettaAgent(BaseAgent):
                     agent_step_span=agent_step_span,
                     is_final_step=(i == max_steps - 1),
                     run_id=run_id,
+                    parallel_tool_calls=response.choices[0].message.tool_calls if settings.enable_parallel_tool_calls else None,
                 )
                 step_progression = StepProgression.STEP_LOGGED
 
@@ -698,6 +731,7 @@ class LettaAgent(BaseAgent):
                 in_context_messages=current_in_context_messages,
                 new_letta_messages=new_in_context_messages,
                 llm_config=agent_state.llm_config,
+                tools=agent_state.tools,
                 total_tokens=usage.total_tokens,
                 force=False,
             )
@@ -719,6 +753,7 @@ class LettaAgent(BaseAgent):
             self.logger.error(f"Failed to update agent's last run metrics: {e}")
 
     @trace_method
+    @serialize_agent_runs
     async def step_stream(
         self,
         input_messages: list[MessageCreate],
@@ -726,6 +761,7 @@ class LettaAgent(BaseAgent):
         use_assistant_message: bool = True,
         request_start_timestamp_ns: int | None = None,
         include_return_message_types: list[MessageType] | None = None,
+        agent_state: AgentState | None = None,
     ) -> AsyncGenerator[str, None]:
         """
         Carries out an invocation of the agent loop in a streaming fashion that yields partial tokens.
@@ -735,11 +771,7 @@ class LettaAgent(BaseAgent):
             3. Fetches a response from the LLM
             4. Processes the response
         """
-        agent_state = await self.agent_manager.get_agent_by_id_async(
-            agent_id=self.agent_id,
-            include_relationships=["tools", "memory", "tool_exec_environment_variables", "sources"],
-            actor=self.actor,
-        )
+        agent_state = await self._load_step_agent_state(agent_state)
         current_in_context_messages, new_in_context_messages = await _prepare_in_context_messages_no_persist_async(
             input_messages, agent_state, self.message_manager, self.actor
         )
@@ -1058,6 +1090,7 @@ class LettaAgent(BaseAgent):
                 in_context_messages=current_in_context_messages,
                 new_letta_messages=new_in_context_messages,
                 llm_config=agent_state.llm_config,
+                tools=agent_state.tools,
                 total_tokens=usage.total_tokens,
                 force=False,
             )
@@ -1131,6 +1164,7 @@ class LettaAgent(BaseAgent):
                     in_context_messages=current_in_context_messages,
                     new_letta_messages=new_in_context_messages,
                     llm_config=agent_state.llm_config,
+                    tools=agent_state.tools,
                     force=True,
                 )
                 new_in_context_messages = []
@@ -1158,6 +1192,8 @@ class LettaAgent(BaseAgent):
                     agent_state=agent_state,
                     tool_rules_solver=tool_rules_solver,
                 )
+                # the token streaming interfaces accumulate a single tool call per response
+                request_data = llm_client.disable_parallel_tool_calls(request_data)
                 log_event("agent.stream.llm_request.created")  # [2^]
 
                 provider_request_start_timestamp_ns = get_utc_timestamp_ns()
@@ -1189,6 +1225,7 @@ class LettaAgent(BaseAgent):
                     in_context_messages=current_in_context_messages,
                     new_letta_messages=new_in_context_messages,
                     llm_config=agent_state.llm_config,
+                    tools=agent_state.tools,
                     force=True,
                 )
                 new_in_context_messages: list[Message] = []
@@ -1203,10 +1240,15 @@ class LettaAgent(BaseAgent):
         new_letta_messages: list[Message],
         llm_config: LLMConfig,
         force: bool,
+        tools: Optional[list[Tool]] = None,
     ) -> list[Message]:
         if isinstance(e, ContextWindowExceededError):
             return await self._rebuild_context_window(
-                in_context_messages=in_context_messages, new_letta_messages=new_letta_messages, llm_config=llm_config, force=force
+                in_context_messages=in_context_messages,
+                new_letta_messages=new_letta_messages,
+                llm_config=llm_config,
+                tools=tools,
+                force=force,
             )
         else:
             raise llm_client.handle_llm_error(e)
@@ -1217,9 +1259,30 @@ class LettaAgent(BaseAgent):
         in_context_messages: list[Message],
         new_letta_messages: list[Message],
         llm_config: LLMConfig,
+        tools: Optional[list[Tool]] = None,
         total_tokens: int | None = None,
         force: bool = False,
     ) -> list[Message]:
+        if settings.store_message_token_counts:
+            try:
+                # tool definitions are sent with every request, so they count towards the window too
+                total_tokens = count_in_context_tokens(in_context_messages + new_letta_messages, tools=tools)
+            except Exception as e:
+                self.logger.warning(f"Failed to count in-context tokens, falling back to provider usage: {e}")
+
+        # A summary prepared ahead of time is swapped in first, whether or not the window is exceeded yet
+        compacted_messages = None
+        if summarizer_settings.speculative_compaction:
+            compacted_messages = await self.summarizer.compact_from_checkpoint(in_context_messages, new_letta_messages)
+        if compacted_messages is not None:
+            # the checkpoint only summarizes what was in context when it was prepared, which may still not fit
+            in_context_messages, new_letta_messages = compacted_messages, []
+            try:
+                total_tokens = count_in_context_tokens(compacted_messages, tools=tools)
+            except Exception as e:
+                self.logger.warning(f"Failed to count tokens of the compacted messages, keeping them as is: {e}")
+                total_tokens = None
+
         # If total tokens is reached, we truncate down
         # TODO: This can be broken by bad configs, e.g. lower bound too high, initial messages too fat, etc.
         if force or (total_tokens and total_tokens > llm_config.context_window):
@@ -1232,6 +1295,8 @@ class LettaAgent(BaseAgent):
                 force=True,
                 clear=True,
             )
+        elif compacted_messages is not None:
+            new_in_context_messages = compacted_messages
         else:
             self.logger.info(
                 f"Total tokens {total_tokens} does not exceed configured max tokens {llm_config.context_window}, passing summarizing w/o force."
@@ -1240,6 +1305,12 @@ class LettaAgent(BaseAgent):
                 in_context_messages=in_context_messages,
                 new_letta_messages=new_letta_messages,
             )
+            if (
+                summarizer_settings.speculative_compaction
+                and total_tokens
+                and total_tokens > summarizer_settings.speculative_compaction_threshold * llm_config.context_window
+            ):
+                self.summarizer.prepare_compaction_checkpoint(new_in_context_messages)
         await self.agent_manager.update_message_ids_async(
             agent_id=self.agent_id,
             message_ids=[m.id for m in new_in_context_messages],
@@ -1352,11 +1423,30 @@ class LettaAgent(BaseAgent):
         agent_step_span: Optional["Span"] = None,
         is_final_step: bool | None = None,
         run_id: str | None = None,
+        parallel_tool_calls: list[ToolCall] | None = None,
     ) -> tuple[list[Message], bool, LettaStopReason | None]:
         """
         Handle the final AI response once streaming completes, execute / validate the
         tool call, decide whether we should keep stepping, and persist state.
+
+        If `parallel_tool_calls` holds more than one call, every call is executed concurrently instead.
         """
+        if parallel_tool_calls and len(parallel_tool_calls) > 1:
+            return await self._handle_parallel_ai_response(
+                parallel_tool_calls,
+                valid_tool_names,
+                agent_state,
+                tool_rules_solver,
+                usage,
+                reasoning_content=reasoning_content,
+                pre_computed_assistant_message_id=pre_computed_assistant_message_id,
+                step_id=step_id,
+                initial_messages=initial_messages,
+                agent_step_span=agent_step_span,
+                is_final_step=is_final_step,
+                run_id=run_id,
+            )
+
         # 1.  Parse and validate the tool-call envelope
         tool_call_name: str = tool_call.function.name
         tool_call_id: str = tool_call.id or f"call_{uuid.uuid4().hex[:8]}"
@@ -1458,27 +1548,48 @@ class LettaAgent(BaseAgent):
         tool_rules_solver: ToolRulesSolver,
         is_final_step: bool | None,
     ) -> tuple[bool, str | None, LettaStopReason | None]:
+        return self._decide_batch_continuation(
+            agent_state=agent_state,
+            request_heartbeat=request_heartbeat,
+            tool_call_names=[tool_call_name],
+            tool_rule_violations=[tool_rule_violated],
+            tool_rules_solver=tool_rules_solver,
+            is_final_step=is_final_step,
+        )
+
+    def _decide_batch_continuation(
+        self,
+        agent_state: AgentState,
+        request_heartbeat: bool,
+        tool_call_names: list[str],
+        tool_rule_violations: list[bool],
+        tool_rules_solver: ToolRulesSolver,
+        is_final_step: bool | None,
+    ) -> tuple[bool, str | None, LettaStopReason | None]:
 
         continue_stepping = request_heartbeat
         heartbeat_reason: str | None = None
         stop_reason: LettaStopReason | None = None
 
-        if tool_rule_violated:
+        for tool_call_name, tool_rule_violated in zip(tool_call_names, tool_rule_violations):
+            if not tool_rule_violated:
+                tool_rules_solver.register_tool_call(tool_call_name)
+        executed_tool_names = [name for name, violated in zip(tool_call_names, tool_rule_violations) if not violated]
+
+        if any(tool_rule_violations):
             continue_stepping = True
             heartbeat_reason = f"{NON_USER_MSG_PREFIX}Continuing: tool rule violation."
         else:
-            tool_rules_solver.register_tool_call(tool_call_name)
-
-            if tool_rules_solver.is_terminal_tool(tool_call_name):
+            if any(tool_rules_solver.is_terminal_tool(name) for name in executed_tool_names):
                 if continue_stepping:
                     stop_reason = LettaStopReason(stop_reason=StopReasonType.tool_rule.value)
                 continue_stepping = False
 
-            elif tool_rules_solver.has_children_tools(tool_call_name):
+            elif any(tool_rules_solver.has_children_tools(name) for name in executed_tool_names):
                 continue_stepping = True
                 heartbeat_reason = f"{NON_USER_MSG_PREFIX}Continuing: child tool rule."
 
-            elif tool_rules_solver.is_continue_tool(tool_call_name):
+            elif any(tool_rules_solver.is_continue_tool(name) for name in executed_tool_names):
                 continue_stepping = True
                 heartbeat_reason = f"{NON_USER_MSG_PREFIX}Continuing: continue tool rule."
 
@@ -1498,6 +1609,154 @@ class LettaAgent(BaseAgent):
 
         return continue_stepping, heartbeat_reason, stop_reason
 
+    async def _handle_parallel_ai_response(
+        self,
+        tool_calls: list[ToolCall],
+        valid_tool_names: list[str],
+        agent_state: AgentState,
+        tool_rules_solver: ToolRulesSolver,
+        usage: UsageStatistics,
+        reasoning_content: list[TextContent | ReasoningContent | RedactedReasoningContent | OmittedReasoningContent] | None = None,
+        pre_computed_assistant_message_id: str | None = None,
+        step_id: str | None = None,
+        initial_messages: list[Message] | None = None,
+        agent_step_span: Optional["Span"] = None,
+        is_final_step: bool | None = None,
+        run_id: str | None = None,
+    ) -> tuple[list[Message], bool, LettaStopReason | None]:
+        """
+        Parallel counterpart of `_handle_ai_response`: validate every tool call in the response as a batch,
+        execute the allowed calls concurrently and persist all resulting messages in a single write.
+        """
+        # 1.  Parse the tool-call envelopes
+        tool_call_ids: list[str] = []
+        tool_call_names: list[str] = []
+        tool_args_list: list[JsonDict] = []
+        request_heartbeat = False
+        for tool_call in tool_calls:
+            tool_args = _safe_load_tool_call_str(tool_call.function.arguments)
+            request_heartbeat = _pop_heartbeat(tool_args) or request_heartbeat
+            tool_args.pop(INNER_THOUGHTS_KWARG, None)
+            tool_call_ids.append(tool_call.id or f"call_{uuid.uuid4().hex[:8]}")
+            tool_call_names.append(tool_call.function.name)
+            tool_args_list.append(tool_args)
+
+        log_telemetry(
+            self.logger,
+            "_handle_parallel_ai_response execute tools start",
+            tool_names=tool_call_names,
+            tool_call_ids=tool_call_ids,
+            request_heartbeat=request_heartbeat,
+        )
+
+        # 2.  Check the batch against the tool rules, then execute the allowed calls concurrently
+        allowed_flags = tool_rules_solver.validate_tool_call_batch(
+            tool_names=tool_call_names,
+            available_tools=set(t.name for t in agent_state.tools),
+            last_function_response=self.last_function_response,
+        )
+        # the first call is checked against the same tool set the LLM request was built with
+        allowed_flags[0] = tool_call_names[0] in valid_tool_names
+        tool_rule_violations = [not allowed for allowed in allowed_flags]
+
+        tool_types = {t.name: t.tool_type for t in agent_state.tools}
+        concurrency_limit = asyncio.Semaphore(settings.parallel_tool_calls_max_concurrency)
+        serial_lock = asyncio.Lock()
+
+        async def _run_tool_call(tool_call_name: str, tool_args: JsonDict, tool_rule_violated: bool) -> ToolExecutionResult:
+            if tool_rule_violated:
+                return _build_rule_violation_result(tool_call_name, valid_tool_names, tool_rules_solver)
+            async with concurrency_limit:
+                if tool_types.get(tool_call_name) in SERIAL_TOOL_TYPES:
+                    async with serial_lock:
+                        return await self._execute_tool(
+                            tool_name=tool_call_name,
+                            tool_args=tool_args,
+                            agent_state=agent_state,
+                            agent_step_span=agent_step_span,
+                            step_id=step_id,
+                        )
+                return await self._execute_tool(
+                    tool_name=tool_call_name,
+                    tool_args=tool_args,
+                    agent_state=agent_state,
+                    agent_step_span=agent_step_span,
+                    step_id=step_id,
+                )
+
+        tool_execution_results = await asyncio.gather(
+            *[
+                _run_tool_call(tool_call_name, tool_args, tool_rule_violated)
+                for tool_call_name, tool_args, tool_rule_violated in zip(tool_call_names, tool_args_list, tool_rule_violations)
+            ]
+        )
+
+        log_telemetry(
+            self.logger,
+            "_handle_parallel_ai_response execute tools finish",
+            tool_execution_results=tool_execution_results,
+            tool_call_ids=tool_call_ids,
+        )
+
+        # 3.  Prepare the function-response payloads
+        tool_call_results = []
+        for tool_call_id, tool_call_name, tool_args, tool_execution_result in zip(
+            tool_call_ids, tool_call_names, tool_args_list, tool_execution_results
+        ):
+            truncate = tool_call_name not in {"conversation_search", "conversation_search_date", "archival_memory_search"}
+            return_char_limit = next(
+                (t.return_char_limit for t in agent_state.tools if t.name == tool_call_name),
+                None,
+            )
+            function_response_string = validate_function_response(
+                tool_execution_result.func_return,
+                return_char_limit=return_char_limit,
+                truncate=truncate,
+            )
+            tool_call_results.append((tool_call_id, tool_call_name, tool_args, tool_execution_result, function_response_string))
+            self.last_function_response = package_function_response(
+                was_success=tool_execution_result.success_flag,
+                response_string=function_response_string,
+                timezone=agent_state.timezone,
+            )
+
+        # 4.  Decide whether to keep stepping, treating the batch as a whole
+        continue_stepping, heartbeat_reason, stop_reason = self._decide_batch_continuation(
+            agent_state=agent_state,
+            request_heartbeat=request_heartbeat,
+            tool_call_names=tool_call_names,
+            tool_rule_violations=tool_rule_violations,
+            tool_rules_solver=tool_rules_solver,
+            is_final_step=is_final_step,
+        )
+
+        # 5.  Create and persist every message from this step in one write
+        tool_call_messages = create_letta_messages_from_parallel_llm_response(
+            agent_id=agent_state.id,
+            model=agent_state.llm_config.model,
+            tool_call_results=tool_call_results,
+            timezone=agent_state.timezone,
+            actor=self.actor,
+            continue_stepping=continue_stepping,
+            heartbeat_reason=heartbeat_reason,
+            reasoning_content=reasoning_content,
+            pre_computed_assistant_message_id=pre_computed_assistant_message_id,
+            step_id=step_id,
+        )
+
+        persisted_messages = await self.message_manager.create_many_messages_async(
+            (initial_messages or []) + tool_call_messages, actor=self.actor
+        )
+
+        if run_id:
+            await self.job_manager.add_messages_to_job_async(
+                job_id=run_id,
+                message_ids=[m.id for m in persisted_messages if m.role != "user"],
+                actor=self.actor,
+            )
+
+        return persisted_messages, continue_stepping, stop_reason
+
     @trace_method
     async def _execute_tool(
         self,
@@ -43,6 +43,32 @@ def server(
         raise NotImplementedError("WS suppport deprecated")
 
 
+def ingest_worker(
+    concurrency: Annotated[
+        Optional[int], typer.Option(help="Files processed concurrently (default: file_ingestion_worker_concurrency)")
+    ] = None,
+):
+    """Run a standalone worker for the durable file ingestion queue"""
+    import asyncio
+
+    async def run():
+        from letta.server.db import db_registry
+        from letta.services.file_processor.ingestion_queue import FileIngestionWorker
+
+        db_registry.initialize_async()
+        worker = FileIngestionWorker(concurrency=concurrency)
+        try:
+            await worker.run()
+        finally:
+            await worker.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        typer.secho("Terminating the ingestion worker...")
+        sys.exit(0)
+
+
 def version() -> str:
     import letta
 
@@ -66,6 +66,9 @@ DEFAULT_MIN_MESSAGE_BUFFER_LENGTH = 15
 
 # embeddings
 MAX_EMBEDDING_DIM = 4096  # maximum supported embeding size - do NOT change or else DBs will need to be reset
+# pgvector indexes at most this many dimensions, so the Postgres message embedding index covers the first ones of
+# the padded embeddings (all of them for models with at most this many)
+MESSAGE_EMBEDDING_INDEX_DIM = 2000
 DEFAULT_EMBEDDING_CHUNK_SIZE = 300
 DEFAULT_EMBEDDING_DIM = 1024
 
@@ -1,6 +1,6 @@
 import asyncio
 from functools import wraps
-from typing import Any, Optional, Set, Union
+from typing import Any, List, Optional, Set, Union
 
 from letta.constants import REDIS_EXCLUDE, REDIS_INCLUDE, REDIS_SET_DEFAULT_VAL
 from letta.log import get_logger
@@ -171,12 +171,39 @@ class AsyncRedisClient:
         client = await self.get_client()
         return await client.delete(*keys)
 
+    @with_retry()
+    async def mget(self, *keys: str) -> List[Any]:
+        """Get values for several keys in one round trip, None for missing keys."""
+        client = await self.get_client()
+        return await client.mget(*keys)
+
     @with_retry()
     async def exists(self, *keys: str) -> int:
         """Check if keys exist."""
         client = await self.get_client()
         return await client.exists(*keys)
 
+    # Pub/sub
+    @with_retry()
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish a message to a channel, returning the number of subscribers that received it."""
+        client = await self.get_client()
+        return await client.publish(channel, message)
+
+    async def subscribe(self, *channels: str):
+        """Subscribe to channels on a dedicated connection; iterate `listen()` on the returned PubSub for messages."""
+        client = await self.get_client()
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*channels)
+        return pubsub
+
+    # Scripting
+    @with_retry()
+    async def eval(self, script: str, keys: List[str], args: List[Union[str, int, float]]) -> Any:
+        """Run a Lua script atomically on the server."""
+        client = await self.get_client()
+        return await client.eval(script, len(keys), *keys, *args)
+
     # Set operations
     async def sadd(self, key: str, *members: Union[str, int, float]) -> int:
         """Add members to set."""
@@ -263,9 +290,15 @@ class NoopAsyncRedisClient(AsyncRedisClient):
     async def get(self, key: str, default: Any = None) -> Any:
         return default
 
+    async def mget(self, *keys: str) -> List[Any]:
+        return [None] * len(keys)
+
     async def exists(self, *keys: str) -> int:
         return 0
 
+    async def publish(self, channel: str, message: str) -> int:
+        return 0
+
     async def sadd(self, key: str, *members: Union[str, int, float]) -> int:
         return 0
 
@@ -176,6 +176,39 @@ class RateLimitExceededError(LettaError):
         )
 
 
+class AgentLockTimeoutError(LettaError):
+    """Error raised when a run waits too long for earlier runs of the same agent to finish."""
+
+    def __init__(self, agent_id: str, timeout: float):
+        super().__init__(
+            message=f"Timed out after {timeout}s waiting for earlier runs of agent {agent_id} to finish",
+            code=ErrorCode.TIMEOUT,
+            details={"agent_id": agent_id, "timeout": timeout},
+        )
+
+
+class AgentLockReentryError(LettaError):
+    """Error raised when a run tries to start another run of an agent whose lock it (or a run waiting on it) holds."""
+
+    def __init__(self, agent_id: str):
+        super().__init__(
+            message=f"Agent {agent_id} is already running earlier in this call chain and cannot be run again until it finishes",
+            code=ErrorCode.INVALID_ARGUMENT,
+            details={"agent_id": agent_id},
+        )
+
+
+class AgentLockLostError(LettaError):
+    """Error raised when a run lost its agent lock (e.g. its lease expired) and another run may have taken over."""
+
+    def __init__(self, agent_id: str):
+        super().__init__(
+            message=f"Lost the lock on agent {agent_id}; another run may be updating its messages",
+            code=ErrorCode.INTERNAL_SERVER_ERROR,
+            details={"agent_id": agent_id},
+        )
+
+
 class LettaMessageError(LettaError):
     """Base error class for handling message-related errors."""
 
@@ -0,0 +1,105 @@
+from collections.abc import AsyncGenerator
+
+from letta.groups.multi_agent_group_v2 import MultiAgentGroupV2, message_text
+from letta.schemas.group import ManagerType
+from letta.schemas.letta_message import LettaMessage
+from letta.schemas.letta_message_content import TextContent
+from letta.schemas.message import Message, MessageCreate
+
+# what the manager is sent on every round, the chat history and the options are in its step's context
+CHOOSE_PARTICIPANT_MESSAGE = "Choose the agent to reply to the latest message in the group chat."
+
+
+class DynamicMultiAgentV2(MultiAgentGroupV2):
+    """
+    The manager agent (`agent_id`) picks the next speaker on every round. Unlike the legacy runtime, the participants'
+    personas and the chat history are given to it in the context of its step rather than copied into blocks of its memory
+    or saved in the message asking for the next speaker.
+    """
+
+    manager_type = ManagerType.dynamic
+
+    async def _run_turn(self, new_messages: list[MessageCreate]) -> AsyncGenerator[LettaMessage | str | tuple, None]:
+        agent_ids = self.group.agent_ids
+        max_turns = self.group.max_turns or len(agent_ids)
+        termination_token = self.group.termination_token or "DONE!"
+        await self._load_agent_states([self.agent_id, *agent_ids])
+
+        chat_history: list[MessageCreate] = []
+        message_index = {agent_id: 0 for agent_id in [self.agent_id, *agent_ids]}
+        speaker_id = None
+        for _ in range(max_turns):
+            # Perform manager step
+            agent_id_options = [agent_id for agent_id in agent_ids if agent_id != speaker_id] or agent_ids
+            manager_message = MessageCreate(
+                role="user",
+                content=[TextContent(text=CHOOSE_PARTICIPANT_MESSAGE)],
+                otid=Message.generate_otid(),
+                sender_id=self.agent_id,
+                group_id=self.group.id,
+            )
+            manager_context = self._choose_participant_context(new_messages, chat_history, agent_id_options)
+            async for chunk in self._participant_step(self.agent_id, [manager_message], context=manager_context):
+                yield chunk
+            if self._cancelled:
+                break
+            speaker_id = self._chosen_participant(agent_id_options)
+
+            # Update chat history
+            chat_history.extend(new_messages)
+
+            # Perform participant step
+            async for chunk in self._participant_step(speaker_id, chat_history[message_index[speaker_id] :]):
+                yield chunk
+
+            # Parse participant response and update message index
+            new_messages = self._group_messages(speaker_id)
+            message_index[speaker_id] = len(chat_history) + len(new_messages)
+
+            # Check for termination token
+            if self._cancelled or any(termination_token in message_text(message) for message in new_messages):
+                break
+
+        # Persist remaining chat history
+        chat_history.extend(new_messages)
+        await self._persist_chat_history(chat_history, message_index, speaker_id)
+
+    def _participant_context(self, agent_id: str) -> str | None:
+        if agent_id == self.agent_id:
+            return None
+        return (
+            f"You are a participant in a group chat with {len(self.group.agent_ids) - 1} other "
+            "agents and one user. Respond to new messages in the group chat when prompted. "
+            f"Description of the group: {self.group.description}."
+        )
+
+    def _choose_participant_context(
+        self, new_messages: list[MessageCreate], chat_history: list[MessageCreate], agent_id_options: list[str]
+    ) -> str:
+        context_messages = "\n".join(f"{message.name or 'user'}: {message_text(message)}" for message in [*chat_history, *new_messages])
+        participants = []
+        for agent_id in agent_id_options:
+            agent_state = self.agent_states[agent_id]
+            persona = next((block.value for block in agent_state.memory.get_blocks() if block.label == "persona"), "")
+            participants.append(f"- {agent_state.name} ({agent_id}): {persona}")
+        participant_descriptions = "\n".join(participants)
+
+        return (
+            f"You are overseeing a group chat with {len(self.group.agent_ids)} agents and one user. "
+            f"Description of the group: {self.group.description}\n"
+            "Choose the most suitable agent to reply to the latest message in the group chat from the following "
+            f"options:\n{participant_descriptions}\nReply with the name of the agent. Do not respond to the messages "
+            "yourself, your task is only to decide the next speaker, not to participate. "
+            f"\nChat history:\n{context_messages}"
+        )
+
+    def _chosen_participant(self, agent_id_options: list[str]) -> str:
+        responses = Message.to_letta_messages_from_list(self.response_messages.get(self.agent_id, []))
+        reply = " ".join(message_text(response) for response in responses if response.message_type == "assistant_message").lower()
+        for agent_id in agent_id_options:
+            if agent_id.lower() in reply:
+                return agent_id
+        for agent_id in agent_id_options:
+            if self.agent_states[agent_id].name.lower() in reply:
+                return agent_id
+        raise ValueError(f"No participant of group {self.group.id} named in the manager's reply: {reply}")
@@ -1,15 +1,25 @@
 import json
-from typing import Dict, Optional, Union
+from typing import TYPE_CHECKING, Dict, Optional, Union
 
 from letta.agent import Agent
 from letta.interface import AgentInterface
 from letta.orm.group import Group
 from letta.orm.user import User
 from letta.schemas.agent import AgentState
+from letta.schemas.group import Group as PydanticGroup
 from letta.schemas.group import ManagerType
 from letta.schemas.letta_message_content import ImageContent, TextContent
 from letta.schemas.message import Message
 from letta.services.mcp.base_client import AsyncBaseMCPClient
+from letta.services.telemetry_manager import NoopTelemetryManager
+from letta.settings import settings
+
+if TYPE_CHECKING:
+    from letta.groups.multi_agent_group_v2 import MultiAgentGroupV2
+    from letta.server.server import SyncServer
+
+# groups with a runtime on the async agent loop, used when `settings.async_group_runtimes` is enabled
+ASYNC_GROUP_MANAGER_TYPES = [ManagerType.round_robin, ManagerType.dynamic, ManagerType.supervisor]
 
 
 def load_multi_agent(
@@ -86,6 +96,43 @@ def load_multi_agent(
             raise ValueError(f"Type {group.manager_type} is not supported.")
 
 
+def load_multi_agent_v2(
+    group: PydanticGroup,
+    agent_id: str,
+    actor: User,
+    server: "SyncServer",
+    current_run_id: Optional[str] = None,
+) -> "MultiAgentGroupV2":
+    """Load the async runtime of a group; `agent_id` is its manager agent, or its first agent if it has none."""
+    if len(group.agent_ids) == 0:
+        raise ValueError("Empty group: group must have at least one agent")
+
+    match group.manager_type:
+        case ManagerType.round_robin:
+            from letta.groups.round_robin_multi_agent_v2 import RoundRobinMultiAgentV2 as runtime_class
+        case ManagerType.dynamic:
+            from letta.groups.dynamic_multi_agent_v2 import DynamicMultiAgentV2 as runtime_class
+        case ManagerType.supervisor:
+            from letta.groups.supervisor_multi_agent_v2 import SupervisorMultiAgentV2 as runtime_class
+        case _:
+            raise ValueError(f"Type {group.manager_type} is not supported.")
+
+    return runtime_class(
+        agent_id=agent_id,
+        message_manager=server.message_manager,
+        agent_manager=server.agent_manager,
+        block_manager=server.block_manager,
+        passage_manager=server.passage_manager,
+        group_manager=server.group_manager,
+        job_manager=server.job_manager,
+        actor=actor,
+        step_manager=server.step_manager,
+        telemetry_manager=server.telemetry_manager if settings.llm_api_logging else NoopTelemetryManager(),
+        group=group,
+        current_run_id=current_run_id,
+    )
+
+
 def stringify_message(message: Message, use_assistant_name: bool = False) -> str | None:
     assistant_name = message.name or "assistant" if use_assistant_name else "assistant"
     if message.role == "user":
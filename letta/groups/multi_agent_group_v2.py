@@ -0,0 +1,353 @@
+"""
+Async runtimes of the round-robin, dynamic and supervisor groups.
+
+`RoundRobinMultiAgent`, `DynamicMultiAgent` and `SupervisorMultiAgent` run a turn on the legacy sync `Agent` in a worker
+thread, loading each participant on its own and stepping it with blocking DB calls. Their V2 runtimes drive the
+participants' `LettaAgent` loops instead:
+
+- the participants' states are loaded in one query at the start of the turn, and handed to their first step;
+- `step_stream` streams the tokens of every participant's reply as the turn goes (`step_stream_no_tokens` its messages),
+  with a single stop reason and the usage of the whole turn at the end;
+- the chat history participants have not seen yet is persisted for them in one write at the end of the turn;
+- context on the group is appended to a participant's system prompt for the requests of its step, not saved as a message.
+
+The servers route groups to them when `settings.async_group_runtimes` is enabled.
+"""
+
+from abc import abstractmethod
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+
+from letta.agents.base_agent import BaseAgent
+from letta.agents.letta_agent import STEP_AGENT_RELATIONSHIPS, LettaAgent
+from letta.constants import DEFAULT_MAX_STEPS
+from letta.llm_api.llm_client import LLMClient
+from letta.orm.errors import NoResultFound
+from letta.otel.tracing import trace_method
+from letta.schemas.agent import AgentState
+from letta.schemas.enums import MessageStreamStatus
+from letta.schemas.group import Group, ManagerType
+from letta.schemas.letta_message import AssistantMessage, LettaMessage, MessageType
+from letta.schemas.letta_message_content import TextContent
+from letta.schemas.letta_response import LettaResponse
+from letta.schemas.letta_stop_reason import LettaStopReason, StopReasonType
+from letta.schemas.message import Message, MessageCreate
+from letta.schemas.usage import LettaUsageStatistics
+from letta.schemas.user import User
+from letta.services.agent_manager import AgentManager
+from letta.services.block_manager import BlockManager
+from letta.services.group_manager import GroupManager
+from letta.services.job_manager import JobManager
+from letta.services.message_manager import MessageManager
+from letta.services.passage_manager import PassageManager
+from letta.services.step_manager import NoopStepManager, StepManager
+from letta.services.telemetry_manager import NoopTelemetryManager, TelemetryManager
+
+# endpoints `LettaAgent.step_stream` can stream the tokens of, other participants are streamed message by message
+TOKEN_STREAMING_ENDPOINTS = ["anthropic", "openai", "bedrock"]
+
+_STOP_REASON_CHUNK_PREFIX = '{"message_type":"stop_reason"'
+_USAGE_CHUNK_PREFIX = '{"message_type":"usage_statistics"'
+
+
+@dataclass
+class _TurnOptions:
+    max_steps: int
+    use_assistant_message: bool
+    include_return_message_types: list[MessageType] | None
+    request_start_timestamp_ns: int | None = None
+    run_id: str | None = None
+    # None when the turn is not streamed
+    stream_tokens: bool | None = None
+
+
+class GroupParticipantAgent(LettaAgent):
+    """A participant's loop, which sends `group_context` at the end of its system prompt without persisting it."""
+
+    group_context: str | None = None
+
+    async def _rebuild_memory_async(self, in_context_messages: list[Message], agent_state: AgentState, **kwargs) -> list[Message]:
+        in_context_messages = await super()._rebuild_memory_async(in_context_messages, agent_state, **kwargs)
+        if not self.group_context:
+            return in_context_messages
+        system_message, *messages = in_context_messages
+        system_text = system_message.content[0].text
+        system_message = system_message.model_copy(update={"content": [TextContent(text=f"{system_text}\n\n{self.group_context}")]})
+        return [system_message, *messages]
+
+
+class MultiAgentGroupV2(BaseAgent):
+    """
+    A group turn driven on the participants' `LettaAgent` loops. Subclasses implement `_run_turn`, stepping participants
+    through `_participant_step` and re-yielding what it yields.
+    """
+
+    manager_type: ManagerType
+
+    def __init__(
+        self,
+        agent_id: str,
+        message_manager: MessageManager,
+        agent_manager: AgentManager,
+        block_manager: BlockManager,
+        passage_manager: PassageManager,
+        group_manager: GroupManager,
+        job_manager: JobManager,
+        actor: User,
+        step_manager: StepManager = NoopStepManager(),
+        telemetry_manager: TelemetryManager = NoopTelemetryManager(),
+        group: Group | None = None,
+        current_run_id: str | None = None,
+    ):
+        super().__init__(
+            agent_id=agent_id,
+            openai_client=None,
+            message_manager=message_manager,
+            agent_manager=agent_manager,
+            actor=actor,
+        )
+        self.block_manager = block_manager
+        self.passage_manager = passage_manager
+        self.group_manager = group_manager
+        self.job_manager = job_manager
+        self.step_manager = step_manager
+        self.telemetry_manager = telemetry_manager
+        self.current_run_id = current_run_id
+        # Group settings
+        assert (
+            group.manager_type == self.manager_type
+        ), f"Expected group manager type to be '{self.manager_type.value}', got {group.manager_type}"
+        self.group = group
+
+        # State of the current turn
+        self.usage = LettaUsageStatistics()
+        self.stop_reason: LettaStopReason | None = None
+        self.agent_states: dict[str, AgentState] = {}
+        self.response_messages: dict[str, list[Message]] = {}
+        self._unused_agent_states: set[str] = set()
+        self._options: _TurnOptions | None = None
+
+    @abstractmethod
+    def _run_turn(self, new_messages: list[MessageCreate]) -> AsyncGenerator[LettaMessage | str | tuple, None]:
+        """Drive the participants through one turn of the group, starting from the messages sent to it."""
+        raise NotImplementedError
+
+    def _participant_context(self, agent_id: str) -> str | None:
+        """Context on the group added to a participant's system prompt while it steps, if any."""
+        return None
+
+    @trace_method
+    async def step(
+        self,
+        input_messages: list[MessageCreate],
+        max_steps: int = DEFAULT_MAX_STEPS,
+        run_id: str | None = None,
+        use_assistant_message: bool = True,
+        request_start_timestamp_ns: int | None = None,
+        include_return_message_types: list[MessageType] | None = None,
+    ) -> LettaResponse:
+        self._options = _TurnOptions(
+            max_steps=max_steps,
+            use_assistant_message=use_assistant_message,
+            include_return_message_types=include_return_message_types,
+            request_start_timestamp_ns=request_start_timestamp_ns,
+            run_id=run_id,
+        )
+        messages = [message async for message in self._run_turn(self._prepare_new_messages(input_messages))]
+        return LettaResponse(
+            messages=messages,
+            stop_reason=self.stop_reason or LettaStopReason(stop_reason=StopReasonType.end_turn.value),
+            usage=self.usage,
+        )
+
+    @trace_method
+    async def step_stream_no_tokens(
+        self,
+        input_messages: list[MessageCreate],
+        max_steps: int = DEFAULT_MAX_STEPS,
+        use_assistant_message: bool = True,
+        request_start_timestamp_ns: int | None = None,
+        include_return_message_types: list[MessageType] | None = None,
+    ):
+        self._options = _TurnOptions(
+            max_steps=max_steps,
+            use_assistant_message=use_assistant_message,
+            include_return_message_types=include_return_message_types,
+            request_start_timestamp_ns=request_start_timestamp_ns,
+            stream_tokens=False,
+        )
+        async for chunk in self._run_turn(self._prepare_new_messages(input_messages)):
+            yield chunk
+
+        for finish_chunk in self.get_finish_chunks_for_stream(self.usage, self.stop_reason):
+            yield f"data: {finish_chunk}\n\n"
+
+    @trace_method
+    async def step_stream(
+        self,
+        input_messages: list[MessageCreate],
+        max_steps: int = DEFAULT_MAX_STEPS,
+        use_assistant_message: bool = True,
+        request_start_timestamp_ns: int | None = None,
+        include_return_message_types: list[MessageType] | None = None,
+    ) -> AsyncGenerator[str, None]:
+        self._options = _TurnOptions(
+            max_steps=max_steps,
+            use_assistant_message=use_assistant_message,
+            include_return_message_types=include_return_message_types,
+            request_start_timestamp_ns=request_start_timestamp_ns,
+            stream_tokens=True,
+        )
+        async for chunk in self._run_turn(self._prepare_new_messages(input_messages)):
+            yield chunk
+
+        for finish_chunk in self.get_finish_chunks_for_stream(self.usage, self.stop_reason):
+            yield f"data: {finish_chunk}\n\n"
+
+    def _prepare_new_messages(self, input_messages: list[MessageCreate]) -> list[MessageCreate]:
+        new_messages = []
+        for message in input_messages:
+            if isinstance(message.content, str):
+                message.content = [TextContent(text=message.content)]
+            message.group_id = self.group.id
+            new_messages.append(message)
+        return new_messages
+
+    async def _load_agent_states(self, agent_ids: list[str]) -> None:
+        """Load the states of the agents taking part in the turn in one query."""
+        agent_states = await self.agent_manager.get_agents_by_ids_async(
+            agent_ids=agent_ids, actor=self.actor, include_relationships=STEP_AGENT_RELATIONSHIPS
+        )
+        self.agent_states = {agent_state.id: agent_state for agent_state in agent_states}
+        missing_agent_ids = [agent_id for agent_id in agent_ids if agent_id not in self.agent_states]
+        if missing_agent_ids:
+            raise NoResultFound(f"Agents {missing_agent_ids} of group {self.group.id} not found")
+        for agent_state in agent_states:
+            if LLMClient.create(provider_type=agent_state.llm_config.model_endpoint_type, actor=self.actor) is None:
+                raise ValueError(
+                    f"Agent {agent_state.id} of group {self.group.id} uses models of type '{agent_state.llm_config.model_endpoint_type}', "
+                    "which the async agent loop does not support"
+                )
+        # a state is only current until the agent's first step of the turn
+        self._unused_agent_states = set(self.agent_states)
+
+    def _create_agent(self, agent_id: str, agent_class: type[GroupParticipantAgent] = GroupParticipantAgent) -> GroupParticipantAgent:
+        return agent_class(
+            agent_id=agent_id,
+            message_manager=self.message_manager,
+            agent_manager=self.agent_manager,
+            block_manager=self.block_manager,
+            job_manager=self.job_manager,
+            passage_manager=self.passage_manager,
+            actor=self.actor,
+            step_manager=self.step_manager,
+            telemetry_manager=self.telemetry_manager,
+            current_run_id=self.current_run_id,
+        )
+
+    async def _participant_step(
+        self, agent_id: str, input_messages: list[MessageCreate], context: str | None = None
+    ) -> AsyncGenerator[LettaMessage | str | tuple, None]:
+        """
+        Step a participant of the turn, yielding its messages (or, when streaming, its chunks without the finish chunks,
+        which are folded into the turn's). Its response messages are kept in `self.response_messages`.
+
+        `context` is added to the participant's system prompt for this step only, it defaults to `_participant_context`.
+        """
+        options = self._options
+        agent = self._create_agent(agent_id)
+        agent.group_context = context or self._participant_context(agent_id)
+        agent_state = self.agent_states[agent_id] if agent_id in self._unused_agent_states else None
+        self._unused_agent_states.discard(agent_id)
+
+        step_kwargs = dict(
+            max_steps=options.max_steps,
+            use_assistant_message=options.use_assistant_message,
+            request_start_timestamp_ns=options.request_start_timestamp_ns,
+            include_return_message_types=options.include_return_message_types,
+            agent_state=agent_state,
+        )
+        # time to first token is measured on the turn's first step only
+        options.request_start_timestamp_ns = None
+
+        if options.stream_tokens is None:
+            response = await agent.step(input_messages, run_id=options.run_id, **step_kwargs)
+            self._add_usage(response.usage)
+            self.stop_reason = response.stop_reason
+            for message in response.messages:
+                yield message
+        else:
+            if options.stream_tokens and self.agent_states[agent_id].llm_config.model_endpoint_type in TOKEN_STREAMING_ENDPOINTS:
+                stream = agent.step_stream(input_messages, **step_kwargs)
+            else:
+                stream = agent.step_stream_no_tokens(input_messages, **step_kwargs)
+            async for chunk in stream:
+                if isinstance(chunk, tuple):
+                    # (content, status_code) chunks are reported as is by the streaming response
+                    yield chunk
+                    continue
+                data = chunk.removeprefix("data: ").strip()
+                if data == MessageStreamStatus.done.value:
+                    continue
+                if data.startswith(_STOP_REASON_CHUNK_PREFIX):
+                    self.stop_reason = LettaStopReason.model_validate_json(data)
+                elif data.startswith(_USAGE_CHUNK_PREFIX):
+                    self._add_usage(LettaUsageStatistics.model_validate_json(data))
+                else:
+                    yield chunk
+
+        self.response_messages[agent_id] = agent.response_messages
+
+    def _add_usage(self, usage: LettaUsageStatistics) -> None:
+        self.usage.prompt_tokens += usage.prompt_tokens
+        self.usage.completion_tokens += usage.completion_tokens
+        self.usage.total_tokens += usage.total_tokens
+        self.usage.step_count += usage.step_count
+
+    @property
+    def _cancelled(self) -> bool:
+        return self.stop_reason is not None and self.stop_reason.stop_reason == StopReasonType.cancelled
+
+    def _group_messages(self, agent_id: str) -> list[MessageCreate]:
+        """What a participant said in its last step, as messages of the group chat."""
+        agent_state = self.agent_states[agent_id]
+        responses = Message.to_letta_messages_from_list(self.response_messages.get(agent_id, []))
+        return [
+            MessageCreate(
+                role="system",
+                content=[TextContent(text=response.content)] if isinstance(response.content, str) else response.content,
+                name=agent_state.name,
+                otid=response.otid,
+                sender_id=agent_state.id,
+                group_id=self.group.id,
+            )
+            for response in responses
+            if response.message_type == "assistant_message"
+        ]
+
+    async def _persist_chat_history(
+        self, chat_history: list[MessageCreate], message_index: dict[str, int], last_speaker_id: str | None
+    ) -> None:
+        """Save the part of the chat history each participant (but the last speaker, who saw all of it) has not seen."""
+        messages_to_persist = [
+            Message(
+                role=message.role,
+                content=message.content,
+                name=message.name,
+                otid=message.otid,
+                sender_id=message.sender_id,
+                group_id=self.group.id,
+                agent_id=agent_id,
+            )
+            for agent_id, index in message_index.items()
+            if agent_id != last_speaker_id
+            for message in chat_history[index:]
+        ]
+        if messages_to_persist:
+            await self.message_manager.create_many_messages_async(messages_to_persist, actor=self.actor)
+
+
+def message_text(message: MessageCreate | AssistantMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(content.text for content in message.content if isinstance(content, TextContent))
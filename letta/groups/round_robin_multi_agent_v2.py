@@ -0,0 +1,58 @@
+from collections.abc import AsyncGenerator
+
+from letta.groups.multi_agent_group_v2 import MultiAgentGroupV2
+from letta.schemas.group import ManagerType
+from letta.schemas.letta_message import LettaMessage
+from letta.schemas.message import MessageCreate
+
+
+class RoundRobinMultiAgentV2(MultiAgentGroupV2):
+    manager_type = ManagerType.round_robin
+
+    async def _run_turn(self, new_messages: list[MessageCreate]) -> AsyncGenerator[LettaMessage | str | tuple, None]:
+        agent_ids = self.group.agent_ids
+        max_turns = self.group.max_turns or len(agent_ids)
+        await self._load_agent_states(agent_ids)
+
+        chat_history: list[MessageCreate] = []
+        message_index = {agent_id: 0 for agent_id in agent_ids}
+        speaker_id = None
+        for i in range(max_turns):
+            # Select speaker
+            speaker_id = agent_ids[i % len(agent_ids)]
+
+            # Update chat history
+            chat_history.extend(new_messages)
+
+            # Perform participant step
+            async for chunk in self._participant_step(speaker_id, chat_history[message_index[speaker_id] :]):
+                yield chunk
+
+            # Parse participant response and update message index
+            new_messages = self._group_messages(speaker_id)
+            message_index[speaker_id] = len(chat_history) + len(new_messages)
+            if self._cancelled:
+                break
+
+        # Persist remaining chat history
+        chat_history.extend(new_messages)
+        await self._persist_chat_history(chat_history, message_index, speaker_id)
+
+    def _participant_context(self, agent_id: str) -> str | None:
+        return (
+            f"%%% GROUP CHAT CONTEXT %%% "
+            f"You are speaking in a group chat with {len(self.group.agent_ids)} other participants. "
+            f"Group Description: {self.group.description} "
+            "INTERACTION GUIDELINES:\n"
+            "1. Be aware that others can see your messages - communicate as if in a real group conversation\n"
+            "2. Acknowledge and build upon others' contributions when relevant\n"
+            "3. Stay on topic while adding your unique perspective based on your role and personality\n"
+            "4. Be concise but engaging - give others space to contribute\n"
+            "5. Maintain your character's personality while being collaborative\n"
+            "6. Feel free to ask questions to other participants to encourage discussion\n"
+            "7. If someone addresses you directly, acknowledge their message\n"
+            "8. Share relevant experiences or knowledge that adds value to the conversation\n\n"
+            "Remember: This is a natural group conversation. Interact as you would in a real group setting, "
+            "staying true to your character while fostering meaningful dialogue. "
+            "%%% END GROUP CHAT CONTEXT %%%"
+        )
@@ -0,0 +1,78 @@
+from collections.abc import AsyncGenerator
+
+from letta.constants import DEFAULT_MESSAGE_TOOL
+from letta.functions.function_sets.multi_agent import send_message_to_all_agents_in_group
+from letta.functions.functions import parse_source_code
+from letta.functions.schema_generator import generate_schema
+from letta.groups.multi_agent_group_v2 import GroupParticipantAgent, MultiAgentGroupV2
+from letta.schemas.agent import AgentState
+from letta.schemas.enums import ToolType
+from letta.schemas.group import ManagerType
+from letta.schemas.letta_message import LettaMessage
+from letta.schemas.message import MessageCreate
+from letta.schemas.tool import Tool
+from letta.schemas.tool_rule import ChildToolRule, InitToolRule, TerminalToolRule
+from letta.services.tool_manager import ToolManager
+
+SUPERVISOR_TOOL_RULES = [
+    InitToolRule(
+        tool_name="send_message_to_all_agents_in_group",
+    ),
+    TerminalToolRule(
+        tool_name=DEFAULT_MESSAGE_TOOL,
+    ),
+    ChildToolRule(
+        tool_name="send_message_to_all_agents_in_group",
+        children=[DEFAULT_MESSAGE_TOOL],
+    ),
+]
+
+
+class SupervisorAgent(GroupParticipantAgent):
+    """The supervisor's loop: it first sends the message to all workers of its group, then replies with their answers."""
+
+    async def _load_step_agent_state(self, agent_state: AgentState | None = None) -> AgentState:
+        agent_state = await super()._load_step_agent_state(agent_state)
+        return agent_state.model_copy(update={"tool_rules": SUPERVISOR_TOOL_RULES})
+
+
+class SupervisorMultiAgentV2(MultiAgentGroupV2):
+    """
+    The supervisor (`agent_id`) steps once per turn. Its `send_message_to_all_agents_in_group` call runs the workers,
+    which do not see each other's replies, concurrently through the fan-out scheduler.
+    """
+
+    manager_type = ManagerType.supervisor
+
+    async def _run_turn(self, new_messages: list[MessageCreate]) -> AsyncGenerator[LettaMessage | str | tuple, None]:
+        await self._load_agent_states([self.agent_id])
+        await self._attach_group_tool()
+        async for chunk in self._participant_step(self.agent_id, new_messages):
+            yield chunk
+
+    def _create_agent(self, agent_id: str, agent_class: type[GroupParticipantAgent] = GroupParticipantAgent) -> GroupParticipantAgent:
+        return super()._create_agent(agent_id, SupervisorAgent if agent_id == self.agent_id else agent_class)
+
+    async def _attach_group_tool(self) -> None:
+        supervisor_state = self.agent_states[self.agent_id]
+        if any(tool.name == send_message_to_all_agents_in_group.__name__ for tool in supervisor_state.tools):
+            return
+
+        tool_manager = ToolManager()
+        multi_agent_tool = await tool_manager.get_tool_by_name_async(
+            tool_name=send_message_to_all_agents_in_group.__name__, actor=self.actor
+        )
+        if multi_agent_tool is None:
+            multi_agent_tool = Tool(
+                name=send_message_to_all_agents_in_group.__name__,
+                description="",
+                source_type="python",
+                tags=[],
+                source_code=parse_source_code(send_message_to_all_agents_in_group),
+                json_schema=generate_schema(send_message_to_all_agents_in_group, None),
+            )
+            multi_agent_tool.tool_type = ToolType.LETTA_MULTI_AGENT_CORE
+            multi_agent_tool = await tool_manager.create_or_update_tool_async(pydantic_tool=multi_agent_tool, actor=self.actor)
+        await self.agent_manager.attach_tool_async(agent_id=self.agent_id, tool_id=multi_agent_tool.id, actor=self.actor)
+        # the loaded state does not have the tool
+        self._unused_agent_states.discard(self.agent_id)
@@ -0,0 +1,239 @@
+"""
+Read-through cache of agent states in front of `AgentManager.get_agent_by_id_async`.
+
+A single agent turn loads the same agent several times (router, system prompt rebuild, memory refresh, tool
+executors), and each load joins the agent's tools, sources, blocks, identities, tags, files and group. With
+`settings.agent_state_cache_size` set, loaded states are kept in an in-process LRU keyed by agent id, organization
+and the requested relationships, and tagged with the agent's version at the time the load started.
+
+Every manager method that mutates an agent, or anything embedded in its state, bumps the version of the affected
+agents (`invalidates_agent_state`, `invalidate_agent_states`) or of all agents (`invalidates_all_agent_states`)
+once it returns, so a cached state is only served while the version it was loaded at is still current. A load that
+races with a mutation is stored under the version read before it started, and is therefore never served.
+
+With `settings.agent_state_cache_redis_invalidation`, versions are also kept in Redis and read (one MGET) on every
+lookup, so mutations on any process invalidate the caches of all of them. Synchronous mutations can only bump the
+local version; `settings.agent_state_cache_ttl_s` bounds how long other processes may serve such states.
+"""
+
+import inspect
+import itertools
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.log import get_logger
+from letta.otel.metric_registry import MetricRegistry
+from letta.schemas.agent import AgentState
+from letta.settings import settings
+
+logger = get_logger(__name__)
+
+AGENT_STATE_CACHE_NAME = "agent_state"
+REDIS_AGENT_STATE_EPOCH_KEY = "letta_agent_state_epoch"
+REDIS_AGENT_STATE_VERSION_PREFIX = "letta_agent_state_version"
+# versions of recently mutated agents remembered per cached state; older ones collapse into a shared floor
+VERSIONS_PER_ENTRY = 4
+
+
+def _redis_version_key(agent_id: str) -> str:
+    return f"{REDIS_AGENT_STATE_VERSION_PREFIX}:{agent_id}"
+
+
+class AgentStateCache:
+    """In-process LRU of agent states, invalidated through per-agent versions (optionally shared through Redis)."""
+
+    def __init__(self, max_size: int, ttl_s: float, redis_invalidation: bool = False):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.redis_invalidation = redis_invalidation
+        # (agent_id, organization_id, relationships) -> (version token, stored at, state)
+        self._states: "OrderedDict[Tuple[str, str, str], Tuple[tuple, float, AgentState]]" = OrderedDict()
+        # local versions are drawn from one clock, so the insertion order of `_versions` is also their order
+        self._clock = itertools.count(1)
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    async def get_or_load(
+        self,
+        agent_id: str,
+        organization_id: str,
+        include_relationships: Optional[List[str]],
+        load: Callable[[], Awaitable[AgentState]],
+    ) -> AgentState:
+        """Return a copy of the cached state of `agent_id`, calling `load` when it is missing or stale."""
+        if not self.enabled:
+            return await load()
+
+        key = (agent_id, organization_id, "*" if include_relationships is None else ",".join(sorted(include_relationships)))
+        token = await self._version_token(agent_id)
+        cached = self._states.get(key)
+        if cached is not None and token is not None and cached[0] == token and time.monotonic() - cached[1] < self.ttl_s:
+            self._states.move_to_end(key)
+            MetricRegistry().cache_hit_counter.add(1, attributes={"cache": AGENT_STATE_CACHE_NAME, "tier": "local"})
+            return cached[2].model_copy(deep=True)
+
+        MetricRegistry().cache_miss_counter.add(1, attributes={"cache": AGENT_STATE_CACHE_NAME, "tier": "local"})
+        agent_state = await load()
+        if token is not None:
+            self._states[key] = (token, time.monotonic(), agent_state.model_copy(deep=True))
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_size:
+                self._states.popitem(last=False)
+                MetricRegistry().cache_eviction_counter.add(1, attributes={"cache": AGENT_STATE_CACHE_NAME, "tier": "local"})
+        return agent_state
+
+    def invalidate_local(self, *agent_ids: str) -> None:
+        """Bump the versions of `agent_ids` in this process only."""
+        if not self.enabled:
+            return
+        for agent_id in agent_ids:
+            self._versions[agent_id] = next(self._clock)
+            self._versions.move_to_end(agent_id)
+        while len(self._versions) > self.max_size * VERSIONS_PER_ENTRY:
+            _, self._floor = self._versions.popitem(last=False)
+
+    async def invalidate(self, *agent_ids: str) -> None:
+        """Bump the versions of `agent_ids`, in every process when Redis invalidation is enabled."""
+        if not self.enabled or not agent_ids:
+            return
+        self.invalidate_local(*agent_ids)
+        redis_client = await self._get_redis_client()
+        if redis_client is None:
+            return
+        try:
+            for agent_id in set(agent_ids):
+                await redis_client.incr(_redis_version_key(agent_id))
+        except Exception as e:
+            logger.warning(f"Failed to invalidate cached agent states of {list(agent_ids)}: {e}")
+
+    def invalidate_all_local(self) -> None:
+        if not self.enabled:
+            return
+        self._states.clear()
+        self._versions.clear()
+        self._floor = next(self._clock)
+
+    async def invalidate_all(self) -> None:
+        """Invalidate every cached agent state, in every process when Redis invalidation is enabled."""
+        if not self.enabled:
+            return
+        self.invalidate_all_local()
+        redis_client = await self._get_redis_client()
+        if redis_client is None:
+            return
+        try:
+            await redis_client.incr(REDIS_AGENT_STATE_EPOCH_KEY)
+        except Exception as e:
+            logger.warning(f"Failed to invalidate cached agent states: {e}")
+
+    async def _version_token(self, agent_id: str) -> Optional[tuple]:
+        """The version a state of `agent_id` loaded now is valid for, or None when it cannot be determined."""
+        local_version = self._versions.get(agent_id, self._floor)
+        redis_client = await self._get_redis_client()
+        if redis_client is None:
+            return (local_version,)
+        try:
+            epoch, version = await redis_client.mget(REDIS_AGENT_STATE_EPOCH_KEY, _redis_version_key(agent_id))
+        except Exception as e:
+            logger.warning(f"Failed to read agent state version of {agent_id}, bypassing the cache: {e}")
+            return None
+        return (local_version, epoch, version)
+
+    async def _get_redis_client(self):
+        if not self.redis_invalidation:
+            return None
+        redis_client = await get_redis_client()
+        return None if isinstance(redis_client, NoopAsyncRedisClient) else redis_client
+
+
+_agent_state_cache: Optional[AgentStateCache] = None
+
+
+def get_agent_state_cache() -> AgentStateCache:
+    global _agent_state_cache
+    if _agent_state_cache is None:
+        _agent_state_cache = AgentStateCache(
+            max_size=settings.agent_state_cache_size,
+            ttl_s=settings.agent_state_cache_ttl_s,
+            redis_invalidation=settings.agent_state_cache_redis_invalidation,
+        )
+    return _agent_state_cache
+
+
+async def invalidate_agent_states(*agent_ids: str) -> None:
+    await get_agent_state_cache().invalidate(*agent_ids)
+
+
+def _agent_id_argument(arguments: Dict[str, Any]) -> Iterable[str]:
+    if arguments.get("agent_id"):
+        return [arguments["agent_id"]]
+    if arguments.get("agent_state") is not None:
+        return [arguments["agent_state"].id]
+    return []
+
+
+def _invalidating(func, invalidate: Callable[[Dict[str, Any]], Awaitable[None]], invalidate_local: Callable[[Dict[str, Any]], None]):
+    signature = inspect.signature(func)
+
+    def bound_arguments(args, kwargs) -> Dict[str, Any]:
+        return signature.bind_partial(*args, **kwargs).arguments
+
+    # invalidate even when the mutation fails, since it may have committed part of its changes
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                await invalidate(bound_arguments(args, kwargs))
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            invalidate_local(bound_arguments(args, kwargs))
+
+    return wrapper
+
+
+def invalidates_agent_state(agent_ids: Callable[[Dict[str, Any]], Iterable[str]] = _agent_id_argument):
+    """
+    Invalidate the cached states of the agents a manager method mutates once it returns.
+
+    `agent_ids` maps the method's bound arguments to the affected agent ids; by default the `agent_id` argument, or
+    the id of the `agent_state` argument. Synchronous methods only invalidate the cache of this process.
+    """
+
+    def decorator(func):
+        async def invalidate(arguments: Dict[str, Any]) -> None:
+            await get_agent_state_cache().invalidate(*agent_ids(arguments))
+
+        def invalidate_local(arguments: Dict[str, Any]) -> None:
+            get_agent_state_cache().invalidate_local(*agent_ids(arguments))
+
+        return _invalidating(func, invalidate, invalidate_local)
+
+    return decorator
+
+
+def invalidates_all_agent_states(func):
+    """Invalidate every cached agent state once the method returns, for mutations of state shared between agents."""
+
+    async def invalidate(_arguments: Dict[str, Any]) -> None:
+        await get_agent_state_cache().invalidate_all()
+
+    def invalidate_local(_arguments: Dict[str, Any]) -> None:
+        get_agent_state_cache().invalidate_all_local()
+
+    return _invalidating(func, invalidate, invalidate_local)
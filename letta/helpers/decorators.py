@@ -1,5 +1,6 @@
 import inspect
 import json
+from collections import OrderedDict
 from dataclasses import dataclass
 from functools import wraps
 from typing import Callable
@@ -9,6 +10,7 @@ from pydantic import BaseModel
 from letta.constants import REDIS_DEFAULT_CACHE_PREFIX
 from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
 from letta.log import get_logger
+from letta.otel.metric_registry import MetricRegistry
 from letta.plugins.plugins import get_experimental_checker
 from letta.settings import settings
 
@@ -86,8 +88,42 @@ class CacheStats:
     invalidations: int = 0
 
 
+class LocalLRUCache:
+    """Bounded in-process LRU tier for `async_redis_cache`. Values are shared, so only cache immutable results."""
+
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max_size
+        self._entries: OrderedDict[str, object] = OrderedDict()
+
+    def get(self, key: str) -> tuple[bool, object]:
+        if key not in self._entries:
+            MetricRegistry().cache_miss_counter.add(1, attributes={"cache": self.name, "tier": "local"})
+            return False, None
+        self._entries.move_to_end(key)
+        MetricRegistry().cache_hit_counter.add(1, attributes={"cache": self.name, "tier": "local"})
+        return True, self._entries[key]
+
+    def set(self, key: str, value: object) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            MetricRegistry().cache_eviction_counter.add(1, attributes={"cache": self.name, "tier": "local"})
+
+    def delete(self, key: str) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
 def async_redis_cache(
-    key_func: Callable, prefix: str = REDIS_DEFAULT_CACHE_PREFIX, ttl_s: int = 600, model_class: type[BaseModel] | None = None
+    key_func: Callable,
+    prefix: str = REDIS_DEFAULT_CACHE_PREFIX,
+    ttl_s: int = 600,
+    model_class: type[BaseModel] | None = None,
+    local_cache_size: int = 0,
 ):
     """
     Decorator for caching async function results in Redis. May be a Noop if redis is not available.
@@ -100,34 +136,53 @@ def async_redis_cache(
         prefix: cache key prefix
         ttl_s: time to live (s)
         model_class: custom pydantic model class for serialization/deserialization
+        local_cache_size: size of an in-process LRU consulted before Redis (0 disables it). Entries never expire,
+            so only use it for results that are a pure function of the cache key.
 
     TODO (cliandy): move to class with generics for type hints
     """
 
     def decorator(func):
         stats = CacheStats()
+        local_cache = LocalLRUCache(prefix, local_cache_size) if local_cache_size > 0 else None
 
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
+            if local_cache is not None:
+                cache_key = get_cache_key(*args, **kwargs)
+                found, value = local_cache.get(cache_key)
+                if found:
+                    stats.hits += 1
+                    return value
+
             redis_client = await get_redis_client()
 
             # Don't bother going through other operations for no reason.
             if isinstance(redis_client, NoopAsyncRedisClient):
-                return await func(*args, **kwargs)
+                result = await func(*args, **kwargs)
+                if local_cache is not None:
+                    stats.misses += 1
+                    local_cache.set(cache_key, result)
+                return result
             cache_key = get_cache_key(*args, **kwargs)
             cached_value = await redis_client.get(cache_key)
 
             try:
                 if cached_value is not None:
                     stats.hits += 1
-                    if model_class:
-                        return model_class.model_validate_json(cached_value)
-                    return json.loads(cached_value)
+                    MetricRegistry().cache_hit_counter.add(1, attributes={"cache": prefix, "tier": "redis"})
+                    value = model_class.model_validate_json(cached_value) if model_class else json.loads(cached_value)
+                    if local_cache is not None:
+                        local_cache.set(cache_key, value)
+                    return value
             except Exception as e:
                 logger.warning(f"Failed to retrieve value from cache: {e}")
 
             stats.misses += 1
+            MetricRegistry().cache_miss_counter.add(1, attributes={"cache": prefix, "tier": "redis"})
             result = await func(*args, **kwargs)
+            if local_cache is not None:
+                local_cache.set(cache_key, result)
             try:
                 if model_class:
                     await redis_client.set(cache_key, result.model_dump_json(), ex=ttl_s)
@@ -141,6 +196,8 @@ def async_redis_cache(
 
         async def invalidate(*args, **kwargs) -> bool:
             stats.invalidations += 1
+            if local_cache is not None:
+                local_cache.delete(get_cache_key(*args, **kwargs))
             try:
                 redis_client = await get_redis_client()
                 cache_key = get_cache_key(*args, **kwargs)
@@ -155,6 +212,7 @@ def async_redis_cache(
         async_wrapper.cache_invalidate = invalidate
         async_wrapper.cache_key_func = get_cache_key
         async_wrapper.cache_stats = stats
+        async_wrapper.local_cache = local_cache
         return async_wrapper
 
     return decorator
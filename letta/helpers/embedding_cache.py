@@ -0,0 +1,195 @@
+"""
+Cache of embedding vectors keyed by embedding config and content hash.
+
+Re-uploading a file to a second folder, re-ingesting a source or repeating a search query used to embed identical
+text again. Vectors are looked up in an in-process LRU first and then, when `settings.embedding_cache_redis_ttl_s`
+is set and Redis is configured, in Redis, so cached vectors are shared across server processes. Only the texts
+missing from both tiers are sent to the provider, deduplicated, in a single request.
+
+Vectors are stored as float32 to keep the in-process tier small (a 1536-dim vector is 6KB instead of ~50KB as a
+list of Python floats), which is below the precision any provider returns anyway.
+"""
+
+import asyncio
+import base64
+import hashlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.helpers.decorators import LocalLRUCache
+from letta.log import get_logger
+from letta.otel.metric_registry import MetricRegistry
+from letta.schemas.embedding_config import EmbeddingConfig
+from letta.settings import settings
+
+logger = get_logger(__name__)
+
+EMBEDDING_CACHE_NAME = "embedding"
+REDIS_EMBEDDING_CACHE_PREFIX = "letta_embedding"
+
+
+@dataclass
+class EmbeddingCacheStats:
+    hits: int = 0
+    misses: int = 0
+    # embedding requests that never reached the provider because every input was cached
+    saved_requests: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def embedding_config_cache_key(embedding_config: EmbeddingConfig) -> str:
+    """Identify the vector space of a config; anything that changes the vectors returned must be part of it."""
+    identity = "|".join(
+        str(part)
+        for part in (
+            embedding_config.embedding_endpoint_type,
+            embedding_config.embedding_endpoint,
+            embedding_config.embedding_model,
+            embedding_config.embedding_dim,
+        )
+    )
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+
+
+def embedding_cache_key(config_key: str, text: str) -> str:
+    return f"{REDIS_EMBEDDING_CACHE_PREFIX}:{config_key}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+class EmbeddingCache:
+    """Two-tier (in-process LRU, then optional Redis) cache of embedding vectors."""
+
+    def __init__(self, max_size: int, redis_ttl_s: int = 0):
+        self._local = LocalLRUCache(EMBEDDING_CACHE_NAME, max_size) if max_size > 0 else None
+        self._redis_ttl_s = redis_ttl_s
+        self.stats = EmbeddingCacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self._local is not None or self._redis_ttl_s > 0
+
+    def get_local(self, embedding_config: EmbeddingConfig, text: str) -> Optional[List[float]]:
+        """Synchronous lookup in the in-process tier only, for callers that cannot await."""
+        if self._local is None:
+            return None
+        found, vector = self._local.get(embedding_cache_key(embedding_config_cache_key(embedding_config), text))
+        self._record(hits=int(found), misses=int(not found))
+        return vector.tolist() if found else None
+
+    def set_local(self, embedding_config: EmbeddingConfig, text: str, embedding: List[float]) -> None:
+        if self._local is not None:
+            self._local.set(
+                embedding_cache_key(embedding_config_cache_key(embedding_config), text), np.asarray(embedding, dtype=np.float32)
+            )
+
+    async def embed(
+        self,
+        texts: List[str],
+        embedding_config: EmbeddingConfig,
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+    ) -> List[List[float]]:
+        """
+        Embed `texts`, calling `embed_fn` only for texts missing from the cache.
+
+        `embed_fn` receives each missing text once and must return vectors in the same order.
+        """
+        if not self.enabled or not texts:
+            return await embed_fn(texts)
+
+        config_key = embedding_config_cache_key(embedding_config)
+        keys = [embedding_cache_key(config_key, text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+
+        if self._local is not None:
+            for key in dict.fromkeys(keys):
+                found, vector = self._local.get(key)
+                if found:
+                    vectors[key] = vector
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing and self._redis_ttl_s > 0:
+            for key, vector in (await self._get_from_redis(missing)).items():
+                vectors[key] = vector
+                if self._local is not None:
+                    self._local.set(key, vector)
+
+        missing_texts = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing_texts.setdefault(key, text)
+
+        unique_keys = len(set(keys))
+        self._record(hits=unique_keys - len(missing_texts), misses=len(missing_texts))
+        results = {key: vector.tolist() for key, vector in vectors.items()}
+        if missing_texts:
+            embeddings = await embed_fn(list(missing_texts.values()))
+            # freshly embedded texts are returned exactly as the provider sent them
+            results.update(zip(missing_texts, embeddings))
+            new_vectors = {key: np.asarray(embedding, dtype=np.float32) for key, embedding in zip(missing_texts, embeddings)}
+            if self._local is not None:
+                for key, vector in new_vectors.items():
+                    self._local.set(key, vector)
+            if self._redis_ttl_s > 0:
+                await self._set_in_redis(new_vectors)
+        else:
+            self.stats.saved_requests += 1
+            MetricRegistry().embedding_requests_saved_counter.add(1, attributes={"model": embedding_config.embedding_model})
+
+        return [results[key] for key in keys]
+
+    def _record(self, hits: int, misses: int) -> None:
+        self.stats.hits += hits
+        self.stats.misses += misses
+
+    async def _get_from_redis(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        redis_client = await get_redis_client()
+        if isinstance(redis_client, NoopAsyncRedisClient):
+            return {}
+        try:
+            values = await redis_client.mget(*keys)
+        except Exception as e:
+            logger.warning(f"Failed to read embeddings from cache: {e}")
+            return {}
+
+        vectors = {}
+        for key, value in zip(keys, values):
+            if value is not None:
+                vectors[key] = np.frombuffer(base64.b64decode(value), dtype=np.float32)
+        MetricRegistry().cache_hit_counter.add(len(vectors), attributes={"cache": EMBEDDING_CACHE_NAME, "tier": "redis"})
+        MetricRegistry().cache_miss_counter.add(len(keys) - len(vectors), attributes={"cache": EMBEDDING_CACHE_NAME, "tier": "redis"})
+        return vectors
+
+    async def _set_in_redis(self, vectors: Dict[str, np.ndarray]) -> None:
+        redis_client = await get_redis_client()
+        if isinstance(redis_client, NoopAsyncRedisClient):
+            return
+        try:
+            await asyncio.gather(
+                *[
+                    redis_client.set(key, base64.b64encode(vector.tobytes()).decode("ascii"), ex=self._redis_ttl_s)
+                    for key, vector in vectors.items()
+                ]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to write embeddings to cache: {e}")
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(max_size=settings.embedding_cache_size, redis_ttl_s=settings.embedding_cache_redis_ttl_s)
+    return _embedding_cache
+
+
+def get_embedding_cache_stats() -> Dict[str, float]:
+    stats = get_embedding_cache().stats
+    return {"hits": stats.hits, "misses": stats.misses, "hit_rate": stats.hit_rate, "saved_requests": stats.saved_requests}
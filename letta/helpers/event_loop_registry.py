@@ -0,0 +1,42 @@
+import asyncio
+from typing import Generic, List, Optional, TypeVar
+from weakref import WeakKeyDictionary
+
+T = TypeVar("T")
+
+
+class EventLoopRegistry(Generic[T]):
+    """
+    Holds one instance per event loop, for resources (locks, connections, background tasks) that are bound to the loop
+    that created them.
+
+    Entries are keyed by the loop itself rather than its id, so a new loop can never pick up the instance of a dead loop
+    that happened to share its address. Entries of closed loops are dropped as soon as any loop touches the registry.
+    """
+
+    def __init__(self):
+        self._instances: "WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = WeakKeyDictionary()
+
+    def get(self) -> Optional[T]:
+        """Get the instance of the running event loop, if one was set."""
+        return self._instances.get(asyncio.get_running_loop())
+
+    def set(self, instance: T) -> T:
+        """Set the instance of the running event loop."""
+        self._drop_closed_loops()
+        self._instances[asyncio.get_running_loop()] = instance
+        return instance
+
+    def pop_all(self) -> List[T]:
+        """Remove and return the instances of all event loops, e.g. to close them on shutdown."""
+        instances = list(self._instances.values())
+        self._instances.clear()
+        return instances
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+    def _drop_closed_loops(self) -> None:
+        # instances often hold tasks or futures of their loop, which keeps a closed loop from being garbage collected
+        for loop in [loop for loop in list(self._instances.keys()) if loop.is_closed()]:
+            self._instances.pop(loop, None)
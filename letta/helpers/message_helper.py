@@ -1,5 +1,8 @@
 import base64
+import json
 import mimetypes
+from functools import lru_cache
+from typing import Optional
 
 import httpx
 
@@ -7,6 +10,7 @@ from letta import system
 from letta.schemas.enums import MessageRole
 from letta.schemas.letta_message_content import Base64Image, ImageContent, ImageSourceType, TextContent
 from letta.schemas.message import Message, MessageCreate
+from letta.schemas.tool import Tool
 
 
 def convert_message_creates_to_messages(
@@ -83,3 +87,48 @@ def _convert_message_create_to_message(
         group_id=message_create.group_id,
         batch_item_id=message_create.batch_item_id,
     )
+
+
+# Key for per-message token counts that add up to what `TiktokenCounter.count_message_tokens` returns
+TIKTOKEN_TOKEN_COUNT_KEY = "tiktoken"
+# num_tokens_from_messages adds these once per request: every reply is primed with <|start|>assistant<|message|>
+REPLY_PRIMING_TOKENS = 3
+
+
+def count_message_tokens(message: Message) -> int:
+    """Count the tokens a single message contributes to an OpenAI-format request."""
+    from letta.local_llm.utils import num_tokens_from_messages
+
+    return num_tokens_from_messages([message.to_openai_dict()]) - REPLY_PRIMING_TOKENS
+
+
+def get_message_token_count(message: Message) -> int:
+    """Return the stored token count for a message, computing and storing it on the message if it is missing."""
+    token_counts = message.token_counts or {}
+    if TIKTOKEN_TOKEN_COUNT_KEY not in token_counts:
+        message.token_counts = {**token_counts, TIKTOKEN_TOKEN_COUNT_KEY: count_message_tokens(message)}
+    return message.token_counts[TIKTOKEN_TOKEN_COUNT_KEY]
+
+
+@lru_cache(maxsize=256)
+def _count_function_tokens(functions_json: str) -> int:
+    from letta.local_llm.utils import num_tokens_from_functions
+
+    return num_tokens_from_functions(json.loads(functions_json))
+
+
+def count_tool_definition_tokens(tools: list[Tool]) -> int:
+    """Count the tokens the tool definitions add to every request, caching the count per set of schemas."""
+    functions = [tool.json_schema for tool in tools if tool.json_schema]
+    if not functions:
+        return 0
+    return _count_function_tokens(json.dumps(functions, sort_keys=True))
+
+
+def count_in_context_tokens(messages: list[Message], tools: Optional[list[Tool]] = None) -> int:
+    """
+    Total tokens of a list of messages, plus the definitions of the tools sent alongside them. Stored counts are used so
+    unchanged messages are never re-tokenized.
+    """
+    tool_tokens = count_tool_definition_tokens(tools) if tools else 0
+    return REPLY_PRIMING_TOKENS + tool_tokens + sum(get_message_token_count(message) for message in messages)
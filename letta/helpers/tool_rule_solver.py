@@ -105,6 +105,39 @@ class ToolRulesSolver(BaseModel):
 
             return list(final_allowed_tools)
 
+    def validate_tool_call_batch(
+        self, tool_names: list[ToolName], available_tools: set[ToolName], last_function_response: str | None = None
+    ) -> list[bool]:
+        """Check a batch of tool calls emitted in a single response against the tool rules.
+
+        The calls are checked in order, as if every earlier allowed call in the batch had already run, so
+        Init/Child/Parent/MaxCountPerStep rules also apply within the batch. A conditional rule cannot be resolved
+        before its tool has returned, so calls that follow a conditional tool in the same batch are rejected.
+        The tool call history is left unchanged.
+
+        Returns:
+            list[bool]: One flag per tool call, True if the call is allowed.
+        """
+        history_length = len(self.tool_call_history)
+        allowed_flags = []
+        try:
+            for i, tool_name in enumerate(tool_names):
+                try:
+                    allowed_tools = self.get_allowed_tool_names(
+                        available_tools=available_tools,
+                        error_on_empty=False,
+                        last_function_response=last_function_response if i == 0 else None,
+                    )
+                except ValueError:
+                    allowed_tools = []
+                is_allowed = tool_name in allowed_tools
+                allowed_flags.append(is_allowed)
+                if is_allowed:
+                    self.tool_call_history.append(tool_name)
+        finally:
+            del self.tool_call_history[history_length:]
+        return allowed_flags
+
     def is_terminal_tool(self, tool_name: ToolName) -> bool:
         """Check if the tool is defined as a terminal tool in the terminal tool rules or required-before-exit tool rules."""
         return any(rule.tool_name == tool_name for rule in self.terminal_tool_rules)
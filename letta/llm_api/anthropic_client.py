@@ -26,6 +26,7 @@ from letta.errors import (
 )
 from letta.helpers.datetime_helpers import get_utc_time_int
 from letta.helpers.decorators import deprecated
+from letta.llm_api.client_registry import get_async_anthropic_client
 from letta.llm_api.helpers import add_inner_thoughts_to_functions, unpack_all_inner_thoughts_from_kwargs
 from letta.llm_api.llm_client_base import LLMClientBase
 from letta.local_llm.constants import INNER_THOUGHTS_KWARG, INNER_THOUGHTS_KWARG_DESCRIPTION
@@ -39,7 +40,7 @@ from letta.schemas.openai.chat_completion_response import ChatCompletionResponse
 from letta.schemas.openai.chat_completion_response import Message as ChoiceMessage
 from letta.schemas.openai.chat_completion_response import ToolCall, UsageStatistics
 from letta.services.provider_manager import ProviderManager
-from letta.settings import model_settings
+from letta.settings import model_settings, settings
 
 DUMMY_FIRST_USER_MESSAGE = "User initializing bootup sequence."
 
@@ -127,11 +128,7 @@ class AnthropicClient(LLMClientBase):
             override_key = ProviderManager().get_override_key(llm_config.provider_name, actor=self.actor)
 
         if async_client:
-            return (
-                anthropic.AsyncAnthropic(api_key=override_key, max_retries=model_settings.anthropic_max_retries)
-                if override_key
-                else anthropic.AsyncAnthropic(max_retries=model_settings.anthropic_max_retries)
-            )
+            return get_async_anthropic_client(override_key, max_retries=model_settings.anthropic_max_retries)
         return (
             anthropic.Anthropic(api_key=override_key, max_retries=model_settings.anthropic_max_retries)
             if override_key
@@ -147,11 +144,7 @@ class AnthropicClient(LLMClientBase):
             override_key = await ProviderManager().get_override_key_async(llm_config.provider_name, actor=self.actor)
 
         if async_client:
-            return (
-                anthropic.AsyncAnthropic(api_key=override_key, max_retries=model_settings.anthropic_max_retries)
-                if override_key
-                else anthropic.AsyncAnthropic(max_retries=model_settings.anthropic_max_retries)
-            )
+            return get_async_anthropic_client(override_key, max_retries=model_settings.anthropic_max_retries)
         return (
             anthropic.Anthropic(api_key=override_key, max_retries=model_settings.anthropic_max_retries)
             if override_key
@@ -202,7 +195,7 @@ class AnthropicClient(LLMClientBase):
             tool_choice = None
         elif self.is_reasoning_model(llm_config) and llm_config.enable_reasoner:
             # NOTE: reasoning models currently do not allow for `any`
-            tool_choice = {"type": "auto", "disable_parallel_tool_use": True}
+            tool_choice = {"type": "auto", "disable_parallel_tool_use": not settings.enable_parallel_tool_calls}
             tools_for_request = [OpenAITool(function=f) for f in tools]
         elif force_tool_call is not None:
             tool_choice = {"type": "tool", "name": force_tool_call, "disable_parallel_tool_use": True}
@@ -215,7 +208,7 @@ class AnthropicClient(LLMClientBase):
                 )
                 llm_config.put_inner_thoughts_in_kwargs = True
         else:
-            tool_choice = {"type": "any", "disable_parallel_tool_use": True}
+            tool_choice = {"type": "any", "disable_parallel_tool_use": not settings.enable_parallel_tool_calls}
             tools_for_request = [OpenAITool(function=f) for f in tools] if tools is not None else None
 
         # Add tool choice
@@ -271,6 +264,12 @@ class AnthropicClient(LLMClientBase):
 
         return data
 
+    def disable_parallel_tool_calls(self, request_data: dict) -> dict:
+        tool_choice = request_data.get("tool_choice")
+        if tool_choice and "disable_parallel_tool_use" in tool_choice:
+            tool_choice["disable_parallel_tool_use"] = True
+        return request_data
+
     async def count_tokens(self, messages: List[dict] = None, model: str = None, tools: List[OpenAITool] = None) -> int:
         logging.getLogger("httpx").setLevel(logging.WARNING)
 
@@ -456,7 +455,8 @@ class AnthropicClient(LLMClientBase):
                             arguments = str(tool_input["function"]["arguments"])
                     else:
                         arguments = json.dumps(tool_input, indent=2)
-                    tool_calls = [
+                    # keep every tool_use block so parallel tool calls survive the conversion
+                    tool_calls = (tool_calls or []) + [
                         ToolCall(
                             id=content_part.id,
                             type="function",
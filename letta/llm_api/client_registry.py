@@ -0,0 +1,154 @@
+"""
+Process-wide registry of shared LLM provider SDK clients.
+
+Building an `AsyncOpenAI`/`AsyncAnthropic` per request also builds a fresh httpx connection pool, so every agent step
+pays for DNS, TCP and TLS setup again. With `model_settings.llm_client_pool_enabled`, clients are shared per
+(provider, base url, api key hash) on each event loop, backed by keep-alive (and, when `h2` is installed, HTTP/2)
+connection pools.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import anthropic
+import httpx
+import openai
+
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.otel.metric_registry import MetricRegistry
+from letta.settings import model_settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+# evicted clients may still be serving a long-running stream, so they are closed after a grace period
+EVICTED_CLIENT_CLOSE_DELAY_S = 600
+
+ClientKey = Tuple[str, Optional[str], Optional[str]]
+
+
+@dataclass
+class PooledClient:
+    client: Any
+    http_client: httpx.AsyncClient
+
+
+class LLMClientRegistry:
+    """LRU cache of SDK clients for one event loop, each owning a keep-alive httpx connection pool."""
+
+    def __init__(self):
+        self._clients: "OrderedDict[ClientKey, PooledClient]" = OrderedDict()
+        self._evicted: Dict[asyncio.Task, PooledClient] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(provider: str, base_url: Optional[str], api_key: Optional[str]) -> ClientKey:
+        api_key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else None
+        return provider, base_url, api_key_hash
+
+    def get_or_create(
+        self, key: ClientKey, factory: Callable[[httpx.AsyncClient], Any], http_client_factory: Callable[..., httpx.AsyncClient]
+    ):
+        pooled = self._clients.get(key)
+        if pooled is not None:
+            self._clients.move_to_end(key)
+            self.hits += 1
+            MetricRegistry().llm_client_pool_lookup_counter.add(1, attributes={"provider": key[0], "hit": True})
+            return pooled.client
+
+        self.misses += 1
+        MetricRegistry().llm_client_pool_lookup_counter.add(1, attributes={"provider": key[0], "hit": False})
+        http_client = http_client_factory(
+            limits=httpx.Limits(
+                max_connections=model_settings.llm_client_pool_max_connections,
+                max_keepalive_connections=model_settings.llm_client_pool_max_keepalive_connections,
+                keepalive_expiry=model_settings.llm_client_pool_keepalive_expiry,
+            ),
+            http2=model_settings.llm_client_pool_http2 and _http2_available(),
+        )
+        self._clients[key] = PooledClient(client=factory(http_client), http_client=http_client)
+
+        while len(self._clients) > model_settings.llm_client_pool_max_clients:
+            _, evicted = self._clients.popitem(last=False)
+            self.evictions += 1
+            task = safe_create_task(_close_later(evicted, EVICTED_CLIENT_CLOSE_DELAY_S), logger=logger, label="close evicted LLM client")
+            self._evicted[task] = evicted
+            task.add_done_callback(lambda done: self._evicted.pop(done, None))
+        MetricRegistry().llm_client_pool_clients_gauge.set(len(self._clients))
+        return self._clients[key].client
+
+    def stats(self) -> Dict[str, Any]:
+        connections = 0
+        for pooled in self._clients.values():
+            # httpx does not expose its pool publicly; this is best-effort introspection
+            pool = getattr(getattr(pooled.http_client, "_transport", None), "_pool", None)
+            connections += len(getattr(pool, "connections", []))
+        return {
+            "clients": len(self._clients),
+            "connections": connections,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    async def close(self) -> None:
+        clients, self._clients = list(self._clients.values()), OrderedDict()
+        for task, evicted in list(self._evicted.items()):
+            task.cancel()
+            clients.append(evicted)
+        self._evicted.clear()
+        await asyncio.gather(*[pooled.http_client.aclose() for pooled in clients], return_exceptions=True)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+async def _close_later(pooled: PooledClient, delay: float) -> None:
+    await asyncio.sleep(delay)
+    await pooled.http_client.aclose()
+
+
+_registries: EventLoopRegistry[LLMClientRegistry] = EventLoopRegistry()
+
+
+def get_llm_client_registry() -> LLMClientRegistry:
+    """Get the client registry for the running event loop (httpx connections cannot be shared across loops)."""
+    registry = _registries.get()
+    if registry is None:
+        registry = _registries.set(LLMClientRegistry())
+    return registry
+
+
+def get_async_openai_client(api_key: Optional[str], base_url: Optional[str], provider: str = "openai") -> openai.AsyncOpenAI:
+    if not model_settings.llm_client_pool_enabled:
+        return openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+    return get_llm_client_registry().get_or_create(
+        LLMClientRegistry.make_key(provider, base_url, api_key),
+        lambda http_client: openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client),
+        openai.DefaultAsyncHttpxClient,
+    )
+
+
+def get_async_anthropic_client(api_key: Optional[str], max_retries: int) -> anthropic.AsyncAnthropic:
+    # a None api_key makes the SDK fall back to ANTHROPIC_API_KEY
+    kwargs = {"api_key": api_key} if api_key else {}
+    if not model_settings.llm_client_pool_enabled:
+        return anthropic.AsyncAnthropic(max_retries=max_retries, **kwargs)
+    return get_llm_client_registry().get_or_create(
+        LLMClientRegistry.make_key("anthropic", None, api_key),
+        lambda http_client: anthropic.AsyncAnthropic(max_retries=max_retries, http_client=http_client, **kwargs),
+        anthropic.DefaultAsyncHttpxClient,
+    )
+
+
+async def close_llm_client_registries() -> None:
+    registries = _registries.pop_all()
+    await asyncio.gather(*[registry.close() for registry in registries], return_exceptions=True)
@@ -126,6 +126,13 @@ class LLMClientBase:
         """
         raise NotImplementedError
 
+    def disable_parallel_tool_calls(self, request_data: dict) -> dict:
+        """
+        Restricts a request built by `build_request_data` to a single tool call per response, e.g. for token streaming,
+        whose interfaces accumulate one tool call at a time.
+        """
+        return request_data
+
     @abstractmethod
     def request(self, request_data: dict, llm_config: LLMConfig) -> dict:
         """
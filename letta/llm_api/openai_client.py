@@ -2,7 +2,7 @@ import os
 from typing import List, Optional
 
 import openai
-from openai import AsyncOpenAI, AsyncStream, OpenAI
+from openai import AsyncStream, OpenAI
 from openai.types.chat.chat_completion import ChatCompletion
 from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
 
@@ -20,6 +20,7 @@ from letta.errors import (
     LLMTimeoutError,
     LLMUnprocessableEntityError,
 )
+from letta.llm_api.client_registry import get_async_openai_client
 from letta.llm_api.helpers import add_inner_thoughts_to_functions, convert_to_structured_output, unpack_all_inner_thoughts_from_kwargs
 from letta.llm_api.llm_client_base import LLMClientBase
 from letta.local_llm.constants import INNER_THOUGHTS_KWARG, INNER_THOUGHTS_KWARG_DESCRIPTION, INNER_THOUGHTS_KWARG_DESCRIPTION_GO_FIRST
@@ -36,7 +37,7 @@ from letta.schemas.openai.chat_completion_request import FunctionSchema
 from letta.schemas.openai.chat_completion_request import Tool as OpenAITool
 from letta.schemas.openai.chat_completion_request import ToolFunctionChoice, cast_message_to_subtype
 from letta.schemas.openai.chat_completion_response import ChatCompletionResponse
-from letta.settings import model_settings
+from letta.settings import model_settings, settings
 
 logger = get_logger(__name__)
 
@@ -228,7 +229,7 @@ class OpenAIClient(LLMClientBase):
             data.frequency_penalty = llm_config.frequency_penalty
 
         if tools and supports_parallel_tool_calling(model):
-            data.parallel_tool_calls = False
+            data.parallel_tool_calls = settings.enable_parallel_tool_calls
 
         # always set user id for openai requests
         if self.actor:
@@ -255,6 +256,12 @@ class OpenAIClient(LLMClientBase):
 
         return data.model_dump(exclude_unset=True)
 
+    def disable_parallel_tool_calls(self, request_data: dict) -> dict:
+        # only models that support the parameter have it set
+        if "parallel_tool_calls" in request_data:
+            request_data["parallel_tool_calls"] = False
+        return request_data
+
     @trace_method
     def request(self, request_data: dict, llm_config: LLMConfig) -> dict:
         """
@@ -271,7 +278,7 @@ class OpenAIClient(LLMClientBase):
         Performs underlying asynchronous request to OpenAI API and returns raw response dict.
         """
         kwargs = await self._prepare_client_kwargs_async(llm_config)
-        client = AsyncOpenAI(**kwargs)
+        client = get_async_openai_client(**kwargs)
 
         response: ChatCompletion = await client.chat.completions.create(**request_data)
         return response.model_dump()
@@ -312,7 +319,7 @@ class OpenAIClient(LLMClientBase):
         Performs underlying asynchronous streaming request to OpenAI and returns the async stream iterator.
         """
         kwargs = await self._prepare_client_kwargs_async(llm_config)
-        client = AsyncOpenAI(**kwargs)
+        client = get_async_openai_client(**kwargs)
         response_stream: AsyncStream[ChatCompletionChunk] = await client.chat.completions.create(
             **request_data, stream=True, stream_options={"include_usage": True}
         )
@@ -322,7 +329,7 @@ class OpenAIClient(LLMClientBase):
     async def request_embeddings(self, inputs: List[str], embedding_config: EmbeddingConfig) -> List[List[float]]:
         """Request embeddings given texts and embedding config"""
         kwargs = self._prepare_client_kwargs_embedding(embedding_config)
-        client = AsyncOpenAI(**kwargs)
+        client = get_async_openai_client(**kwargs)
         response = await client.embeddings.create(model=embedding_config.embedding_model, input=inputs)
 
         # TODO: add total usage
@@ -1,10 +1,11 @@
 from typing import List, Optional
 
 from openai.types.chat.chat_completion_message_tool_call import ChatCompletionMessageToolCall as OpenAIToolCall
-from sqlalchemy import BigInteger, FetchedValue, ForeignKey, Index, event, text
-from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
+from sqlalchemy import JSON, BigInteger, Column, FetchedValue, ForeignKey, Index, event, literal_column, text
+from sqlalchemy.orm import Mapped, Session, deferred, mapped_column, relationship
 
-from letta.orm.custom_columns import MessageContentColumn, ToolCallColumn, ToolReturnColumn
+from letta.constants import MAX_EMBEDDING_DIM, MESSAGE_EMBEDDING_INDEX_DIM
+from letta.orm.custom_columns import CommonVector, MessageContentColumn, ToolCallColumn, ToolReturnColumn
 from letta.orm.mixins import AgentMixin, OrganizationMixin
 from letta.orm.sqlalchemy_base import SqlalchemyBase
 from letta.schemas.letta_message_content import MessageContent
@@ -13,6 +14,9 @@ from letta.schemas.message import Message as PydanticMessage
 from letta.schemas.message import ToolReturn
 from letta.settings import DatabaseChoice, settings
 
+# the part of `messages.embedding` the Postgres vector index is built on, searches must order by the same expression
+MESSAGE_EMBEDDING_INDEX_EXPRESSION = f"(((embedding::real[])[1:{MESSAGE_EMBEDDING_INDEX_DIM}])::vector({MESSAGE_EMBEDDING_INDEX_DIM}))"
+
 
 class Message(SqlalchemyBase, OrganizationMixin, AgentMixin):
     """Defines data model for storing Message objects"""
@@ -23,6 +27,25 @@ class Message(SqlalchemyBase, OrganizationMixin, AgentMixin):
         Index("ix_messages_created_at", "created_at", "id"),
         Index("ix_messages_agent_sequence", "agent_id", "sequence_id"),
         Index("ix_messages_org_agent", "organization_id", "agent_id"),
+        # full-text index over the text parts of the content; SQLite mirrors messages into an FTS5 table instead
+        *(
+            [
+                Index(
+                    "ix_messages_content_tsv",
+                    text("""to_tsvector('english', jsonb_path_query_array(content::jsonb, '$[*] ? (@.type == "text").text'))"""),
+                    postgresql_using="gin",
+                ),
+                # approximate nearest-neighbour index for semantic recall; the SQLite equivalent is a sqlite-vec table
+                Index(
+                    "ix_messages_embedding_hnsw",
+                    literal_column(MESSAGE_EMBEDDING_INDEX_EXPRESSION).label("embedding_prefix"),
+                    postgresql_using="hnsw",
+                    postgresql_ops={"embedding_prefix": "vector_cosine_ops"},
+                ),
+            ]
+            if settings.database_engine is DatabaseChoice.POSTGRES
+            else []
+        ),
     )
     __pydantic_model__ = PydanticMessage
 
@@ -52,6 +75,18 @@ class Message(SqlalchemyBase, OrganizationMixin, AgentMixin):
     is_err: Mapped[Optional[bool]] = mapped_column(
         nullable=True, doc="Whether this message is part of an error step. Used only for debugging purposes."
     )
+    token_counts: Mapped[Optional[dict]] = mapped_column(
+        JSON, nullable=True, doc="Token counts of this message keyed by tokenizer family, so context windows don't re-tokenize it"
+    )
+
+    # Embedding of the message text for semantic recall, written in the background when `settings.message_embeddings`
+    # is enabled. Deferred so that listing messages doesn't load it.
+    if settings.database_engine is DatabaseChoice.POSTGRES:
+        from pgvector.sqlalchemy import Vector
+
+        embedding = deferred(Column(Vector(MAX_EMBEDDING_DIM), nullable=True))
+    else:
+        embedding = deferred(Column(CommonVector, nullable=True))
 
     # Monotonically increasing sequence for efficient/correct listing
     sequence_id: Mapped[int] = mapped_column(
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import JSON, Column, Index
+from sqlalchemy import JSON, Column, Index, text
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 
 from letta.config import LettaConfig
@@ -87,6 +87,7 @@ class ArchivalPassage(BasePassage, ArchiveMixin):
                 Index("ix_archival_passages_org_archive", "organization_id", "archive_id"),
                 Index("archival_passages_created_at_id_idx", "created_at", "id"),
                 Index("ix_archival_passages_archive_id", "archive_id"),
+                Index("ix_archival_passages_text_tsv", text("to_tsvector('english', text)"), postgresql_using="gin"),
                 {"extend_existing": True},
             )
         return (
@@ -14,6 +14,10 @@ if settings.database_engine == DatabaseChoice.SQLITE:
 
 logger = get_logger(__name__)
 
+# connection info key recording whether sqlite-vec was loaded into that connection
+SQLITE_VEC_LOADED = "letta_sqlite_vec_loaded"
+_sqlite_vec_load_warned = False
+
 
 def adapt_array(arr):
     """
@@ -134,6 +138,31 @@ def cosine_distance(embedding1, embedding2, expected_dim=MAX_EMBEDDING_DIM):
     return distance
 
 
+def load_sqlite_vec_extension(dbapi_connection, is_aiosqlite_connection: bool) -> bool:
+    """
+    Load the sqlite-vec extension into a new connection.
+
+    Returns False instead of raising when the interpreter's sqlite3 module was built without extension loading,
+    so vector search keeps working through the exact `cosine_distance` path.
+    """
+    try:
+        if is_aiosqlite_connection:
+            dbapi_connection.run_async(lambda conn: conn.enable_load_extension(True))
+            dbapi_connection.run_async(lambda conn: conn.load_extension(sqlite_vec.loadable_path()))
+            dbapi_connection.run_async(lambda conn: conn.enable_load_extension(False))
+        else:
+            dbapi_connection.enable_load_extension(True)
+            sqlite_vec.load(dbapi_connection)
+            dbapi_connection.enable_load_extension(False)
+        return True
+    except Exception as e:
+        global _sqlite_vec_load_warned
+        if not _sqlite_vec_load_warned:
+            _sqlite_vec_load_warned = True
+            logger.warning(f"Could not load sqlite-vec extension, passage vector search will use exact scans: {e}")
+        return False
+
+
 # Note: sqlite-vec provides native SQL functions for vector operations
 # We don't need custom Python distance functions since sqlite-vec handles this at the SQL level
 @event.listens_for(Engine, "connect")
@@ -162,6 +191,10 @@ def register_functions(dbapi_connection, connection_record):
         except Exception as e:
             raise RuntimeError(f"Failed to load sqlite-vec extension: {e}")
 
+        # The vector index needs the sqlite-vec extension loaded on every connection that touches it
+        if settings.sqlite_vector_index:
+            connection_record.info[SQLITE_VEC_LOADED] = load_sqlite_vec_extension(dbapi_connection, is_aiosqlite_connection)
+
         # Register custom cosine_distance function for backward compatibility
         try:
             if is_aiosqlite_connection:
@@ -182,6 +182,109 @@ class MetricRegistry:
             ),
         )
 
+    # (includes provider, hit)
+    @property
+    def llm_client_pool_lookup_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_llm_client_pool_lookup",
+            partial(
+                self._meter.create_counter,
+                name="count_llm_client_pool_lookup",
+                description="Counts shared LLM client lookups, split by whether a pooled client was reused",
+                unit="1",
+            ),
+        )
+
+    @property
+    def llm_client_pool_clients_gauge(self) -> Gauge:
+        return self._get_or_create_metric(
+            "gauge_llm_client_pool_clients",
+            partial(
+                self._meter.create_gauge,
+                name="gauge_llm_client_pool_clients",
+                description="Number of shared LLM clients held by the client registry",
+                unit="1",
+            ),
+        )
+
+    # (includes cache, tier)
+    @property
+    def cache_hit_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_cache_hit",
+            partial(
+                self._meter.create_counter,
+                name="count_cache_hit",
+                description="Counts cache lookups that found a value",
+                unit="1",
+            ),
+        )
+
+    # (includes cache, tier)
+    @property
+    def cache_miss_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_cache_miss",
+            partial(
+                self._meter.create_counter,
+                name="count_cache_miss",
+                description="Counts cache lookups that did not find a value",
+                unit="1",
+            ),
+        )
+
+    # (includes cache, tier)
+    @property
+    def cache_eviction_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_cache_eviction",
+            partial(
+                self._meter.create_counter,
+                name="count_cache_eviction",
+                description="Counts entries evicted from bounded in-process caches",
+                unit="1",
+            ),
+        )
+
+    # (includes model)
+    @property
+    def embedding_requests_saved_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_embedding_requests_saved",
+            partial(
+                self._meter.create_counter,
+                name="count_embedding_requests_saved",
+                description="Counts embedding requests served entirely from the embedding cache",
+                unit="1",
+            ),
+        )
+
+    # (includes backend, scope: process or shared)
+    @property
+    def agent_lock_queue_depth_histogram(self) -> Histogram:
+        return self._get_or_create_metric(
+            "hist_agent_lock_queue_depth",
+            partial(
+                self._meter.create_histogram,
+                name="hist_agent_lock_queue_depth",
+                description="Runs of the same agent queued ahead of a run when it starts waiting for the agent lock",
+                unit="1",
+            ),
+        )
+
+    # (includes backend)
+    @property
+    def agent_lock_wait_ms_histogram(self) -> Histogram:
+        return self._get_or_create_metric(
+            "hist_agent_lock_wait_ms",
+            partial(
+                self._meter.create_histogram,
+                name="hist_agent_lock_wait_ms",
+                description="Time a run waits for earlier runs of the same agent to release the agent lock",
+                unit="ms",
+            ),
+        )
+
     # Database connection pool metrics
     # (includes engine_name)
     @property
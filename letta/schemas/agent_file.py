@@ -1,15 +1,18 @@
 from datetime import datetime
+from enum import Enum
 from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
 from letta.schemas.agent import AgentState, CreateAgent
 from letta.schemas.block import Block, CreateBlock
+from letta.schemas.embedding_config import EmbeddingConfig
 from letta.schemas.enums import MessageRole
 from letta.schemas.file import FileAgent, FileAgentBase, FileMetadata, FileMetadataBase
 from letta.schemas.group import Group, GroupCreate
 from letta.schemas.mcp import MCPServer
 from letta.schemas.message import Message, MessageCreate
+from letta.schemas.passage import Passage
 from letta.schemas.source import Source, SourceCreate
 from letta.schemas.tool import Tool
 from letta.schemas.user import User
@@ -103,9 +106,14 @@ class AgentSchema(CreateAgent):
 
     @classmethod
     async def from_agent_state(
-        cls, agent_state: AgentState, message_manager: MessageManager, files_agents: List[FileAgent], actor: User
+        cls,
+        agent_state: AgentState,
+        message_manager: MessageManager,
+        files_agents: List[FileAgent],
+        actor: User,
+        include_messages: bool = True,
     ) -> "AgentSchema":
-        """Convert AgentState to AgentSchema"""
+        """Convert AgentState to AgentSchema (without messages if `include_messages` is False, e.g. when they are streamed)"""
 
         create_agent = CreateAgent(
             name=agent_state.name,
@@ -151,9 +159,11 @@ class AgentSchema(CreateAgent):
             per_file_view_window_char_limit=agent_state.per_file_view_window_char_limit,
         )
 
-        messages = await message_manager.list_messages_for_agent_async(
-            agent_id=agent_state.id, actor=actor, limit=50
-        )  # TODO: Expand to get more messages
+        messages = []
+        if include_messages:
+            messages = await message_manager.list_messages_for_agent_async(
+                agent_id=agent_state.id, actor=actor, limit=50
+            )  # TODO: Expand to get more messages
 
         # Convert messages to MessageSchema objects
         message_schemas = [MessageSchema.from_message(msg) for msg in messages]
@@ -326,3 +336,78 @@ class AgentFileSchema(BaseModel):
         default_factory=dict, description="Metadata for this agent file, including revision_id and other export information."
     )
     created_at: Optional[datetime] = Field(default=None, description="The timestamp when the object was created.")
+
+
+class PassageSchema(BaseModel):
+    """Archival or source passage with human-readable IDs for streamed agent files"""
+
+    __id_prefix__ = "passage"
+    id: str = Field(..., description="Human-readable identifier for this passage in the file")
+    text: str = Field(..., description="The text of the passage")
+    metadata: Optional[Dict] = Field(default_factory=dict, description="The metadata of the passage")
+    embedding_config: Optional[EmbeddingConfig] = Field(None, description="The embedding configuration used by the passage")
+    created_at: Optional[datetime] = Field(None, description="The creation date of the passage")
+    agent_id: Optional[str] = Field(None, description="The agent whose archival memory holds this passage")
+    file_id: Optional[str] = Field(None, description="The file this source passage was chunked from")
+    source_id: Optional[str] = Field(None, description="The source of the file this source passage was chunked from")
+    embedding: Optional[str] = Field(None, description="The embedding, base64 encoded little-endian float32 (inline embeddings)")
+    embedding_offset: Optional[int] = Field(None, description="Byte offset of the embedding in the sidecar file (sidecar embeddings)")
+    embedding_dim: Optional[int] = Field(None, description="Number of float32 values of the embedding in the sidecar file")
+
+    @classmethod
+    def from_passage(cls, passage: Passage) -> "PassageSchema":
+        """Convert Passage to PassageSchema, without its embedding"""
+        return cls(
+            id=passage.id,
+            text=passage.text,
+            metadata=passage.metadata or {},
+            embedding_config=passage.embedding_config,
+            created_at=passage.created_at,
+            file_id=passage.file_id,
+            source_id=passage.source_id,
+        )
+
+
+class AgentFileEmbeddings(str, Enum):
+    """How passage embeddings are shipped in a streamed agent file"""
+
+    none = "none"  # passages are re-embedded on import
+    inline = "inline"  # base64 encoded in each passage record
+    sidecar = "sidecar"  # in a separate binary file, referenced by offset from each passage record
+
+
+class AgentFileRecordType(str, Enum):
+    header = "header"
+    mcp_server = "mcp_server"
+    tool = "tool"
+    block = "block"
+    source = "source"
+    file = "file"
+    agent = "agent"
+    message = "message"
+    passage = "passage"
+    group = "group"
+    end = "end"
+
+
+class AgentFileStreamHeader(BaseModel):
+    """First record of a streamed agent file"""
+
+    version: int = Field(..., description="Version of the streamed agent file format")
+    embeddings: AgentFileEmbeddings = Field(..., description="How passage embeddings are shipped")
+    source_passages: bool = Field(False, description="Whether the source passages of files are shipped, so files need no re-embedding")
+    metadata: Dict[str, str] = Field(default_factory=dict, description="Metadata for this agent file, including revision_id")
+    created_at: Optional[datetime] = Field(default=None, description="The timestamp when the object was created.")
+
+
+class AgentFileRecord(BaseModel):
+    """
+    One line of a streamed agent file (newline-delimited JSON).
+
+    Records follow the import dependency order: the header, MCP servers, tools, blocks, sources and files, then each
+    agent followed by its messages (in conversation order) and archival passages, then source passages, groups and an
+    end record carrying the number of records of each type, so that truncated files are detected.
+    """
+
+    type: AgentFileRecordType = Field(..., description="The type of the record")
+    data: Dict[str, Any] = Field(default_factory=dict, description="The record, e.g. a serialized AgentSchema for agent records")
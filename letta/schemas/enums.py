@@ -127,6 +127,7 @@ class JobType(str, Enum):
     JOB = "job"
     RUN = "run"
     BATCH = "batch"
+    FILE_INGESTION = "file_ingestion"
 
 
 class ToolSourceType(str, Enum):
@@ -1,6 +1,8 @@
 import asyncio
+import hashlib
 import logging
-from typing import TYPE_CHECKING, List, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Literal, Optional
 
 from jinja2 import Template, TemplateSyntaxError
 from pydantic import BaseModel, Field, field_validator
@@ -59,6 +61,12 @@ class ContextWindowOverview(BaseModel):
     messages: List[Message] = Field(..., description="The messages in the context window.")
 
 
+@lru_cache(maxsize=256)
+def get_compiled_template(prompt_template: str, enable_async: bool = False) -> Template:
+    """Parse and compile a Jinja2 template once per distinct template string. Compiled templates are safe to share."""
+    return Template(prompt_template, enable_async=enable_async)
+
+
 class Memory(BaseModel, validate_assignment=True):
     """
 
@@ -124,10 +132,10 @@ class Memory(BaseModel, validate_assignment=True):
         """
         try:
             # Validate Jinja2 syntax
-            Template(prompt_template)
+            template = get_compiled_template(prompt_template)
 
             # Validate compatibility with current memory structure
-            Template(prompt_template).render(blocks=self.blocks, file_blocks=self.file_blocks, sources=[], max_files_open=None)
+            template.render(blocks=self.blocks, file_blocks=self.file_blocks, sources=[], max_files_open=None)
 
             # If we get here, the template is valid and compatible
             self.prompt_template = prompt_template
@@ -142,11 +150,10 @@ class Memory(BaseModel, validate_assignment=True):
         Async version of set_prompt_template that doesn't block the event loop.
         """
         try:
-            # Validate Jinja2 syntax with async enabled
-            Template(prompt_template)
+            # Validate Jinja2 syntax
+            template = get_compiled_template(prompt_template)
 
             # Validate compatibility with current memory structure - use async rendering
-            template = Template(prompt_template)
             await asyncio.to_thread(template.render, blocks=self.blocks, file_blocks=self.file_blocks, sources=[], max_files_open=None)
 
             # If we get here, the template is valid and compatible
@@ -160,7 +167,7 @@ class Memory(BaseModel, validate_assignment=True):
     def compile(self, tool_usage_rules=None, sources=None, max_files_open=None) -> str:
         """Generate a string representation of the memory in-context using the Jinja2 template"""
         try:
-            template = Template(self.prompt_template)
+            template = get_compiled_template(self.prompt_template)
             return template.render(
                 blocks=self.blocks,
                 file_blocks=self.file_blocks,
@@ -177,7 +184,7 @@ class Memory(BaseModel, validate_assignment=True):
     async def compile_async(self, tool_usage_rules=None, sources=None, max_files_open=None) -> str:
         """Async version of compile that doesn't block the event loop"""
         try:
-            template = Template(self.prompt_template, enable_async=True)
+            template = get_compiled_template(self.prompt_template, enable_async=True)
             return await template.render_async(
                 blocks=self.blocks,
                 file_blocks=self.file_blocks,
@@ -195,6 +202,21 @@ class Memory(BaseModel, validate_assignment=True):
         """Compile the memory in a thread"""
         return await asyncio.to_thread(self.compile, tool_usage_rules=tool_usage_rules, sources=sources, max_files_open=max_files_open)
 
+    def fingerprint(self, tool_usage_rules=None, sources=None, max_files_open=None) -> str:
+        """
+        Hash everything `compile` renders from (template, blocks, file blocks, tool rule prompts, sources), so callers can
+        tell that the compiled memory is unchanged without rendering it.
+        """
+        hasher = hashlib.sha256()
+        hasher.update(self.prompt_template.encode("utf-8"))
+        for block in self.blocks + self.file_blocks:
+            hasher.update(block.model_dump_json().encode("utf-8"))
+        hasher.update(str(tool_usage_rules).encode("utf-8"))
+        for source in sources or []:
+            hasher.update(source.model_dump_json().encode("utf-8"))
+        hasher.update(str(max_files_open).encode("utf-8"))
+        return hasher.hexdigest()
+
     def list_block_labels(self) -> List[str]:
         """Return a list of the block names held inside the memory object"""
         # return list(self.memory.keys())
@@ -325,3 +347,15 @@ class RecallMemorySummary(BaseModel):
 
 class CreateArchivalMemory(BaseModel):
     text: str = Field(..., description="Text to write to archival memory.")
+
+
+class CreateArchivalMemoryBulk(BaseModel):
+    texts: List[str] = Field(..., description="Texts to write to archival memory. Each text is chunked and embedded independently.")
+
+
+class ArchivalMemoryInsertResult(BaseModel):
+    index: int = Field(..., description="Position of the text in the request.")
+    status: Literal["created", "duplicate", "failed"] = Field(..., description="Outcome of inserting the text.")
+    passage_ids: List[str] = Field(default_factory=list, description="IDs of the passages created for the text.")
+    duplicate_of: Optional[int] = Field(None, description="Index of an earlier text in the request with identical content.")
+    error: Optional[str] = Field(None, description="Why the text could not be inserted.")
@@ -174,6 +174,9 @@ class Message(BaseMessage):
     is_err: Optional[bool] = Field(
         default=None, description="Whether this message is part of an error step. Used only for debugging purposes."
     )
+    token_counts: Optional[Dict[str, int]] = Field(
+        default=None, description="Token counts of this message, keyed by tokenizer family. Computed when the message is persisted."
+    )
     # This overrides the optional base orm schema, created_at MUST exist on all messages objects
     created_at: datetime = Field(default_factory=get_utc_time, description="The timestamp when the object was created.")
 
@@ -17,7 +17,13 @@ from starlette.middleware.cors import CORSMiddleware
 from letta.__init__ import __version__ as letta_version
 from letta.agents.exceptions import IncompatibleAgentType
 from letta.constants import ADMIN_PREFIX, API_PREFIX, OPENAI_API_PREFIX
-from letta.errors import BedrockPermissionError, LettaAgentNotFoundError, LettaUserNotFoundError
+from letta.errors import (
+    AgentLockReentryError,
+    AgentLockTimeoutError,
+    BedrockPermissionError,
+    LettaAgentNotFoundError,
+    LettaUserNotFoundError,
+)
 from letta.helpers.pinecone_utils import get_pinecone_indices, should_use_pinecone, upsert_pinecone_indices
 from letta.jobs.scheduler import start_scheduler_with_leader_election
 from letta.log import get_logger
@@ -44,6 +50,7 @@ from letta.server.rest_api.static_files import mount_static_files
 from letta.server.rest_api.utils import SENTRY_ENABLED
 from letta.server.server import SyncServer
 from letta.settings import settings, telemetry_settings
+from letta.utils import safe_create_task
 
 if SENTRY_ENABLED:
     import sentry_sdk
@@ -137,6 +144,31 @@ async def lifespan(app_: FastAPI):
         logger.info(f"[Worker {worker_id}] Scheduler initialization completed")
     except Exception as e:
         logger.error(f"[Worker {worker_id}] Scheduler initialization failed: {e}", exc_info=True)
+
+    if settings.file_ingestion_queue_enabled and settings.file_ingestion_run_worker:
+        from letta.services.file_processor.ingestion_queue import start_file_ingestion_worker
+
+        start_file_ingestion_worker()
+        logger.info(f"[Worker {worker_id}] File ingestion worker started")
+
+    # Subscribe to run cancellations before any run starts
+    from letta.services.run_cancellation_bus import get_run_cancellation_bus
+
+    if get_run_cancellation_bus() is not None:
+        logger.info(f"[Worker {worker_id}] Run cancellation bus started ({settings.run_cancellation_backend.value})")
+
+    if settings.telemetry_write_behind_enabled:
+        from letta.services.telemetry_buffer import get_telemetry_buffer
+
+        # also claims telemetry spilled by processes that exited before flushing it
+        get_telemetry_buffer()
+        logger.info(f"[Worker {worker_id}] Telemetry write-behind buffer started")
+
+    if settings.model_catalog_enabled:
+        from letta.services.model_catalog import get_model_catalog
+
+        # load persisted model lists (or list the providers) before the first request needs them
+        safe_create_task(get_model_catalog().warm(server._enabled_providers), logger=logger, label="warm model catalog")
     logger.info(f"[Worker {worker_id}] Lifespan startup completed")
     yield
 
@@ -150,6 +182,66 @@ async def lifespan(app_: FastAPI):
     except Exception as e:
         logger.error(f"[Worker {worker_id}] Scheduler shutdown failed: {e}", exc_info=True)
 
+    # Stop claiming file ingestion jobs; in-flight jobs are picked up again once their lease expires
+    from letta.services.file_processor.ingestion_queue import stop_file_ingestion_worker
+
+    await stop_file_ingestion_worker()
+
+    # Stop listening for run cancellations
+    from letta.services.run_cancellation_bus import close_run_cancellation_buses
+
+    await close_run_cancellation_buses()
+
+    # Release agent locks still held by runs that did not finish
+    from letta.services.per_agent_lock_manager import close_per_agent_lock_managers
+
+    await close_per_agent_lock_managers()
+
+    # Stop warm local sandbox workers
+    from letta.services.tool_sandbox.local_worker_pool import close_local_sandbox_worker_pools
+
+    await close_local_sandbox_worker_pools()
+
+    # Stop file parse workers
+    from letta.services.file_processor.parser.parse_pool import close_file_parse_worker_pools
+
+    await close_file_parse_worker_pools()
+
+    # Close pooled MCP sessions
+    from letta.services.mcp.session_pool import close_mcp_session_pools
+
+    await close_mcp_session_pools()
+
+    # Cancel multi-agent sends still running after their fan-out returned
+    from letta.services.fan_out_scheduler import close_fan_out_schedulers
+
+    await close_fan_out_schedulers()
+
+    # Cancel compaction summaries still being prepared
+    from letta.services.summarizer.compaction_checkpoints import close_compaction_checkpoint_stores
+
+    await close_compaction_checkpoint_stores()
+
+    # Cancel message embeddings still in flight, those messages stay keyword-searchable only
+    from letta.services.message_embedder import close_message_embedders
+
+    await close_message_embedders()
+
+    # Stop refreshing model lists
+    from letta.services.model_catalog import close_model_catalogs
+
+    await close_model_catalogs()
+
+    # Close shared LLM provider clients
+    from letta.llm_api.client_registry import close_llm_client_registries
+
+    await close_llm_client_registries()
+
+    # Write telemetry that is still buffered
+    from letta.services.telemetry_buffer import close_telemetry_buffers
+
+    await close_telemetry_buffers()
+
     # Cleanup SQLAlchemy instrumentation
     if not settings.disable_tracing and settings.sqlalchemy_tracing:
         try:
@@ -232,6 +324,8 @@ def create_application() -> "FastAPI":
     app.add_exception_handler(LettaUserNotFoundError, _error_handler_404_user)
     app.add_exception_handler(ForeignKeyConstraintViolationError, _error_handler_409)
     app.add_exception_handler(UniqueConstraintViolationError, _error_handler_409)
+    app.add_exception_handler(AgentLockTimeoutError, _error_handler_409)
+    app.add_exception_handler(AgentLockReentryError, _error_handler_409)
 
     @app.exception_handler(IncompatibleAgentType)
     async def handle_incompatible_agent_type(request: Request, exc: IncompatibleAgentType):
@@ -1,19 +1,36 @@
-import asyncio
-from typing import TYPE_CHECKING, List, Optional, Union
+import json
+import time
+import uuid
+from typing import TYPE_CHECKING, AsyncGenerator, List, Optional, Union
 
 from fastapi import APIRouter, Body, Depends, Header, HTTPException
-from fastapi.responses import StreamingResponse
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_chunk import Choice as ChunkChoice
+from openai.types.chat.chat_completion_chunk import ChoiceDelta
 from openai.types.chat.completion_create_params import CompletionCreateParams
+from openai.types.completion_usage import CompletionUsage
 
-from letta.agent import Agent
-from letta.constants import DEFAULT_MESSAGE_TOOL, DEFAULT_MESSAGE_TOOL_KWARG, LETTA_MODEL_ENDPOINT
+from letta.agents.letta_agent import LettaAgent
+from letta.groups.sleeptime_multi_agent_v2 import SleeptimeMultiAgentV2
+from letta.helpers.datetime_helpers import get_utc_timestamp_ns
+from letta.llm_api.llm_client import LLMClient
 from letta.log import get_logger
-from letta.schemas.message import Message, MessageCreate
+from letta.orm.errors import NoResultFound
+from letta.schemas.agent import AgentState, AgentType
+from letta.schemas.enums import MessageStreamStatus
+from letta.schemas.letta_message import AssistantMessage, MessageType
+from letta.schemas.letta_stop_reason import StopReasonType
+from letta.schemas.message import MessageCreate
+from letta.schemas.usage import LettaUsageStatistics
 from letta.schemas.user import User
-from letta.server.rest_api.chat_completions_interface import ChatCompletionsStreamingInterface
+from letta.server.rest_api.streaming_response import StreamingResponseWithStatusCode
 
 # TODO this belongs in a controller!
-from letta.server.rest_api.utils import get_letta_server, get_user_message_from_chat_completions_request, sse_async_generator
+from letta.server.rest_api.utils import get_letta_server, get_user_message_from_chat_completions_request
+from letta.services.summarizer.enums import SummarizationMode
+from letta.services.telemetry_manager import NoopTelemetryManager
+from letta.settings import settings
 
 if TYPE_CHECKING:
     from letta.server.server import SyncServer
@@ -30,7 +47,7 @@ logger = get_logger(__name__)
     responses={
         200: {
             "description": "Successful response",
-            "content": {"text/event-stream": {}},
+            "content": {"application/json": {}, "text/event-stream": {}},
         }
     },
 )
@@ -40,18 +57,27 @@ async def create_chat_completions(
     server: "SyncServer" = Depends(get_letta_server),
     user_id: Optional[str] = Header(None, alias="user_id"),
 ):
-    # Validate and process fields
-    if not completion_request["stream"]:
-        raise HTTPException(status_code=400, detail="Must be streaming request: `stream` was set to `False` in the request.")
+    """
+    OpenAI-compatible chat completions against an agent: the last user message is sent to the agent, and the messages
+    it sends back are returned as the completion (streamed as chunks if `stream` is set).
+    """
+    request_start_timestamp_ns = get_utc_timestamp_ns()
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=user_id)
 
-    actor = server.user_manager.get_user_or_default(user_id=user_id)
+    try:
+        agent = await server.agent_manager.get_agent_by_id_async(agent_id, actor, include_relationships=["multi_agent_group"])
+    except NoResultFound:
+        raise HTTPException(status_code=404, detail=f"Agent with id={agent_id} not found for user_id={actor.id}.")
 
-    letta_agent = server.load_agent(agent_id=agent_id, actor=actor)
-    llm_config = letta_agent.agent_state.llm_config
-    if llm_config.model_endpoint_type != "openai" or llm_config.model_endpoint == LETTA_MODEL_ENDPOINT:
-        error_msg = f"You can only use models with type 'openai' for chat completions. This agent {agent_id} has llm_config: \n{llm_config.model_dump_json(indent=4)}"
+    llm_config = agent.llm_config
+    if LLMClient.create(provider_type=llm_config.model_endpoint_type, actor=actor) is None:
+        error_msg = f"Chat completions are not supported for models of type '{llm_config.model_endpoint_type}'. This agent {agent_id} has llm_config: \n{llm_config.model_dump_json(indent=4)}"
         logger.error(error_msg)
         raise HTTPException(status_code=400, detail=error_msg)
+    if agent.multi_agent_group is not None and agent.multi_agent_group.manager_type not in ["sleeptime", "voice_sleeptime"]:
+        raise HTTPException(
+            status_code=400, detail=f"Chat completions are not supported for agents in {agent.multi_agent_group.manager_type} groups."
+        )
 
     model = completion_request.get("model")
     if model != llm_config.model:
@@ -61,69 +87,173 @@ async def create_chat_completions(
 
     return await send_message_to_agent_chat_completions(
         server=server,
-        letta_agent=letta_agent,
+        agent=agent,
         actor=actor,
         messages=get_user_message_from_chat_completions_request(completion_request),
+        stream=bool(completion_request.get("stream")),
+        include_usage=bool((completion_request.get("stream_options") or {}).get("include_usage")),
+        request_start_timestamp_ns=request_start_timestamp_ns,
     )
 
 
 async def send_message_to_agent_chat_completions(
     server: "SyncServer",
-    letta_agent: Agent,
+    agent: AgentState,
     actor: User,
-    messages: Union[List[Message], List[MessageCreate]],
-    assistant_message_tool_name: str = DEFAULT_MESSAGE_TOOL,
-    assistant_message_tool_kwarg: str = DEFAULT_MESSAGE_TOOL_KWARG,
-) -> StreamingResponse:
+    messages: List[MessageCreate],
+    stream: bool = True,
+    include_usage: bool = False,
+    request_start_timestamp_ns: Optional[int] = None,
+) -> Union[StreamingResponseWithStatusCode, ChatCompletion]:
     """Split off into a separate function so that it can be imported in the /chat/completion proxy."""
-    # For streaming response
-    try:
-        # TODO: cleanup this logic
-        llm_config = letta_agent.agent_state.llm_config
-
-        # Create a new interface per request
-        letta_agent.interface = ChatCompletionsStreamingInterface()
-        streaming_interface = letta_agent.interface
-        if not isinstance(streaming_interface, ChatCompletionsStreamingInterface):
-            raise ValueError(f"Agent has wrong type of interface: {type(streaming_interface)}")
-
-        # Allow AssistantMessage is desired by client
-        streaming_interface.assistant_message_tool_name = assistant_message_tool_name
-        streaming_interface.assistant_message_tool_kwarg = assistant_message_tool_kwarg
-
-        # Related to JSON buffer reader
-        streaming_interface.inner_thoughts_in_kwargs = (
-            llm_config.put_inner_thoughts_in_kwargs if llm_config.put_inner_thoughts_in_kwargs is not None else False
-        )
+    agent_loop = _create_agent_loop(server, agent, actor)
+    completion_id = f"chatcmpl-{uuid.uuid4()}"
+    created = int(time.time())
 
-        # Offload the synchronous message_func to a separate thread
-        streaming_interface.stream_start()
-        asyncio.create_task(
-            asyncio.to_thread(
-                server.send_messages,
-                actor=actor,
-                agent_id=letta_agent.agent_state.id,
+    if stream:
+        # tokens are streamed where the agent loop supports it, otherwise each assistant message is sent as one chunk
+        if agent.llm_config.model_endpoint_type in ["anthropic", "openai", "bedrock"]:
+            letta_stream = agent_loop.step_stream(
                 input_messages=messages,
-                interface=streaming_interface,
-                put_inner_thoughts_first=False,
+                use_assistant_message=True,
+                request_start_timestamp_ns=request_start_timestamp_ns,
+                include_return_message_types=[MessageType.assistant_message],
             )
+        else:
+            letta_stream = agent_loop.step_stream_no_tokens(
+                messages,
+                use_assistant_message=True,
+                request_start_timestamp_ns=request_start_timestamp_ns,
+                include_return_message_types=[MessageType.assistant_message],
+            )
+        return StreamingResponseWithStatusCode(
+            _chat_completion_chunks(letta_stream, completion_id, created, agent.llm_config.model, include_usage),
+            media_type="text/event-stream",
         )
 
-        # return a stream
-        return StreamingResponse(
-            sse_async_generator(
-                streaming_interface.get_generator(),
-                usage_task=None,
-                finish_message=True,
-            ),
-            media_type="text/event-stream",
+    response = await agent_loop.step(
+        messages,
+        use_assistant_message=True,
+        request_start_timestamp_ns=request_start_timestamp_ns,
+        include_return_message_types=[MessageType.assistant_message],
+    )
+    content = "\n".join(_assistant_text(message) for message in response.messages if isinstance(message, AssistantMessage))
+    return ChatCompletion(
+        id=completion_id,
+        object="chat.completion",
+        created=created,
+        model=agent.llm_config.model,
+        choices=[
+            Choice(
+                index=0,
+                message=ChatCompletionMessage(role="assistant", content=content),
+                finish_reason=_finish_reason(response.stop_reason.stop_reason),
+            )
+        ],
+        usage=_completion_usage(response.usage),
+    )
+
+
+def _create_agent_loop(server: "SyncServer", agent: AgentState, actor: User) -> Union[LettaAgent, SleeptimeMultiAgentV2]:
+    telemetry_manager = server.telemetry_manager if settings.llm_api_logging else NoopTelemetryManager()
+    if agent.enable_sleeptime and agent.agent_type != AgentType.voice_convo_agent:
+        return SleeptimeMultiAgentV2(
+            agent_id=agent.id,
+            message_manager=server.message_manager,
+            agent_manager=server.agent_manager,
+            block_manager=server.block_manager,
+            passage_manager=server.passage_manager,
+            group_manager=server.group_manager,
+            job_manager=server.job_manager,
+            actor=actor,
+            step_manager=server.step_manager,
+            telemetry_manager=telemetry_manager,
+            group=agent.multi_agent_group,
         )
+    return LettaAgent(
+        agent_id=agent.id,
+        message_manager=server.message_manager,
+        agent_manager=server.agent_manager,
+        block_manager=server.block_manager,
+        job_manager=server.job_manager,
+        passage_manager=server.passage_manager,
+        actor=actor,
+        step_manager=server.step_manager,
+        telemetry_manager=telemetry_manager,
+        summarizer_mode=(
+            SummarizationMode.STATIC_MESSAGE_BUFFER
+            if agent.agent_type == AgentType.voice_convo_agent
+            else SummarizationMode.PARTIAL_EVICT_MESSAGE_BUFFER
+        ),
+    )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(e)
-        import traceback
 
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"{e}")
+async def _chat_completion_chunks(
+    letta_stream: AsyncGenerator[Union[str, tuple], None], completion_id: str, created: int, model: str, include_usage: bool
+) -> AsyncGenerator[Union[str, tuple], None]:
+    """Translate the server-sent events of the agent loop into OpenAI chat completion chunks."""
+
+    def chunk(delta: ChoiceDelta, finish_reason: Optional[str] = None) -> str:
+        completion_chunk = ChatCompletionChunk(
+            id=completion_id,
+            object="chat.completion.chunk",
+            created=created,
+            model=model,
+            choices=[ChunkChoice(index=0, delta=delta, finish_reason=finish_reason)],
+        )
+        return f"data: {completion_chunk.model_dump_json(exclude_none=True)}\n\n"
+
+    role_sent = False
+    async for event in letta_stream:
+        if isinstance(event, tuple):
+            # (content, status_code) chunks are reported as is by the streaming response
+            yield event
+            continue
+
+        data = event.removeprefix("data: ").strip()
+        if data == MessageStreamStatus.done.value:
+            yield f"data: {data}\n\n"
+            continue
+        try:
+            payload = json.loads(data)
+        except json.JSONDecodeError:
+            # e.g. keepalive pings
+            continue
+
+        message_type = payload.get("message_type")
+        if message_type == MessageType.assistant_message.value:
+            text = _assistant_text(AssistantMessage.model_validate(payload))
+            if text:
+                yield chunk(ChoiceDelta(content=text, role=None if role_sent else "assistant"))
+                role_sent = True
+        elif message_type == "stop_reason":
+            yield chunk(ChoiceDelta(), finish_reason=_finish_reason(payload.get("stop_reason")))
+        elif message_type == "usage_statistics" and include_usage:
+            usage_chunk = ChatCompletionChunk(
+                id=completion_id,
+                object="chat.completion.chunk",
+                created=created,
+                model=model,
+                choices=[],
+                usage=_completion_usage(LettaUsageStatistics.model_validate(payload)),
+            )
+            yield f"data: {usage_chunk.model_dump_json(exclude_none=True)}\n\n"
+
+
+def _finish_reason(stop_reason: Optional[str]) -> str:
+    # running out of steps is the agent loop's equivalent of running out of tokens
+    return "length" if stop_reason == StopReasonType.max_steps else "stop"
+
+
+def _assistant_text(message: AssistantMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(content.text for content in message.content)
+
+
+def _completion_usage(usage: LettaUsageStatistics) -> CompletionUsage:
+    return CompletionUsage(
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        total_tokens=usage.total_tokens,
+    )
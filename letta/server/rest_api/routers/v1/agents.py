@@ -15,6 +15,8 @@ from starlette.responses import Response, StreamingResponse
 from letta.agents.letta_agent import LettaAgent
 from letta.constants import DEFAULT_MAX_STEPS, DEFAULT_MESSAGE_TOOL, DEFAULT_MESSAGE_TOOL_KWARG, REDIS_RUN_ID_PREFIX
 from letta.data_sources.redis_client import get_redis_client
+from letta.errors import AgentFileImportError
+from letta.groups.helpers import ASYNC_GROUP_MANAGER_TYPES, load_multi_agent_v2
 from letta.groups.sleeptime_multi_agent_v2 import SleeptimeMultiAgentV2
 from letta.helpers.datetime_helpers import get_utc_timestamp_ns
 from letta.log import get_logger
@@ -22,14 +24,17 @@ from letta.orm.errors import NoResultFound
 from letta.otel.context import get_ctx_attributes
 from letta.otel.metric_registry import MetricRegistry
 from letta.schemas.agent import AgentState, AgentType, CreateAgent, UpdateAgent
+from letta.schemas.agent_file import AgentFileEmbeddings
+from letta.schemas.agent_file import AgentSchema as AgentFileAgentSchema
 from letta.schemas.block import Block, BlockUpdate
+from letta.schemas.enums import MessageRole
 from letta.schemas.group import Group
 from letta.schemas.job import JobStatus, JobUpdate, LettaRequestConfig
 from letta.schemas.letta_message import LettaMessageUnion, LettaMessageUpdateUnion, MessageType
 from letta.schemas.letta_request import LettaAsyncRequest, LettaRequest, LettaStreamingRequest
 from letta.schemas.letta_response import LettaResponse
-from letta.schemas.memory import ContextWindowOverview, CreateArchivalMemory, Memory
-from letta.schemas.message import MessageCreate
+from letta.schemas.memory import ContextWindowOverview, CreateArchivalMemory, CreateArchivalMemoryBulk, Memory
+from letta.schemas.message import Message, MessageCreate
 from letta.schemas.passage import Passage, PassageUpdate
 from letta.schemas.run import Run
 from letta.schemas.source import Source
@@ -38,6 +43,7 @@ from letta.schemas.user import User
 from letta.serialize_schemas.pydantic_agent_schema import AgentSchema
 from letta.server.rest_api.utils import get_letta_server
 from letta.server.server import SyncServer
+from letta.services.agent_serialization_manager import iter_agent_file_lines
 from letta.services.summarizer.enums import SummarizationMode
 from letta.services.telemetry_manager import NoopTelemetryManager
 from letta.settings import settings
@@ -222,6 +228,59 @@ def import_agent_serialized(
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred while uploading the agent: {e!s}")
 
 
+@router.get("/{agent_id}/export/stream", response_class=StreamingResponse, operation_id="export_agent_file_stream")
+async def export_agent_file_stream(
+    agent_id: str,
+    embeddings: AgentFileEmbeddings = Query(
+        AgentFileEmbeddings.none,
+        description="Whether to ship passage embeddings inline (so they need not be recomputed on import) or not at all. Sidecar embeddings are only available from the Python API.",
+    ),
+    server: "SyncServer" = Depends(get_letta_server),
+    actor_id: str | None = Header(None, alias="user_id"),
+):
+    """
+    Export an agent as a streamed agent file: newline-delimited JSON records, written while messages and passages are
+    read from the database, so that large agents can be exported without building the whole file in memory.
+    """
+    if embeddings == AgentFileEmbeddings.sidecar:
+        raise HTTPException(status_code=400, detail="Sidecar embeddings cannot be exported over HTTP, use inline embeddings instead.")
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+    try:
+        # fail before the response starts for unknown agents
+        await server.agent_manager.get_agent_by_id_async(agent_id=agent_id, actor=actor, include_relationships=[])
+    except NoResultFound:
+        raise HTTPException(status_code=404, detail=f"Agent with id={agent_id} not found for user_id={actor.id}.")
+
+    lines = server.agent_serialization_manager.export_stream(agent_ids=[agent_id], actor=actor, embeddings=embeddings)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.post("/import/stream", response_model=list[str], operation_id="import_agent_file_stream")
+async def import_agent_file_stream(
+    file: UploadFile = File(...),
+    server: "SyncServer" = Depends(get_letta_server),
+    actor_id: str | None = Header(None, alias="user_id"),
+    env_vars: Optional[Dict[str, Any]] = Form(None, description="Environment variables to pass to the agent for tool execution."),
+):
+    """
+    Import a streamed agent file, as exported by `export_agent_file_stream`, reading and inserting it record by record.
+    Returns the IDs of the imported agents.
+    """
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+
+    async def read_chunks():
+        while chunk := await file.read(1024 * 1024):
+            yield chunk
+
+    try:
+        result = await server.agent_serialization_manager.import_stream(
+            lines=iter_agent_file_lines(read_chunks()), actor=actor, env_vars=env_vars
+        )
+    except AgentFileImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [db_id for file_id, db_id in result.id_mappings.items() if file_id.startswith(f"{AgentFileAgentSchema.__id_prefix__}-")]
+
+
 @router.get("/{agent_id}/context", response_model=ContextWindowOverview, operation_id="retrieve_agent_context_window")
 async def retrieve_agent_context_window(
     agent_id: str,
@@ -752,6 +811,43 @@ async def create_passage(
     return await server.insert_archival_memory_async(agent_id=agent_id, memory_contents=request.text, actor=actor)
 
 
+@router.post(
+    "/{agent_id}/archival-memory/bulk",
+    response_model=None,
+    operation_id="create_passages_bulk",
+    responses={
+        200: {
+            "description": "Successful response",
+            "content": {
+                "text/event-stream": {"description": "Server-Sent Events stream of ArchivalMemoryInsertResult, one per text"},
+            },
+        }
+    },
+)
+async def create_passages_bulk(
+    agent_id: str,
+    request: CreateArchivalMemoryBulk = Body(...),
+    server: "SyncServer" = Depends(get_letta_server),
+    actor_id: str | None = Header(None, alias="user_id"),
+):
+    """
+    Insert many memories into an agent's archival memory store.
+
+    Texts identical to an earlier text in the request, or whose chunks are all already stored, are reported as duplicates.
+    Results are streamed back in completion order as each text is stored.
+    """
+    from letta.server.rest_api.streaming_response import StreamingResponseWithStatusCode
+
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+    results = await server.insert_archival_memory_bulk_async(agent_id=agent_id, texts=request.texts, actor=actor)
+
+    async def result_stream():
+        async for result in results:
+            yield f"data: {result.model_dump_json()}\n\n"
+
+    return StreamingResponseWithStatusCode(result_stream(), media_type="text/event-stream")
+
+
 @router.patch("/{agent_id}/archival-memory/{memory_id}", response_model=list[Passage], operation_id="modify_passage")
 def modify_passage(
     agent_id: str,
@@ -828,6 +924,38 @@ async def list_messages(
     )
 
 
+@router.get("/{agent_id}/messages/search", response_model=AgentMessagesResponse, operation_id="search_messages")
+async def search_messages(
+    agent_id: str,
+    query: str = Query(..., description="Text to find semantically similar messages to."),
+    roles: list[MessageRole] | None = Query(None, description="Only search messages with these roles."),
+    start_date: datetime | None = Query(None, description="Only search messages created at or after this time."),
+    end_date: datetime | None = Query(None, description="Only search messages created at or before this time."),
+    limit: int = Query(10, ge=1, le=100, description="Number of most similar messages to return."),
+    server: "SyncServer" = Depends(get_letta_server),
+    actor_id: str | None = Header(None, alias="user_id"),  # Extract user_id from header, default to None if not present
+):
+    """
+    Search an agent's message history by semantic similarity, most similar first.
+    Only messages embedded since message embeddings were enabled on the server are searched.
+    """
+    if not settings.message_embeddings:
+        raise HTTPException(status_code=400, detail="Message embeddings are disabled")
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+    agent = await server.agent_manager.get_agent_by_id_async(agent_id=agent_id, actor=actor, include_relationships=[])
+    messages = await server.message_manager.semantic_search_messages_for_agent_async(
+        agent_id=agent_id,
+        actor=actor,
+        query_text=query,
+        embedding_config=agent.embedding_config,
+        roles=roles,
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+    )
+    return Message.to_letta_messages_from_list(messages, reverse=False)
+
+
 @router.patch("/{agent_id}/messages/{message_id}", response_model=LettaMessageUnion, operation_id="modify_message")
 def modify_message(
     agent_id: str,
@@ -867,7 +995,11 @@ async def send_message(
     actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
     # TODO: This is redundant, remove soon
     agent = await server.agent_manager.get_agent_by_id_async(agent_id, actor, include_relationships=["multi_agent_group"])
-    agent_eligible = agent.multi_agent_group is None or agent.multi_agent_group.manager_type in ["sleeptime", "voice_sleeptime"]
+    agent_eligible = (
+        agent.multi_agent_group is None
+        or agent.multi_agent_group.manager_type in ["sleeptime", "voice_sleeptime"]
+        or (settings.async_group_runtimes and agent.multi_agent_group.manager_type in ASYNC_GROUP_MANAGER_TYPES)
+    )
     model_compatible = agent.llm_config.model_endpoint_type in [
         "anthropic",
         "openai",
@@ -908,7 +1040,11 @@ async def send_message(
 
     try:
         if agent_eligible and model_compatible:
-            if agent.enable_sleeptime and agent.agent_type != AgentType.voice_convo_agent:
+            if agent.multi_agent_group is not None and agent.multi_agent_group.manager_type in ASYNC_GROUP_MANAGER_TYPES:
+                agent_loop = load_multi_agent_v2(
+                    group=agent.multi_agent_group, agent_id=agent_id, actor=actor, server=server, current_run_id=run.id if run else None
+                )
+            elif agent.enable_sleeptime and agent.agent_type != AgentType.voice_convo_agent:
                 agent_loop = SleeptimeMultiAgentV2(
                     agent_id=agent_id,
                     message_manager=server.message_manager,
@@ -1009,7 +1145,11 @@ async def send_message_streaming(
     actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
     # TODO: This is redundant, remove soon
     agent = await server.agent_manager.get_agent_by_id_async(agent_id, actor, include_relationships=["multi_agent_group"])
-    agent_eligible = agent.multi_agent_group is None or agent.multi_agent_group.manager_type in ["sleeptime", "voice_sleeptime"]
+    agent_eligible = (
+        agent.multi_agent_group is None
+        or agent.multi_agent_group.manager_type in ["sleeptime", "voice_sleeptime"]
+        or (settings.async_group_runtimes and agent.multi_agent_group.manager_type in ASYNC_GROUP_MANAGER_TYPES)
+    )
     model_compatible = agent.llm_config.model_endpoint_type in [
         "anthropic",
         "openai",
@@ -1051,7 +1191,11 @@ async def send_message_streaming(
 
     try:
         if agent_eligible and model_compatible:
-            if agent.enable_sleeptime and agent.agent_type != AgentType.voice_convo_agent:
+            if agent.multi_agent_group is not None and agent.multi_agent_group.manager_type in ASYNC_GROUP_MANAGER_TYPES:
+                agent_loop = load_multi_agent_v2(
+                    group=agent.multi_agent_group, agent_id=agent_id, actor=actor, server=server, current_run_id=run.id if run else None
+                )
+            elif agent.enable_sleeptime and agent.agent_type != AgentType.voice_convo_agent:
                 agent_loop = SleeptimeMultiAgentV2(
                     agent_id=agent_id,
                     message_manager=server.message_manager,
@@ -1204,7 +1348,11 @@ async def _process_message_background(
     request_start_timestamp_ns = get_utc_timestamp_ns()
     try:
         agent = await server.agent_manager.get_agent_by_id_async(agent_id, actor, include_relationships=["multi_agent_group"])
-        agent_eligible = agent.multi_agent_group is None or agent.multi_agent_group.manager_type in ["sleeptime", "voice_sleeptime"]
+        agent_eligible = (
+            agent.multi_agent_group is None
+            or agent.multi_agent_group.manager_type in ["sleeptime", "voice_sleeptime"]
+            or (settings.async_group_runtimes and agent.multi_agent_group.manager_type in ASYNC_GROUP_MANAGER_TYPES)
+        )
         model_compatible = agent.llm_config.model_endpoint_type in [
             "anthropic",
             "openai",
@@ -1215,7 +1363,11 @@ async def _process_message_background(
             "ollama",
         ]
         if agent_eligible and model_compatible:
-            if agent.enable_sleeptime and agent.agent_type != AgentType.voice_convo_agent:
+            if agent.multi_agent_group is not None and agent.multi_agent_group.manager_type in ASYNC_GROUP_MANAGER_TYPES:
+                agent_loop = load_multi_agent_v2(
+                    group=agent.multi_agent_group, agent_id=agent_id, actor=actor, server=server, current_run_id=run_id
+                )
+            elif agent.enable_sleeptime and agent.agent_type != AgentType.voice_convo_agent:
                 agent_loop = SleeptimeMultiAgentV2(
                     agent_id=agent_id,
                     message_manager=server.message_manager,
@@ -5,13 +5,19 @@ from fastapi.responses import JSONResponse
 from pydantic import Field
 
 from letta.constants import DEFAULT_MESSAGE_TOOL, DEFAULT_MESSAGE_TOOL_KWARG
+from letta.groups.helpers import ASYNC_GROUP_MANAGER_TYPES, load_multi_agent_v2
+from letta.groups.multi_agent_group_v2 import MultiAgentGroupV2
+from letta.helpers.datetime_helpers import get_utc_timestamp_ns
 from letta.orm.errors import NoResultFound
 from letta.schemas.group import Group, GroupCreate, GroupUpdate, ManagerType
 from letta.schemas.letta_message import LettaMessageUnion, LettaMessageUpdateUnion
 from letta.schemas.letta_request import LettaRequest, LettaStreamingRequest
 from letta.schemas.letta_response import LettaResponse
+from letta.schemas.user import User
+from letta.server.rest_api.streaming_response import StreamingResponseWithStatusCode, add_keepalive_to_stream
 from letta.server.rest_api.utils import get_letta_server
 from letta.server.server import SyncServer
+from letta.settings import settings
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
@@ -139,7 +145,18 @@ async def send_group_message(
     Process a user message and return the group's response.
     This endpoint accepts a message from a user and processes it through through agents in the group based on the specified pattern
     """
+    request_start_timestamp_ns = get_utc_timestamp_ns()
     actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+    group_loop = await _load_async_group_runtime(server, group_id, actor)
+    if group_loop is not None:
+        return await group_loop.step(
+            request.messages,
+            max_steps=request.max_steps,
+            use_assistant_message=request.use_assistant_message,
+            request_start_timestamp_ns=request_start_timestamp_ns,
+            include_return_message_types=request.include_return_message_types,
+        )
+
     result = await server.send_group_message_to_agent(
         group_id=group_id,
         actor=actor,
@@ -178,7 +195,23 @@ async def send_group_message_streaming(
     This endpoint accepts a message from a user and processes it through agents in the group based on the specified pattern.
     It will stream the steps of the response always, and stream the tokens if 'stream_tokens' is set to True.
     """
+    request_start_timestamp_ns = get_utc_timestamp_ns()
     actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+    group_loop = await _load_async_group_runtime(server, group_id, actor)
+    if group_loop is not None:
+        # each participant's tokens are streamed if its model supports it, see `MultiAgentGroupV2`
+        stream_method = group_loop.step_stream if request.stream_tokens else group_loop.step_stream_no_tokens
+        stream = stream_method(
+            request.messages,
+            max_steps=request.max_steps,
+            use_assistant_message=request.use_assistant_message,
+            request_start_timestamp_ns=request_start_timestamp_ns,
+            include_return_message_types=request.include_return_message_types,
+        )
+        if request.include_pings and settings.enable_keepalive:
+            stream = add_keepalive_to_stream(stream, keepalive_interval=settings.keepalive_interval)
+        return StreamingResponseWithStatusCode(stream, media_type="text/event-stream")
+
     result = await server.send_group_message_to_agent(
         group_id=group_id,
         actor=actor,
@@ -193,6 +226,21 @@ async def send_group_message_streaming(
     return result
 
 
+async def _load_async_group_runtime(server: SyncServer, group_id: str, actor: User) -> Optional[MultiAgentGroupV2]:
+    """The async runtime of the group, if enabled for its type; otherwise the group is run by the legacy agent."""
+    if not settings.async_group_runtimes:
+        return None
+    try:
+        group = await server.group_manager.retrieve_group_async(group_id=group_id, actor=actor)
+    except NoResultFound:
+        raise HTTPException(status_code=404, detail=f"Group id={group_id} not found for user_id={actor.id}.")
+    if group.manager_type not in ASYNC_GROUP_MANAGER_TYPES:
+        return None
+    if len(group.agent_ids) == 0:
+        raise HTTPException(status_code=400, detail="Empty group: group must have at least one agent")
+    return load_multi_agent_v2(group=group, agent_id=group.manager_agent_id or group.agent_ids[0], actor=actor, server=server)
+
+
 GroupMessagesResponse = Annotated[
     List[LettaMessageUnion], Field(json_schema_extra={"type": "array", "items": {"$ref": "#/components/schemas/LettaMessageUnion"}})
 ]
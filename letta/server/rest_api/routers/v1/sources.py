@@ -32,6 +32,7 @@ from letta.services.file_processor.embedder.openai_embedder import OpenAIEmbedde
 from letta.services.file_processor.embedder.pinecone_embedder import PineconeEmbedder
 from letta.services.file_processor.file_processor import FileProcessor
 from letta.services.file_processor.file_types import get_allowed_media_types, get_extension_to_mime_type_map, register_mime_types
+from letta.services.file_processor.ingestion_queue import enqueue_file_ingestion
 from letta.services.file_processor.parser.markitdown_parser import MarkitdownFileParser
 from letta.services.file_processor.parser.mistral_parser import MistralFileParser
 from letta.settings import settings
@@ -292,10 +293,15 @@ async def upload_file_to_source(
         file_path=None,
         file_type=mimetypes.guess_type(original_filename)[0] or file.content_type or "unknown",
         file_size=file.size if file.size is not None else None,
-        processing_status=FileProcessingStatus.PARSING,
+        processing_status=FileProcessingStatus.PENDING if settings.file_ingestion_queue_enabled else FileProcessingStatus.PARSING,
     )
     file_metadata = await server.file_manager.create_file(file_metadata, actor=actor)
 
+    if settings.file_ingestion_queue_enabled:
+        await enqueue_file_ingestion(content=content, file_metadata=file_metadata, actor=actor)
+        safe_create_task(sleeptime_document_ingest_async(server, source_id, actor), logger=logger, label="sleeptime_document_ingest_async")
+        return file_metadata
+
     # TODO: Do we need to pull in the full agent_states? Can probably simplify here right?
     agent_states = await server.source_manager.list_attached_agents(source_id=source_id, actor=actor)
 
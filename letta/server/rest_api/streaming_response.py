@@ -15,6 +15,7 @@ from letta.schemas.letta_ping import LettaPing
 from letta.schemas.user import User
 from letta.server.rest_api.utils import capture_sentry_exception
 from letta.services.job_manager import JobManager
+from letta.services.run_cancellation_bus import get_run_cancellation_bus
 
 logger = get_logger(__name__)
 
@@ -113,14 +114,16 @@ async def cancellation_aware_stream_wrapper(
     Wraps a stream generator to provide real-time job cancellation checking.
 
     This wrapper periodically checks for job cancellation while streaming and
-    can interrupt the stream at any point, not just at step boundaries.
+    can interrupt the stream at any point, not just at step boundaries. When a
+    run cancellation bus is configured, every chunk is checked against it
+    instead, without querying the database.
 
     Args:
         stream_generator: The original stream generator to wrap
         job_manager: Job manager instance for checking job status
         job_id: ID of the job to monitor for cancellation
         actor: User/actor making the request
-        cancellation_check_interval: How often to check for cancellation (seconds)
+        cancellation_check_interval: How often to check for cancellation (seconds) when polling the database
 
     Yields:
         Stream chunks from the original generator until cancelled
@@ -128,27 +131,34 @@ async def cancellation_aware_stream_wrapper(
     Raises:
         asyncio.CancelledError: If the job is cancelled during streaming
     """
+    cancellation_bus = get_run_cancellation_bus()
     last_cancellation_check = asyncio.get_event_loop().time()
 
     try:
         async for chunk in stream_generator:
-            # Check for cancellation periodically (not on every chunk for performance)
-            current_time = asyncio.get_event_loop().time()
-            if current_time - last_cancellation_check >= cancellation_check_interval:
-                try:
-                    job = await job_manager.get_job_by_id_async(job_id=job_id, actor=actor)
-                    if job.status == JobStatus.cancelled:
-                        logger.info(f"Stream cancelled for job {job_id}, interrupting stream")
-                        # Send cancellation event to client
-                        cancellation_event = {"message_type": "stop_reason", "stop_reason": "cancelled"}
-                        yield f"data: {json.dumps(cancellation_event)}\n\n"
-                        # Raise custom exception for explicit job cancellation
-                        raise JobCancelledException(job_id, f"Job {job_id} was cancelled")
-                except Exception as e:
-                    # Log warning but don't fail the stream if cancellation check fails
-                    logger.warning(f"Failed to check job cancellation for job {job_id}: {e}")
-
-                last_cancellation_check = current_time
+            if cancellation_bus is not None:
+                cancelled = cancellation_bus.is_cancelled(job_id)
+            else:
+                cancelled = False
+                # Check for cancellation periodically (not on every chunk for performance)
+                current_time = asyncio.get_event_loop().time()
+                if current_time - last_cancellation_check >= cancellation_check_interval:
+                    try:
+                        job = await job_manager.get_job_by_id_async(job_id=job_id, actor=actor)
+                        cancelled = job.status == JobStatus.cancelled
+                    except Exception as e:
+                        # Log warning but don't fail the stream if cancellation check fails
+                        logger.warning(f"Failed to check job cancellation for job {job_id}: {e}")
+
+                    last_cancellation_check = current_time
+
+            if cancelled:
+                logger.info(f"Stream cancelled for job {job_id}, interrupting stream")
+                # Send cancellation event to client
+                cancellation_event = {"message_type": "stop_reason", "stop_reason": "cancelled"}
+                yield f"data: {json.dumps(cancellation_event)}\n\n"
+                # Raise custom exception for explicit job cancellation
+                raise JobCancelledException(job_id, f"Job {job_id} was cancelled")
 
             yield chunk
 
@@ -3,7 +3,7 @@ import json
 import os
 import uuid
 from enum import Enum
-from typing import TYPE_CHECKING, AsyncGenerator, Dict, Iterable, List, Optional, Union, cast
+from typing import TYPE_CHECKING, AsyncGenerator, Dict, Iterable, List, Optional, Tuple, Union, cast
 
 from fastapi import Header, HTTPException
 from openai.types.chat import ChatCompletionMessageParam
@@ -263,6 +263,90 @@ def create_letta_messages_from_llm_response(
     return messages
 
 
+def create_letta_messages_from_parallel_llm_response(
+    agent_id: str,
+    model: str,
+    tool_call_results: List[Tuple[str, str, Dict, ToolExecutionResult, Optional[str]]],
+    timezone: str,
+    actor: User,
+    continue_stepping: bool = False,
+    heartbeat_reason: Optional[str] = None,
+    reasoning_content: Optional[List[Union[TextContent, ReasoningContent, RedactedReasoningContent, OmittedReasoningContent]]] = None,
+    pre_computed_assistant_message_id: Optional[str] = None,
+    step_id: str | None = None,
+) -> List[Message]:
+    """
+    Parallel counterpart of `create_letta_messages_from_llm_response`: one assistant message carrying every tool call,
+    followed by one tool message per call (in call order) and an optional heartbeat.
+
+    Each entry in `tool_call_results` is (tool_call_id, function_name, function_arguments, tool_execution_result, function_response).
+    """
+    tool_calls = []
+    for tool_call_id, function_name, function_arguments, _, _ in tool_call_results:
+        function_arguments[REQUEST_HEARTBEAT_PARAM] = continue_stepping
+        tool_calls.append(
+            OpenAIToolCall(
+                id=tool_call_id,
+                function=OpenAIFunction(
+                    name=function_name,
+                    arguments=json.dumps(function_arguments),
+                ),
+                type="function",
+            )
+        )
+
+    assistant_message = Message(
+        role=MessageRole.assistant,
+        content=reasoning_content if reasoning_content else [],
+        agent_id=agent_id,
+        model=model,
+        tool_calls=tool_calls,
+        tool_call_id=tool_calls[0].id,
+        created_at=get_utc_time(),
+    )
+    if pre_computed_assistant_message_id:
+        assistant_message.id = pre_computed_assistant_message_id
+    messages = [assistant_message]
+
+    for tool_call_id, function_name, _, tool_execution_result, function_response in tool_call_results:
+        messages.append(
+            Message(
+                role=MessageRole.tool,
+                content=[TextContent(text=package_function_response(tool_execution_result.success_flag, function_response, timezone))],
+                agent_id=agent_id,
+                model=model,
+                tool_calls=[],
+                tool_call_id=tool_call_id,
+                created_at=get_utc_time(),
+                name=function_name,
+                tool_returns=[
+                    ToolReturn(
+                        status=tool_execution_result.status,
+                        stderr=tool_execution_result.stderr,
+                        stdout=tool_execution_result.stdout,
+                    )
+                ],
+            )
+        )
+
+    if continue_stepping:
+        messages.append(
+            create_heartbeat_system_message(
+                agent_id=agent_id,
+                model=model,
+                function_call_success=all(result.success_flag for _, _, _, result, _ in tool_call_results),
+                actor=actor,
+                timezone=timezone,
+                heartbeat_reason=heartbeat_reason,
+            )
+        )
+
+    for message in messages:
+        message.step_id = step_id
+
+    return messages
+
+
 def create_heartbeat_system_message(
     agent_id: str,
     model: str,
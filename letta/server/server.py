@@ -6,7 +6,7 @@ import warnings
 from abc import abstractmethod
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple, Union
 
 import httpx
 from anthropic import AsyncAnthropic
@@ -49,7 +49,7 @@ from letta.schemas.letta_message_content import TextContent
 from letta.schemas.letta_response import LettaResponse
 from letta.schemas.letta_stop_reason import LettaStopReason, StopReasonType
 from letta.schemas.llm_config import LLMConfig
-from letta.schemas.memory import ArchivalMemorySummary, Memory, RecallMemorySummary
+from letta.schemas.memory import ArchivalMemoryInsertResult, ArchivalMemorySummary, Memory, RecallMemorySummary
 from letta.schemas.message import Message, MessageCreate, MessageUpdate
 from letta.schemas.passage import Passage, PassageUpdate
 from letta.schemas.pip_requirement import PipRequirement
@@ -94,6 +94,7 @@ from letta.services.mcp.sse_client import MCP_CONFIG_TOPLEVEL_KEY, AsyncSSEMCPCl
 from letta.services.mcp.stdio_client import AsyncStdioMCPClient
 from letta.services.mcp_manager import MCPManager
 from letta.services.message_manager import MessageManager
+from letta.services.model_catalog import get_model_catalog
 from letta.services.organization_manager import OrganizationManager
 from letta.services.passage_manager import PassageManager
 from letta.services.provider_manager import ProviderManager
@@ -765,6 +766,9 @@ class SyncServer(Server):
 
     @trace_method
     async def get_cached_llm_config_async(self, actor: User, **kwargs):
+        if settings.model_catalog_enabled:
+            # the catalog already resolves handles without listing models, and refreshes them
+            return await self.get_llm_config_from_handle_async(actor=actor, **kwargs)
         key = make_key(**kwargs)
         if key not in self._llm_config_cache:
             self._llm_config_cache[key] = await self.get_llm_config_from_handle_async(actor=actor, **kwargs)
@@ -780,6 +784,8 @@ class SyncServer(Server):
     # @async_redis_cache(key_func=lambda (actor, **kwargs): actor.id + hash(kwargs))
     @trace_method
     async def get_cached_embedding_config_async(self, actor: User, **kwargs):
+        if settings.model_catalog_enabled:
+            return await self.get_embedding_config_from_handle_async(actor=actor, **kwargs)
         key = make_key(**kwargs)
         if key not in self._embedding_config_cache:
             self._embedding_config_cache[key] = await self.get_embedding_config_from_handle_async(actor=actor, **kwargs)
@@ -1157,6 +1163,16 @@ class SyncServer(Server):
 
         return passages
 
+    async def insert_archival_memory_bulk_async(
+        self, agent_id: str, texts: List[str], actor: User
+    ) -> AsyncGenerator[ArchivalMemoryInsertResult, None]:
+        # Validate up front so errors surface before a streaming response has started
+        if len(texts) > settings.archival_bulk_insert_max_texts:
+            raise ValueError(f"Bulk archival insert accepts at most {settings.archival_bulk_insert_max_texts} texts, got {len(texts)}")
+        agent_state = await self.agent_manager.get_agent_by_id_async(agent_id=agent_id, actor=actor)
+
+        return self.passage_manager.insert_passages_bulk_async(agent_state=agent_state, texts=texts, actor=actor)
+
     def modify_archival_memory(self, agent_id: str, memory_id: str, passage: PassageUpdate, actor: User) -> List[Passage]:
         passage = Passage(**passage.model_dump(exclude_unset=True, exclude_none=True))
         passages = self.passage_manager.update_passage_by_id(passage_id=memory_id, passage=passage, actor=actor)
@@ -1560,6 +1576,8 @@ class SyncServer(Server):
         )
 
         async def get_provider_models(provider: Provider) -> list[LLMConfig]:
+            if settings.model_catalog_enabled:
+                return await get_model_catalog().list_llm_models(provider)
             try:
                 async with asyncio.timeout(constants.GET_PROVIDERS_TIMEOUT_SECONDS):
                     return await provider.list_llm_models_async()
@@ -1604,6 +1622,8 @@ class SyncServer(Server):
 
         # Fetch embedding models from each provider concurrently
         async def get_provider_embedding_models(provider):
+            if settings.model_catalog_enabled:
+                return await get_model_catalog().list_embedding_models(provider)
             try:
                 # All providers now have list_embedding_models_async
                 return await provider.list_embedding_models_async()
@@ -1750,10 +1770,14 @@ class SyncServer(Server):
             provider_name, model_name = handle.split("/", 1)
             provider = await self.get_provider_from_name_async(provider_name, actor)
 
-            all_llm_configs = await provider.list_llm_models_async()
-            llm_configs = [config for config in all_llm_configs if config.handle == handle]
-            if not llm_configs:
-                llm_configs = [config for config in all_llm_configs if config.model == model_name]
+            if settings.model_catalog_enabled:
+                llm_configs = await get_model_catalog().find_llm_configs(provider, handle, model_name)
+                all_llm_configs = llm_configs or await get_model_catalog().list_llm_models(provider)
+            else:
+                all_llm_configs = await provider.list_llm_models_async()
+                llm_configs = [config for config in all_llm_configs if config.handle == handle]
+                if not llm_configs:
+                    llm_configs = [config for config in all_llm_configs if config.model == model_name]
             if not llm_configs:
                 available_handles = [config.handle for config in all_llm_configs]
                 raise HandleNotFoundError(handle, available_handles)
@@ -1828,8 +1852,11 @@ class SyncServer(Server):
             provider_name, model_name = handle.split("/", 1)
             provider = await self.get_provider_from_name_async(provider_name, actor)
 
-            all_embedding_configs = await provider.list_embedding_models_async()
-            embedding_configs = [config for config in all_embedding_configs if config.handle == handle]
+            if settings.model_catalog_enabled:
+                embedding_configs = await get_model_catalog().find_embedding_configs(provider, handle)
+            else:
+                all_embedding_configs = await provider.list_embedding_models_async()
+                embedding_configs = [config for config in all_embedding_configs if config.handle == handle]
             if not embedding_configs:
                 raise ValueError(f"Embedding model {model_name} is not supported by {provider_name}")
         except ValueError as e:
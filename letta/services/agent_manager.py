@@ -1,4 +1,5 @@
 import asyncio
+import heapq
 import os
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Set, Tuple
@@ -23,11 +24,17 @@ from letta.constants import (
     FILES_TOOLS,
 )
 from letta.helpers import ToolRulesSolver
+from letta.helpers.agent_state_cache import (
+    get_agent_state_cache,
+    invalidate_agent_states,
+    invalidates_agent_state,
+    invalidates_all_agent_states,
+)
 from letta.helpers.datetime_helpers import get_utc_time
 from letta.llm_api.llm_client import LLMClient
 from letta.log import get_logger
 from letta.orm import Agent as AgentModel
-from letta.orm import AgentsTags, ArchivalPassage
+from letta.orm import AgentsTags, ArchivalPassage, ArchivesAgents
 from letta.orm import Block as BlockModel
 from letta.orm import BlocksAgents
 from letta.orm import Group as GroupModel
@@ -69,7 +76,7 @@ from letta.server.db import db_registry
 from letta.services.block_manager import BlockManager
 from letta.services.context_window_calculator.context_window_calculator import ContextWindowCalculator
 from letta.services.context_window_calculator.token_counter import AnthropicTokenCounter, TiktokenCounter
-from letta.services.file_processor.chunker.line_chunker import LineChunker
+from letta.services.file_processor.parser.parse_pool import chunk_file_lines
 from letta.services.files_agents_manager import FileAgentManager
 from letta.services.helpers.agent_manager_helper import (
     _apply_filters,
@@ -88,15 +95,32 @@ from letta.services.helpers.agent_manager_helper import (
     check_supports_structured_output,
     compile_system_message,
     derive_system_message,
+    embed_query_text,
     get_system_message_from_compiled_memory,
     initialize_message_sequence,
     initialize_message_sequence_async,
     package_initial_message_sequence,
+    record_system_message_fingerprint,
+    system_message_matches_memory_fingerprint,
     validate_agent_exists_async,
 )
+from letta.services.helpers.full_text_index import (
+    ARCHIVAL_PASSAGE_TEXT_INDEX,
+    ensure_full_text_index_async,
+    keyword_search,
+    query_terms,
+    reciprocal_rank_fusion,
+)
+from letta.services.helpers.passage_vector_index import (
+    ARCHIVAL_PASSAGE_INDEX,
+    SOURCE_PASSAGE_INDEX,
+    schedule_scope_rebuild,
+    search_passage_vector_index,
+)
 from letta.services.identity_manager import IdentityManager
 from letta.services.message_manager import MessageManager
 from letta.services.passage_manager import PassageManager
+from letta.services.per_agent_lock_manager import ensure_agent_lock_held
 from letta.services.source_manager import SourceManager
 from letta.services.tool_manager import ToolManager
 from letta.settings import DatabaseChoice, settings
@@ -750,6 +774,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     def update_agent(
         self,
         agent_id: str,
@@ -875,6 +900,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def update_agent_async(
         self,
         agent_id: str,
@@ -1002,12 +1028,14 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def update_message_ids_async(
         self,
         agent_id: str,
         message_ids: List[str],
         actor: PydanticUser,
     ) -> None:
+        await ensure_agent_lock_held(agent_id)
         async with db_registry.async_session() as session:
             query = select(AgentModel)
             query = AgentModel.apply_access_predicate(query, actor, ["read"], AccessType.ORGANIZATION)
@@ -1204,6 +1232,7 @@ class AgentManager:
         match_all: List[str],
         match_some: List[str],
         limit: Optional[int] = 50,
+        include_relationships: Optional[List[str]] = None,
     ) -> List[PydanticAgentState]:
         """
         Retrieves agents in the same organization that match all specified `match_all` tags
@@ -1215,6 +1244,7 @@ class AgentManager:
             match_all (List[str]): Agents must have all these tags.
             match_some (List[str]): Agents must have at least one of these tags.
             limit (Optional[int]): Maximum number of agents to return.
+            include_relationships (Optional[List[str]]): Relationships to load with the agents (all by default).
 
         Returns:
             List[PydanticAgentState: The filtered list of matching agents.
@@ -1237,8 +1267,11 @@ class AgentManager:
                 query = query.join(AgentsTags).where(AgentsTags.tag.in_(match_some))
 
             query = query.distinct(AgentModel.id).order_by(AgentModel.id).limit(limit)
+            query = _apply_relationship_filters(query, include_relationships)
             result = await session.execute(query)
-            return await asyncio.gather(*[agent.to_pydantic_async() for agent in result.scalars()])
+            return await asyncio.gather(
+                *[agent.to_pydantic_async(include_relationships=include_relationships) for agent in result.scalars()]
+            )
 
     @trace_method
     def size(
@@ -1279,6 +1312,19 @@ class AgentManager:
         include_relationships: Optional[List[str]] = None,
     ) -> PydanticAgentState:
         """Fetch an agent by its ID."""
+        return await get_agent_state_cache().get_or_load(
+            agent_id,
+            actor.organization_id,
+            include_relationships,
+            lambda: self._read_agent_by_id_async(agent_id=agent_id, actor=actor, include_relationships=include_relationships),
+        )
+
+    async def _read_agent_by_id_async(
+        self,
+        agent_id: str,
+        actor: PydanticUser,
+        include_relationships: Optional[List[str]] = None,
+    ) -> PydanticAgentState:
         async with db_registry.async_session() as session:
             try:
                 query = select(AgentModel)
@@ -1348,6 +1394,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     def delete_agent(self, agent_id: str, actor: PydanticUser) -> None:
         """
         Deletes an agent and its associated relationships.
@@ -1396,6 +1443,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def delete_agent_async(self, agent_id: str, actor: PydanticUser) -> None:
         """
         Deletes an agent and its associated relationships.
@@ -1740,9 +1788,21 @@ class AgentManager:
 
         # note: we only update the system prompt if the core memory is changed
         # this means that the archival/recall memory statistics may be someout out of date
+        tool_usage_rules = tool_rules_solver.compile_tool_rule_prompts()
+        memory_fingerprint = agent_state.memory.fingerprint(
+            tool_usage_rules=tool_usage_rules, sources=agent_state.sources, max_files_open=agent_state.max_files_open
+        )
+        if not force and system_message_matches_memory_fingerprint(
+            curr_system_message.id, curr_system_message_openai["content"], memory_fingerprint
+        ):
+            logger.debug(
+                f"Memory fingerprint unchanged for agent id={agent_id} and actor=({actor.id}, {actor.name}), skipping system prompt rebuild"
+            )
+            return agent_state, curr_system_message, num_messages, num_archival_memories
+
         curr_memory_str = await agent_state.memory.compile_in_thread_async(
             sources=agent_state.sources,
-            tool_usage_rules=tool_rules_solver.compile_tool_rule_prompts(),
+            tool_usage_rules=tool_usage_rules,
             max_files_open=agent_state.max_files_open,
         )
         if curr_memory_str in curr_system_message_openai["content"] and not force:
@@ -1750,6 +1810,7 @@ class AgentManager:
             logger.debug(
                 f"Memory hasn't changed for agent id={agent_id} and actor=({actor.id}, {actor.name}), skipping system prompt rebuild"
             )
+            record_system_message_fingerprint(curr_system_message.id, curr_system_message_openai["content"], memory_fingerprint)
             return agent_state, curr_system_message, num_messages, num_archival_memories
 
         # If the memory didn't update, we probably don't want to update the timestamp inside
@@ -1789,6 +1850,7 @@ class AgentManager:
                     message_update=MessageUpdate(**temp_message.model_dump()),
                     actor=actor,
                 )
+                record_system_message_fingerprint(curr_system_message.id, new_system_message_str, memory_fingerprint)
             else:
                 curr_system_message = temp_message
 
@@ -1802,6 +1864,7 @@ class AgentManager:
     @enforce_types
     @trace_method
     async def set_in_context_messages_async(self, agent_id: str, message_ids: List[str], actor: PydanticUser) -> PydanticAgentState:
+        await ensure_agent_lock_held(agent_id)
         return await self.update_agent_async(agent_id=agent_id, agent_update=UpdateAgent(message_ids=message_ids), actor=actor)
 
     @enforce_types
@@ -1848,6 +1911,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def reset_messages_async(
         self, agent_id: str, actor: PydanticUser, add_default_initial_messages: bool = False
     ) -> PydanticAgentState:
@@ -2000,6 +2064,7 @@ class AgentManager:
     # ======================================================================================================================
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def attach_source_async(self, agent_id: str, source_id: str, actor: PydanticUser) -> PydanticAgentState:
         """
         Attaches a source to an agent.
@@ -2098,6 +2163,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def detach_source_async(self, agent_id: str, source_id: str, actor: PydanticUser) -> PydanticAgentState:
         """
         Detaches a source from an agent.
@@ -2192,10 +2258,15 @@ class AgentManager:
                 setattr(block, key, value)
 
             await block.update_async(session, actor=actor)
-            return block.to_pydantic()
+            pydantic_block = block.to_pydantic()
+            if get_agent_state_cache().enabled:
+                result = await session.execute(select(BlocksAgents.agent_id).where(BlocksAgents.block_id == block.id))
+                await invalidate_agent_states(*result.scalars())
+            return pydantic_block
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     def update_block_with_label(
         self,
         agent_id: str,
@@ -2221,6 +2292,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     def attach_block(self, agent_id: str, block_id: str, actor: PydanticUser) -> PydanticAgentState:
         """Attaches a block to an agent. For sleeptime agents, also attaches to paired agents in the same group."""
         with db_registry.session() as session:
@@ -2251,6 +2323,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def attach_block_async(self, agent_id: str, block_id: str, actor: PydanticUser) -> PydanticAgentState:
         """Attaches a block to an agent. For sleeptime agents, also attaches to paired agents in the same group."""
         async with db_registry.async_session() as session:
@@ -2287,6 +2360,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     def detach_block(
         self,
         agent_id: str,
@@ -2308,6 +2382,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def detach_block_async(
         self,
         agent_id: str,
@@ -2329,6 +2404,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     def detach_block_with_label(
         self,
         agent_id: str,
@@ -2352,6 +2428,63 @@ class AgentManager:
     # Passage Management
     # ======================================================================================================================
 
+    @staticmethod
+    def _use_passage_vector_index(embed_query: bool, limit: Optional[int], *filters: Any) -> bool:
+        """The SQLite vector index only answers plain top-k searches; date, cursor and file filters use the exact scan."""
+        return (
+            embed_query
+            and bool(limit)
+            and settings.sqlite_vector_index
+            and settings.database_engine is DatabaseChoice.SQLITE
+            and not any(f is not None for f in filters)
+        )
+
+    @trace_method
+    async def _search_passage_vector_index_async(
+        self,
+        session,
+        query_embedding: List[float],
+        limit: int,
+        agent_id: Optional[str] = None,
+        source_id: Optional[str] = None,
+        include_archival: bool = True,
+        include_sources: bool = True,
+    ) -> Optional[List[str]]:
+        """
+        Get the ids of the `limit` nearest passages from the SQLite vector index.
+
+        Returns None when the search has to fall back to an exact scan, i.e. when the scopes cannot be resolved
+        or any of them has no fresh index (stale scopes are rebuilt in the background).
+        """
+        scopes = []
+        if include_archival:
+            if agent_id is None:
+                return None
+            archive_ids = await session.execute(select(ArchivesAgents.archive_id).where(ArchivesAgents.agent_id == agent_id))
+            scopes.append((ARCHIVAL_PASSAGE_INDEX, list(archive_ids.scalars())))
+        if include_sources:
+            if source_id is not None:
+                scopes.append((SOURCE_PASSAGE_INDEX, [source_id]))
+            elif agent_id is not None:
+                source_ids = await session.execute(select(SourcesAgents.source_id).where(SourcesAgents.agent_id == agent_id))
+                scopes.append((SOURCE_PASSAGE_INDEX, list(source_ids.scalars())))
+            else:
+                return None
+
+        candidates = []
+        for index, scope_ids in scopes:
+            index_candidates, stale_scope_ids = await session.run_sync(
+                lambda sync_session, index=index, scope_ids=scope_ids: search_passage_vector_index(
+                    sync_session.connection(), index, scope_ids, query_embedding, limit
+                )
+            )
+            for scope_id in stale_scope_ids:
+                schedule_scope_rebuild(index, scope_id)
+            if index_candidates is None:
+                return None
+            candidates.extend(index_candidates)
+        return [passage_id for passage_id, _ in heapq.nsmallest(limit, candidates, key=lambda candidate: candidate[1])]
+
     @enforce_types
     @trace_method
     def list_passages(
@@ -2437,6 +2570,19 @@ class AgentManager:
     ) -> List[PydanticPassage]:
         """Lists all passages attached to an agent."""
         async with db_registry.async_session() as session:
+            query_embedding, passage_ids = None, None
+            if self._use_passage_vector_index(embed_query, limit, file_id, start_date, end_date, before, after):
+                query_embedding = embed_query_text(query_text, embedding_config)
+                passage_ids = await self._search_passage_vector_index_async(
+                    session,
+                    query_embedding,
+                    limit,
+                    agent_id=agent_id,
+                    source_id=source_id,
+                    include_archival=agent_id is not None,
+                    include_sources=not agent_only,
+                )
+
             main_query = build_passage_query(
                 actor=actor,
                 agent_id=agent_id,
@@ -2451,6 +2597,8 @@ class AgentManager:
                 ascending=ascending,
                 embedding_config=embedding_config,
                 agent_only=agent_only,
+                query_embedding=query_embedding,
+                passage_ids=passage_ids,
             )
 
             # Add limit
@@ -2500,6 +2648,13 @@ class AgentManager:
     ) -> List[PydanticPassage]:
         """Lists all passages attached to an agent."""
         async with db_registry.async_session() as session:
+            query_embedding, passage_ids = None, None
+            if self._use_passage_vector_index(embed_query, limit, file_id, start_date, end_date, before, after):
+                query_embedding = embed_query_text(query_text, embedding_config)
+                passage_ids = await self._search_passage_vector_index_async(
+                    session, query_embedding, limit, agent_id=agent_id, source_id=source_id, include_archival=False
+                )
+
             main_query = build_source_passage_query(
                 actor=actor,
                 agent_id=agent_id,
@@ -2513,6 +2668,8 @@ class AgentManager:
                 embed_query=embed_query,
                 ascending=ascending,
                 embedding_config=embedding_config,
+                query_embedding=query_embedding,
+                passage_ids=passage_ids,
             )
 
             # Add limit
@@ -2546,6 +2703,13 @@ class AgentManager:
     ) -> List[PydanticPassage]:
         """Lists all passages attached to an agent."""
         async with db_registry.async_session() as session:
+            query_embedding, passage_ids = None, None
+            if self._use_passage_vector_index(embed_query, limit, start_date, end_date, before, after):
+                query_embedding = embed_query_text(query_text, embedding_config)
+                passage_ids = await self._search_passage_vector_index_async(
+                    session, query_embedding, limit, agent_id=agent_id, include_sources=False
+                )
+
             main_query = build_agent_passage_query(
                 actor=actor,
                 agent_id=agent_id,
@@ -2557,6 +2721,8 @@ class AgentManager:
                 embed_query=embed_query,
                 ascending=ascending,
                 embedding_config=embedding_config,
+                query_embedding=query_embedding,
+                passage_ids=passage_ids,
             )
 
             # Add limit
@@ -2572,6 +2738,63 @@ class AgentManager:
             # Convert to Pydantic models
             return [p.to_pydantic() for p in passages]
 
+    @enforce_types
+    @trace_method
+    async def keyword_search_agent_passages_async(
+        self,
+        actor: PydanticUser,
+        agent_id: str,
+        query_text: str,
+        limit: Optional[int] = 50,
+    ) -> List[PydanticPassage]:
+        """
+        Lists the archival passages of an agent that match any word of `query_text`, most relevant first.
+
+        Falls back to the substring filter of `list_agent_passages_async` when the query has no words or the full-text
+        index is unavailable.
+        """
+        terms = query_terms(query_text)
+        if not terms or not await ensure_full_text_index_async():
+            return await self.list_agent_passages_async(actor=actor, agent_id=agent_id, query_text=query_text, limit=limit)
+
+        async with db_registry.async_session() as session:
+            query = (
+                select(ArchivalPassage)
+                .join(ArchivesAgents, ArchivalPassage.archive_id == ArchivesAgents.archive_id)
+                .where(ArchivesAgents.agent_id == agent_id, ArchivalPassage.organization_id == actor.organization_id)
+            )
+            query = keyword_search(query, ARCHIVAL_PASSAGE_TEXT_INDEX, terms)
+            if limit:
+                query = query.limit(limit)
+            result = await session.execute(query)
+            return [p.to_pydantic() for p in result.scalars().all()]
+
+    @enforce_types
+    @trace_method
+    async def hybrid_search_agent_passages_async(
+        self,
+        actor: PydanticUser,
+        agent_id: str,
+        query_text: str,
+        embedding_config: Optional[EmbeddingConfig] = None,
+        limit: Optional[int] = 50,
+    ) -> List[PydanticPassage]:
+        """
+        Lists the archival passages of an agent most relevant to `query_text`, by the reciprocal rank fusion of their
+        vector similarity and full-text rankings.
+        """
+        vector_results, keyword_results = await asyncio.gather(
+            self.list_agent_passages_async(
+                actor=actor, agent_id=agent_id, query_text=query_text, limit=limit, embedding_config=embedding_config, embed_query=True
+            ),
+            self.keyword_search_agent_passages_async(actor=actor, agent_id=agent_id, query_text=query_text, limit=limit),
+        )
+        passages = {passage.id: passage for passage in [*vector_results, *keyword_results]}
+        ranking = reciprocal_rank_fusion(
+            [[passage.id for passage in vector_results], [passage.id for passage in keyword_results]], k=settings.hybrid_search_rrf_k
+        )
+        return [passages[passage_id] for passage_id in ranking[:limit]]
+
     @enforce_types
     @trace_method
     def passage_size(
@@ -2655,6 +2878,7 @@ class AgentManager:
     # ======================================================================================================================
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     def attach_tool(self, agent_id: str, tool_id: str, actor: PydanticUser) -> PydanticAgentState:
         """
         Attaches a tool to an agent.
@@ -2691,6 +2915,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def attach_tool_async(self, agent_id: str, tool_id: str, actor: PydanticUser) -> None:
         """
         Attaches a tool to an agent.
@@ -2745,6 +2970,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def bulk_attach_tools_async(self, agent_id: str, tool_ids: List[str], actor: PydanticUser) -> None:
         """
         Efficiently attaches multiple tools to an agent in a single operation.
@@ -2817,6 +3043,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def attach_missing_files_tools_async(self, agent_state: PydanticAgentState, actor: PydanticUser) -> PydanticAgentState:
         """
         Attaches missing core file tools to an agent.
@@ -2878,6 +3105,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def detach_all_files_tools_async(self, agent_state: PydanticAgentState, actor: PydanticUser) -> PydanticAgentState:
         """
         Detach all core file tools from an agent.
@@ -2910,6 +3138,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     def detach_tool(self, agent_id: str, tool_id: str, actor: PydanticUser) -> PydanticAgentState:
         """
         Detaches a tool from an agent.
@@ -2944,6 +3173,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def detach_tool_async(self, agent_id: str, tool_id: str, actor: PydanticUser) -> None:
         """
         Detaches a tool from an agent.
@@ -2973,6 +3203,7 @@ class AgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def bulk_detach_tools_async(self, agent_id: str, tool_ids: List[str], actor: PydanticUser) -> None:
         """
         Efficiently detaches multiple tools from an agent in a single operation.
@@ -3077,8 +3308,7 @@ class AgentManager:
         logger.info(f"Attached agents: {[a.id for a in agent_states]}")
 
         # Generate visible content for the file
-        line_chunker = LineChunker()
-        content_lines = line_chunker.chunk_text(file_metadata=file_metadata_with_content)
+        content_lines = await chunk_file_lines(file_metadata_with_content)
         visible_content = "\n".join(content_lines)
         visible_content_map = {file_metadata_with_content.file_name: visible_content}
 
@@ -3112,10 +3342,9 @@ class AgentManager:
         logger.info(f"Inserting {len(file_metadata_with_content)} documents into context window for agent_state: {agent_state.id}")
 
         # Generate visible content for each file
-        line_chunker = LineChunker()
         visible_content_map = {}
         for file_metadata in file_metadata_with_content:
-            content_lines = line_chunker.chunk_text(file_metadata=file_metadata)
+            content_lines = await chunk_file_lines(file_metadata)
             visible_content_map[file_metadata.file_name] = "\n".join(content_lines)
 
         # Use bulk attach to avoid race conditions and duplicate LRU eviction decisions
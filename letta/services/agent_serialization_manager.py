@@ -1,13 +1,24 @@
+import base64
+import copy
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
 
 from letta.constants import MCP_TOOL_TAG_NAME_PREFIX
 from letta.errors import AgentFileExportError, AgentFileImportError
+from letta.helpers.json_helpers import json_dumps
 from letta.helpers.pinecone_utils import should_use_pinecone
 from letta.log import get_logger
 from letta.schemas.agent import AgentState, CreateAgent
 from letta.schemas.agent_file import (
+    AgentFileEmbeddings,
+    AgentFileRecord,
+    AgentFileRecordType,
     AgentFileSchema,
+    AgentFileStreamHeader,
     AgentSchema,
     BlockSchema,
     FileAgentSchema,
@@ -16,15 +27,18 @@ from letta.schemas.agent_file import (
     ImportResult,
     MCPServerSchema,
     MessageSchema,
+    PassageSchema,
     SourceSchema,
     ToolSchema,
 )
 from letta.schemas.block import Block
+from letta.schemas.embedding_config import EmbeddingConfig
 from letta.schemas.enums import FileProcessingStatus
 from letta.schemas.file import FileMetadata
 from letta.schemas.group import Group, GroupCreate
 from letta.schemas.mcp import MCPServer
 from letta.schemas.message import Message
+from letta.schemas.passage import Passage
 from letta.schemas.source import Source
 from letta.schemas.tool import Tool
 from letta.schemas.user import User
@@ -47,6 +61,10 @@ from letta.utils import get_latest_alembic_revision
 
 logger = get_logger(__name__)
 
+AGENT_FILE_STREAM_VERSION = 1
+# messages and passages read from the database, or written to it, per query in streamed exports and imports
+AGENT_FILE_STREAM_BATCH_SIZE = 500
+
 
 class AgentSerializationManager:
     """
@@ -80,6 +98,7 @@ class AgentSerializationManager:
         self.file_manager = file_manager
         self.file_agent_manager = file_agent_manager
         self.message_manager = message_manager
+        self.passage_manager = agent_manager.passage_manager
         self.file_parser = MistralFileParser() if settings.mistral_api_key else MarkitdownFileParser()
         self.using_pinecone = should_use_pinecone()
 
@@ -97,6 +116,7 @@ class AgentSerializationManager:
             MessageSchema.__id_prefix__: 0,
             FileAgentSchema.__id_prefix__: 0,
             MCPServerSchema.__id_prefix__: 0,
+            PassageSchema.__id_prefix__: 0,
         }
 
     def _reset_state(self):
@@ -154,7 +174,7 @@ class AgentSerializationManager:
         return sorted(unique_blocks.values(), key=lambda x: x.label)
 
     async def _extract_unique_sources_and_files_from_agents(
-        self, agent_states: List[AgentState], actor: User, files_agents_cache: dict = None
+        self, agent_states: List[AgentState], actor: User, files_agents_cache: dict = None, include_content: bool = True
     ) -> tuple[List[Source], List[FileMetadata]]:
         """Extract unique sources and files from agent states using bulk operations"""
 
@@ -177,11 +197,13 @@ class AgentSerializationManager:
                 all_source_ids.add(file_agent.source_id)
                 all_file_ids.add(file_agent.file_id)
         sources = await self.source_manager.get_sources_by_ids_async(list(all_source_ids), actor)
-        files = await self.file_manager.get_files_by_ids_async(list(all_file_ids), actor, include_content=True)
+        files = await self.file_manager.get_files_by_ids_async(list(all_file_ids), actor, include_content=include_content)
 
         return sources, files
 
-    async def _convert_agent_state_to_schema(self, agent_state: AgentState, actor: User, files_agents_cache: dict = None) -> AgentSchema:
+    async def _convert_agent_state_to_schema(
+        self, agent_state: AgentState, actor: User, files_agents_cache: dict = None, include_messages: bool = True
+    ) -> AgentSchema:
         """Convert AgentState to AgentSchema with ID remapping"""
 
         agent_file_id = self._map_db_to_file_id(agent_state.id, AgentSchema.__id_prefix__)
@@ -198,7 +220,7 @@ class AgentSerializationManager:
                 per_file_view_window_char_limit=agent_state.per_file_view_window_char_limit,
             )
         agent_schema = await AgentSchema.from_agent_state(
-            agent_state, message_manager=self.message_manager, files_agents=files_agents, actor=actor
+            agent_state, message_manager=self.message_manager, files_agents=files_agents, actor=actor, include_messages=include_messages
         )
         agent_schema.id = agent_file_id
 
@@ -209,8 +231,9 @@ class AgentSerializationManager:
                 message.agent_id = agent_file_id
 
         if agent_schema.in_context_message_ids:
+            # streamed messages follow their agent, so the in-context ones are mapped ahead of them
             agent_schema.in_context_message_ids = [
-                self._map_db_to_file_id(message_id, MessageSchema.__id_prefix__, allow_new=False)
+                self._map_db_to_file_id(message_id, MessageSchema.__id_prefix__, allow_new=not include_messages)
                 for message_id in agent_schema.in_context_message_ids
             ]
 
@@ -330,6 +353,35 @@ class AgentSerializationManager:
             logger.error(f"Failed to convert group {group.id}: {e}")
             raise
 
+    async def _load_agents_for_export(self, agent_ids: List[str], actor: User) -> Tuple[List[AgentState], List[Group]]:
+        """Load the agents to export, adding the other agents of their groups to `agent_ids`, and their groups"""
+        agent_states = await self.agent_manager.get_agents_by_ids_async(agent_ids=agent_ids, actor=actor)
+
+        # Validate that all requested agents were found
+        if len(agent_states) != len(agent_ids):
+            found_ids = {agent.id for agent in agent_states}
+            missing_ids = [agent_id for agent_id in agent_ids if agent_id not in found_ids]
+            raise AgentFileExportError(f"The following agent IDs were not found: {missing_ids}")
+
+        groups = []
+        group_agent_ids = []
+        for agent_state in agent_states:
+            if agent_state.multi_agent_group != None:
+                groups.append(agent_state.multi_agent_group)
+                group_agent_ids.extend(agent_state.multi_agent_group.agent_ids)
+
+        group_agent_ids = list(set(group_agent_ids) - set(agent_ids))
+        if group_agent_ids:
+            group_agent_states = await self.agent_manager.get_agents_by_ids_async(agent_ids=group_agent_ids, actor=actor)
+            if len(group_agent_states) != len(group_agent_ids):
+                found_ids = {agent.id for agent in group_agent_states}
+                missing_ids = [agent_id for agent_id in group_agent_ids if agent_id not in found_ids]
+                raise AgentFileExportError(f"The following agent IDs were not found: {missing_ids}")
+            agent_ids.extend(group_agent_ids)
+            agent_states.extend(group_agent_states)
+
+        return agent_states, groups
+
     async def export(self, agent_ids: List[str], actor: User) -> AgentFileSchema:
         """
         Export agents and their related entities to AgentFileSchema format.
@@ -346,30 +398,7 @@ class AgentSerializationManager:
         try:
             self._reset_state()
 
-            agent_states = await self.agent_manager.get_agents_by_ids_async(agent_ids=agent_ids, actor=actor)
-
-            # Validate that all requested agents were found
-            if len(agent_states) != len(agent_ids):
-                found_ids = {agent.id for agent in agent_states}
-                missing_ids = [agent_id for agent_id in agent_ids if agent_id not in found_ids]
-                raise AgentFileExportError(f"The following agent IDs were not found: {missing_ids}")
-
-            groups = []
-            group_agent_ids = []
-            for agent_state in agent_states:
-                if agent_state.multi_agent_group != None:
-                    groups.append(agent_state.multi_agent_group)
-                    group_agent_ids.extend(agent_state.multi_agent_group.agent_ids)
-
-            group_agent_ids = list(set(group_agent_ids) - set(agent_ids))
-            if group_agent_ids:
-                group_agent_states = await self.agent_manager.get_agents_by_ids_async(agent_ids=group_agent_ids, actor=actor)
-                if len(group_agent_states) != len(group_agent_ids):
-                    found_ids = {agent.id for agent in group_agent_states}
-                    missing_ids = [agent_id for agent_id in group_agent_ids if agent_id not in found_ids]
-                    raise AgentFileExportError(f"The following agent IDs were not found: {missing_ids}")
-                agent_ids.extend(group_agent_ids)
-                agent_states.extend(group_agent_states)
+            agent_states, groups = await self._load_agents_for_export(agent_ids, actor)
 
             # cache for file-agent relationships to avoid duplicate queries
             files_agents_cache = {}  # Maps agent_id to list of file_agent relationships
@@ -464,103 +493,22 @@ class AgentSerializationManager:
             file_metadata_cache = {}  # Maps database file ID to FileMetadata
 
             # 1. Create MCP servers first (tools depend on them)
-            if schema.mcp_servers:
-                for mcp_server_schema in schema.mcp_servers:
-                    server_data = mcp_server_schema.model_dump(exclude={"id"})
-                    filtered_server_data = self._filter_dict_for_model(server_data, MCPServer)
-                    create_schema = MCPServer(**filtered_server_data)
-
-                    # Note: We don't have auth info from export, so the user will need to re-configure auth.
-                    # TODO: @jnjpng store metadata about obfuscated metadata to surface to the user
-                    created_mcp_server = await self.mcp_manager.create_or_update_mcp_server(create_schema, actor)
-                    file_to_db_ids[mcp_server_schema.id] = created_mcp_server.id
-                    imported_count += 1
+            imported_count += await self._import_mcp_servers(schema.mcp_servers, actor, file_to_db_ids)
 
             # 2. Create tools (may depend on MCP servers) - using bulk upsert for efficiency
-            if schema.tools:
-                # convert tool schemas to pydantic tools
-                pydantic_tools = []
-                for tool_schema in schema.tools:
-                    pydantic_tools.append(Tool(**tool_schema.model_dump(exclude={"id"})))
-
-                # bulk upsert all tools at once
-                created_tools = await self.tool_manager.bulk_upsert_tools_async(pydantic_tools, actor)
-
-                # map file ids to database ids
-                # note: tools are matched by name during upsert, so we need to match by name here too
-                created_tools_by_name = {tool.name: tool for tool in created_tools}
-                for tool_schema in schema.tools:
-                    created_tool = created_tools_by_name.get(tool_schema.name)
-                    if created_tool:
-                        file_to_db_ids[tool_schema.id] = created_tool.id
-                        imported_count += 1
-                    else:
-                        logger.warning(f"Tool {tool_schema.name} was not created during bulk upsert")
+            imported_count += await self._import_tools(schema.tools, actor, file_to_db_ids)
 
             # 2. Create blocks (no dependencies) - using batch create for efficiency
-            if schema.blocks:
-                # convert block schemas to pydantic blocks (excluding IDs to create new blocks)
-                pydantic_blocks = []
-                for block_schema in schema.blocks:
-                    pydantic_blocks.append(Block(**block_schema.model_dump(exclude={"id"})))
-
-                # batch create all blocks at once
-                created_blocks = await self.block_manager.batch_create_blocks_async(pydantic_blocks, actor)
-
-                # map file ids to database ids
-                for block_schema, created_block in zip(schema.blocks, created_blocks):
-                    file_to_db_ids[block_schema.id] = created_block.id
-                    imported_count += 1
+            imported_count += await self._import_blocks(schema.blocks, actor, file_to_db_ids)
 
             # 3. Create sources (no dependencies) - using bulk upsert for efficiency
-            if schema.sources:
-                # convert source schemas to pydantic sources
-                pydantic_sources = []
-                for source_schema in schema.sources:
-                    source_data = source_schema.model_dump(exclude={"id", "embedding", "embedding_chunk_size"})
-                    pydantic_sources.append(Source(**source_data))
-
-                # bulk upsert all sources at once
-                created_sources = await self.source_manager.bulk_upsert_sources_async(pydantic_sources, actor)
-
-                # map file ids to database ids
-                # note: sources are matched by name during upsert, so we need to match by name here too
-                created_sources_by_name = {source.name: source for source in created_sources}
-                for source_schema in schema.sources:
-                    created_source = created_sources_by_name.get(source_schema.name)
-                    if created_source:
-                        file_to_db_ids[source_schema.id] = created_source.id
-                        imported_count += 1
-                    else:
-                        logger.warning(f"Source {source_schema.name} was not created during bulk upsert")
+            imported_count += await self._import_sources(schema.sources, actor, file_to_db_ids)
 
             # 4. Create files (depends on sources)
-            for file_schema in schema.files:
-                # Convert FileSchema back to FileMetadata
-                file_data = file_schema.model_dump(exclude={"id", "content"})
-                # Remap source_id from file ID to database ID
-                file_data["source_id"] = file_to_db_ids[file_schema.source_id]
-                # Set processing status to PARSING since we have parsed content but need to re-embed
-                file_data["processing_status"] = FileProcessingStatus.PARSING
-                file_data["error_message"] = None
-                file_data["total_chunks"] = None
-                file_data["chunks_embedded"] = None
-                file_metadata = FileMetadata(**file_data)
-                created_file = await self.file_manager.create_file(file_metadata, actor, text=file_schema.content)
-                file_to_db_ids[file_schema.id] = created_file.id
-                imported_count += 1
+            imported_count += await self._import_files(schema.files, actor, file_to_db_ids)
 
             # 5. Process files for chunking/embedding (depends on files and sources)
-            if should_use_pinecone():
-                embedder = PineconeEmbedder(embedding_config=schema.agents[0].embedding_config)
-            else:
-                embedder = OpenAIEmbedder(embedding_config=schema.agents[0].embedding_config)
-            file_processor = FileProcessor(
-                file_parser=self.file_parser,
-                embedder=embedder,
-                actor=actor,
-                using_pinecone=self.using_pinecone,
-            )
+            file_processor = self._create_file_processor(schema.agents[0].embedding_config, actor)
 
             for file_schema in schema.files:
                 if file_schema.content:  # Only process files with content
@@ -581,44 +529,16 @@ class AgentSerializationManager:
 
             # 6. Create agents with empty message history
             for agent_schema in schema.agents:
-                # Convert AgentSchema back to CreateAgent, remapping tool/block IDs
-                agent_data = agent_schema.model_dump(exclude={"id", "in_context_message_ids", "messages"})
-
-                # Remap tool_ids from file IDs to database IDs
-                if agent_data.get("tool_ids"):
-                    agent_data["tool_ids"] = [file_to_db_ids[file_id] for file_id in agent_data["tool_ids"]]
-
-                # Remap block_ids from file IDs to database IDs
-                if agent_data.get("block_ids"):
-                    agent_data["block_ids"] = [file_to_db_ids[file_id] for file_id in agent_data["block_ids"]]
-
-                if env_vars:
-                    for var in agent_data["tool_exec_environment_variables"]:
-                        var["value"] = env_vars.get(var["key"], "")
-
-                agent_create = CreateAgent(**agent_data)
-                created_agent = await self.agent_manager.create_agent_async(agent_create, actor, _init_with_no_messages=True)
-                file_to_db_ids[agent_schema.id] = created_agent.id
+                await self._import_agent(agent_schema, actor, file_to_db_ids, env_vars)
                 imported_count += 1
 
             # 7. Create messages and update agent message_ids
             for agent_schema in schema.agents:
                 agent_db_id = file_to_db_ids[agent_schema.id]
-                message_file_to_db_ids = {}
 
                 # Create messages for this agent
-                messages = []
-                for message_schema in agent_schema.messages:
-                    # Convert MessageSchema back to Message, setting agent_id to new DB ID
-                    message_data = message_schema.model_dump(exclude={"id"})
-                    message_data["agent_id"] = agent_db_id  # Remap agent_id to new database ID
-                    message_obj = Message(**message_data)
-                    messages.append(message_obj)
-                    # Map file ID to the generated database ID immediately
-                    message_file_to_db_ids[message_schema.id] = message_obj.id
-
-                created_messages = await self.message_manager.create_many_messages_async(pydantic_msgs=messages, actor=actor)
-                imported_count += len(created_messages)
+                message_file_to_db_ids = await self._import_messages(agent_schema.messages, agent_db_id, actor)
+                imported_count += len(message_file_to_db_ids)
 
                 # Remap in_context_message_ids from file IDs to database IDs
                 in_context_db_ids = [message_file_to_db_ids[message_schema_id] for message_schema_id in agent_schema.in_context_message_ids]
@@ -628,42 +548,10 @@ class AgentSerializationManager:
 
             # 8. Create file-agent relationships (depends on agents and files)
             for agent_schema in schema.agents:
-                if agent_schema.files_agents:
-                    agent_db_id = file_to_db_ids[agent_schema.id]
-
-                    # Prepare files for bulk attachment
-                    files_for_agent = []
-                    visible_content_map = {}
-
-                    for file_agent_schema in agent_schema.files_agents:
-                        file_db_id = file_to_db_ids[file_agent_schema.file_id]
-
-                        # Use cached file metadata if available
-                        if file_db_id not in file_metadata_cache:
-                            file_metadata_cache[file_db_id] = await self.file_manager.get_file_by_id(file_db_id, actor)
-                        file_metadata = file_metadata_cache[file_db_id]
-                        files_for_agent.append(file_metadata)
-
-                        if file_agent_schema.visible_content:
-                            visible_content_map[file_db_id] = file_agent_schema.visible_content
-
-                    # Bulk attach files to agent
-                    await self.file_agent_manager.attach_files_bulk(
-                        agent_id=agent_db_id,
-                        files_metadata=files_for_agent,
-                        visible_content_map=visible_content_map,
-                        actor=actor,
-                        max_files_open=agent_schema.max_files_open,
-                    )
-                    imported_count += len(files_for_agent)
+                imported_count += await self._import_files_agents(agent_schema, actor, file_to_db_ids, file_metadata_cache)
 
             for group in schema.groups:
-                group_data = group.model_dump(exclude={"id"})
-                group_data["agent_ids"] = [file_to_db_ids[agent_id] for agent_id in group_data["agent_ids"]]
-                if "manager_agent_id" in group_data["manager_config"]:
-                    group_data["manager_config"]["manager_agent_id"] = file_to_db_ids[group_data["manager_config"]["manager_agent_id"]]
-                created_group = await self.group_manager.create_group_async(GroupCreate(**group_data), actor)
-                file_to_db_ids[group.id] = created_group.id
+                await self._import_group(group, actor, file_to_db_ids)
                 imported_count += 1
 
             return ImportResult(
@@ -677,6 +565,426 @@ class AgentSerializationManager:
             logger.exception(f"Failed to import agent file: {e}")
             raise AgentFileImportError(f"Import failed: {e}") from e
 
+    def export_stream(
+        self,
+        agent_ids: List[str],
+        actor: User,
+        embeddings: AgentFileEmbeddings = AgentFileEmbeddings.none,
+        sidecar: Optional[BinaryIO] = None,
+        batch_size: int = AGENT_FILE_STREAM_BATCH_SIZE,
+    ) -> AsyncIterator[str]:
+        """
+        Export agents and their related entities as a streamed agent file, one newline-terminated record at a time.
+
+        Unlike `export`, messages and passages are read from the database in pages of `batch_size` and file contents
+        one file at a time, so memory does not grow with the size of the agents.
+
+        Args:
+            agent_ids: List of agent UUIDs to export
+            embeddings: How to ship passage embeddings; unless none, archival and source passages are exported with
+                their embeddings so that importing them needs no embedding requests
+            sidecar: Binary file the embeddings are written to when `embeddings` is sidecar
+
+        Raises:
+            AgentFileExportError: If export fails
+        """
+        if embeddings == AgentFileEmbeddings.sidecar and sidecar is None:
+            raise AgentFileExportError("Exporting sidecar embeddings requires a sidecar file")
+
+        # streams interleave with other exports, so they map IDs on a copy with its own mapping state
+        manager = copy.copy(self)
+        manager._db_to_file_ids = {}
+        manager._id_counters = dict.fromkeys(self._id_counters, 0)
+        return manager._export_stream(agent_ids, actor, embeddings=embeddings, sidecar=sidecar, batch_size=batch_size)
+
+    async def _export_stream(
+        self, agent_ids: List[str], actor: User, embeddings: AgentFileEmbeddings, sidecar: Optional[BinaryIO], batch_size: int
+    ) -> AsyncIterator[str]:
+        counts = Counter()
+        sidecar_offset = 0
+
+        def record(record_type: AgentFileRecordType, data: BaseModel) -> str:
+            counts[record_type.value] += 1
+            return json_dumps({"type": record_type.value, "data": data.model_dump(mode="json")}, indent=None) + "\n"
+
+        def passage_record(passage: Passage, passage_schema: PassageSchema) -> str:
+            nonlocal sidecar_offset
+            if embeddings != AgentFileEmbeddings.none and passage.embedding:
+                embedding = passage.embedding
+                if passage.embedding_config and passage.embedding_config.embedding_dim:
+                    # stored embeddings are padded to MAX_EMBEDDING_DIM, which the import pads them back to
+                    embedding = embedding[: passage.embedding_config.embedding_dim]
+                data = np.asarray(embedding, dtype="<f4").tobytes()
+                if embeddings == AgentFileEmbeddings.inline:
+                    passage_schema.embedding = base64.b64encode(data).decode("ascii")
+                else:
+                    sidecar.write(data)
+                    passage_schema.embedding_offset, passage_schema.embedding_dim = sidecar_offset, len(embedding)
+                    sidecar_offset += len(data)
+            return record(AgentFileRecordType.passage, passage_schema)
+
+        try:
+            self._reset_state()
+
+            agent_states, groups = await self._load_agents_for_export(agent_ids, actor)
+            files_agents_cache = {}
+            tool_set = self._extract_unique_tools(agent_states)
+            block_set = self._extract_unique_blocks(agent_states)
+            mcp_server_set = await self._extract_unique_mcp_servers(tool_set, actor)
+            for mcp_server in mcp_server_set:
+                self._map_db_to_file_id(mcp_server.id, MCPServerSchema.__id_prefix__)
+            # file contents are loaded one file at a time below
+            source_set, file_set = await self._extract_unique_sources_and_files_from_agents(
+                agent_states, actor, files_agents_cache, include_content=False
+            )
+            # source passages live in the vector store with pinecone, so they are re-embedded on import
+            source_passages = embeddings != AgentFileEmbeddings.none and not self.using_pinecone
+
+            # agents are mapped first, so that the IDs of their tools, blocks, sources and files are known
+            agent_schemas = [
+                await self._convert_agent_state_to_schema(
+                    agent_state, actor=actor, files_agents_cache=files_agents_cache, include_messages=False
+                )
+                for agent_state in agent_states
+            ]
+
+            logger.info(f"Streaming export of {len(agent_ids)} agents to agent file format")
+            header = AgentFileStreamHeader(
+                version=AGENT_FILE_STREAM_VERSION,
+                embeddings=embeddings,
+                source_passages=source_passages,
+                metadata={"revision_id": await get_latest_alembic_revision()},
+                created_at=datetime.now(timezone.utc),
+            )
+            yield json_dumps({"type": AgentFileRecordType.header.value, "data": header.model_dump(mode="json")}, indent=None) + "\n"
+
+            for mcp_server in mcp_server_set:
+                yield record(AgentFileRecordType.mcp_server, self._convert_mcp_server_to_schema(mcp_server))
+            for tool in tool_set:
+                yield record(AgentFileRecordType.tool, self._convert_tool_to_schema(tool))
+            for block in block_set:
+                yield record(AgentFileRecordType.block, self._convert_block_to_schema(block))
+            for source in source_set:
+                yield record(AgentFileRecordType.source, self._convert_source_to_schema(source))
+            for file_metadata in file_set:
+                file_metadata = await self.file_manager.get_file_by_id(file_metadata.id, actor, include_content=True)
+                yield record(AgentFileRecordType.file, self._convert_file_to_schema(file_metadata))
+
+            for agent_state, agent_schema in zip(agent_states, agent_schemas):
+                yield record(AgentFileRecordType.agent, agent_schema)
+
+                after = None
+                while True:
+                    messages = await self.message_manager.list_messages_for_agent_async(
+                        agent_id=agent_state.id, actor=actor, after=after, limit=batch_size
+                    )
+                    for message in messages:
+                        message_schema = MessageSchema.from_message(message)
+                        # only in-context messages were mapped ahead, the others need no mapping kept around
+                        message_schema.id = self._db_to_file_ids.pop(message.id, None) or self._generate_file_id(
+                            MessageSchema.__id_prefix__
+                        )
+                        message_schema.agent_id = agent_schema.id
+                        yield record(AgentFileRecordType.message, message_schema)
+                    if len(messages) < batch_size:
+                        break
+                    after = messages[-1].id
+
+                for archive_id in await self.agent_manager.get_agent_archive_ids_async(agent_id=agent_state.id, actor=actor):
+                    after = None
+                    while True:
+                        passages = await self.passage_manager.list_passages_by_archive_id_async(
+                            archive_id=archive_id, actor=actor, after=after, limit=batch_size
+                        )
+                        for passage in passages:
+                            passage_schema = PassageSchema.from_passage(passage)
+                            passage_schema.id = self._generate_file_id(PassageSchema.__id_prefix__)
+                            passage_schema.agent_id = agent_schema.id
+                            yield passage_record(passage, passage_schema)
+                        if len(passages) < batch_size:
+                            break
+                        after = passages[-1].id
+
+            if source_passages:
+                for file_metadata in file_set:
+                    after = None
+                    while True:
+                        passages = await self.passage_manager.list_passages_by_file_id_async(
+                            file_id=file_metadata.id, actor=actor, after=after, limit=batch_size
+                        )
+                        for passage in passages:
+                            passage_schema = PassageSchema.from_passage(passage)
+                            passage_schema.id = self._generate_file_id(PassageSchema.__id_prefix__)
+                            passage_schema.file_id = self._map_db_to_file_id(file_metadata.id, FileSchema.__id_prefix__, allow_new=False)
+                            passage_schema.source_id = self._map_db_to_file_id(
+                                file_metadata.source_id, SourceSchema.__id_prefix__, allow_new=False
+                            )
+                            yield passage_record(passage, passage_schema)
+                        if len(passages) < batch_size:
+                            break
+                        after = passages[-1].id
+
+            for group in groups:
+                yield record(AgentFileRecordType.group, self._convert_group_to_schema(group))
+
+            yield json_dumps({"type": AgentFileRecordType.end.value, "data": {"counts": dict(counts)}}, indent=None) + "\n"
+
+        except Exception as e:
+            logger.error(f"Failed to export agent file: {e}")
+            raise AgentFileExportError(f"Export failed: {e}") from e
+
+    async def import_stream(
+        self,
+        lines: AsyncIterable[Union[str, bytes]],
+        actor: User,
+        env_vars: Optional[Dict[str, Any]] = None,
+        sidecar: Optional[BinaryIO] = None,
+        batch_size: int = AGENT_FILE_STREAM_BATCH_SIZE,
+    ) -> ImportResult:
+        """
+        Import a streamed agent file, as written by `export_stream`, one record at a time.
+
+        Messages and passages are inserted in batches of `batch_size` as they are read. Passages shipped with their
+        embeddings are inserted as is; the others (and files without shipped passages) are re-embedded.
+
+        Args:
+            lines: The lines of the agent file
+            sidecar: Binary file holding the embeddings of a file exported with sidecar embeddings
+
+        Returns:
+            ImportResult with success status and details
+
+        Raises:
+            AgentFileImportError: If import fails
+        """
+        stream_import = None
+        try:
+            logger.info("Starting streamed agent file import")
+
+            stream_import = _AgentFileStreamImport(self, actor=actor, env_vars=env_vars, sidecar=sidecar, batch_size=batch_size)
+            line_number = 0
+            async for line in lines:
+                line_number += 1
+                if not line.strip():
+                    continue
+                try:
+                    record = AgentFileRecord.model_validate_json(line)
+                except ValidationError as e:
+                    raise AgentFileImportError(f"Invalid record on line {line_number}: {e}") from e
+                await stream_import.add(record)
+            stream_import.finish()
+
+            return ImportResult(
+                success=True,
+                message=f"Import completed successfully. Imported {stream_import.imported_count} entities.",
+                imported_count=stream_import.imported_count,
+                id_mappings=stream_import.file_to_db_ids,
+            )
+
+        except Exception as e:
+            logger.exception(f"Failed to import agent file: {e}")
+            if stream_import is not None:
+                await stream_import.abort()
+            raise AgentFileImportError(f"Import failed: {e}") from e
+
+    async def _import_mcp_servers(self, mcp_server_schemas: List[MCPServerSchema], actor: User, file_to_db_ids: Dict[str, str]) -> int:
+        for mcp_server_schema in mcp_server_schemas:
+            server_data = mcp_server_schema.model_dump(exclude={"id"})
+            filtered_server_data = self._filter_dict_for_model(server_data, MCPServer)
+            create_schema = MCPServer(**filtered_server_data)
+
+            # Note: We don't have auth info from export, so the user will need to re-configure auth.
+            # TODO: @jnjpng store metadata about obfuscated metadata to surface to the user
+            created_mcp_server = await self.mcp_manager.create_or_update_mcp_server(create_schema, actor)
+            file_to_db_ids[mcp_server_schema.id] = created_mcp_server.id
+        return len(mcp_server_schemas)
+
+    async def _import_tools(self, tool_schemas: List[ToolSchema], actor: User, file_to_db_ids: Dict[str, str]) -> int:
+        if not tool_schemas:
+            return 0
+
+        # convert tool schemas to pydantic tools
+        pydantic_tools = []
+        for tool_schema in tool_schemas:
+            pydantic_tools.append(Tool(**tool_schema.model_dump(exclude={"id"})))
+
+        # bulk upsert all tools at once
+        created_tools = await self.tool_manager.bulk_upsert_tools_async(pydantic_tools, actor)
+
+        # map file ids to database ids
+        # note: tools are matched by name during upsert, so we need to match by name here too
+        imported_count = 0
+        created_tools_by_name = {tool.name: tool for tool in created_tools}
+        for tool_schema in tool_schemas:
+            created_tool = created_tools_by_name.get(tool_schema.name)
+            if created_tool:
+                file_to_db_ids[tool_schema.id] = created_tool.id
+                imported_count += 1
+            else:
+                logger.warning(f"Tool {tool_schema.name} was not created during bulk upsert")
+        return imported_count
+
+    async def _import_blocks(self, block_schemas: List[BlockSchema], actor: User, file_to_db_ids: Dict[str, str]) -> int:
+        if not block_schemas:
+            return 0
+
+        # convert block schemas to pydantic blocks (excluding IDs to create new blocks)
+        pydantic_blocks = []
+        for block_schema in block_schemas:
+            pydantic_blocks.append(Block(**block_schema.model_dump(exclude={"id"})))
+
+        # batch create all blocks at once
+        created_blocks = await self.block_manager.batch_create_blocks_async(pydantic_blocks, actor)
+
+        # map file ids to database ids
+        for block_schema, created_block in zip(block_schemas, created_blocks):
+            file_to_db_ids[block_schema.id] = created_block.id
+        return len(created_blocks)
+
+    async def _import_sources(self, source_schemas: List[SourceSchema], actor: User, file_to_db_ids: Dict[str, str]) -> int:
+        if not source_schemas:
+            return 0
+
+        # convert source schemas to pydantic sources
+        pydantic_sources = []
+        for source_schema in source_schemas:
+            source_data = source_schema.model_dump(exclude={"id", "embedding", "embedding_chunk_size"})
+            pydantic_sources.append(Source(**source_data))
+
+        # bulk upsert all sources at once
+        created_sources = await self.source_manager.bulk_upsert_sources_async(pydantic_sources, actor)
+
+        # map file ids to database ids
+        # note: sources are matched by name during upsert, so we need to match by name here too
+        imported_count = 0
+        created_sources_by_name = {source.name: source for source in created_sources}
+        for source_schema in source_schemas:
+            created_source = created_sources_by_name.get(source_schema.name)
+            if created_source:
+                file_to_db_ids[source_schema.id] = created_source.id
+                imported_count += 1
+            else:
+                logger.warning(f"Source {source_schema.name} was not created during bulk upsert")
+        return imported_count
+
+    async def _import_files(
+        self, file_schemas: List[FileSchema], actor: User, file_to_db_ids: Dict[str, str], embedded: bool = False
+    ) -> int:
+        """Create files; unless their passages are `embedded` (shipped with the file), they are left to be re-embedded"""
+        for file_schema in file_schemas:
+            # Convert FileSchema back to FileMetadata
+            file_data = file_schema.model_dump(exclude={"id", "content"})
+            # Remap source_id from file ID to database ID
+            file_data["source_id"] = file_to_db_ids[file_schema.source_id]
+            if embedded:
+                file_data["processing_status"] = FileProcessingStatus.COMPLETED
+            else:
+                # Set processing status to PARSING since we have parsed content but need to re-embed
+                file_data["processing_status"] = FileProcessingStatus.PARSING
+                file_data["total_chunks"] = None
+                file_data["chunks_embedded"] = None
+            file_data["error_message"] = None
+            file_metadata = FileMetadata(**file_data)
+            created_file = await self.file_manager.create_file(file_metadata, actor, text=file_schema.content)
+            file_to_db_ids[file_schema.id] = created_file.id
+        return len(file_schemas)
+
+    def _create_file_processor(self, embedding_config: EmbeddingConfig, actor: User) -> FileProcessor:
+        if should_use_pinecone():
+            embedder = PineconeEmbedder(embedding_config=embedding_config)
+        else:
+            embedder = OpenAIEmbedder(embedding_config=embedding_config)
+        return FileProcessor(
+            file_parser=self.file_parser,
+            embedder=embedder,
+            actor=actor,
+            using_pinecone=self.using_pinecone,
+        )
+
+    async def _import_agent(
+        self, agent_schema: AgentSchema, actor: User, file_to_db_ids: Dict[str, str], env_vars: Optional[Dict[str, Any]] = None
+    ) -> AgentState:
+        """Create an agent with empty message history"""
+        # Convert AgentSchema back to CreateAgent, remapping tool/block IDs
+        agent_data = agent_schema.model_dump(exclude={"id", "in_context_message_ids", "messages"})
+
+        # Remap tool_ids from file IDs to database IDs
+        if agent_data.get("tool_ids"):
+            agent_data["tool_ids"] = [file_to_db_ids[file_id] for file_id in agent_data["tool_ids"]]
+
+        # Remap block_ids from file IDs to database IDs
+        if agent_data.get("block_ids"):
+            agent_data["block_ids"] = [file_to_db_ids[file_id] for file_id in agent_data["block_ids"]]
+
+        if env_vars:
+            for var in agent_data["tool_exec_environment_variables"]:
+                var["value"] = env_vars.get(var["key"], "")
+
+        agent_create = CreateAgent(**agent_data)
+        created_agent = await self.agent_manager.create_agent_async(agent_create, actor, _init_with_no_messages=True)
+        file_to_db_ids[agent_schema.id] = created_agent.id
+        return created_agent
+
+    async def _import_messages(self, message_schemas: List[MessageSchema], agent_db_id: str, actor: User) -> Dict[str, str]:
+        """Create messages of an agent in batches, in order, and return the database IDs of their file IDs"""
+        message_file_to_db_ids = {}
+        for start in range(0, len(message_schemas), AGENT_FILE_STREAM_BATCH_SIZE):
+            messages = []
+            for message_schema in message_schemas[start : start + AGENT_FILE_STREAM_BATCH_SIZE]:
+                # Convert MessageSchema back to Message, setting agent_id to new DB ID
+                message_data = message_schema.model_dump(exclude={"id"})
+                message_data["agent_id"] = agent_db_id  # Remap agent_id to new database ID
+                message_obj = Message(**message_data)
+                messages.append(message_obj)
+                # Map file ID to the generated database ID immediately
+                message_file_to_db_ids[message_schema.id] = message_obj.id
+
+            await self.message_manager.create_many_messages_async(pydantic_msgs=messages, actor=actor)
+        return message_file_to_db_ids
+
+    async def _import_files_agents(
+        self, agent_schema: AgentSchema, actor: User, file_to_db_ids: Dict[str, str], file_metadata_cache: Dict[str, FileMetadata]
+    ) -> int:
+        """Create the file-agent relationships of an agent (depends on agents and files)"""
+        if not agent_schema.files_agents:
+            return 0
+        agent_db_id = file_to_db_ids[agent_schema.id]
+
+        # Prepare files for bulk attachment
+        files_for_agent = []
+        visible_content_map = {}
+
+        for file_agent_schema in agent_schema.files_agents:
+            file_db_id = file_to_db_ids[file_agent_schema.file_id]
+
+            # Use cached file metadata if available
+            if file_db_id not in file_metadata_cache:
+                file_metadata_cache[file_db_id] = await self.file_manager.get_file_by_id(file_db_id, actor)
+            file_metadata = file_metadata_cache[file_db_id]
+            files_for_agent.append(file_metadata)
+
+            if file_agent_schema.visible_content:
+                visible_content_map[file_db_id] = file_agent_schema.visible_content
+
+        # Bulk attach files to agent
+        await self.file_agent_manager.attach_files_bulk(
+            agent_id=agent_db_id,
+            files_metadata=files_for_agent,
+            visible_content_map=visible_content_map,
+            actor=actor,
+            max_files_open=agent_schema.max_files_open,
+        )
+        return len(files_for_agent)
+
+    async def _import_group(self, group: GroupSchema, actor: User, file_to_db_ids: Dict[str, str]) -> Group:
+        group_data = group.model_dump(exclude={"id"})
+        group_data["agent_ids"] = [file_to_db_ids[agent_id] for agent_id in group_data["agent_ids"]]
+        if "manager_agent_id" in group_data["manager_config"]:
+            group_data["manager_config"]["manager_agent_id"] = file_to_db_ids[group_data["manager_config"]["manager_agent_id"]]
+        created_group = await self.group_manager.create_group_async(GroupCreate(**group_data), actor)
+        file_to_db_ids[group.id] = created_group.id
+        return created_group
+
     def _validate_id_format(self, schema: AgentFileSchema) -> List[str]:
         """Validate that all IDs follow the expected format"""
         errors = []
@@ -845,3 +1153,297 @@ class AgentSerializationManager:
         except AttributeError:
             allowed = model_cls.__fields__.keys()  # Pydantic v1
         return {k: v for k, v in data.items() if k in allowed}
+
+
+class _AgentFileStreamImport:
+    """
+    State of one streamed agent file import.
+
+    Consecutive records of the same type are buffered and written together once a record of another type arrives or
+    the batch is full, so that tools, blocks and sources are still upserted in bulk and messages and passages are
+    inserted in batches. Each agent is created as soon as its record arrives, followed by its messages and passages.
+    """
+
+    def __init__(
+        self,
+        manager: AgentSerializationManager,
+        actor: User,
+        env_vars: Optional[Dict[str, Any]],
+        sidecar: Optional[BinaryIO],
+        batch_size: int,
+    ):
+        self.manager = manager
+        self.actor = actor
+        self.env_vars = env_vars
+        self.sidecar = sidecar
+        self.batch_size = batch_size
+
+        self.header: Optional[AgentFileStreamHeader] = None
+        self.ended = False
+        self.counts = Counter()
+        self.imported_count = 0
+        self.file_to_db_ids: Dict[str, str] = {}  # Maps file IDs to new database IDs (except for messages and passages)
+        self.file_metadata_cache: Dict[str, FileMetadata] = {}  # Maps database file ID to FileMetadata (without content)
+
+        self.pending_type: Optional[AgentFileRecordType] = None
+        self.pending: List[BaseModel] = []
+        # files to re-embed, once the embedding config of the first agent is known
+        self.unprocessed_files: List[Tuple[str, str]] = []
+
+        # agent whose messages and archival passages are being read
+        self.agent: Optional[AgentState] = None
+        self.agent_file_id: Optional[str] = None
+        self.archive_id: Optional[str] = None
+        self.in_context_file_ids: List[str] = []
+        self.in_context_db_ids: Dict[str, str] = {}
+
+    async def add(self, record: AgentFileRecord) -> None:
+        if self.ended:
+            raise AgentFileImportError(f"Unexpected {record.type.value} record after the end record")
+        if self.header is None:
+            if record.type != AgentFileRecordType.header:
+                raise AgentFileImportError("A streamed agent file must start with a header record")
+            self.header = AgentFileStreamHeader.model_validate(record.data)
+            if self.header.version > AGENT_FILE_STREAM_VERSION:
+                raise AgentFileImportError(f"Unsupported streamed agent file version {self.header.version}")
+            return
+        if record.type == AgentFileRecordType.header:
+            raise AgentFileImportError("Unexpected second header record")
+
+        if record.type != self.pending_type or len(self.pending) >= self.batch_size:
+            await self._flush()
+            self.pending_type = record.type
+
+        if record.type == AgentFileRecordType.end:
+            await self._finish_agent()
+            await self._process_files()
+            expected_counts = record.data.get("counts", {})
+            if dict(self.counts) != expected_counts:
+                raise AgentFileImportError(f"Agent file records {dict(self.counts)} do not match its end record {expected_counts}")
+            self.ended = True
+            return
+
+        self.counts[record.type.value] += 1
+        self.pending.append(_RECORD_SCHEMAS[record.type].model_validate(record.data))
+
+    def finish(self) -> None:
+        if self.header is None:
+            raise AgentFileImportError("The agent file is empty")
+        if not self.ended:
+            raise AgentFileImportError("The agent file has no end record, it may be truncated")
+
+    async def abort(self) -> None:
+        """
+        Delete the groups, agents, files and blocks created so far, so that a failed import does not leave behind agents
+        with only part of their messages. Tools, sources and MCP servers are upserted, and may predate the import, so
+        they are kept.
+        """
+        manager, actor = self.manager, self.actor
+        deletions = [
+            (GroupSchema.__id_prefix__, manager.group_manager.delete_group_async),
+            (AgentSchema.__id_prefix__, manager.agent_manager.delete_agent_async),
+            (FileSchema.__id_prefix__, manager.file_manager.delete_file),
+            (BlockSchema.__id_prefix__, manager.block_manager.delete_block_async),
+        ]
+        for prefix, delete in deletions:
+            for file_id, db_id in self.file_to_db_ids.items():
+                if not file_id.startswith(f"{prefix}-"):
+                    continue
+                try:
+                    await delete(db_id, actor)
+                except Exception as e:
+                    logger.warning(f"Failed to delete {db_id} after a failed agent file import: {e}")
+        self.agent = None
+
+    async def _flush(self) -> None:
+        records, self.pending = self.pending, []
+        if not records:
+            return
+        manager, actor = self.manager, self.actor
+        record_type = self.pending_type
+
+        if record_type == AgentFileRecordType.mcp_server:
+            self.imported_count += await manager._import_mcp_servers(records, actor, self.file_to_db_ids)
+        elif record_type == AgentFileRecordType.tool:
+            self.imported_count += await manager._import_tools(records, actor, self.file_to_db_ids)
+        elif record_type == AgentFileRecordType.block:
+            self.imported_count += await manager._import_blocks(records, actor, self.file_to_db_ids)
+        elif record_type == AgentFileRecordType.source:
+            self.imported_count += await manager._import_sources(records, actor, self.file_to_db_ids)
+        elif record_type == AgentFileRecordType.file:
+            embedded = self.header.source_passages and not manager.using_pinecone
+            self.imported_count += await manager._import_files(records, actor, self.file_to_db_ids, embedded=embedded)
+            if not embedded:
+                self.unprocessed_files.extend(
+                    (self.file_to_db_ids[file_schema.id], self.file_to_db_ids[file_schema.source_id])
+                    for file_schema in records
+                    if file_schema.content
+                )
+        elif record_type == AgentFileRecordType.agent:
+            for agent_schema in records:
+                await self._start_agent(agent_schema)
+        elif record_type == AgentFileRecordType.message:
+            await self._import_messages(records)
+        elif record_type == AgentFileRecordType.passage:
+            await self._import_passages(records)
+        elif record_type == AgentFileRecordType.group:
+            await self._finish_agent()
+            for group in records:
+                await manager._import_group(group, actor, self.file_to_db_ids)
+                self.imported_count += 1
+
+    async def _start_agent(self, agent_schema: AgentSchema) -> None:
+        await self._finish_agent()
+        # files are re-embedded with the embedding config of the first agent, like in `import_file`
+        await self._process_files(agent_schema.embedding_config)
+
+        self.agent = await self.manager._import_agent(agent_schema, self.actor, self.file_to_db_ids, self.env_vars)
+        self.imported_count += 1
+        self.agent_file_id = agent_schema.id
+        self.archive_id = None
+        self.in_context_file_ids = agent_schema.in_context_message_ids
+        self.in_context_db_ids = {}
+        self.imported_count += await self.manager._import_files_agents(
+            agent_schema, self.actor, self.file_to_db_ids, self.file_metadata_cache
+        )
+
+    async def _finish_agent(self) -> None:
+        if self.agent is None:
+            return
+        missing_ids = [file_id for file_id in self.in_context_file_ids if file_id not in self.in_context_db_ids]
+        if missing_ids:
+            logger.warning(f"In-context messages {missing_ids} of agent {self.agent_file_id} are missing from the agent file")
+        in_context_db_ids = [self.in_context_db_ids[file_id] for file_id in self.in_context_file_ids if file_id in self.in_context_db_ids]
+        await self.manager.agent_manager.update_message_ids_async(agent_id=self.agent.id, message_ids=in_context_db_ids, actor=self.actor)
+        self.agent = None
+
+    async def _process_files(self, embedding_config: Optional[EmbeddingConfig] = None) -> None:
+        if not self.unprocessed_files:
+            return
+        if embedding_config is None:
+            logger.warning(f"Not embedding {len(self.unprocessed_files)} imported files, the agent file has no agents")
+            self.unprocessed_files = []
+            return
+
+        file_processor = self.manager._create_file_processor(embedding_config, self.actor)
+        for file_db_id, source_db_id in self.unprocessed_files:
+            # contents are loaded one file at a time, rather than kept since the file records were read
+            file_metadata = await self.manager.file_manager.get_file_by_id(file_db_id, self.actor, include_content=True)
+            passages = await file_processor.process_imported_file(file_metadata=file_metadata, source_id=source_db_id)
+            self.imported_count += len(passages)
+        self.unprocessed_files = []
+
+    async def _import_messages(self, message_schemas: List[MessageSchema]) -> None:
+        for message_schema in message_schemas:
+            if self.agent is None or message_schema.agent_id != self.agent_file_id:
+                raise AgentFileImportError(f"Message {message_schema.id} does not follow its agent {message_schema.agent_id}")
+
+        message_file_to_db_ids = await self.manager._import_messages(message_schemas, self.agent.id, self.actor)
+        self.imported_count += len(message_file_to_db_ids)
+        in_context_file_ids = set(self.in_context_file_ids)
+        self.in_context_db_ids.update(
+            (file_id, db_id) for file_id, db_id in message_file_to_db_ids.items() if file_id in in_context_file_ids
+        )
+
+    async def _import_passages(self, passage_schemas: List[PassageSchema]) -> None:
+        archival_passages, texts = [], []
+        source_passages: Dict[str, List[Passage]] = {}
+        for passage_schema in passage_schemas:
+            embedding = self._decode_embedding(passage_schema)
+            if passage_schema.agent_id is not None:
+                if self.agent is None or passage_schema.agent_id != self.agent_file_id:
+                    raise AgentFileImportError(f"Passage {passage_schema.id} does not follow its agent {passage_schema.agent_id}")
+                if embedding is None:
+                    texts.append(passage_schema.text)
+                    continue
+                if self.archive_id is None:
+                    archive = await self.manager.passage_manager.archive_manager.get_or_create_default_archive_for_agent_async(
+                        agent_id=self.agent.id, agent_name=self.agent.name, actor=self.actor
+                    )
+                    self.archive_id = archive.id
+                archival_passages.append(self._to_passage(passage_schema, embedding, archive_id=self.archive_id))
+            elif self.header.source_passages and not self.manager.using_pinecone:
+                file_db_id = self.file_to_db_ids[passage_schema.file_id]
+                passage = self._to_passage(passage_schema, embedding, source_id=self.file_to_db_ids[passage_schema.source_id])
+                passage.file_id = file_db_id
+                source_passages.setdefault(file_db_id, []).append(passage)
+
+        passage_manager = self.manager.passage_manager
+        if archival_passages:
+            await passage_manager.create_many_archival_passages_async(passages=archival_passages, actor=self.actor)
+            self.imported_count += len(archival_passages)
+        for file_db_id, passages in source_passages.items():
+            if file_db_id not in self.file_metadata_cache:
+                self.file_metadata_cache[file_db_id] = await self.manager.file_manager.get_file_by_id(file_db_id, self.actor)
+            await passage_manager.create_many_source_passages_async(
+                passages=passages, file_metadata=self.file_metadata_cache[file_db_id], actor=self.actor
+            )
+            self.imported_count += len(passages)
+
+        # passages shipped without embeddings are embedded again, in batches
+        for start in range(0, len(texts), settings.archival_bulk_insert_max_texts):
+            async for result in passage_manager.insert_passages_bulk_async(
+                agent_state=self.agent, texts=texts[start : start + settings.archival_bulk_insert_max_texts], actor=self.actor
+            ):
+                if result.status == "failed":
+                    logger.warning(f"Failed to import archival passage of agent {self.agent_file_id}: {result.error}")
+                else:
+                    self.imported_count += len(result.passage_ids or [])
+
+    def _to_passage(self, passage_schema: PassageSchema, embedding: Optional[List[float]], **kwargs) -> Passage:
+        passage_data = dict(
+            organization_id=self.actor.organization_id,
+            text=passage_schema.text,
+            embedding=embedding,
+            embedding_config=passage_schema.embedding_config,
+            metadata_=passage_schema.metadata or {},
+            **kwargs,
+        )
+        if passage_schema.created_at is not None:
+            passage_data["created_at"] = passage_schema.created_at
+        return Passage(**passage_data)
+
+    def _decode_embedding(self, passage_schema: PassageSchema) -> Optional[List[float]]:
+        if passage_schema.embedding is not None:
+            data = base64.b64decode(passage_schema.embedding)
+        elif passage_schema.embedding_offset is not None:
+            if self.sidecar is None:
+                raise AgentFileImportError(f"Passage {passage_schema.id} has its embedding in a sidecar file, but none was provided")
+            size = (passage_schema.embedding_dim or 0) * 4
+            self.sidecar.seek(passage_schema.embedding_offset)
+            data = self.sidecar.read(size)
+            if len(data) != size:
+                raise AgentFileImportError(f"The sidecar file is missing the embedding of passage {passage_schema.id}")
+        else:
+            return None
+        return np.frombuffer(data, dtype="<f4").tolist()
+
+
+_RECORD_SCHEMAS = {
+    AgentFileRecordType.mcp_server: MCPServerSchema,
+    AgentFileRecordType.tool: ToolSchema,
+    AgentFileRecordType.block: BlockSchema,
+    AgentFileRecordType.source: SourceSchema,
+    AgentFileRecordType.file: FileSchema,
+    AgentFileRecordType.agent: AgentSchema,
+    AgentFileRecordType.message: MessageSchema,
+    AgentFileRecordType.passage: PassageSchema,
+    AgentFileRecordType.group: GroupSchema,
+}
+
+
+async def iter_agent_file_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a stream of byte chunks (e.g. an upload) into the lines of a streamed agent file."""
+    # only new chunks are split; the pieces of a line spanning several chunks are joined once it is complete
+    partial: List[bytes] = []
+    async for chunk in chunks:
+        *lines, rest = chunk.split(b"\n")
+        if lines:
+            lines[0] = b"".join(partial + [lines[0]])
+            partial = []
+            for line in lines:
+                yield line
+        if rest:
+            partial.append(rest)
+    if partial:
+        yield b"".join(partial)
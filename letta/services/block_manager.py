@@ -5,6 +5,7 @@ from typing import Dict, List, Optional
 from sqlalchemy import and_, delete, func, or_, select
 from sqlalchemy.orm import Session
 
+from letta.helpers.agent_state_cache import get_agent_state_cache, invalidate_agent_states
 from letta.log import get_logger
 from letta.orm.agent import Agent as AgentModel
 from letta.orm.block import Block as BlockModel
@@ -27,6 +28,20 @@ logger = get_logger(__name__)
 class BlockManager:
     """Manager class to handle business logic related to Blocks."""
 
+    @staticmethod
+    def _attached_agent_ids(session: Session, block_ids: List[str]) -> List[str]:
+        """Agents whose cached states embed `block_ids` (none when the agent state cache is disabled)."""
+        if not get_agent_state_cache().enabled:
+            return []
+        return list(session.execute(select(BlocksAgents.agent_id).where(BlocksAgents.block_id.in_(block_ids)).distinct()).scalars())
+
+    @staticmethod
+    async def _attached_agent_ids_async(session, block_ids: List[str]) -> List[str]:
+        if not get_agent_state_cache().enabled:
+            return []
+        result = await session.execute(select(BlocksAgents.agent_id).where(BlocksAgents.block_id.in_(block_ids)).distinct())
+        return list(result.scalars())
+
     @enforce_types
     @trace_method
     def create_or_update_block(self, block: PydanticBlock, actor: PydanticUser) -> PydanticBlock:
@@ -121,7 +136,9 @@ class BlockManager:
             for key, value in update_data.items():
                 setattr(block, key, value)
 
+            agent_ids = self._attached_agent_ids(session, [block_id])
             block.update(db_session=session, actor=actor)
+            get_agent_state_cache().invalidate_local(*agent_ids)
             return block.to_pydantic()
 
     @enforce_types
@@ -139,14 +156,17 @@ class BlockManager:
 
             await block.update_async(db_session=session, actor=actor, no_commit=True, no_refresh=True)
             pydantic_block = block.to_pydantic()
+            agent_ids = await self._attached_agent_ids_async(session, [block_id])
             await session.commit()
-            return pydantic_block
+        await invalidate_agent_states(*agent_ids)
+        return pydantic_block
 
     @enforce_types
     @trace_method
     def delete_block(self, block_id: str, actor: PydanticUser) -> None:
         """Delete a block by its ID."""
         with db_registry.session() as session:
+            agent_ids = self._attached_agent_ids(session, [block_id])
             # First, delete all references in blocks_agents table
             session.execute(delete(BlocksAgents).where(BlocksAgents.block_id == block_id))
             session.flush()
@@ -154,12 +174,14 @@ class BlockManager:
             # Then delete the block itself
             block = BlockModel.read(db_session=session, identifier=block_id)
             block.hard_delete(db_session=session, actor=actor)
+        get_agent_state_cache().invalidate_local(*agent_ids)
 
     @enforce_types
     @trace_method
     async def delete_block_async(self, block_id: str, actor: PydanticUser) -> None:
         """Delete a block by its ID."""
         async with db_registry.async_session() as session:
+            agent_ids = await self._attached_agent_ids_async(session, [block_id])
             # First, delete all references in blocks_agents table
             await session.execute(delete(BlocksAgents).where(BlocksAgents.block_id == block_id))
             await session.flush()
@@ -167,6 +189,7 @@ class BlockManager:
             # Then delete the block itself
             block = await BlockModel.read_async(db_session=session, identifier=block_id, actor=actor)
             await block.hard_delete_async(db_session=session, actor=actor)
+        await invalidate_agent_states(*agent_ids)
 
     @enforce_types
     @trace_method
@@ -664,7 +687,9 @@ class BlockManager:
             block = self._move_block_to_sequence(session, block, previous_entry.sequence_number, actor)
 
             # 4) Commit
+            agent_ids = self._attached_agent_ids(session, [block.id])
             session.commit()
+            get_agent_state_cache().invalidate_local(*agent_ids)
             return block.to_pydantic()
 
     @enforce_types
@@ -703,7 +728,9 @@ class BlockManager:
 
             block = self._move_block_to_sequence(session, block, next_entry.sequence_number, actor)
 
+            agent_ids = self._attached_agent_ids(session, [block.id])
             session.commit()
+            get_agent_state_cache().invalidate_local(*agent_ids)
             return block.to_pydantic()
 
     @enforce_types
@@ -743,7 +770,9 @@ class BlockManager:
                     new_val = new_val[: block.limit]
                 block.value = new_val
 
+            agent_ids = await self._attached_agent_ids_async(session, list(found_ids))
             await session.commit()
+            await invalidate_agent_states(*agent_ids)
 
             if return_hydrated:
                 # TODO: implement for async
@@ -3,6 +3,7 @@ from typing import Any, List, Optional, Tuple
 
 from openai.types.beta.function_tool import FunctionTool as OpenAITool
 
+from letta.helpers.message_helper import TIKTOKEN_TOKEN_COUNT_KEY, count_in_context_tokens
 from letta.log import get_logger
 from letta.schemas.agent import AgentState
 from letta.schemas.enums import MessageRole
@@ -72,9 +73,6 @@ class ContextWindowCalculator:
         messages = await message_manager.get_messages_by_ids_async(message_ids=agent_state.message_ids[1:], actor=actor)
         in_context_messages = [system_message_compiled] + messages
 
-        # Convert messages to appropriate format
-        converted_messages = token_counter.convert_messages(in_context_messages)
-
         # Extract system components
         system_prompt = ""
         core_memory = ""
@@ -101,17 +99,22 @@ class ContextWindowCalculator:
         if agent_state.tools:
             available_functions_definitions = [OpenAITool(type="function", function=f.json_schema) for f in agent_state.tools]
 
+        # Count message tokens from the counts stored with each message when the counter can use them
+        counted_messages = in_context_messages[message_start_index:]
+        if not counted_messages:
+            count_messages = asyncio.sleep(0, result=0)
+        elif token_counter.message_token_count_key == TIKTOKEN_TOKEN_COUNT_KEY:
+            count_messages = asyncio.sleep(0, result=count_in_context_tokens(counted_messages))
+        else:
+            count_messages = token_counter.count_message_tokens(token_counter.convert_messages(counted_messages))
+
         # Count tokens concurrently
         token_counts = await asyncio.gather(
             token_counter.count_text_tokens(system_prompt),
             token_counter.count_text_tokens(core_memory),
             token_counter.count_text_tokens(external_memory_summary),
             token_counter.count_text_tokens(summary_memory) if summary_memory else asyncio.sleep(0, result=0),
-            (
-                token_counter.count_message_tokens(converted_messages[message_start_index:])
-                if len(converted_messages) > message_start_index
-                else asyncio.sleep(0, result=0)
-            ),
+            count_messages,
             (
                 token_counter.count_tool_tokens(available_functions_definitions)
                 if available_functions_definitions
@@ -1,18 +1,23 @@
 import hashlib
 import json
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from letta.helpers.decorators import async_redis_cache
+from letta.helpers.message_helper import TIKTOKEN_TOKEN_COUNT_KEY
 from letta.llm_api.anthropic_client import AnthropicClient
 from letta.otel.tracing import trace_method
 from letta.schemas.openai.chat_completion_request import Tool as OpenAITool
+from letta.settings import settings
 from letta.utils import count_tokens
 
 
 class TokenCounter(ABC):
     """Abstract base class for token counting strategies"""
 
+    # Key into `Message.token_counts` whose per-message values add up to `count_message_tokens`, if any
+    message_token_count_key: Optional[str] = None
+
     @abstractmethod
     async def count_text_tokens(self, text: str) -> int:
         """Count tokens in a text string"""
@@ -42,6 +47,7 @@ class AnthropicTokenCounter(TokenCounter):
         key_func=lambda self, text: f"anthropic_text_tokens:{self.model}:{hashlib.sha256(text.encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        local_cache_size=settings.token_count_cache_size,
     )
     async def count_text_tokens(self, text: str) -> int:
         if not text:
@@ -53,6 +59,7 @@ class AnthropicTokenCounter(TokenCounter):
         key_func=lambda self, messages: f"anthropic_message_tokens:{self.model}:{hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        local_cache_size=settings.token_count_cache_size,
     )
     async def count_message_tokens(self, messages: List[Dict[str, Any]]) -> int:
         if not messages:
@@ -64,6 +71,7 @@ class AnthropicTokenCounter(TokenCounter):
         key_func=lambda self, tools: f"anthropic_tool_tokens:{self.model}:{hashlib.sha256(json.dumps([t.model_dump() for t in tools], sort_keys=True).encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        local_cache_size=settings.token_count_cache_size,
     )
     async def count_tool_tokens(self, tools: List[OpenAITool]) -> int:
         if not tools:
@@ -77,6 +85,8 @@ class AnthropicTokenCounter(TokenCounter):
 class TiktokenCounter(TokenCounter):
     """Token counter using tiktoken"""
 
+    message_token_count_key = TIKTOKEN_TOKEN_COUNT_KEY
+
     def __init__(self, model: str):
         self.model = model
 
@@ -85,6 +95,7 @@ class TiktokenCounter(TokenCounter):
         key_func=lambda self, text: f"tiktoken_text_tokens:{self.model}:{hashlib.sha256(text.encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        local_cache_size=settings.token_count_cache_size,
     )
     async def count_text_tokens(self, text: str) -> int:
         if not text:
@@ -96,6 +107,7 @@ class TiktokenCounter(TokenCounter):
         key_func=lambda self, messages: f"tiktoken_message_tokens:{self.model}:{hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        local_cache_size=settings.token_count_cache_size,
     )
     async def count_message_tokens(self, messages: List[Dict[str, Any]]) -> int:
         if not messages:
@@ -109,6 +121,7 @@ class TiktokenCounter(TokenCounter):
         key_func=lambda self, tools: f"tiktoken_tool_tokens:{self.model}:{hashlib.sha256(json.dumps([t.model_dump() for t in tools], sort_keys=True).encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        local_cache_size=settings.token_count_cache_size,
     )
     async def count_tool_tokens(self, tools: List[OpenAITool]) -> int:
         if not tools:
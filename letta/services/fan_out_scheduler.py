@@ -0,0 +1,135 @@
+"""
+Bounded fan-out of agent steps, for multi-agent tools that message many agents at once.
+
+`send_message_to_agents_matching_tags` started one step per matching agent at once and returned nothing until the
+slowest one finished, so a broadcast to hundreds of agents exhausted the DB pool and the providers' rate limits. Steps
+fanned out through the scheduler of the event loop instead:
+
+- run at most `settings.multi_agent_concurrent_sends` at a time across all fan-outs of the process, and at most
+  `settings.multi_agent_concurrent_sends_per_provider` at a time against the same LLM provider;
+- are each cancelled once they ran for `timeout_s`, time spent queued for a budget not included;
+- are reported as they complete, until the fan-out's deadline. Steps still queued or running then are reported as
+  pending and keep running in the background, since their recipients should still get the message.
+
+Fan-outs started by a step that is itself part of a fan-out (e.g. a recipient broadcasting in turn) bypass the budgets:
+the outer step holds its slots until the inner fan-out completes, so waiting for more slots could deadlock.
+"""
+
+import asyncio
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.settings import settings
+
+logger = get_logger(__name__)
+
+# set in the tasks of fan-out calls, and inherited by the tasks they start
+_in_fan_out_call: ContextVar[bool] = ContextVar("in_fan_out_call", default=False)
+
+
+@dataclass
+class FanOutCall:
+    key: str
+    # calls to the same provider share its budget
+    provider: str
+    call: Callable[[], Awaitable[Any]]
+    # run instead of `call` when the call had to queue for a budget, e.g. to reload state that may have gone stale
+    queued_call: Optional[Callable[[], Awaitable[Any]]] = None
+
+
+@dataclass
+class FanOutResult:
+    key: str
+    status: str  # Possible statuses: success, error, timeout, pending
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+class FanOutScheduler:
+    """Global and per-provider concurrency budgets of this event loop's fan-outs, and the steps still running."""
+
+    def __init__(self, max_concurrency: int, max_concurrency_per_provider: int):
+        self.max_concurrency_per_provider = max_concurrency_per_provider
+        self._budget = asyncio.Semaphore(max_concurrency)
+        self._provider_budgets: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def fan_out(self, calls: List[FanOutCall], timeout_s: float, deadline_s: float) -> AsyncIterator[FanOutResult]:
+        """Run `calls` within the budgets, yielding their results as they complete and, at the deadline, the rest as pending."""
+        nested = _in_fan_out_call.get()
+        tasks = {}
+        for call in calls:
+            task = asyncio.create_task(self._run_nested(call, timeout_s) if nested else self._run(call, timeout_s))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            tasks[task] = call
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + deadline_s
+        pending = set(tasks)
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+        if pending:
+            logger.info(f"Fan-out deadline of {deadline_s}s passed with {len(pending)} of {len(tasks)} calls still queued or running")
+        for task in pending:
+            yield FanOutResult(key=tasks[task].key, status="pending")
+
+    async def _run(self, call: FanOutCall, timeout_s: float) -> FanOutResult:
+        provider_budget = self._provider_budgets.get(call.provider)
+        if provider_budget is None:
+            provider_budget = self._provider_budgets[call.provider] = asyncio.Semaphore(self.max_concurrency_per_provider)
+
+        queued = provider_budget.locked() or self._budget.locked()
+        # the provider's budget first, so that calls waiting on a busy provider do not hold global slots
+        async with provider_budget, self._budget:
+            _in_fan_out_call.set(True)
+            return await self._call(call, call.queued_call if queued and call.queued_call else call.call, timeout_s)
+
+    async def _run_nested(self, call: FanOutCall, timeout_s: float) -> FanOutResult:
+        return await self._call(call, call.call, timeout_s)
+
+    async def _call(self, call: FanOutCall, func: Callable[[], Awaitable[Any]], timeout_s: float) -> FanOutResult:
+        try:
+            async with asyncio.timeout(timeout_s):
+                return FanOutResult(key=call.key, status="success", value=await func())
+        except TimeoutError as e:
+            logger.warning(f"Fan-out call {call.key} timed out after {timeout_s}s")
+            return FanOutResult(key=call.key, status="timeout", error=e)
+        except Exception as e:
+            return FanOutResult(key=call.key, status="error", error=e)
+
+    async def close(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_schedulers: EventLoopRegistry[FanOutScheduler] = EventLoopRegistry()
+
+
+def get_fan_out_scheduler() -> FanOutScheduler:
+    """Get the fan-out scheduler of the running event loop (its semaphores are loop-bound)."""
+    scheduler = _schedulers.get()
+    if scheduler is None:
+        scheduler = _schedulers.set(
+            FanOutScheduler(
+                max_concurrency=settings.multi_agent_concurrent_sends,
+                max_concurrency_per_provider=settings.multi_agent_concurrent_sends_per_provider,
+            )
+        )
+    return scheduler
+
+
+async def close_fan_out_schedulers() -> None:
+    schedulers = _schedulers.pop_all()
+    await asyncio.gather(*[scheduler.close() for scheduler in schedulers], return_exceptions=True)
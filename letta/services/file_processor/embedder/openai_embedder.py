@@ -1,6 +1,7 @@
 import asyncio
 from typing import List, Optional, Tuple, cast
 
+from letta.helpers.embedding_cache import get_embedding_cache
 from letta.llm_api.llm_client import LLMClient
 from letta.llm_api.openai_client import OpenAIClient
 from letta.log import get_logger
@@ -49,7 +50,11 @@ class OpenAIEmbedder(BaseEmbedder):
         )
 
         try:
-            embeddings = await self.client.request_embeddings(inputs=batch, embedding_config=self.embedding_config)
+            embeddings = await get_embedding_cache().embed(
+                batch,
+                self.embedding_config,
+                lambda texts: self.client.request_embeddings(inputs=texts, embedding_config=self.embedding_config),
+            )
             log_event("embedder.batch_completed", {"batch_size": len(batch), "embeddings_generated": len(embeddings)})
             return [(idx, e) for idx, e in zip(batch_indices, embeddings)]
         except Exception as e:
@@ -1,4 +1,5 @@
-from typing import List
+import asyncio
+from typing import List, Tuple
 
 from mistralai import OCRPageObject, OCRResponse, OCRUsageInfo
 
@@ -15,12 +16,16 @@ from letta.services.file_manager import FileManager
 from letta.services.file_processor.chunker.llama_index_chunker import LlamaIndexChunker
 from letta.services.file_processor.embedder.base_embedder import BaseEmbedder
 from letta.services.file_processor.parser.base_parser import FileParser
+from letta.services.file_processor.parser.parse_pool import chunk_text_in_process_pool, should_chunk_in_process_pool
 from letta.services.job_manager import JobManager
 from letta.services.passage_manager import PassageManager
 from letta.services.source_manager import SourceManager
 
 logger = get_logger(__name__)
 
+# embedding requests in flight while a streamed file is still being parsed
+STREAMING_EMBEDDING_CONCURRENCY = 4
+
 
 class FileProcessor:
     """Main PDF processing orchestrator"""
@@ -44,6 +49,14 @@ class FileProcessor:
         self.actor = actor
         self.using_pinecone = using_pinecone
 
+    async def _chunk_page(self, text_chunker: LlamaIndexChunker, page: OCRPageObject, default: bool = False) -> List[str]:
+        """Chunk one page, in the parse worker pool when it is too large to chunk on the event loop"""
+        if should_chunk_in_process_pool(page.markdown):
+            return await chunk_text_in_process_pool(
+                page.markdown, text_chunker.file_type, text_chunker.chunk_size, text_chunker.chunk_overlap, default=default
+            )
+        return text_chunker.default_chunk_text(page) if default else text_chunker.chunk_text(page)
+
     async def _chunk_and_embed_with_fallback(self, file_metadata: FileMetadata, ocr_response, source_id: str) -> List:
         """Chunk text and generate embeddings with fallback to default chunker if needed"""
         filename = file_metadata.file_name
@@ -55,7 +68,7 @@ class FileProcessor:
         try:
             all_chunks = []
             for page in ocr_response.pages:
-                chunks = text_chunker.chunk_text(page)
+                chunks = await self._chunk_page(text_chunker, page)
                 if not chunks:
                     log_event(
                         "file_processor.chunking_failed",
@@ -97,7 +110,7 @@ class FileProcessor:
                 all_chunks = []
 
                 for page in ocr_response.pages:
-                    chunks = text_chunker.default_chunk_text(page)
+                    chunks = await self._chunk_page(text_chunker, page, default=True)
                     if not chunks:
                         log_event(
                             "file_processor.default_chunking_failed",
@@ -159,115 +172,251 @@ class FileProcessor:
         )
 
         try:
-            # Ensure we're working with bytes
-            if isinstance(content, str):
-                content = content.encode("utf-8")
-
-            from letta.otel.metric_registry import MetricRegistry
-
-            MetricRegistry().file_process_bytes_histogram.record(len(content), attributes=get_ctx_attributes())
-
-            if len(content) > self.max_file_size:
-                log_event(
-                    "file_processor.size_limit_exceeded",
-                    {"filename": filename, "file_size": len(content), "max_file_size": self.max_file_size},
+            if not self.using_pinecone and self.file_parser.supports_page_streaming(file_metadata.file_type, len(content)):
+                return await self._parse_and_embed_streaming(
+                    agent_states=agent_states, source_id=source_id, content=content, file_metadata=file_metadata
                 )
-                raise ValueError(f"PDF size exceeds maximum allowed size of {self.max_file_size} bytes")
 
-            logger.info(f"Starting OCR extraction for {filename}")
-            log_event("file_processor.ocr_started", {"filename": filename, "file_size": len(content), "mime_type": file_metadata.file_type})
-            ocr_response = await self.file_parser.extract_text(content, mime_type=file_metadata.file_type)
+            file_metadata, ocr_response = await self.parse(
+                agent_states=agent_states, source_id=source_id, content=content, file_metadata=file_metadata
+            )
+            return await self.embed_and_persist(file_metadata=file_metadata, source_id=source_id, ocr_response=ocr_response)
 
-            # update file with raw text
-            raw_markdown_text = "".join([page.markdown for page in ocr_response.pages])
+        except Exception as e:
+            logger.exception("File processing failed for %s: %s", filename, e)
             log_event(
-                "file_processor.ocr_completed",
-                {"filename": filename, "pages_extracted": len(ocr_response.pages), "text_length": len(raw_markdown_text)},
+                "file_processor.processing_failed",
+                {
+                    "filename": filename,
+                    "file_id": str(file_metadata.id),
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                    "status": FileProcessingStatus.ERROR.value,
+                },
+            )
+            await self.file_manager.update_file_status(
+                file_id=file_metadata.id, actor=self.actor, processing_status=FileProcessingStatus.ERROR, error_message=str(e)
             )
 
-            file_metadata = await self.file_manager.upsert_file_content(file_id=file_metadata.id, text=raw_markdown_text, actor=self.actor)
+            return []
 
-            await self.agent_manager.insert_file_into_context_windows(
-                source_id=source_id,
-                file_metadata_with_content=file_metadata,
-                actor=self.actor,
-                agent_states=agent_states,
-            )
+    @trace_method
+    async def parse(
+        self,
+        agent_states: list[AgentState],
+        source_id: str,
+        content: bytes,
+        file_metadata: FileMetadata,
+    ) -> Tuple[FileMetadata, OCRResponse]:
+        """Extract text from the file, store it as the file's content and open the file in attached agents. Raises on failure."""
+        content = self._check_content(content, file_metadata)
 
-            if not ocr_response or len(ocr_response.pages) == 0:
-                log_event(
-                    "file_processor.ocr_no_text",
-                    {
-                        "filename": filename,
-                        "ocr_response_empty": not ocr_response,
-                        "pages_count": len(ocr_response.pages) if ocr_response else 0,
-                    },
-                )
-                raise ValueError("No text extracted from PDF")
+        logger.info(f"Starting OCR extraction for {file_metadata.file_name}")
+        log_event(
+            "file_processor.ocr_started",
+            {"filename": file_metadata.file_name, "file_size": len(content), "mime_type": file_metadata.file_type},
+        )
+        ocr_response = await self.file_parser.extract_text(content, mime_type=file_metadata.file_type)
+
+        file_metadata = await self._store_parsed_text(
+            agent_states=agent_states, source_id=source_id, file_metadata=file_metadata, ocr_response=ocr_response
+        )
+        return file_metadata, ocr_response
+
+    def _check_content(self, content: bytes, file_metadata: FileMetadata) -> bytes:
+        # Ensure we're working with bytes
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+
+        from letta.otel.metric_registry import MetricRegistry
+
+        MetricRegistry().file_process_bytes_histogram.record(len(content), attributes=get_ctx_attributes())
 
-            logger.info("Chunking extracted text")
+        if len(content) > self.max_file_size:
             log_event(
-                "file_processor.chunking_started",
-                {"filename": filename, "pages_to_process": len(ocr_response.pages)},
+                "file_processor.size_limit_exceeded",
+                {"filename": file_metadata.file_name, "file_size": len(content), "max_file_size": self.max_file_size},
             )
+            raise ValueError(f"PDF size exceeds maximum allowed size of {self.max_file_size} bytes")
+        return content
 
-            # Chunk and embed with fallback logic
-            all_passages = await self._chunk_and_embed_with_fallback(
-                file_metadata=file_metadata,
-                ocr_response=ocr_response,
-                source_id=source_id,
-            )
+    async def _store_parsed_text(
+        self, agent_states: list[AgentState], source_id: str, file_metadata: FileMetadata, ocr_response: OCRResponse
+    ) -> FileMetadata:
+        filename = file_metadata.file_name
 
-            if not self.using_pinecone:
-                all_passages = await self.passage_manager.create_many_source_passages_async(
-                    passages=all_passages,
-                    file_metadata=file_metadata,
-                    actor=self.actor,
-                )
-                log_event(
-                    "file_processor.passages_created",
-                    {"filename": filename, "total_passages": len(all_passages)},
-                )
+        # update file with raw text
+        raw_markdown_text = "".join([page.markdown for page in ocr_response.pages])
+        log_event(
+            "file_processor.ocr_completed",
+            {"filename": filename, "pages_extracted": len(ocr_response.pages), "text_length": len(raw_markdown_text)},
+        )
+
+        file_metadata = await self.file_manager.upsert_file_content(file_id=file_metadata.id, text=raw_markdown_text, actor=self.actor)
+
+        await self.agent_manager.insert_file_into_context_windows(
+            source_id=source_id,
+            file_metadata_with_content=file_metadata,
+            actor=self.actor,
+            agent_states=agent_states,
+        )
 
-            logger.info(f"Successfully processed {filename}: {len(all_passages)} passages")
+        if not ocr_response or len(ocr_response.pages) == 0:
             log_event(
-                "file_processor.processing_completed",
+                "file_processor.ocr_no_text",
                 {
                     "filename": filename,
-                    "file_id": str(file_metadata.id),
-                    "total_passages": len(all_passages),
-                    "status": FileProcessingStatus.COMPLETED.value,
+                    "ocr_response_empty": not ocr_response,
+                    "pages_count": len(ocr_response.pages) if ocr_response else 0,
                 },
             )
+            raise ValueError("No text extracted from PDF")
 
-            # update job status
-            if not self.using_pinecone:
-                await self.file_manager.update_file_status(
-                    file_id=file_metadata.id,
-                    actor=self.actor,
-                    processing_status=FileProcessingStatus.COMPLETED,
-                    chunks_embedded=len(all_passages),
+        return file_metadata
+
+    @trace_method
+    async def _parse_and_embed_streaming(
+        self,
+        agent_states: list[AgentState],
+        source_id: str,
+        content: bytes,
+        file_metadata: FileMetadata,
+    ) -> List[Passage]:
+        """
+        Parse and chunk the file in the parse worker pool and start embedding each page's chunks as soon as it arrives.
+
+        Passages are only written once every page has been embedded. If a page yields no chunks or embedding fails,
+        the parsed text goes through `embed_and_persist`, which retries with the default chunker.
+        """
+        filename = file_metadata.file_name
+        content = self._check_content(content, file_metadata)
+        text_chunker = LlamaIndexChunker(file_type=file_metadata.file_type, chunk_size=self.embedder.embedding_config.embedding_chunk_size)
+
+        logger.info(f"Starting streaming extraction for {filename}")
+        log_event("file_processor.ocr_started", {"filename": filename, "file_size": len(content), "mime_type": file_metadata.file_type})
+
+        semaphore = asyncio.Semaphore(STREAMING_EMBEDDING_CONCURRENCY)
+
+        async def embed(chunks: List[str]) -> List[Passage]:
+            async with semaphore:
+                return await self.embedder.generate_embedded_passages(
+                    file_id=file_metadata.id, source_id=source_id, chunks=chunks, actor=self.actor
                 )
 
-            return all_passages
+        pages, embedding_tasks, pending_chunks = [], [], []
+        chunking_failed = False
+        try:
+            async for parsed in self.file_parser.stream_pages(
+                content,
+                mime_type=file_metadata.file_type,
+                file_type=text_chunker.file_type,
+                chunk_size=text_chunker.chunk_size,
+                chunk_overlap=text_chunker.chunk_overlap,
+            ):
+                pages.append(parsed.page)
+                if not parsed.chunks:
+                    chunking_failed = True
+                if chunking_failed:
+                    continue
+                pending_chunks.extend(parsed.chunks)
+                if len(pending_chunks) >= self.embedder.embedding_config.batch_size:
+                    embedding_tasks.append(asyncio.create_task(embed(pending_chunks)))
+                    pending_chunks = []
+
+            if pending_chunks and not chunking_failed:
+                embedding_tasks.append(asyncio.create_task(embed(pending_chunks)))
+
+            ocr_response = OCRResponse(
+                model="markitdown", pages=pages, usage_info=OCRUsageInfo(pages_processed=len(pages)), document_annotation=None
+            )
+            file_metadata = await self._store_parsed_text(
+                agent_states=agent_states, source_id=source_id, file_metadata=file_metadata, ocr_response=ocr_response
+            )
 
-        except Exception as e:
-            logger.exception("File processing failed for %s: %s", filename, e)
+            if not chunking_failed:
+                try:
+                    results = await asyncio.gather(*embedding_tasks)
+                except Exception as e:
+                    logger.warning(f"Failed to embed streamed chunks for {filename}: {str(e)}. Retrying with default chunker.")
+                    chunking_failed = True
+        finally:
+            for task in embedding_tasks:
+                task.cancel()
+
+        if chunking_failed:
+            return await self.embed_and_persist(file_metadata=file_metadata, source_id=source_id, ocr_response=ocr_response)
+
+        all_passages = [passage for passages in results for passage in passages]
+        file_metadata = await self.file_manager.update_file_status(
+            file_id=file_metadata.id,
+            actor=self.actor,
+            processing_status=FileProcessingStatus.EMBEDDING,
+            total_chunks=len(all_passages),
+            chunks_embedded=0,
+        )
+        return await self._persist_passages(file_metadata=file_metadata, all_passages=all_passages)
+
+    @trace_method
+    async def embed_and_persist(self, file_metadata: FileMetadata, source_id: str, ocr_response: OCRResponse) -> List[Passage]:
+        """Chunk and embed parsed text, store the passages and mark the file completed. Raises on failure."""
+        filename = file_metadata.file_name
+
+        logger.info("Chunking extracted text")
+        log_event(
+            "file_processor.chunking_started",
+            {"filename": filename, "pages_to_process": len(ocr_response.pages)},
+        )
+
+        # Chunk and embed with fallback logic
+        all_passages = await self._chunk_and_embed_with_fallback(
+            file_metadata=file_metadata,
+            ocr_response=ocr_response,
+            source_id=source_id,
+        )
+
+        return await self._persist_passages(file_metadata=file_metadata, all_passages=all_passages)
+
+    async def _persist_passages(self, file_metadata: FileMetadata, all_passages: List[Passage]) -> List[Passage]:
+        filename = file_metadata.file_name
+
+        if not self.using_pinecone:
+            all_passages = await self.passage_manager.create_many_source_passages_async(
+                passages=all_passages,
+                file_metadata=file_metadata,
+                actor=self.actor,
+            )
             log_event(
-                "file_processor.processing_failed",
-                {
-                    "filename": filename,
-                    "file_id": str(file_metadata.id),
-                    "error": str(e),
-                    "error_type": type(e).__name__,
-                    "status": FileProcessingStatus.ERROR.value,
-                },
+                "file_processor.passages_created",
+                {"filename": filename, "total_passages": len(all_passages)},
             )
+
+        logger.info(f"Successfully processed {filename}: {len(all_passages)} passages")
+        log_event(
+            "file_processor.processing_completed",
+            {
+                "filename": filename,
+                "file_id": str(file_metadata.id),
+                "total_passages": len(all_passages),
+                "status": FileProcessingStatus.COMPLETED.value,
+            },
+        )
+
+        # update job status
+        if not self.using_pinecone:
             await self.file_manager.update_file_status(
-                file_id=file_metadata.id, actor=self.actor, processing_status=FileProcessingStatus.ERROR, error_message=str(e)
+                file_id=file_metadata.id,
+                actor=self.actor,
+                processing_status=FileProcessingStatus.COMPLETED,
+                chunks_embedded=len(all_passages),
             )
 
-            return []
+        return all_passages
+
+    async def embed_and_persist_stored_content(self, file_metadata: FileMetadata, source_id: str) -> List[Passage]:
+        """Finish processing a file whose text was already extracted and stored by `parse`."""
+        return await self.embed_and_persist(
+            file_metadata=file_metadata, source_id=source_id, ocr_response=self._create_ocr_response_from_content(file_metadata.content)
+        )
 
     def _create_ocr_response_from_content(self, content: str):
         """Create minimal OCR response from existing content"""
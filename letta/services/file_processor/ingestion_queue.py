@@ -0,0 +1,375 @@
+"""
+Durable file ingestion queue backed by the jobs table.
+
+Uploads used to start `FileProcessor.process` with `safe_create_task` on the API event loop, so ingestion competed
+with request handling, had no backpressure and was lost if the process restarted. With
+`settings.file_ingestion_queue_enabled`, an upload instead spools the file's bytes to
+`settings.file_ingestion_spool_dir` and inserts a `file_ingestion` job. `FileIngestionWorker`s claim queued jobs
+with a compare-and-set on the job status, so any number of them can share a database. They run inside each API
+process (`settings.file_ingestion_run_worker`) or as dedicated `letta ingest-worker` processes. When workers run on
+several hosts, the spool directory must be shared storage.
+
+A job records its stage in its metadata:
+  queued    -> the file has been uploaded and is waiting for a worker
+  parsed    -> text was extracted and stored as the file's content, so a retry skips parsing
+  persisted -> passages were written and the file is completed
+Chunking and embedding run again on a retry from `parsed` (with `embedding_cache_size` set, already embedded chunks
+come from the embedding cache). Progress is reported through `FileMetadata.processing_status` as before: the file
+stays `pending` until a worker picks it up, and only turns to `error` once its last attempt has failed.
+
+Workers heartbeat the jobs they run. A running job whose heartbeat is older than `file_ingestion_lease_timeout`
+is assumed to belong to a dead worker and is queued again. The expired lease counts as a failed attempt, so a file that
+keeps killing or hanging its workers fails once it is out of attempts.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select, update
+
+from letta.constants import LETTA_DIR
+from letta.helpers.pinecone_utils import should_use_pinecone
+from letta.log import get_logger
+from letta.orm.job import Job as JobModel
+from letta.orm.user import User as UserModel
+from letta.otel.tracing import trace_method
+from letta.schemas.embedding_config import EmbeddingConfig
+from letta.schemas.enums import FileProcessingStatus, JobStatus, JobType
+from letta.schemas.file import FileMetadata
+from letta.schemas.job import Job as PydanticJob
+from letta.schemas.job import JobUpdate
+from letta.schemas.user import User
+from letta.server.db import db_registry
+from letta.services.file_manager import FileManager
+from letta.services.file_processor.embedder.openai_embedder import OpenAIEmbedder
+from letta.services.file_processor.embedder.pinecone_embedder import PineconeEmbedder
+from letta.services.file_processor.file_processor import FileProcessor
+from letta.services.file_processor.parser.markitdown_parser import MarkitdownFileParser
+from letta.services.file_processor.parser.mistral_parser import MistralFileParser
+from letta.services.job_manager import JobManager
+from letta.services.passage_manager import PassageManager
+from letta.services.source_manager import SourceManager
+from letta.services.user_manager import UserManager
+from letta.settings import settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+STAGE_QUEUED = "queued"
+STAGE_PARSED = "parsed"
+STAGE_PERSISTED = "persisted"
+
+# upper bound on queued jobs inspected per claim attempt
+CLAIM_CANDIDATES = 100
+
+
+def build_file_processor(embedding_config: EmbeddingConfig, actor: User) -> FileProcessor:
+    # Choose parser based on mistral API key availability
+    file_parser = MistralFileParser() if settings.mistral_api_key else MarkitdownFileParser()
+    using_pinecone = should_use_pinecone()
+    embedder = PineconeEmbedder(embedding_config=embedding_config) if using_pinecone else OpenAIEmbedder(embedding_config=embedding_config)
+    return FileProcessor(file_parser=file_parser, embedder=embedder, actor=actor, using_pinecone=using_pinecone)
+
+
+def get_spool_dir() -> Path:
+    return Path(settings.file_ingestion_spool_dir or os.path.join(LETTA_DIR, "file_ingestion"))
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff between attempts, capped at ten minutes."""
+    return min(settings.file_ingestion_retry_base_delay * 2 ** (attempts - 1), 600.0)
+
+
+class FileIngestionQueue:
+    """Enqueue, claim and settle `file_ingestion` jobs."""
+
+    def __init__(self):
+        self.job_manager = JobManager()
+        self.file_manager = FileManager()
+        self.user_manager = UserManager()
+
+    @trace_method
+    async def enqueue(self, content: bytes, file_metadata: FileMetadata, actor: User) -> PydanticJob:
+        """Spool an uploaded file and queue it for ingestion. `file_metadata` must already exist in the pending state."""
+        spool_dir = get_spool_dir()
+        content_path = spool_dir / f"{file_metadata.id}.bin"
+
+        def write_spool_file():
+            spool_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = content_path.with_suffix(".tmp")
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, content_path)
+
+        await asyncio.to_thread(write_spool_file)
+        job = PydanticJob(
+            job_type=JobType.FILE_INGESTION,
+            status=JobStatus.created,
+            metadata={
+                "file_id": file_metadata.id,
+                "source_id": file_metadata.source_id,
+                "content_path": str(content_path),
+                "stage": STAGE_QUEUED,
+                "attempts": 0,
+                "not_before": 0,
+            },
+        )
+        return await self.job_manager.create_job_async(pydantic_job=job, actor=actor)
+
+    async def requeue_expired(self) -> int:
+        """
+        Settle running jobs whose worker stopped heartbeating as failed attempts: they are queued again, or failed once
+        they are out of attempts. Returns the number of jobs settled.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.file_ingestion_lease_timeout)
+        expired_where = (JobModel.job_type == JobType.FILE_INGESTION, JobModel.status == JobStatus.running, JobModel.updated_at < cutoff)
+        async with db_registry.async_session() as session:
+            expired_ids = (await session.execute(select(JobModel.id).where(*expired_where))).scalars().all()
+            expired_jobs = []
+            for job_id in expired_ids:
+                # take the lease over with a compare-and-set, so that a job is settled once if workers race on it
+                result = await session.execute(
+                    update(JobModel).where(JobModel.id == job_id, *expired_where).values(updated_at=datetime.now(timezone.utc))
+                )
+                await session.commit()
+                if result.rowcount == 1:
+                    expired_jobs.append((await session.get(JobModel, job_id)).to_pydantic())
+
+        for job in expired_jobs:
+            logger.warning(f"File ingestion job {job.id} lost its worker (lease expired)")
+            await self.fail(job, None, "The worker processing the file stopped responding")
+        return len(expired_jobs)
+
+    async def claim(self) -> Optional[PydanticJob]:
+        """
+        Claim the oldest runnable job, respecting per-organization concurrency.
+
+        The per-organization limit is checked before the claim, so concurrent workers can briefly overshoot it;
+        the claim itself is an atomic compare-and-set, so a job is only ever handed to one worker.
+        """
+        async with db_registry.async_session() as session:
+            running_rows = await session.execute(
+                select(UserModel.organization_id, func.count())
+                .select_from(JobModel)
+                .join(UserModel, UserModel.id == JobModel.user_id)
+                .where(JobModel.job_type == JobType.FILE_INGESTION, JobModel.status == JobStatus.running)
+                .group_by(UserModel.organization_id)
+            )
+            running_per_org: Dict[str, int] = dict(running_rows.all())
+
+            candidates = await session.execute(
+                select(JobModel.id, JobModel.metadata_, UserModel.organization_id)
+                .join(UserModel, UserModel.id == JobModel.user_id)
+                .where(JobModel.job_type == JobType.FILE_INGESTION, JobModel.status == JobStatus.created)
+                .order_by(JobModel.created_at)
+                .limit(CLAIM_CANDIDATES)
+            )
+            now = time.time()
+            for job_id, metadata, organization_id in candidates.all():
+                if (metadata or {}).get("not_before", 0) > now:
+                    continue
+                if running_per_org.get(organization_id, 0) >= settings.file_ingestion_max_concurrent_per_org:
+                    continue
+                result = await session.execute(
+                    update(JobModel)
+                    .where(JobModel.id == job_id, JobModel.status == JobStatus.created)
+                    .values(status=JobStatus.running, updated_at=datetime.now(timezone.utc))
+                )
+                await session.commit()
+                if result.rowcount == 1:
+                    job = await session.get(JobModel, job_id)
+                    await session.refresh(job)
+                    return job.to_pydantic()
+        return None
+
+    async def heartbeat(self, job_id: str) -> None:
+        async with db_registry.async_session() as session:
+            await session.execute(
+                update(JobModel)
+                .where(JobModel.id == job_id, JobModel.status == JobStatus.running)
+                .values(updated_at=datetime.now(timezone.utc))
+            )
+            await session.commit()
+
+    async def update_metadata(self, job: PydanticJob, actor: User, **values) -> PydanticJob:
+        return await self.job_manager.update_job_by_id_async(
+            job_id=job.id, job_update=JobUpdate(metadata={**job.metadata, **values}), actor=actor
+        )
+
+    async def complete(self, job: PydanticJob, actor: User, num_passages: int) -> None:
+        await self.job_manager.update_job_by_id_async(
+            job_id=job.id,
+            job_update=JobUpdate(
+                status=JobStatus.completed, metadata={**job.metadata, "stage": STAGE_PERSISTED, "num_passages": num_passages}
+            ),
+            actor=actor,
+        )
+        await self._remove_spool_file(job)
+
+    async def fail(self, job: PydanticJob, actor: Optional[User], error: str) -> bool:
+        """
+        Record a failed attempt. Returns True if the job was queued again, False if it has no attempts left, in which
+        case its file is marked as errored. The actor is loaded when not given, e.g. when loading it is what failed.
+        """
+        if actor is None:
+            actor = await self.user_manager.get_actor_by_id_async(job.user_id)
+        attempts = job.metadata.get("attempts", 0) + 1
+        metadata = {**job.metadata, "attempts": attempts, "error": error}
+        if attempts < settings.file_ingestion_max_attempts:
+            metadata["not_before"] = time.time() + retry_delay(attempts)
+            await self.job_manager.update_job_by_id_async(
+                job_id=job.id, job_update=JobUpdate(status=JobStatus.created, metadata=metadata), actor=actor
+            )
+            return True
+        await self.job_manager.update_job_by_id_async(
+            job_id=job.id, job_update=JobUpdate(status=JobStatus.failed, metadata=metadata), actor=actor
+        )
+        await self._remove_spool_file(job)
+        try:
+            await self.file_manager.update_file_status(
+                file_id=job.metadata["file_id"], actor=actor, processing_status=FileProcessingStatus.ERROR, error_message=error
+            )
+        except Exception as e:
+            logger.warning(f"Failed to mark file {job.metadata['file_id']} of failed ingestion job {job.id} as errored: {e}")
+        return False
+
+    async def cancel(self, job: PydanticJob, actor: User, reason: str) -> None:
+        await self.job_manager.update_job_by_id_async(
+            job_id=job.id, job_update=JobUpdate(status=JobStatus.cancelled, metadata={**job.metadata, "error": reason}), actor=actor
+        )
+        await self._remove_spool_file(job)
+
+    @staticmethod
+    async def _remove_spool_file(job: PydanticJob) -> None:
+        content_path = job.metadata.get("content_path")
+        if content_path:
+            await asyncio.to_thread(Path(content_path).unlink, missing_ok=True)
+
+
+class FileIngestionWorker:
+    """Polls the ingestion queue and runs up to `file_ingestion_worker_concurrency` files at a time."""
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = concurrency or settings.file_ingestion_worker_concurrency
+        self.queue = FileIngestionQueue()
+        self.file_manager = FileManager()
+        self.source_manager = SourceManager()
+        self.passage_manager = PassageManager()
+        self.user_manager = UserManager()
+        self._wakeup = asyncio.Event()
+        self._running: List[asyncio.Task] = []
+        self._stopped = False
+
+    def notify(self) -> None:
+        """Wake the worker up early, e.g. right after a job was enqueued in the same process."""
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        last_requeue = 0.0
+        while not self._stopped:
+            try:
+                if time.monotonic() - last_requeue > settings.file_ingestion_lease_timeout / 2:
+                    last_requeue = time.monotonic()
+                    await self.queue.requeue_expired()
+
+                self._running = [task for task in self._running if not task.done()]
+                while len(self._running) < self.concurrency:
+                    job = await self.queue.claim()
+                    if job is None:
+                        break
+                    self._running.append(safe_create_task(self.process_job(job), logger=logger, label=f"file ingestion {job.id}"))
+            except Exception as e:
+                logger.error(f"File ingestion worker failed to poll the queue: {e}", exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.file_ingestion_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def stop(self) -> None:
+        """Stop claiming jobs. In-flight jobs are cancelled and picked up again by another worker once their lease expires."""
+        self._stopped = True
+        self._wakeup.set()
+        for task in self._running:
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(settings.file_ingestion_lease_timeout / 4)
+            try:
+                await self.queue.heartbeat(job_id)
+            except Exception as e:
+                logger.warning(f"Failed to heartbeat file ingestion job {job_id}: {e}")
+
+    @trace_method
+    async def process_job(self, job: PydanticJob) -> None:
+        actor = None
+        file_id, source_id = job.metadata["file_id"], job.metadata["source_id"]
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            # loading fails like any other step, rather than leaving the job running until its lease expires
+            actor = await self.user_manager.get_actor_by_id_async(job.user_id)
+            file_metadata = await self.file_manager.get_file_by_id(file_id, actor=actor, include_content=True)
+            source = await self.source_manager.get_source_by_id(source_id=source_id, actor=actor)
+            if file_metadata is None or source is None:
+                logger.info(f"Cancelling file ingestion job {job.id}: file {file_id} or source {source_id} was deleted")
+                await self.queue.cancel(job, actor, "File or source was deleted")
+                return
+
+            processor = build_file_processor(source.embedding_config, actor)
+            if job.metadata.get("stage") == STAGE_PARSED and file_metadata.content is not None:
+                # a previous attempt may have died after writing passages but before the job was settled
+                leftovers = await self.passage_manager.list_passages_by_file_id_async(file_id=file_id, actor=actor)
+                if leftovers:
+                    await self.passage_manager.delete_source_passages_async(actor=actor, passages=leftovers)
+                passages = await processor.embed_and_persist_stored_content(file_metadata=file_metadata, source_id=source_id)
+            else:
+                content = await asyncio.to_thread(Path(job.metadata["content_path"]).read_bytes)
+                await self.file_manager.update_file_status(file_id=file_id, actor=actor, processing_status=FileProcessingStatus.PARSING)
+                agent_states = await self.source_manager.list_attached_agents(source_id=source_id, actor=actor)
+                file_metadata, ocr_response = await processor.parse(
+                    agent_states=agent_states, source_id=source_id, content=content, file_metadata=file_metadata
+                )
+                job = await self.queue.update_metadata(job, actor, stage=STAGE_PARSED)
+                passages = await processor.embed_and_persist(file_metadata=file_metadata, source_id=source_id, ocr_response=ocr_response)
+            await self.queue.complete(job, actor, num_passages=len(passages))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"File ingestion job {job.id} for file {file_id} failed: {e}")
+            await self.queue.fail(job, actor, str(e))
+        finally:
+            heartbeat.cancel()
+
+
+_worker: Optional[FileIngestionWorker] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+async def enqueue_file_ingestion(content: bytes, file_metadata: FileMetadata, actor: User) -> PydanticJob:
+    job = await FileIngestionQueue().enqueue(content=content, file_metadata=file_metadata, actor=actor)
+    if _worker is not None:
+        _worker.notify()
+    return job
+
+
+def start_file_ingestion_worker() -> FileIngestionWorker:
+    """Start a worker on the running event loop (used by the API lifespan and `letta ingest-worker`)."""
+    global _worker, _worker_task
+    if _worker is None:
+        _worker = FileIngestionWorker()
+        _worker_task = safe_create_task(_worker.run(), logger=logger, label="file ingestion worker")
+    return _worker
+
+
+async def stop_file_ingestion_worker() -> None:
+    global _worker, _worker_task
+    if _worker is not None:
+        await _worker.stop()
+        await asyncio.gather(_worker_task, return_exceptions=True)
+    _worker, _worker_task = None, None
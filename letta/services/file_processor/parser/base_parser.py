@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from letta.services.file_processor.parser.parse_pool import ParsedPage
 
 
 class FileParser(ABC):
@@ -7,3 +10,18 @@ class FileParser(ABC):
     @abstractmethod
     async def extract_text(self, content: bytes, mime_type: str):
         """Extract text from PDF content"""
+
+    def supports_page_streaming(self, mime_type: str, size: int) -> bool:
+        """Whether `stream_pages` can be used for this file"""
+        return False
+
+    async def stream_pages(
+        self, content: bytes, mime_type: str, file_type: Optional[str], chunk_size: int, chunk_overlap: int
+    ) -> AsyncIterator[ParsedPage]:
+        """
+        Extract and chunk text page by page. By default the whole file is parsed with `extract_text` and its pages are
+        yielded unchunked, which leaves chunking to the caller.
+        """
+        ocr_response = await self.extract_text(content, mime_type=mime_type)
+        for page in ocr_response.pages:
+            yield ParsedPage(page=page, chunks=None)
@@ -1,6 +1,7 @@
 import logging
 import os
 import tempfile
+from typing import AsyncIterator, Optional
 
 from markitdown import MarkItDown
 from mistralai import OCRPageObject, OCRResponse, OCRUsageInfo
@@ -9,6 +10,7 @@ from letta.log import get_logger
 from letta.otel.tracing import trace_method
 from letta.services.file_processor.file_types import is_simple_text_mime_type
 from letta.services.file_processor.parser.base_parser import FileParser
+from letta.services.file_processor.parser.parse_pool import ParsedPage, parse_pages_in_process_pool, should_parse_in_process_pool
 
 logger = get_logger(__name__)
 
@@ -29,6 +31,19 @@ class MarkitdownFileParser(FileParser):
     async def extract_text(self, content: bytes, mime_type: str) -> OCRResponse:
         """Extract text using markitdown."""
         try:
+            if should_parse_in_process_pool(mime_type, len(content)):
+                logger.info(f"Extracting text in the parse worker pool: {self.model}")
+                pages = [
+                    parsed.page
+                    async for parsed in parse_pages_in_process_pool(content, mime_type, suffix=self._get_file_extension(mime_type))
+                ]
+                return OCRResponse(
+                    model=self.model,
+                    pages=pages,
+                    usage_info=OCRUsageInfo(pages_processed=len(pages)),
+                    document_annotation=None,
+                )
+
             # Handle simple text files directly
             if is_simple_text_mime_type(mime_type):
                 logger.info(f"Extracting text directly (no processing needed): {self.model}")
@@ -79,6 +94,23 @@ class MarkitdownFileParser(FileParser):
             logger.error(f"Markitdown text extraction failed: {str(e)}")
             raise
 
+    def supports_page_streaming(self, mime_type: str, size: int) -> bool:
+        return should_parse_in_process_pool(mime_type, size)
+
+    async def stream_pages(
+        self, content: bytes, mime_type: str, file_type: Optional[str], chunk_size: int, chunk_overlap: int
+    ) -> AsyncIterator[ParsedPage]:
+        """Extract and chunk text in the parse worker pool, yielding pages as soon as they are chunked."""
+        async for parsed in parse_pages_in_process_pool(
+            content,
+            mime_type,
+            suffix=self._get_file_extension(mime_type),
+            file_type=file_type,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        ):
+            yield parsed
+
     def _get_file_extension(self, mime_type: str) -> str:
         """Get file extension based on MIME type for markitdown processing."""
         mime_to_ext = {
@@ -0,0 +1,269 @@
+"""
+Pool of worker processes that parse and chunk uploaded files.
+
+MarkItDown conversion and LlamaIndex chunking are CPU bound and synchronous, so running them on the API event loop
+stalls every request served by that process while a large PDF or DOCX is being processed. With
+`settings.file_parsing_process_pool_enabled`, binary files, text files larger than `file_parsing_inline_max_bytes`
+and large chunking jobs are sent to warm worker processes (see `parse_worker.py`) instead; small text files stay
+inline, where the round trip would cost more than the work.
+
+Each file gets `file_parsing_timeout` seconds, after which its worker is killed, and workers cannot allocate more than
+`file_parsing_max_memory_mb` on top of their baseline.
+"""
+
+import asyncio
+import os
+import pickle
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from mistralai import OCRPageObject
+
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.schemas.file import FileMetadata
+from letta.services.file_processor.chunker.line_chunker import LineChunker
+from letta.services.file_processor.file_types import is_simple_text_mime_type
+from letta.settings import settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+WORKER_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parse_worker.py")
+HEADER_FORMAT = ">I"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+@dataclass
+class ParsedPage:
+    page: OCRPageObject
+    # None when chunking was not requested
+    chunks: Optional[List[str]]
+
+
+def should_parse_in_process_pool(mime_type: str, size: int) -> bool:
+    return settings.file_parsing_process_pool_enabled and (
+        size > settings.file_parsing_inline_max_bytes or not is_simple_text_mime_type(mime_type)
+    )
+
+
+def should_chunk_in_process_pool(text: str) -> bool:
+    return settings.file_parsing_process_pool_enabled and len(text) > settings.file_parsing_inline_max_bytes
+
+
+class FileParseWorker:
+    """A warm worker process that parses and chunks files sent over its stdin/stdout pipes."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.num_files = 0
+        # peak RSS above the worker's footprint after startup
+        self.memory_growth_mb = 0.0
+        # False while a response is only partially read; such a worker cannot take another request
+        self.idle = True
+
+    @classmethod
+    async def spawn(cls) -> "FileParseWorker":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            WORKER_SCRIPT_PATH,
+            str(settings.file_parsing_max_memory_mb),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        return cls(process)
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process.returncode is None
+
+    def should_recycle(self) -> bool:
+        return (
+            not self.is_alive
+            or not self.idle
+            or self.num_files >= settings.file_parsing_worker_max_files
+            or self.memory_growth_mb >= settings.file_parsing_max_memory_mb
+        )
+
+    async def stream(self, request: Dict[str, Any], timeout: float) -> AsyncIterator[Dict[str, Any]]:
+        """Send one request and yield its response frames until the worker reports it is done."""
+        self.idle = False
+        payload = pickle.dumps(request)
+        self.process.stdin.write(struct.pack(HEADER_FORMAT, len(payload)) + payload)
+        await self.process.stdin.drain()
+
+        async def _read_response():
+            header = await self.process.stdout.readexactly(HEADER_SIZE)
+            (length,) = struct.unpack(HEADER_FORMAT, header)
+            return pickle.loads(await self.process.stdout.readexactly(length))
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                response = await asyncio.wait_for(_read_response(), timeout=max(deadline - time.monotonic(), 0))
+            except asyncio.IncompleteReadError:
+                raise RuntimeError(f"File parse worker exited unexpectedly with code {await self.process.wait()}")
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"File parsing timed out after {timeout} seconds")
+
+            if response.get("done"):
+                self.idle = True
+                self.num_files += 1
+                self.memory_growth_mb = response["memory_growth_mb"]
+                if response["error"]:
+                    error_type, message = response["error"]
+                    if error_type == "MemoryError":
+                        raise MemoryError(f"File parsing exceeded the {settings.file_parsing_max_memory_mb}MB memory limit")
+                    raise RuntimeError(f"File parsing failed ({error_type}): {message}")
+                return
+            yield response
+
+    async def close(self) -> None:
+        if not self.is_alive:
+            return
+        if not self.idle:
+            # still busy with a request nobody is waiting for
+            self.process.kill()
+            await self.process.wait()
+            return
+        try:
+            self.process.stdin.close()
+            await asyncio.wait_for(self.process.wait(), timeout=5)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.process.kill()
+            await self.process.wait()
+
+
+class FileParseWorkerPool:
+    """
+    Bounded pool of parse workers for one event loop.
+
+    At most `file_parsing_process_pool_size` files are parsed at once; further requests wait for a worker. Workers are
+    reused across files and replaced once they crossed the memory limit, timed out or handled
+    `file_parsing_worker_max_files` files.
+    """
+
+    def __init__(self):
+        self._idle_workers: List[FileParseWorker] = []
+        self._semaphore = asyncio.Semaphore(settings.file_parsing_process_pool_size)
+        self._replenish_tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+    async def _acquire(self) -> FileParseWorker:
+        while self._idle_workers:
+            worker = self._idle_workers.pop()
+            if worker.is_alive:
+                return worker
+        return await FileParseWorker.spawn()
+
+    async def _release(self, worker: FileParseWorker) -> None:
+        if worker.should_recycle():
+            await worker.close()
+            if not self._closed:
+                task = safe_create_task(self._replenish(), logger=logger, label="replenish file parse worker pool")
+                self._replenish_tasks.add(task)
+                task.add_done_callback(self._replenish_tasks.discard)
+        elif self._closed:
+            await worker.close()
+        else:
+            self._idle_workers.append(worker)
+
+    async def _replenish(self) -> None:
+        if not self._idle_workers:
+            worker = await FileParseWorker.spawn()
+            await self._release(worker)
+
+    async def stream(self, request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        async with self._semaphore:
+            worker = await self._acquire()
+            try:
+                async for response in worker.stream(request, timeout=settings.file_parsing_timeout):
+                    yield response
+            finally:
+                await self._release(worker)
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in list(self._replenish_tasks):
+            task.cancel()
+        await asyncio.gather(*self._replenish_tasks, return_exceptions=True)
+        workers, self._idle_workers = self._idle_workers, []
+        await asyncio.gather(*[worker.close() for worker in workers])
+
+
+_worker_pools: EventLoopRegistry[FileParseWorkerPool] = EventLoopRegistry()
+
+
+def get_file_parse_worker_pool() -> FileParseWorkerPool:
+    """Get the parse worker pool for the running event loop (worker pipes are bound to the loop that created them)."""
+    pool = _worker_pools.get()
+    if pool is None:
+        pool = _worker_pools.set(FileParseWorkerPool())
+    return pool
+
+
+async def close_file_parse_worker_pools() -> None:
+    pools = _worker_pools.pop_all()
+    await asyncio.gather(*[pool.close() for pool in pools], return_exceptions=True)
+
+
+async def parse_pages_in_process_pool(
+    content: bytes,
+    mime_type: str,
+    suffix: str,
+    file_type: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: int = 50,
+) -> AsyncIterator[ParsedPage]:
+    """
+    Extract text from a file in a worker process, yielding it page by page.
+
+    When `chunk_size` is given each page is also chunked in the worker, and pages are yielded as soon as they are
+    chunked. MarkItDown converts a document as a whole, so the first page arrives once conversion has finished.
+    """
+    request = {
+        "op": "parse",
+        "content": content,
+        "mime_type": mime_type,
+        "suffix": suffix,
+        "file_type": file_type,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+    }
+    async for response in get_file_parse_worker_pool().stream(request):
+        page = response["page"]
+        yield ParsedPage(
+            page=OCRPageObject(index=page["index"], markdown=page["markdown"], images=[], dimensions=None),
+            chunks=response["chunks"],
+        )
+
+
+async def chunk_text_in_process_pool(
+    text: str, file_type: Optional[str], chunk_size: int, chunk_overlap: int, default: bool = False
+) -> List[str]:
+    request = {
+        "op": "chunk",
+        "text": text,
+        "file_type": file_type,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "default": default,
+    }
+    chunks = []
+    async for response in get_file_parse_worker_pool().stream(request):
+        chunks.extend(response["chunks"])
+    return chunks
+
+
+async def chunk_file_lines(file_metadata: FileMetadata) -> List[str]:
+    """`LineChunker.chunk_text` for a whole file, in the worker pool when the file is too large to split inline."""
+    if not should_chunk_in_process_pool(file_metadata.content or ""):
+        return LineChunker().chunk_text(file_metadata=file_metadata)
+    lines = []
+    async for response in get_file_parse_worker_pool().stream({"op": "lines", "file_metadata": file_metadata}):
+        lines.extend(response["chunks"])
+    return lines
@@ -0,0 +1,155 @@
+"""
+Long-lived worker process that parses and chunks uploaded files off the API event loop.
+
+Started by `FileParseWorkerPool` as `python parse_worker.py <max_memory_mb>` rather than with `-m`, so that letta is
+only imported once stdout has been redirected (importing it logs to stdout, which would corrupt the protocol). Requests and responses are length-prefixed pickles exchanged over the process' stdin/stdout (the same framing as the
+local tool sandbox worker). A parse request is answered with one frame per page, each carrying the page's chunks, so
+the caller can start embedding the first pages while later ones are still being chunked, followed by a final frame.
+
+MarkItDown returns a converted document as one string, so documents are cut into pages of about `PAGE_SIZE`
+characters at paragraph breaks. Plain text files are kept whole since their chunkers (e.g. JSON) need the full text.
+"""
+
+import logging
+import os
+import pickle
+import resource
+import struct
+import sys
+import tempfile
+import traceback
+from typing import Iterator, List, Optional
+
+HEADER_FORMAT = ">I"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+PAGE_SIZE = 32 * 1024
+
+
+def _read_frame(stream) -> Optional[bytes]:
+    header = stream.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        return None
+    (length,) = struct.unpack(HEADER_FORMAT, header)
+    return stream.read(length)
+
+
+def _write_frame(stream, response: dict) -> None:
+    payload = pickle.dumps(response)
+    stream.write(struct.pack(HEADER_FORMAT, len(payload)) + payload)
+    stream.flush()
+
+
+def _split_pages(text: str) -> List[str]:
+    pages, start = [], 0
+    while len(text) - start > PAGE_SIZE:
+        end = text.rfind("\n\n", start, start + PAGE_SIZE)
+        end = start + PAGE_SIZE if end <= start else end + 2
+        pages.append(text[start:end])
+        start = end
+    pages.append(text[start:])
+    return pages
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def _limit_memory(max_memory_mb: int) -> None:
+    """Cap the address space at the current size plus `max_memory_mb`, so a runaway parse raises MemoryError."""
+    try:
+        with open("/proc/self/statm") as statm:
+            current_bytes = int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # not Linux; the pool still recycles workers whose peak RSS crossed the limit
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = current_bytes + max_memory_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+class ParseWorker:
+    def __init__(self):
+        from markitdown import MarkItDown
+
+        from letta.services.file_processor.chunker.line_chunker import LineChunker
+        from letta.services.file_processor.chunker.llama_index_chunker import LlamaIndexChunker
+        from letta.services.file_processor.file_types import is_simple_text_mime_type
+
+        self._markitdown = MarkItDown(enable_plugins=False)
+        self._chunker_class = LlamaIndexChunker
+        self._line_chunker = LineChunker()
+        self._is_simple_text_mime_type = is_simple_text_mime_type
+
+    def _extract_text(self, content: bytes, mime_type: str, suffix: str) -> str:
+        if self._is_simple_text_mime_type(mime_type):
+            return content.decode("utf-8", errors="replace")
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+            temp_file.write(content)
+            temp_file_path = temp_file.name
+        try:
+            return self._markitdown.convert(temp_file_path).text_content
+        finally:
+            os.unlink(temp_file_path)
+
+    def _chunk(self, text: str, file_type: Optional[str], chunk_size: int, chunk_overlap: int, default: bool = False) -> List[str]:
+        chunker = self._chunker_class(chunk_size=chunk_size, chunk_overlap=chunk_overlap, file_type=file_type)
+        return chunker.default_chunk_text(text) if default else chunker.chunk_text(text)
+
+    def handle_request(self, request: dict) -> Iterator[dict]:
+        if request["op"] == "chunk":
+            yield {
+                "chunks": self._chunk(
+                    request["text"], request["file_type"], request["chunk_size"], request["chunk_overlap"], request["default"]
+                )
+            }
+            return
+        if request["op"] == "lines":
+            yield {"chunks": self._line_chunker.chunk_text(file_metadata=request["file_metadata"])}
+            return
+
+        text = self._extract_text(request["content"], request["mime_type"], request["suffix"])
+        pages = [text] if self._is_simple_text_mime_type(request["mime_type"]) else _split_pages(text)
+        for index, markdown in enumerate(pages):
+            chunks = None
+            if request["chunk_size"]:
+                chunks = self._chunk(markdown, request["file_type"], request["chunk_size"], request["chunk_overlap"])
+            yield {"page": {"index": index, "markdown": markdown}, "chunks": chunks}
+
+
+def main() -> None:
+    # Keep private handles on the protocol pipes, then point the raw fds away from them
+    protocol_in = os.fdopen(os.dup(sys.stdin.fileno()), "rb")
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, sys.stdin.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    # Suppress pdfminer warnings that occur during PDF processing
+    logging.getLogger("pdfminer").setLevel(logging.ERROR)
+
+    worker = ParseWorker()
+    _limit_memory(int(sys.argv[1]))
+    baseline_rss_mb = _max_rss_mb()
+    while True:
+        frame = _read_frame(protocol_in)
+        if frame is None:
+            break
+        error = None
+        try:
+            for response in worker.handle_request(pickle.loads(frame)):
+                _write_frame(protocol_out, response)
+        except Exception as e:
+            # MemoryError included: the allocation failed, so the worker itself is still usable
+            traceback.print_exc()
+            error = (type(e).__name__, str(e))
+        _write_frame(protocol_out, {"done": True, "error": error, "memory_growth_mb": _max_rss_mb() - baseline_rss_mb})
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from typing import Dict, List, Optional, Union
 
 from sqlalchemy import and_, delete, func, or_, select, update
 
+from letta.helpers.agent_state_cache import invalidates_agent_state
 from letta.log import get_logger
 from letta.orm.errors import NoResultFound
 from letta.orm.files_agents import FileAgent as FileAgentModel
@@ -23,6 +24,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def attach_file(
         self,
         *,
@@ -112,6 +114,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def update_file_agent_by_id(
         self,
         *,
@@ -144,6 +147,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def update_file_agent_by_name(
         self,
         *,
@@ -170,6 +174,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def detach_file(self, *, agent_id: str, file_id: str, actor: PydanticUser) -> None:
         """Hard-delete the association."""
         async with db_registry.async_session() as session:
@@ -178,6 +183,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state(lambda arguments: {agent_id for agent_id, _ in arguments["agent_file_pairs"]})
     async def detach_file_bulk(self, *, agent_file_pairs: List, actor: PydanticUser) -> int:  # List of (agent_id, file_id) tuples
         """
         Bulk delete multiple agent-file associations in a single query.
@@ -315,6 +321,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def mark_access(self, *, agent_id: str, file_id: str, actor: PydanticUser) -> None:
         """Update only `last_accessed_at = now()` without loading the row."""
         async with db_registry.async_session() as session:
@@ -332,6 +339,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def mark_access_bulk(self, *, agent_id: str, file_names: List[str], actor: PydanticUser) -> None:
         """Update `last_accessed_at = now()` for multiple files by name without loading rows."""
         if not file_names:
@@ -352,6 +360,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def close_all_other_files(self, *, agent_id: str, keep_file_names: List[str], actor: PydanticUser) -> List[str]:
         """Close every open file for this agent except those in keep_file_names.
 
@@ -386,6 +395,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def enforce_max_open_files_and_open(
         self,
         *,
@@ -517,6 +527,7 @@ class FileAgentManager:
 
     @enforce_types
     @trace_method
+    @invalidates_agent_state()
     async def attach_files_bulk(
         self,
         *,
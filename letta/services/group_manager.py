@@ -3,6 +3,7 @@ from typing import List, Optional
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from letta.helpers.agent_state_cache import invalidates_all_agent_states
 from letta.orm.agent import Agent as AgentModel
 from letta.orm.errors import NoResultFound
 from letta.orm.group import Group as GroupModel
@@ -60,6 +61,7 @@ class GroupManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     def create_group(self, group: GroupCreate, actor: PydanticUser) -> PydanticGroup:
         with db_registry.session() as session:
             new_group = GroupModel()
@@ -105,6 +107,7 @@ class GroupManager:
             return new_group.to_pydantic()
 
     @enforce_types
+    @invalidates_all_agent_states
     async def create_group_async(self, group: GroupCreate, actor: PydanticUser) -> PydanticGroup:
         async with db_registry.async_session() as session:
             new_group = GroupModel()
@@ -151,6 +154,7 @@ class GroupManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def modify_group_async(self, group_id: str, group_update: GroupUpdate, actor: PydanticUser) -> PydanticGroup:
         async with db_registry.async_session() as session:
             group = await GroupModel.read_async(db_session=session, identifier=group_id, actor=actor)
@@ -214,6 +218,7 @@ class GroupManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     def delete_group(self, group_id: str, actor: PydanticUser) -> None:
         with db_registry.session() as session:
             # Retrieve the agent
@@ -222,6 +227,7 @@ class GroupManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def delete_group_async(self, group_id: str, actor: PydanticUser) -> None:
         async with db_registry.async_session() as session:
             group = await GroupModel.read_async(db_session=session, identifier=group_id, actor=actor)
@@ -1,7 +1,9 @@
+import hashlib
 import os
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Literal, Optional, Set
+from typing import List, Literal, Optional, Set, Tuple
 
 import numpy as np
 from sqlalchemy import Select, and_, asc, desc, func, literal, nulls_last, or_, select, union_all
@@ -23,6 +25,7 @@ from letta.constants import (
 from letta.embeddings import embedding_model
 from letta.helpers import ToolRulesSolver
 from letta.helpers.datetime_helpers import format_datetime, get_local_time, get_local_time_fast
+from letta.helpers.embedding_cache import get_embedding_cache
 from letta.orm.agent import Agent as AgentModel
 from letta.orm.agents_tags import AgentsTags
 from letta.orm.archives_agents import ArchivesAgents
@@ -329,6 +332,34 @@ def compile_system_message(
     return formatted_prompt
 
 
+# system message id -> (memory fingerprint, hash of the system message text that was rendered from that memory)
+_system_message_fingerprints: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+SYSTEM_MESSAGE_FINGERPRINT_CACHE_SIZE = 10_000
+
+
+def _hash_system_message_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def system_message_matches_memory_fingerprint(system_message_id: str, system_message_text: str, memory_fingerprint: str) -> bool:
+    """
+    Whether a system message is known to have been built from memory with this fingerprint.
+
+    The message text hash is checked too, so a system message rewritten elsewhere (e.g. by another worker) is not skipped.
+    """
+    entry = _system_message_fingerprints.get(system_message_id)
+    if entry is None or entry[0] != memory_fingerprint:
+        return False
+    return entry[1] == _hash_system_message_text(system_message_text)
+
+
+def record_system_message_fingerprint(system_message_id: str, system_message_text: str, memory_fingerprint: str) -> None:
+    _system_message_fingerprints[system_message_id] = (memory_fingerprint, _hash_system_message_text(system_message_text))
+    _system_message_fingerprints.move_to_end(system_message_id)
+    while len(_system_message_fingerprints) > SYSTEM_MESSAGE_FINGERPRINT_CACHE_SIZE:
+        _system_message_fingerprints.popitem(last=False)
+
+
 @trace_method
 def get_system_message_from_compiled_memory(
     system_prompt: str,
@@ -939,6 +970,19 @@ def _apply_relationship_filters(query, include_relationships: Optional[List[str]
     return query
 
 
+def embed_query_text(query_text: Optional[str], embedding_config: Optional[EmbeddingConfig]) -> List[float]:
+    """Embed a search query, padded to the stored embedding width."""
+    assert embedding_config is not None, "embedding_config must be specified for vector search"
+    assert query_text is not None, "query_text must be specified for vector search"
+    embedding_cache = get_embedding_cache()
+    embedded_text = embedding_cache.get_local(embedding_config, query_text)
+    if embedded_text is None:
+        embedded_text = embedding_model(embedding_config).get_text_embedding(query_text)
+        embedding_cache.set_local(embedding_config, query_text, embedded_text)
+    embedded_text = np.array(embedded_text)
+    return np.pad(embedded_text, (0, MAX_EMBEDDING_DIM - embedded_text.shape[0]), mode="constant").tolist()
+
+
 def build_passage_query(
     actor: User,
     agent_id: Optional[str] = None,
@@ -953,19 +997,19 @@ def build_passage_query(
     ascending: bool = True,
     embedding_config: Optional[EmbeddingConfig] = None,
     agent_only: bool = False,
+    query_embedding: Optional[List[float]] = None,
+    passage_ids: Optional[List[str]] = None,
 ) -> Select:
     """Helper function to build the base passage query with all filters applied.
     Supports both before and after pagination across merged source and agent passages.
 
+    If `passage_ids` is given (e.g. candidates from the SQLite vector index), results are restricted to those passages.
+
     Returns the query before any limit or count operations are applied.
     """
     embedded_text = None
     if embed_query:
-        assert embedding_config is not None, "embedding_config must be specified for vector search"
-        assert query_text is not None, "query_text must be specified for vector search"
-        embedded_text = embedding_model(embedding_config).get_text_embedding(query_text)
-        embedded_text = np.array(embedded_text)
-        embedded_text = np.pad(embedded_text, (0, MAX_EMBEDDING_DIM - embedded_text.shape[0]), mode="constant").tolist()
+        embedded_text = query_embedding if query_embedding is not None else embed_query_text(query_text, embedding_config)
 
     # Start with base query for source passages
     source_passages = None
@@ -1065,6 +1109,8 @@ def build_passage_query(
         main_query = main_query.where(combined_query.c.source_id == source_id)
     if file_id:
         main_query = main_query.where(combined_query.c.file_id == file_id)
+    if passage_ids is not None:
+        main_query = main_query.where(combined_query.c.id.in_(passage_ids))
 
     # Vector search
     if embedded_text:
@@ -1163,17 +1209,15 @@ def build_source_passage_query(
     embed_query: bool = False,
     ascending: bool = True,
     embedding_config: Optional[EmbeddingConfig] = None,
+    query_embedding: Optional[List[float]] = None,
+    passage_ids: Optional[List[str]] = None,
 ) -> Select:
     """Build query for source passages with all filters applied."""
 
     # Handle embedding for vector search
     embedded_text = None
     if embed_query:
-        assert embedding_config is not None, "embedding_config must be specified for vector search"
-        assert query_text is not None, "query_text must be specified for vector search"
-        embedded_text = embedding_model(embedding_config).get_text_embedding(query_text)
-        embedded_text = np.array(embedded_text)
-        embedded_text = np.pad(embedded_text, (0, MAX_EMBEDDING_DIM - embedded_text.shape[0]), mode="constant").tolist()
+        embedded_text = query_embedding if query_embedding is not None else embed_query_text(query_text, embedding_config)
 
     # Base query for source passages
     query = select(SourcePassage).where(SourcePassage.organization_id == actor.organization_id)
@@ -1192,6 +1236,8 @@ def build_source_passage_query(
         query = query.where(SourcePassage.created_at >= start_date)
     if end_date:
         query = query.where(SourcePassage.created_at <= end_date)
+    if passage_ids is not None:
+        query = query.where(SourcePassage.id.in_(passage_ids))
 
     # Handle text search or vector search
     if embedded_text:
@@ -1259,17 +1305,15 @@ def build_agent_passage_query(
     embed_query: bool = False,
     ascending: bool = True,
     embedding_config: Optional[EmbeddingConfig] = None,
+    query_embedding: Optional[List[float]] = None,
+    passage_ids: Optional[List[str]] = None,
 ) -> Select:
     """Build query for agent passages with all filters applied."""
 
     # Handle embedding for vector search
     embedded_text = None
     if embed_query:
-        assert embedding_config is not None, "embedding_config must be specified for vector search"
-        assert query_text is not None, "query_text must be specified for vector search"
-        embedded_text = embedding_model(embedding_config).get_text_embedding(query_text)
-        embedded_text = np.array(embedded_text)
-        embedded_text = np.pad(embedded_text, (0, MAX_EMBEDDING_DIM - embedded_text.shape[0]), mode="constant").tolist()
+        embedded_text = query_embedding if query_embedding is not None else embed_query_text(query_text, embedding_config)
 
     # Base query for agent passages - join through archives_agents
     query = (
@@ -1283,6 +1327,8 @@ def build_agent_passage_query(
         query = query.where(ArchivalPassage.created_at >= start_date)
     if end_date:
         query = query.where(ArchivalPassage.created_at <= end_date)
+    if passage_ids is not None:
+        query = query.where(ArchivalPassage.id.in_(passage_ids))
 
     # Handle text search or vector search
     if embedded_text:
@@ -0,0 +1,172 @@
+"""
+Full-text keyword index over passage and message text.
+
+Keyword search filtered with `lower(text) LIKE '%query%'`, which reads every passage or message in scope. With
+`settings.full_text_search` enabled, `archival_memory_search` and `conversation_search` rank through a full-text index
+instead:
+
+- On Postgres, GIN indexes over `to_tsvector('english', ...)` of archival passage text and of the text parts of message content
+  (created by the `add_full_text_search_indexes` migration), ranked with `ts_rank_cd`.
+- On SQLite, contentless FTS5 tables mirror the archival passage and message tables through triggers, ranked with BM25. They are
+  created, and backfilled, the first time they are needed.
+
+Queries are reduced to their words and matched disjunctively, so rows matching more (and rarer) words rank higher
+rather than every word being required. Rankings from different indexes, or from vector search, are combined with
+reciprocal rank fusion.
+"""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import Select, bindparam, cast, column, func, literal_column, table, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Connection
+
+from letta.log import get_logger
+from letta.server.db import db_registry
+from letta.settings import DatabaseChoice, settings
+
+logger = get_logger(__name__)
+
+TS_CONFIG = "english"
+# words of a query used at most, so that pasted paragraphs do not turn into huge disjunctions
+MAX_QUERY_TERMS = 32
+# text parts of a message's content, as a JSON path (Postgres) and as an SQL expression over a row (SQLite triggers)
+MESSAGE_TEXT_JSONPATH = '$[*] ? (@.type == "text").text'
+MESSAGE_TEXT_SQLITE = (
+    "coalesce((SELECT group_concat(json_extract(value, '$.text'), ' ') "
+    "FROM json_each(CASE WHEN json_valid({row}.content) THEN {row}.content ELSE '[]' END) "
+    "WHERE json_extract(value, '$.type') = 'text'), '')"
+)
+
+
+@dataclass(frozen=True)
+class FullTextIndex:
+    table: str
+    column: str
+    # SQLite FTS5 table mirroring `table`, and the indexed text as an SQL expression over a row (`{row}`)
+    index_table: str
+    text_sqlite: str
+    # for JSON columns, the path of the indexed strings (Postgres)
+    json_path: Optional[str] = None
+
+
+ARCHIVAL_PASSAGE_TEXT_INDEX = FullTextIndex(
+    table="archival_passages", column="text", index_table="archival_passages_fts", text_sqlite="{row}.text"
+)
+MESSAGE_TEXT_INDEX = FullTextIndex(
+    table="messages", column="content", index_table="messages_fts", text_sqlite=MESSAGE_TEXT_SQLITE, json_path=MESSAGE_TEXT_JSONPATH
+)
+FULL_TEXT_INDEXES = (ARCHIVAL_PASSAGE_TEXT_INDEX, MESSAGE_TEXT_INDEX)
+
+_tables_exist = False
+
+
+def query_terms(query_text: Optional[str]) -> List[str]:
+    """The distinct words of a query, lowercased; punctuation and operators of either search syntax are dropped."""
+    terms = dict.fromkeys(re.findall(r"[^\W_]+", (query_text or "").lower()))
+    return list(terms)[:MAX_QUERY_TERMS]
+
+
+def keyword_search(statement: Select, index: FullTextIndex, terms: Sequence[str]) -> Select:
+    """
+    Restrict `statement` (a select over `index.table`) to rows matching any of `terms`, best matches first.
+
+    Further filters can still be added to the returned statement; the limit has to be applied by the caller.
+    """
+    if settings.database_engine is DatabaseChoice.POSTGRES:
+        ts_config = literal_column(f"'{TS_CONFIG}'")
+        document = literal_column(f"{index.table}.{index.column}")
+        if index.json_path is not None:
+            document = func.jsonb_path_query_array(cast(document, JSONB), literal_column(f"'{index.json_path}'"))
+        # same expression as the GIN index, so that the planner can use it
+        tsvector = func.to_tsvector(ts_config, document)
+        tsquery = func.to_tsquery(ts_config, " | ".join(terms))
+        return statement.where(tsvector.op("@@")(tsquery)).order_by(func.ts_rank_cd(tsvector, tsquery).desc())
+
+    fts = table(index.index_table, column("rowid"))
+    match = " OR ".join(f'"{term}"' for term in terms)
+    return (
+        statement.join(fts, fts.c.rowid == literal_column(f"{index.table}.rowid"))
+        .where(text(f"{index.index_table} MATCH :match").bindparams(bindparam("match", match)))
+        .order_by(func.bm25(literal_column(index.index_table)))
+    )
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int) -> List[str]:
+    """
+    Merge rankings of ids by the sum of `1 / (k + rank)` over the rankings each id appears in.
+
+    Only ranks are used, so rankings with incomparable scores (BM25, `ts_rank_cd`, cosine distance) can be fused.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] += 1.0 / (k + rank)
+    # sorting is stable, so ties keep the order in which ids were first ranked
+    return sorted(scores, key=lambda item_id: -scores[item_id])
+
+
+def _create_index_tables(connection: Connection) -> None:
+    """Create the FTS5 tables and their triggers, and index the rows written before they existed."""
+    for index in FULL_TEXT_INDEXES:
+        fts, new_text, old_text = index.index_table, index.text_sqlite.format(row="new"), index.text_sqlite.format(row="old")
+        # contentless, since search results are joined back to the mirrored table through the rowid
+        connection.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(text, content='', tokenize='porter unicode61')"))
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {index.table} BEGIN "
+                f"INSERT INTO {fts}(rowid, text) VALUES (new.rowid, {new_text}); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {index.table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.rowid, {old_text}); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {index.column} ON {index.table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.rowid, {old_text}); "
+                f"INSERT INTO {fts}(rowid, text) VALUES (new.rowid, {new_text}); END"
+            )
+        )
+        # skipping indexed rows keeps this idempotent; of two processes creating the index, one fails to commit and retries
+        connection.execute(
+            text(
+                f"INSERT INTO {fts}(rowid, text) SELECT rowid, {index.text_sqlite.format(row=index.table)} FROM {index.table} "
+                f"WHERE rowid NOT IN (SELECT rowid FROM {fts})"
+            )
+        )
+
+
+def rebuild_full_text_index(connection: Connection, index: FullTextIndex) -> None:
+    """
+    Re-index every row of `index.table`.
+
+    The SQLite index is keyed by the rowids of the mirrored table, which `VACUUM` may renumber, so it has to be rebuilt
+    after one.
+    """
+    connection.execute(text(f"INSERT INTO {index.index_table}({index.index_table}) VALUES ('delete-all')"))
+    connection.execute(
+        text(f"INSERT INTO {index.index_table}(rowid, text) SELECT rowid, {index.text_sqlite.format(row=index.table)} FROM {index.table}")
+    )
+
+
+async def ensure_full_text_index_async() -> bool:
+    """Make sure the full-text index can be searched; returns False when keyword search has to fall back to scans."""
+    global _tables_exist
+    if settings.database_engine is DatabaseChoice.POSTGRES or _tables_exist:
+        return True
+    try:
+        async with db_registry.async_session() as session:
+            await session.run_sync(lambda sync_session: _create_index_tables(sync_session.connection()))
+            await session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to create the SQLite full-text index, keyword search will scan instead: {e}")
+        return False
+    _tables_exist = True
+    return True
@@ -0,0 +1,209 @@
+"""
+sqlite-vec backed vector index for passage search on SQLite.
+
+Exact vector search on SQLite orders every passage in scope by the Python `cosine_distance` UDF. With
+`settings.sqlite_vector_index` enabled, each passage table gets a companion `vec0` virtual table partitioned by
+archive/source id, and nearest-neighbour candidates are read from it instead. Candidates are then joined back to
+the passage tables, so every other filter (organization, agent attachment) still applies and rows deleted behind
+the index's back simply drop out.
+
+Message embeddings (see `letta.services.message_embedder`) are indexed the same way, partitioned by agent id.
+
+The index is maintained by the PassageManager write paths in the same transaction as the passages themselves, and by
+the message embedder in the transaction that stores message embeddings.
+A scope (one archive or source) only answers from the index once it has been fully built; until then, or after an
+index write failed, searches fall back to the exact scan and a rebuild of that scope is scheduled.
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection
+
+from letta.constants import MAX_EMBEDDING_DIM
+from letta.log import get_logger
+from letta.orm.sqlite_functions import SQLITE_VEC_LOADED, adapt_array
+from letta.server.db import db_registry
+from letta.settings import DatabaseChoice, settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+# (index_table, scope_id) pairs whose index has been fully built
+INDEX_STATE_TABLE = "passage_vector_index_state"
+EMBEDDING_SIZE_BYTES = MAX_EMBEDDING_DIM * 4
+
+
+@dataclass(frozen=True)
+class PassageVectorIndex:
+    passage_table: str
+    index_table: str
+    scope_column: str
+
+
+ARCHIVAL_PASSAGE_INDEX = PassageVectorIndex(
+    passage_table="archival_passages", index_table="archival_passages_vec", scope_column="archive_id"
+)
+SOURCE_PASSAGE_INDEX = PassageVectorIndex(passage_table="source_passages", index_table="source_passages_vec", scope_column="source_id")
+MESSAGE_INDEX = PassageVectorIndex(passage_table="messages", index_table="messages_vec", scope_column="agent_id")
+VECTOR_INDEXES = (ARCHIVAL_PASSAGE_INDEX, SOURCE_PASSAGE_INDEX, MESSAGE_INDEX)
+
+_tables_exist = False
+_pending_rebuilds: Set[Tuple[str, str]] = set()
+
+
+def passage_vector_index_enabled(connection: Connection) -> bool:
+    return (
+        settings.sqlite_vector_index and settings.database_engine is DatabaseChoice.SQLITE and connection.info.get(SQLITE_VEC_LOADED, False)
+    )
+
+
+def _index_tables_exist(connection: Connection) -> bool:
+    global _tables_exist
+    if not _tables_exist:
+        names = [INDEX_STATE_TABLE, *[index.index_table for index in VECTOR_INDEXES]]
+        query = text("SELECT count(*) FROM sqlite_master WHERE name IN :names").bindparams(bindparam("names", expanding=True))
+        _tables_exist = connection.execute(query, {"names": names}).scalar() == len(names)
+    return _tables_exist
+
+
+def _create_index_tables(connection: Connection) -> None:
+    if _index_tables_exist(connection):
+        return
+    for index in VECTOR_INDEXES:
+        connection.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index.index_table} USING vec0("
+                f"passage_id text primary key, scope_id text partition key, "
+                f"embedding float[{MAX_EMBEDDING_DIM}] distance_metric=cosine)"
+            )
+        )
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_STATE_TABLE} "
+            f"(index_table TEXT NOT NULL, scope_id TEXT NOT NULL, PRIMARY KEY (index_table, scope_id))"
+        )
+    )
+
+
+def index_passages(connection: Connection, index: PassageVectorIndex, passage_ids: Sequence[str]) -> None:
+    """
+    (Re-)index passages written in the current transaction.
+
+    Only scopes whose index is already built are touched; unbuilt scopes pick the passages up when they are rebuilt.
+    If the index write fails the affected scopes are marked stale rather than failing the passage write.
+    """
+    if not passage_ids or not passage_vector_index_enabled(connection):
+        return
+    _create_index_tables(connection)
+
+    params = {"passage_ids": list(passage_ids), "index_table": index.index_table, "embedding_size": EMBEDDING_SIZE_BYTES}
+    try:
+        connection.execute(
+            text(f"DELETE FROM {index.index_table} WHERE passage_id IN :passage_ids").bindparams(bindparam("passage_ids", expanding=True)),
+            params,
+        )
+        connection.execute(
+            text(
+                f"INSERT INTO {index.index_table} (passage_id, scope_id, embedding) "
+                f"SELECT p.id, p.{index.scope_column}, p.embedding FROM {index.passage_table} p "
+                f"JOIN {INDEX_STATE_TABLE} s ON s.index_table = :index_table AND s.scope_id = p.{index.scope_column} "
+                f"WHERE p.id IN :passage_ids AND length(p.embedding) = :embedding_size"
+            ).bindparams(bindparam("passage_ids", expanding=True)),
+            params,
+        )
+    except Exception as e:
+        # SQLite statements are atomic, so the surrounding transaction is still usable here
+        logger.warning(f"Failed to update {index.index_table}, marking affected scopes stale: {e}")
+        connection.execute(
+            text(
+                f"DELETE FROM {INDEX_STATE_TABLE} WHERE index_table = :index_table AND scope_id IN "
+                f"(SELECT {index.scope_column} FROM {index.passage_table} WHERE id IN :passage_ids)"
+            ).bindparams(bindparam("passage_ids", expanding=True)),
+            params,
+        )
+
+
+def remove_passages(connection: Connection, index: PassageVectorIndex, passage_ids: Sequence[str]) -> None:
+    """Drop passages from the index. Missed removals are harmless since search results are joined back to the passages."""
+    if not passage_ids or not passage_vector_index_enabled(connection) or not _index_tables_exist(connection):
+        return
+    try:
+        connection.execute(
+            text(f"DELETE FROM {index.index_table} WHERE passage_id IN :passage_ids").bindparams(bindparam("passage_ids", expanding=True)),
+            {"passage_ids": list(passage_ids)},
+        )
+    except Exception as e:
+        logger.warning(f"Failed to remove passages from {index.index_table}: {e}")
+
+
+def rebuild_scope(connection: Connection, index: PassageVectorIndex, scope_id: str) -> None:
+    """Rebuild the index for one archive/source from its passages and mark it fresh."""
+    _create_index_tables(connection)
+    params = {"scope_id": scope_id, "index_table": index.index_table, "embedding_size": EMBEDDING_SIZE_BYTES}
+    connection.execute(text(f"DELETE FROM {index.index_table} WHERE scope_id = :scope_id"), params)
+    connection.execute(
+        text(
+            f"INSERT INTO {index.index_table} (passage_id, scope_id, embedding) "
+            f"SELECT id, {index.scope_column}, embedding FROM {index.passage_table} "
+            f"WHERE {index.scope_column} = :scope_id AND length(embedding) = :embedding_size"
+        ),
+        params,
+    )
+    connection.execute(text(f"INSERT OR REPLACE INTO {INDEX_STATE_TABLE} (index_table, scope_id) VALUES (:index_table, :scope_id)"), params)
+
+
+def search_passage_vector_index(
+    connection: Connection, index: PassageVectorIndex, scope_ids: Sequence[str], query_embedding: List[float], k: int
+) -> Tuple[Optional[List[Tuple[str, float]]], List[str]]:
+    """
+    Find the `k` nearest passages across `scope_ids`.
+
+    Returns `(candidates, stale_scope_ids)`. `candidates` is a list of `(passage_id, distance)` pairs, or None when
+    any scope has no fresh index and the caller has to fall back to exact search.
+    """
+    if not passage_vector_index_enabled(connection):
+        return None, []
+    if not _index_tables_exist(connection):
+        return None, list(scope_ids)
+    if not scope_ids:
+        return [], []
+
+    fresh_query = text(f"SELECT scope_id FROM {INDEX_STATE_TABLE} WHERE index_table = :index_table AND scope_id IN :scope_ids")
+    fresh_query = fresh_query.bindparams(bindparam("scope_ids", expanding=True))
+    fresh = set(connection.execute(fresh_query, {"index_table": index.index_table, "scope_ids": list(scope_ids)}).scalars())
+    stale_scope_ids = [scope_id for scope_id in scope_ids if scope_id not in fresh]
+    if stale_scope_ids:
+        return None, stale_scope_ids
+
+    # vec0 only orders results within a single partition, so query each scope and merge
+    query_embedding_binary = adapt_array(query_embedding)
+    knn_query = text(
+        f"SELECT passage_id, distance FROM {index.index_table} WHERE embedding MATCH :query_embedding AND k = :k AND scope_id = :scope_id"
+    )
+    candidates = []
+    for scope_id in scope_ids:
+        rows = connection.execute(knn_query, {"query_embedding": query_embedding_binary, "k": k, "scope_id": scope_id})
+        candidates.extend((row.passage_id, row.distance) for row in rows)
+    return heapq.nsmallest(k, candidates, key=lambda candidate: candidate[1]), []
+
+
+async def rebuild_scope_async(index: PassageVectorIndex, scope_id: str) -> None:
+    try:
+        async with db_registry.async_session() as session:
+            await session.run_sync(lambda sync_session: rebuild_scope(sync_session.connection(), index, scope_id))
+            await session.commit()
+        logger.info(f"Rebuilt {index.index_table} for {scope_id}")
+    finally:
+        _pending_rebuilds.discard((index.index_table, scope_id))
+
+
+def schedule_scope_rebuild(index: PassageVectorIndex, scope_id: str) -> None:
+    """Rebuild a stale scope in the background, at most once at a time per scope."""
+    key = (index.index_table, scope_id)
+    if key in _pending_rebuilds:
+        return
+    _pending_rebuilds.add(key)
+    safe_create_task(rebuild_scope_async(index, scope_id), logger=logger, label=f"rebuild {index.index_table} for {scope_id}")
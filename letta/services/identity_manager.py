@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from sqlalchemy import select
 from sqlalchemy.exc import NoResultFound
 
+from letta.helpers.agent_state_cache import invalidates_all_agent_states
 from letta.orm.agent import Agent as AgentModel
 from letta.orm.block import Block as BlockModel
 from letta.orm.errors import UniqueConstraintViolationError
@@ -59,6 +60,7 @@ class IdentityManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def create_identity_async(self, identity: IdentityCreate, actor: PydanticUser) -> PydanticIdentity:
         async with db_registry.async_session() as session:
             return await self._create_identity_async(db_session=session, identity=identity, actor=actor)
@@ -107,6 +109,7 @@ class IdentityManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def upsert_identity_async(self, identity: IdentityUpsert, actor: PydanticUser) -> PydanticIdentity:
         async with db_registry.async_session() as session:
             existing_identity = await IdentityModel.read_async(
@@ -133,6 +136,7 @@ class IdentityManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def update_identity_async(
         self, identity_id: str, identity: IdentityUpdate, actor: PydanticUser, replace: bool = False
     ) -> PydanticIdentity:
@@ -196,6 +200,7 @@ class IdentityManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def upsert_identity_properties_async(
         self, identity_id: str, properties: List[IdentityProperty], actor: PydanticUser
     ) -> PydanticIdentity:
@@ -213,6 +218,7 @@ class IdentityManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def delete_identity_async(self, identity_id: str, actor: PydanticUser) -> None:
         async with db_registry.async_session() as session:
             identity = await IdentityModel.read_async(db_session=session, identifier=identity_id, actor=actor)
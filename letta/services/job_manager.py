@@ -28,6 +28,7 @@ from letta.schemas.step import Step as PydanticStep
 from letta.schemas.usage import LettaUsageStatistics
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.run_cancellation_bus import get_run_cancellation_bus
 from letta.settings import DatabaseChoice, settings
 from letta.utils import enforce_types
 
@@ -183,6 +184,11 @@ class JobManager:
             result = job.to_pydantic()
             await session.commit()
 
+        if job_update.status == JobStatus.cancelled:
+            cancellation_bus = get_run_cancellation_bus()
+            if cancellation_bus is not None:
+                await cancellation_bus.publish(job_id)
+
         # Dispatch callback outside of database session if needed
         if needs_callback:
             callback_info = {
@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar, Union
+
+import anyio
+
+from letta.functions.mcp_client.types import SSEServerConfig, StdioServerConfig, StreamableHTTPServerConfig
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.schemas.user import User as PydanticUser
+from letta.services.mcp.base_client import AsyncBaseMCPClient
+from letta.settings import tool_settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+ServerConfig = Union[SSEServerConfig, StdioServerConfig, StreamableHTTPServerConfig]
+ClientFactory = Callable[[ServerConfig, PydanticUser], Awaitable[AsyncBaseMCPClient]]
+T = TypeVar("T")
+
+# errors that mean the underlying transport is gone rather than the tool call failing
+BROKEN_CONNECTION_ERRORS = (ConnectionError, OSError, anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)
+
+
+class PooledMCPSession:
+    """
+    A connected MCP client owned by a dedicated task.
+
+    The MCP transports are anyio context managers that must be entered and exited from the same task, so the
+    connection is opened and cleaned up inside `_run` while callers share the initialized client session.
+    """
+
+    def __init__(self, key: str, client: AsyncBaseMCPClient):
+        self.key = key
+        self.client = client
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.last_health_check = time.monotonic()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._connect_error: Optional[BaseException] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._connect_error:
+            raise self._connect_error
+
+    async def _run(self) -> None:
+        try:
+            await asyncio.wait_for(self.client.connect_to_server(), timeout=tool_settings.mcp_connect_to_server_timeout)
+        except Exception as e:
+            self._connect_error = e
+            self._ready.set()
+            await self._cleanup()
+            return
+
+        self._ready.set()
+        try:
+            await self._closing.wait()
+        finally:
+            await self._cleanup()
+
+    async def _cleanup(self) -> None:
+        try:
+            await self.client.cleanup()
+        except Exception as e:
+            logger.warning(f"Error during pooled MCP client cleanup: {e}")
+
+    @property
+    def is_alive(self) -> bool:
+        return self._task is not None and not self._task.done() and self.client.initialized
+
+    async def check_health(self) -> bool:
+        """Ping the server if the session has not been checked recently."""
+        if not self.is_alive:
+            return False
+        if time.monotonic() - self.last_health_check < tool_settings.mcp_session_health_check_interval:
+            return True
+        try:
+            await asyncio.wait_for(self.client.session.send_ping(), timeout=tool_settings.mcp_connect_to_server_timeout)
+        except Exception as e:
+            logger.info(f"Pooled MCP session failed health check, reconnecting: {e}")
+            return False
+        self.last_health_check = time.monotonic()
+        return True
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=tool_settings.mcp_connect_to_server_timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+
+
+class MCPSessionPool:
+    """
+    Keyed pool of long-lived MCP client sessions.
+
+    Sessions are keyed by server config (including resolved environment variables) and the actor's organization, and
+    for remote servers also by the actor, whose OAuth tokens the connection may be logged in with. Repeated tool calls
+    against the same server therefore reuse one connection. Idle sessions are closed after
+    `mcp_session_idle_timeout`, stale ones are health-checked before reuse and reconnected on failure, and at most
+    `mcp_session_pool_max_sessions` sessions are kept open (callers over the cap get a one-off connection).
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, PooledMCPSession] = {}
+        self._key_locks: Dict[str, asyncio.Lock] = {}
+        # callers holding or waiting on each key lock, so that unused locks can be dropped
+        self._key_lock_users: Dict[str, int] = {}
+        self._reaper_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def make_key(server_config: ServerConfig, actor: PydanticUser) -> str:
+        config_hash = hashlib.sha256(server_config.model_dump_json().encode("utf-8")).hexdigest()
+        if hasattr(server_config, "server_url"):
+            # MCPManager.get_mcp_client attaches the actor's own OAuth session to remote servers
+            return f"{actor.organization_id}:{actor.id}:{config_hash}"
+        return f"{actor.organization_id}:{config_hash}"
+
+    async def run(
+        self,
+        server_config: ServerConfig,
+        actor: PydanticUser,
+        client_factory: ClientFactory,
+        operation: Callable[[AsyncBaseMCPClient], Awaitable[T]],
+    ) -> T:
+        """Run `operation` against a pooled client, reconnecting once if a reused connection turns out to be broken."""
+        key = self.make_key(server_config, actor)
+        reused = key in self._sessions
+        try:
+            async with self.session(server_config, actor, client_factory) as client:
+                return await operation(client)
+        except BROKEN_CONNECTION_ERRORS as e:
+            if not reused:
+                raise
+            logger.info(f"Pooled MCP session for {server_config.server_name} failed, retrying on a fresh connection: {e}")
+            await self.invalidate(key)
+            async with self.session(server_config, actor, client_factory) as client:
+                return await operation(client)
+
+    @asynccontextmanager
+    async def session(self, server_config: ServerConfig, actor: PydanticUser, client_factory: ClientFactory) -> AsyncIterator[Any]:
+        key = self.make_key(server_config, actor)
+        pooled = await self._acquire(key, server_config, actor, client_factory)
+        self._ensure_reaper()
+
+        if pooled is None:
+            # over the session cap: fall back to a one-off connection
+            client = await client_factory(server_config, actor)
+            try:
+                await client.connect_to_server()
+                yield client
+            finally:
+                await client.cleanup()
+            return
+
+        pooled.in_use += 1
+        try:
+            yield pooled.client
+        finally:
+            pooled.in_use -= 1
+            pooled.last_used = time.monotonic()
+
+    async def _acquire(
+        self, key: str, server_config: ServerConfig, actor: PydanticUser, client_factory: ClientFactory
+    ) -> Optional[PooledMCPSession]:
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+        self._key_lock_users[key] = self._key_lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                pooled = self._sessions.get(key)
+                if pooled is not None:
+                    if await pooled.check_health():
+                        return pooled
+                    await self.invalidate(key)
+
+                if len(self._sessions) >= tool_settings.mcp_session_pool_max_sessions and not await self._evict_idle_session():
+                    return None
+
+                pooled = PooledMCPSession(key=key, client=await client_factory(server_config, actor))
+                await pooled.start()
+                self._sessions[key] = pooled
+                return pooled
+        finally:
+            self._key_lock_users[key] -= 1
+            if not self._key_lock_users[key]:
+                del self._key_lock_users[key]
+                self._drop_key_lock(key)
+
+    def _drop_key_lock(self, key: str) -> None:
+        """Forget the lock of a key that has no session and no caller holding or waiting on it."""
+        if key not in self._sessions and key not in self._key_lock_users:
+            self._key_locks.pop(key, None)
+
+    async def _evict_idle_session(self) -> bool:
+        idle_sessions = [s for s in self._sessions.values() if s.in_use == 0]
+        if not idle_sessions:
+            return False
+        await self.invalidate(min(idle_sessions, key=lambda s: s.last_used).key)
+        return True
+
+    async def invalidate(self, key: str) -> None:
+        pooled = self._sessions.pop(key, None)
+        self._drop_key_lock(key)
+        if pooled is not None:
+            await pooled.close()
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = safe_create_task(self._reap_idle_sessions(), logger=logger, label="reap idle MCP sessions")
+
+    async def _reap_idle_sessions(self) -> None:
+        while self._sessions:
+            await asyncio.sleep(tool_settings.mcp_session_idle_timeout / 2)
+            now = time.monotonic()
+            for key, pooled in list(self._sessions.items()):
+                if pooled.in_use == 0 and (now - pooled.last_used > tool_settings.mcp_session_idle_timeout or not pooled.is_alive):
+                    await self.invalidate(key)
+
+    async def close(self) -> None:
+        for key in list(self._sessions):
+            await self.invalidate(key)
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+
+
+_session_pools: EventLoopRegistry[MCPSessionPool] = EventLoopRegistry()
+
+
+def get_mcp_session_pool() -> MCPSessionPool:
+    """Get the MCP session pool for the running event loop (sessions cannot be shared across loops)."""
+    pool = _session_pools.get()
+    if pool is None:
+        pool = _session_pools.set(MCPSessionPool())
+    return pool
+
+
+async def close_mcp_session_pools() -> None:
+    pools = _session_pools.pop_all()
+    await asyncio.gather(*[pool.close() for pool in pools], return_exceptions=True)
@@ -29,6 +29,7 @@ from letta.schemas.tool import Tool as PydanticTool
 from letta.schemas.tool import ToolCreate
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.mcp.session_pool import get_mcp_session_pool
 from letta.services.mcp.sse_client import MCP_CONFIG_TOPLEVEL_KEY, AsyncSSEMCPClient
 from letta.services.mcp.stdio_client import AsyncStdioMCPClient
 from letta.services.mcp.streamable_http_client import AsyncStreamableHTTPMCPClient
@@ -49,10 +50,16 @@ class MCPManager:
     @enforce_types
     async def list_mcp_server_tools(self, mcp_server_name: str, actor: PydanticUser) -> List[MCPTool]:
         """Get a list of all tools for a specific MCP server."""
+        from letta.settings import tool_settings
+
+        mcp_client = None
         try:
             mcp_server_id = await self.get_mcp_server_id_by_name(mcp_server_name, actor=actor)
             mcp_config = await self.get_mcp_server_by_id_async(mcp_server_id, actor=actor)
             server_config = mcp_config.to_config()
+            if tool_settings.mcp_enable_session_pool:
+                return await get_mcp_session_pool().run(server_config, actor, self.get_mcp_client, lambda client: client.list_tools())
+
             mcp_client = await self.get_mcp_client(server_config, actor)
             await mcp_client.connect_to_server()
 
@@ -65,7 +72,8 @@ class MCPManager:
             logger.info(f"Error listing tools for MCP server {mcp_server_name}: {e}")
             return []
         finally:
-            await mcp_client.cleanup()
+            if mcp_client:
+                await mcp_client.cleanup()
 
     @enforce_types
     async def execute_mcp_server_tool(
@@ -91,6 +99,13 @@ class MCPManager:
                 raise ValueError(f"MCP server {mcp_server_name} not found in config.")
             server_config = mcp_config[mcp_server_name]
 
+        if tool_settings.mcp_enable_session_pool:
+            result, success = await get_mcp_session_pool().run(
+                server_config, actor, self.get_mcp_client, lambda client: client.execute_tool(tool_name, tool_args)
+            )
+            logger.info(f"MCP Result: {result}, Success: {success}")
+            return result, success
+
         mcp_client = await self.get_mcp_client(server_config, actor)
         await mcp_client.connect_to_server()
 
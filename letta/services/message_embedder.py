@@ -0,0 +1,147 @@
+"""
+Background embedding of messages for semantic recall.
+
+With `settings.message_embeddings` enabled, the user messages and the replies of assistant messages written by
+`MessageManager.create_many_messages_async` are embedded with their agent's embedding config in a background task,
+off the request path, and the vectors are stored in `messages.embedding` (and the SQLite vector index, when enabled).
+Messages that are not embedded yet, or whose embedding failed, are only found by keyword search.
+
+Embedding tasks are tracked per event loop, so that shutdown can cancel them; a cancelled batch is simply left
+unembedded.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import select, update
+
+from letta.constants import DEFAULT_MESSAGE_TOOL, DEFAULT_MESSAGE_TOOL_KWARG, MAX_EMBEDDING_DIM
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.orm.agent import Agent as AgentModel
+from letta.orm.message import Message as MessageModel
+from letta.schemas.enums import MessageRole
+from letta.schemas.letta_message_content import MessageContentType
+from letta.schemas.message import Message as PydanticMessage
+from letta.schemas.user import User as PydanticUser
+from letta.server.db import db_registry
+from letta.services.helpers.passage_vector_index import MESSAGE_INDEX, index_passages
+from letta.services.passage_manager import PassageManager
+from letta.settings import DatabaseChoice, settings
+
+logger = get_logger(__name__)
+
+EMBEDDED_MESSAGE_ROLES = (MessageRole.user, MessageRole.assistant)
+
+
+def message_embedding_text(message: PydanticMessage) -> Optional[str]:
+    """The text of a message that is embedded, or None if the message is not searchable semantically."""
+    if message.role == MessageRole.assistant:
+        # the content of assistant messages is their reasoning, what they say is sent with the message tool
+        return _sent_message_text(message)
+    if message.role not in EMBEDDED_MESSAGE_ROLES or not message.content:
+        return None
+    text = "\n".join(content.text for content in message.content if content.type == MessageContentType.text).strip()
+    if message.role == MessageRole.user:
+        # user messages are packed with metadata; heartbeats and system alerts are packed with other types
+        try:
+            packed = json.loads(text)
+        except ValueError:
+            packed = None
+        if isinstance(packed, dict) and "type" in packed:
+            text = packed.get("message") if packed["type"] == "user_message" else None
+    return text if isinstance(text, str) and text.strip() else None
+
+
+def _sent_message_text(message: PydanticMessage) -> Optional[str]:
+    texts = []
+    for tool_call in message.tool_calls or []:
+        if tool_call.function.name != DEFAULT_MESSAGE_TOOL:
+            continue
+        try:
+            arguments = json.loads(tool_call.function.arguments)
+        except ValueError:
+            continue
+        if isinstance(arguments, dict) and isinstance(arguments.get(DEFAULT_MESSAGE_TOOL_KWARG), str):
+            texts.append(arguments[DEFAULT_MESSAGE_TOOL_KWARG])
+    text = "\n".join(texts).strip()
+    return text or None
+
+
+class MessageEmbedder:
+    """The message embedding tasks of this event loop."""
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(settings.message_embedding_concurrency)
+
+    def schedule(self, messages: List[PydanticMessage], actor: PydanticUser) -> None:
+        """Embed `messages` in the background; messages without searchable text are skipped."""
+        texts = {message.id: text for message in messages if message.agent_id and (text := message_embedding_text(message))}
+        if not texts:
+            return
+        agent_ids = {message.id: message.agent_id for message in messages if message.id in texts}
+        task = asyncio.create_task(self._embed(texts, agent_ids, actor))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """Wait for the messages scheduled so far to be embedded."""
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _embed(self, texts: Dict[str, str], agent_ids: Dict[str, str], actor: PydanticUser) -> None:
+        try:
+            async with self._semaphore:
+                async with db_registry.async_session() as session:
+                    query = select(AgentModel.id, AgentModel.embedding_config).where(AgentModel.id.in_(set(agent_ids.values())))
+                    embedding_configs = {row.id: row.embedding_config for row in await session.execute(query)}
+
+                message_ids_by_agent = defaultdict(list)
+                for message_id, agent_id in agent_ids.items():
+                    if embedding_configs.get(agent_id) is not None:
+                        message_ids_by_agent[agent_id].append(message_id)
+
+                rows = []
+                for agent_id, message_ids in message_ids_by_agent.items():
+                    embeddings = await PassageManager().embed_texts_async(
+                        [texts[message_id] for message_id in message_ids], embedding_configs[agent_id], actor
+                    )
+                    for message_id, embedding in zip(message_ids, embeddings):
+                        embedding = np.asarray(embedding, dtype=np.float32)
+                        rows.append({"id": message_id, "embedding": np.pad(embedding, (0, MAX_EMBEDDING_DIM - embedding.shape[0]))})
+                if not rows:
+                    return
+
+                async with db_registry.async_session() as session:
+                    await session.execute(update(MessageModel), rows)
+                    if settings.sqlite_vector_index and settings.database_engine is DatabaseChoice.SQLITE:
+                        message_ids = [row["id"] for row in rows]
+                        await session.run_sync(lambda sync_session: index_passages(sync_session.connection(), MESSAGE_INDEX, message_ids))
+                    await session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to embed {len(texts)} messages, they are only found by keyword search: {e}")
+
+    async def close(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_embedders: EventLoopRegistry[MessageEmbedder] = EventLoopRegistry()
+
+
+def get_message_embedder() -> MessageEmbedder:
+    """Get the message embedder of the running event loop."""
+    embedder = _embedders.get()
+    if embedder is None:
+        embedder = _embedders.set(MessageEmbedder())
+    return embedder
+
+
+async def close_message_embedders() -> None:
+    embedders = _embedders.pop_all()
+    await asyncio.gather(*[embedder.close() for embedder in embedders], return_exceptions=True)
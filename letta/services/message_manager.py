@@ -1,14 +1,21 @@
+import asyncio
 import json
 import uuid
+from datetime import datetime
 from typing import List, Optional, Sequence
 
-from sqlalchemy import delete, exists, func, select, text
+from sqlalchemy import delete, exists, func, literal_column, select, text
 
+from letta.constants import MESSAGE_EMBEDDING_INDEX_DIM
+from letta.helpers.message_helper import get_message_token_count
 from letta.log import get_logger
 from letta.orm.agent import Agent as AgentModel
 from letta.orm.errors import NoResultFound
+from letta.orm.message import MESSAGE_EMBEDDING_INDEX_EXPRESSION
 from letta.orm.message import Message as MessageModel
+from letta.orm.sqlite_functions import adapt_array
 from letta.otel.tracing import trace_method
+from letta.schemas.embedding_config import EmbeddingConfig
 from letta.schemas.enums import MessageRole
 from letta.schemas.letta_message import LettaMessageUpdateUnion
 from letta.schemas.letta_message_content import ImageSourceType, LettaImage, MessageContentType
@@ -17,12 +24,24 @@ from letta.schemas.message import MessageUpdate
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
 from letta.services.file_manager import FileManager
-from letta.services.helpers.agent_manager_helper import validate_agent_exists_async
+from letta.services.helpers.agent_manager_helper import embed_query_text, validate_agent_exists_async
+from letta.services.helpers.full_text_index import (
+    MESSAGE_TEXT_INDEX,
+    ensure_full_text_index_async,
+    keyword_search,
+    query_terms,
+    reciprocal_rank_fusion,
+)
+from letta.services.helpers.passage_vector_index import MESSAGE_INDEX, schedule_scope_rebuild, search_passage_vector_index
+from letta.services.message_embedder import get_message_embedder
 from letta.settings import DatabaseChoice, settings
 from letta.utils import enforce_types
 
 logger = get_logger(__name__)
 
+# vector index candidates read per requested message when role or date filters may drop some of them
+MESSAGE_INDEX_OVERFETCH = 4
+
 
 class MessageManager:
     """Manager class to handle business logic related to Messages."""
@@ -87,6 +106,7 @@ class MessageManager:
     def create_message(self, pydantic_msg: PydanticMessage, actor: PydanticUser) -> PydanticMessage:
         """Create a new message."""
         with db_registry.session() as session:
+            self._populate_token_counts([pydantic_msg])
             # Set the organization id of the Pydantic message
             msg_data = pydantic_msg.model_dump(to_orm=True)
             msg_data["organization_id"] = actor.organization_id
@@ -94,7 +114,20 @@ class MessageManager:
             msg.create(session, actor=actor)  # Persist to database
             return msg.to_pydantic()
 
+    @staticmethod
+    def _populate_token_counts(pydantic_msgs: List[PydanticMessage]) -> None:
+        """Count tokens once at write time (in place, so callers holding the messages see the counts too)."""
+        if not settings.store_message_token_counts:
+            return
+        for pydantic_msg in pydantic_msgs:
+            try:
+                get_message_token_count(pydantic_msg)
+            except Exception as e:
+                # counted lazily by readers instead
+                logger.warning(f"Failed to count tokens for message {pydantic_msg.id}: {e}")
+
     def _create_many_preprocess(self, pydantic_msgs: List[PydanticMessage], actor: PydanticUser) -> List[MessageModel]:
+        self._populate_token_counts(pydantic_msgs)
         # Create ORM model instances for all messages
         orm_messages = []
         for pydantic_msg in pydantic_msgs:
@@ -170,7 +203,9 @@ class MessageManager:
             created_messages = await MessageModel.batch_create_async(orm_messages, session, actor=actor, no_commit=True, no_refresh=True)
             result = [msg.to_pydantic() for msg in created_messages]
             await session.commit()
-            return result
+        if settings.message_embeddings:
+            get_message_embedder().schedule(result, actor)
+        return result
 
     @enforce_types
     @trace_method
@@ -287,7 +322,9 @@ class MessageManager:
             await message.update_async(db_session=session, actor=actor, no_commit=True, no_refresh=True)
             pydantic_message = message.to_pydantic()
             await session.commit()
-            return pydantic_message
+        if settings.message_embeddings and (message_update.content is not None or message_update.tool_calls is not None):
+            get_message_embedder().schedule([pydantic_message], actor)
+        return pydantic_message
 
     def _update_message_by_id_impl(
         self, message_id: str, message_update: MessageUpdate, actor: PydanticUser, message: MessageModel
@@ -312,6 +349,9 @@ class MessageManager:
 
         for key, value in update_data.items():
             setattr(message, key, value)
+        if update_data:
+            # stale now, recounted on the next read
+            message.token_counts = None
         return message
 
     @enforce_types
@@ -624,6 +664,170 @@ class MessageManager:
             results = result.scalars().all()
             return [msg.to_pydantic() for msg in results]
 
+    @enforce_types
+    @trace_method
+    async def search_messages_for_agent_async(
+        self,
+        agent_id: str,
+        actor: PydanticUser,
+        query_text: str,
+        roles: Optional[Sequence[MessageRole]] = None,
+        limit: Optional[int] = 50,
+    ) -> List[PydanticMessage]:
+        """
+        Lists the messages of an agent whose text content matches any word of `query_text`, most relevant first.
+
+        Falls back to the substring filter of `list_messages_for_agent_async` (ordered by sequence_id) when the query has
+        no words or the full-text index is unavailable.
+        """
+        terms = query_terms(query_text)
+        if not terms or not await ensure_full_text_index_async():
+            return await self.list_messages_for_agent_async(agent_id=agent_id, actor=actor, query_text=query_text, roles=roles, limit=limit)
+
+        async with db_registry.async_session() as session:
+            await validate_agent_exists_async(session, agent_id, actor)
+
+            query = select(MessageModel).where(MessageModel.agent_id == agent_id)
+            query = query.where((MessageModel.is_err == False) | (MessageModel.is_err.is_(None)))
+            if roles:
+                query = query.where(MessageModel.role.in_([r.value for r in roles]))
+            query = keyword_search(query, MESSAGE_TEXT_INDEX, terms)
+            if limit:
+                query = query.limit(limit)
+
+            result = await session.execute(query)
+            return [msg.to_pydantic() for msg in result.scalars().all()]
+
+    @enforce_types
+    @trace_method
+    async def semantic_search_messages_for_agent_async(
+        self,
+        agent_id: str,
+        actor: PydanticUser,
+        query_text: str,
+        embedding_config: EmbeddingConfig,
+        roles: Optional[Sequence[MessageRole]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 10,
+    ) -> List[PydanticMessage]:
+        """
+        Lists the `limit` embedded messages of an agent closest to `query_text`, most similar first.
+
+        Only messages embedded since `settings.message_embeddings` was enabled are searched. Candidates are read from a
+        vector index instead of scanning the agent's whole history: the agent's partition of the sqlite-vec index on SQLite
+        with `settings.sqlite_vector_index`, the pgvector hnsw index on Postgres. They are then filtered and ranked by their
+        exact distance, and the search falls back to an exact scan when the filters leave fewer than `limit`.
+        """
+        query_embedding = await asyncio.to_thread(embed_query_text, query_text, embedding_config)
+
+        async with db_registry.async_session() as session:
+            await validate_agent_exists_async(session, agent_id, actor)
+
+            query = select(MessageModel).where(MessageModel.agent_id == agent_id, MessageModel.embedding.is_not(None))
+            query = query.where((MessageModel.is_err == False) | (MessageModel.is_err.is_(None)))
+            if roles:
+                query = query.where(MessageModel.role.in_([r.value for r in roles]))
+            if start_date:
+                query = query.where(MessageModel.created_at >= start_date)
+            if end_date:
+                query = query.where(MessageModel.created_at <= end_date)
+
+            if settings.database_engine is DatabaseChoice.POSTGRES:
+                distance = MessageModel.embedding.cosine_distance(query_embedding)
+            else:
+                distance = func.cosine_distance(MessageModel.embedding, adapt_array(query_embedding))
+            query = query.order_by(distance.asc())
+
+            k = limit * MESSAGE_INDEX_OVERFETCH if roles or start_date or end_date else limit
+            candidate_ids = await self._search_message_vector_index_async(session, agent_id, query_embedding, k)
+            if candidate_ids is None and settings.database_engine is DatabaseChoice.POSTGRES:
+                candidate_ids = await self._search_message_embedding_index_async(session, agent_id, query_embedding, k)
+            if candidate_ids is not None:
+                result = await session.execute(query.where(MessageModel.id.in_(candidate_ids)).limit(limit))
+                ranked = result.scalars().all()
+                # unless the filters dropped candidates the agent has more of, these are the nearest messages; only the
+                # SQLite index is partitioned by agent, so only it runs out of candidates when the agent has no more
+                exhausted = len(candidate_ids) < k and settings.database_engine is DatabaseChoice.SQLITE
+                if len(ranked) >= limit or exhausted:
+                    return [msg.to_pydantic() for msg in ranked]
+
+            result = await session.execute(query.limit(limit))
+            return [msg.to_pydantic() for msg in result.scalars().all()]
+
+    @staticmethod
+    async def _search_message_embedding_index_async(session, agent_id: str, query_embedding: List[float], k: int) -> List[str]:
+        """
+        Get the ids of the agent's `k` nearest messages from the Postgres hnsw index, nearest first.
+
+        The index covers the first `MESSAGE_EMBEDDING_INDEX_DIM` dimensions of the embeddings, which is all of them for
+        most embedding models; the candidates of larger ones are approximate, and are ranked by their exact distance.
+        """
+        from pgvector.sqlalchemy import Vector
+
+        # the index scan returns at most `ef_search` rows before the agent filter applies
+        await session.execute(text(f"SET LOCAL hnsw.ef_search = {min(max(k, 40), 1000)}"))
+        indexed_embedding = literal_column(MESSAGE_EMBEDDING_INDEX_EXPRESSION, type_=Vector(MESSAGE_EMBEDDING_INDEX_DIM))
+        query = (
+            select(MessageModel.id)
+            .where(MessageModel.agent_id == agent_id, MessageModel.embedding.is_not(None))
+            .order_by(indexed_embedding.cosine_distance(query_embedding[:MESSAGE_EMBEDDING_INDEX_DIM]).asc())
+            .limit(k)
+        )
+        return list((await session.execute(query)).scalars().all())
+
+    @staticmethod
+    async def _search_message_vector_index_async(session, agent_id: str, query_embedding: List[float], k: int) -> Optional[List[str]]:
+        """
+        Get the ids of the agent's `k` nearest messages from the SQLite vector index, nearest first.
+
+        Returns None when the search has to fall back to an exact scan; a stale index is rebuilt in the background.
+        """
+        if not (settings.sqlite_vector_index and settings.database_engine is DatabaseChoice.SQLITE):
+            return None
+        candidates, stale_scope_ids = await session.run_sync(
+            lambda sync_session: search_passage_vector_index(sync_session.connection(), MESSAGE_INDEX, [agent_id], query_embedding, k)
+        )
+        if stale_scope_ids:
+            schedule_scope_rebuild(MESSAGE_INDEX, agent_id)
+        return None if candidates is None else [message_id for message_id, _ in candidates]
+
+    @enforce_types
+    @trace_method
+    async def hybrid_search_messages_for_agent_async(
+        self,
+        agent_id: str,
+        actor: PydanticUser,
+        query_text: str,
+        embedding_config: EmbeddingConfig,
+        roles: Optional[Sequence[MessageRole]] = None,
+        limit: int = 50,
+    ) -> List[PydanticMessage]:
+        """
+        Lists the messages of an agent most relevant to `query_text`, by the reciprocal rank fusion of their vector
+        similarity and keyword rankings. Keywords are matched through the full-text index with `settings.full_text_search`,
+        and as a substring of the message text otherwise; either way, messages that are not embedded yet are still found.
+        """
+        if settings.full_text_search:
+            keyword_matches = self.search_messages_for_agent_async(
+                agent_id=agent_id, actor=actor, query_text=query_text, roles=roles, limit=limit
+            )
+        else:
+            keyword_matches = self.list_messages_for_agent_async(
+                agent_id=agent_id, actor=actor, query_text=query_text, roles=roles, limit=limit
+            )
+        vector_results, keyword_results = await asyncio.gather(
+            self.semantic_search_messages_for_agent_async(
+                agent_id=agent_id, actor=actor, query_text=query_text, embedding_config=embedding_config, roles=roles, limit=limit
+            ),
+            keyword_matches,
+        )
+        messages = {message.id: message for message in [*vector_results, *keyword_results]}
+        ranking = reciprocal_rank_fusion(
+            [[message.id for message in vector_results], [message.id for message in keyword_results]], k=settings.hybrid_search_rrf_k
+        )
+        return [messages[message_id] for message_id in ranking[:limit]]
+
     @enforce_types
     @trace_method
     async def delete_all_messages_for_agent_async(self, agent_id: str, actor: PydanticUser, exclude_ids: Optional[List[str]] = None) -> int:
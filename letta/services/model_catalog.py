@@ -0,0 +1,215 @@
+"""
+Per-provider catalog of the LLM and embedding models providers serve.
+
+Listing models calls every enabled provider's API, so `/v1/models` and resolving a model handle during agent creation
+were as slow (and as flaky) as the slowest provider. With `settings.model_catalog_enabled`, model lists are cached per
+provider configuration and indexed by handle and model name:
+
+- A list older than its provider's TTL (`settings.model_catalog_ttl_s`, overridable per provider name or type through
+  `settings.model_catalog_provider_ttls`) is still served while one background task per provider refreshes it.
+- A failed refresh keeps serving the last list that was listed successfully, and is retried after `RETRY_INTERVAL_S`.
+- Every successful listing is persisted under `settings.model_catalog_snapshot_dir`, so a restarted process serves the
+  last known good list right away and refreshes it in the background.
+
+Only a provider that was never listed, and has no snapshot, is listed inline. Configs are copied on the way out, since
+callers adjust them per agent.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from letta.constants import GET_PROVIDERS_TIMEOUT_SECONDS, LETTA_DIR
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.helpers.json_helpers import json_dumps, json_loads
+from letta.log import get_logger
+from letta.schemas.embedding_config import EmbeddingConfig
+from letta.schemas.llm_config import LLMConfig
+from letta.schemas.providers import Provider
+from letta.settings import settings
+
+logger = get_logger(__name__)
+
+KIND_LLM = "llm"
+KIND_EMBEDDING = "embedding"
+RETRY_INTERVAL_S = 30.0
+# a handle missing from a cached list refreshes it inline at most this often, to pick up newly released models
+MISS_REFRESH_INTERVAL_S = 30.0
+
+ModelConfig = Union[LLMConfig, EmbeddingConfig]
+CatalogKey = Tuple[str, str]
+
+
+def get_model_catalog_snapshot_dir() -> Path:
+    return Path(settings.model_catalog_snapshot_dir or os.path.join(LETTA_DIR, "model_catalog"))
+
+
+def provider_catalog_key(provider: Provider) -> str:
+    """Identify a provider configuration; credentials decide which models are listed, so they are part of it (hashed)."""
+    return hashlib.sha256(provider.model_dump_json(exclude={"updated_at"}).encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class CatalogEntry:
+    configs: List[ModelConfig]
+    # wall clock, so that it stays meaningful in snapshots read by later processes
+    fetched_at: float
+    by_handle: Dict[str, List[ModelConfig]] = field(init=False)
+    by_model: Dict[str, List[ModelConfig]] = field(init=False)
+
+    def __post_init__(self):
+        self.by_handle, self.by_model = {}, {}
+        for config in self.configs:
+            self.by_handle.setdefault(config.handle, []).append(config)
+            model = config.model if isinstance(config, LLMConfig) else config.embedding_model
+            self.by_model.setdefault(model, []).append(config)
+
+    def lookup(self, handle: str, model_name: Optional[str] = None) -> List[ModelConfig]:
+        configs = self.by_handle.get(handle)
+        if not configs and model_name is not None:
+            configs = self.by_model.get(model_name)
+        return configs or []
+
+
+class ModelCatalog:
+    """Cached model lists of every provider configuration seen by this event loop."""
+
+    def __init__(self):
+        self._entries: Dict[CatalogKey, CatalogEntry] = {}
+        self._refreshes: Dict[CatalogKey, asyncio.Task] = {}
+        self._attempted_at: Dict[CatalogKey, float] = {}
+        self._failed_at: Dict[CatalogKey, float] = {}
+
+    async def list_llm_models(self, provider: Provider) -> List[LLMConfig]:
+        entry = await self._get_entry(provider, KIND_LLM)
+        return [config.model_copy(deep=True) for config in entry.configs] if entry else []
+
+    async def list_embedding_models(self, provider: Provider) -> List[EmbeddingConfig]:
+        entry = await self._get_entry(provider, KIND_EMBEDDING)
+        return [config.model_copy(deep=True) for config in entry.configs] if entry else []
+
+    async def find_llm_configs(self, provider: Provider, handle: str, model_name: Optional[str] = None) -> List[LLMConfig]:
+        """LLM configs of `provider` with this handle or, failing that, this model name."""
+        return await self._find(provider, KIND_LLM, handle, model_name)
+
+    async def find_embedding_configs(self, provider: Provider, handle: str) -> List[EmbeddingConfig]:
+        return await self._find(provider, KIND_EMBEDDING, handle)
+
+    async def warm(self, providers: List[Provider]) -> None:
+        """Load snapshots of (or list) every kind of model of `providers`, e.g. at startup."""
+        await asyncio.gather(*[self._get_entry(provider, kind) for provider in providers for kind in (KIND_LLM, KIND_EMBEDDING)])
+
+    async def _find(self, provider: Provider, kind: str, handle: str, model_name: Optional[str] = None) -> List[ModelConfig]:
+        key = (provider_catalog_key(provider), kind)
+        entry = await self._get_entry(provider, kind)
+        configs = entry.lookup(handle, model_name) if entry else []
+        if not configs and time.monotonic() - self._attempted_at.get(key, float("-inf")) >= MISS_REFRESH_INTERVAL_S:
+            entry = await self._refresh(provider, kind)
+            configs = entry.lookup(handle, model_name) if entry else []
+        return [config.model_copy(deep=True) for config in configs]
+
+    async def _get_entry(self, provider: Provider, kind: str) -> Optional[CatalogEntry]:
+        key = (provider_catalog_key(provider), kind)
+        entry = self._entries.get(key)
+        if entry is None:
+            snapshot = await asyncio.to_thread(self._load_snapshot, key)
+            entry = self._entries.setdefault(key, snapshot) if snapshot else self._entries.get(key)
+        if entry is None:
+            if time.monotonic() - self._failed_at.get(key, float("-inf")) < RETRY_INTERVAL_S:
+                return None
+            return await self._refresh(provider, kind)
+
+        if time.time() - entry.fetched_at >= self._ttl(provider) and key not in self._refreshes:
+            if time.monotonic() - self._failed_at.get(key, float("-inf")) >= RETRY_INTERVAL_S:
+                self._start_refresh(provider, kind)
+        return entry
+
+    def _ttl(self, provider: Provider) -> float:
+        ttls = settings.model_catalog_provider_ttls
+        return ttls.get(provider.name, ttls.get(provider.provider_type.value, settings.model_catalog_ttl_s))
+
+    def _start_refresh(self, provider: Provider, kind: str) -> asyncio.Task:
+        key = (provider_catalog_key(provider), kind)
+        task = self._refreshes.get(key)
+        if task is None:
+            task = self._refreshes[key] = asyncio.create_task(self._fetch(provider, kind, key))
+            task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+        return task
+
+    async def _refresh(self, provider: Provider, kind: str) -> Optional[CatalogEntry]:
+        # shielded so that a caller giving up does not cancel the listing for everyone else waiting on it
+        return await asyncio.shield(self._start_refresh(provider, kind))
+
+    async def _fetch(self, provider: Provider, kind: str, key: CatalogKey) -> Optional[CatalogEntry]:
+        self._attempted_at[key] = time.monotonic()
+        list_models = provider.list_llm_models_async if kind == KIND_LLM else provider.list_embedding_models_async
+        try:
+            async with asyncio.timeout(GET_PROVIDERS_TIMEOUT_SECONDS):
+                configs = await list_models()
+        except Exception as e:
+            self._failed_at[key] = time.monotonic()
+            logger.warning(f"Failed to list {kind} models for provider {provider.name}, serving the last known list: {e}")
+            return self._entries.get(key)
+
+        self._failed_at.pop(key, None)
+        entry = self._entries[key] = CatalogEntry(configs=configs, fetched_at=time.time())
+        await asyncio.to_thread(self._save_snapshot, key, entry)
+        return entry
+
+    @staticmethod
+    def _snapshot_path(key: CatalogKey) -> Path:
+        provider_key, kind = key
+        return get_model_catalog_snapshot_dir() / f"{kind}-{provider_key}.json"
+
+    def _load_snapshot(self, key: CatalogKey) -> Optional[CatalogEntry]:
+        path = self._snapshot_path(key)
+        if not path.is_file():
+            return None
+        config_class = LLMConfig if key[1] == KIND_LLM else EmbeddingConfig
+        try:
+            snapshot = json_loads(path.read_text())
+            return CatalogEntry(
+                configs=[config_class.model_validate(config) for config in snapshot["configs"]], fetched_at=snapshot["fetched_at"]
+            )
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable model catalog snapshot {path}: {e}")
+            return None
+
+    def _save_snapshot(self, key: CatalogKey, entry: CatalogEntry) -> None:
+        path = self._snapshot_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # written aside and renamed, so that concurrent readers never see a partial snapshot
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(
+                json_dumps({"fetched_at": entry.fetched_at, "configs": [config.model_dump(mode="json") for config in entry.configs]})
+            )
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to persist model catalog snapshot {path}: {e}")
+
+    async def close(self) -> None:
+        refreshes = list(self._refreshes.values())
+        for task in refreshes:
+            task.cancel()
+        await asyncio.gather(*refreshes, return_exceptions=True)
+
+
+_catalogs: EventLoopRegistry[ModelCatalog] = EventLoopRegistry()
+
+
+def get_model_catalog() -> ModelCatalog:
+    """Get the model catalog of the running event loop (refresh tasks are loop-bound)."""
+    catalog = _catalogs.get()
+    if catalog is None:
+        catalog = _catalogs.set(ModelCatalog())
+    return catalog
+
+
+async def close_model_catalogs() -> None:
+    catalogs = _catalogs.pop_all()
+    await asyncio.gather(*[catalog.close() for catalog in catalogs], return_exceptions=True)
@@ -1,26 +1,43 @@
 import asyncio
+import hashlib
+from collections import Counter
 from datetime import datetime, timezone
 from functools import lru_cache
-from typing import List, Optional
+from typing import AsyncGenerator, Dict, List, Optional, Set, Tuple
 
 from openai import AsyncOpenAI, OpenAI
-from sqlalchemy import select
+from sqlalchemy import insert, select
 
 from letta.constants import MAX_EMBEDDING_DIM
 from letta.embeddings import embedding_model, parse_and_chunk_text
 from letta.helpers.decorators import async_redis_cache
+from letta.helpers.embedding_cache import get_embedding_cache
+from letta.llm_api.llm_client import LLMClient
+from letta.log import get_logger
 from letta.orm import ArchivesAgents
 from letta.orm.errors import NoResultFound
 from letta.orm.passage import ArchivalPassage, SourcePassage
 from letta.otel.tracing import trace_method
 from letta.schemas.agent import AgentState
+from letta.schemas.enums import ProviderType
 from letta.schemas.file import FileMetadata as PydanticFileMetadata
+from letta.schemas.memory import ArchivalMemoryInsertResult
 from letta.schemas.passage import Passage as PydanticPassage
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
 from letta.services.archive_manager import ArchiveManager
+from letta.services.helpers.passage_vector_index import (
+    ARCHIVAL_PASSAGE_INDEX,
+    SOURCE_PASSAGE_INDEX,
+    PassageVectorIndex,
+    index_passages,
+    remove_passages,
+)
+from letta.settings import DatabaseChoice, settings
 from letta.utils import enforce_types
 
+logger = get_logger(__name__)
+
 
 # TODO: Add redis-backed caching for backend
 @lru_cache(maxsize=8192)
@@ -47,6 +64,18 @@ class PassageManager:
     def __init__(self):
         self.archive_manager = ArchiveManager()
 
+    @staticmethod
+    async def _index_passages_async(session, index: PassageVectorIndex, passage_ids: List[str]) -> None:
+        """Add passages written in the current transaction to the SQLite vector index (no-op unless enabled)."""
+        if settings.sqlite_vector_index and settings.database_engine is DatabaseChoice.SQLITE:
+            await session.run_sync(lambda sync_session: index_passages(sync_session.connection(), index, passage_ids))
+
+    @staticmethod
+    async def _remove_passages_from_index_async(session, index: PassageVectorIndex, passage_ids: List[str]) -> None:
+        """Drop passages from the SQLite vector index as part of the current transaction (no-op unless enabled)."""
+        if settings.sqlite_vector_index and settings.database_engine is DatabaseChoice.SQLITE:
+            await session.run_sync(lambda sync_session: remove_passages(sync_session.connection(), index, passage_ids))
+
     # AGENT PASSAGE METHODS
     @enforce_types
     @trace_method
@@ -195,7 +224,9 @@ class PassageManager:
         passage = ArchivalPassage(**common_fields, **agent_fields)
 
         async with db_registry.async_session() as session:
-            passage = await passage.create_async(session, actor=actor)
+            passage = await passage.create_async(session, actor=actor, no_commit=True)
+            await self._index_passages_async(session, ARCHIVAL_PASSAGE_INDEX, [passage.id])
+            await session.commit()
             return passage.to_pydantic()
 
     @enforce_types
@@ -261,7 +292,9 @@ class PassageManager:
         passage = SourcePassage(**common_fields, **source_fields)
 
         async with db_registry.async_session() as session:
-            passage = await passage.create_async(session, actor=actor)
+            passage = await passage.create_async(session, actor=actor, no_commit=True)
+            await self._index_passages_async(session, SOURCE_PASSAGE_INDEX, [passage.id])
+            await session.commit()
             return passage.to_pydantic()
 
     # DEPRECATED - Use specific methods above
@@ -296,7 +329,10 @@ class PassageManager:
         # Common fields for both passage types
         passage = self._preprocess_passage_for_creation(pydantic_passage=pydantic_passage)
         async with db_registry.async_session() as session:
-            passage = await passage.create_async(session, actor=actor)
+            passage = await passage.create_async(session, actor=actor, no_commit=True)
+            index = ARCHIVAL_PASSAGE_INDEX if isinstance(passage, ArchivalPassage) else SOURCE_PASSAGE_INDEX
+            await self._index_passages_async(session, index, [passage.id])
+            await session.commit()
             return passage.to_pydantic()
 
     @trace_method
@@ -363,7 +399,11 @@ class PassageManager:
             archival_passages.append(ArchivalPassage(**common_fields, **archival_fields))
 
         async with db_registry.async_session() as session:
-            archival_created = await ArchivalPassage.batch_create_async(items=archival_passages, db_session=session, actor=actor)
+            archival_created = await ArchivalPassage.batch_create_async(
+                items=archival_passages, db_session=session, actor=actor, no_commit=True
+            )
+            await self._index_passages_async(session, ARCHIVAL_PASSAGE_INDEX, [p.id for p in archival_created])
+            await session.commit()
             return [p.to_pydantic() for p in archival_created]
 
     @enforce_types
@@ -406,7 +446,9 @@ class PassageManager:
             source_passages.append(SourcePassage(**common_fields, **source_fields))
 
         async with db_registry.async_session() as session:
-            source_created = await SourcePassage.batch_create_async(items=source_passages, db_session=session, actor=actor)
+            source_created = await SourcePassage.batch_create_async(items=source_passages, db_session=session, actor=actor, no_commit=True)
+            await self._index_passages_async(session, SOURCE_PASSAGE_INDEX, [p.id for p in source_created])
+            await session.commit()
             return [p.to_pydantic() for p in source_created]
 
     # DEPRECATED - Use specific methods above
@@ -450,11 +492,18 @@ class PassageManager:
 
             results = []
             if agent_passages:
-                agent_created = await ArchivalPassage.batch_create_async(items=agent_passages, db_session=session, actor=actor)
+                agent_created = await ArchivalPassage.batch_create_async(
+                    items=agent_passages, db_session=session, actor=actor, no_commit=True
+                )
+                await self._index_passages_async(session, ARCHIVAL_PASSAGE_INDEX, [p.id for p in agent_created])
                 results.extend(agent_created)
             if source_passages:
-                source_created = await SourcePassage.batch_create_async(items=source_passages, db_session=session, actor=actor)
+                source_created = await SourcePassage.batch_create_async(
+                    items=source_passages, db_session=session, actor=actor, no_commit=True
+                )
+                await self._index_passages_async(session, SOURCE_PASSAGE_INDEX, [p.id for p in source_created])
                 results.extend(source_created)
+            await session.commit()
 
             return [p.to_pydantic() for p in results]
 
@@ -565,9 +614,175 @@ class PassageManager:
         except Exception as e:
             raise e
 
+    @trace_method
+    async def insert_passages_bulk_async(
+        self,
+        agent_state: AgentState,
+        texts: List[str],
+        actor: PydanticUser,
+    ) -> AsyncGenerator[ArchivalMemoryInsertResult, None]:
+        """
+        Insert many texts into archival memory, yielding one result per text as soon as it is stored.
+
+        Texts are deduplicated by content hash within the request, and chunks already in the agent's archive are skipped.
+        The remaining chunks are packed into embedding batches of `embedding_config.batch_size`, embedded with bounded
+        concurrency, and each batch is written with one multi-row insert in its own transaction, so a text is durable
+        by the time its result is yielded.
+        """
+        if len(texts) > settings.archival_bulk_insert_max_texts:
+            raise ValueError(f"Bulk archival insert accepts at most {settings.archival_bulk_insert_max_texts} texts, got {len(texts)}")
+
+        archive = await self.archive_manager.get_or_create_default_archive_for_agent_async(
+            agent_id=agent_state.id,
+            agent_name=agent_state.name,
+            actor=actor,
+        )
+        embedding_config = agent_state.embedding_config
+
+        unique_texts: Dict[int, str] = {}
+        first_index_by_hash: Dict[str, int] = {}
+        for index, text in enumerate(texts):
+            if not text.strip():
+                yield ArchivalMemoryInsertResult(index=index, status="failed", error="Text is empty")
+                continue
+            content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if content_hash in first_index_by_hash:
+                yield ArchivalMemoryInsertResult(index=index, status="duplicate", duplicate_of=first_index_by_hash[content_hash])
+                continue
+            first_index_by_hash[content_hash] = index
+            unique_texts[index] = text
+
+        # chunking is CPU bound, keep it off the event loop
+        chunks_by_index = await asyncio.to_thread(
+            lambda: {index: list(parse_and_chunk_text(text, embedding_config.embedding_chunk_size)) for index, text in unique_texts.items()}
+        )
+        existing_chunks = await self._get_existing_archival_texts_async(
+            archive_id=archive.id, texts={chunk for chunks in chunks_by_index.values() for chunk in chunks}, actor=actor
+        )
+
+        pending_chunks: List[Tuple[int, str]] = []
+        for index, chunks in chunks_by_index.items():
+            new_chunks = [chunk for chunk in chunks if chunk not in existing_chunks]
+            if not new_chunks:
+                yield ArchivalMemoryInsertResult(index=index, status="duplicate")
+                continue
+            pending_chunks.extend((index, chunk) for chunk in new_chunks)
+
+        batch_size = max(1, embedding_config.batch_size)
+        batches = [pending_chunks[i : i + batch_size] for i in range(0, len(pending_chunks), batch_size)]
+        outstanding = Counter(index for index, _ in pending_chunks)
+        passage_ids: Dict[int, List[str]] = {index: [] for index in outstanding}
+        errors: Dict[int, str] = {}
+        semaphore = asyncio.Semaphore(settings.archival_bulk_embedding_concurrency)
+
+        async def process_batch(batch: List[Tuple[int, str]]) -> Tuple[List[Tuple[int, str]], List[str], Optional[Exception]]:
+            async with semaphore:
+                try:
+                    embeddings = await self._embed_batch_async([chunk for _, chunk in batch], embedding_config, actor)
+                    passages = [
+                        PydanticPassage(
+                            organization_id=actor.organization_id,
+                            archive_id=archive.id,
+                            text=chunk,
+                            embedding=embedding,
+                            embedding_config=embedding_config,
+                        )
+                        for (_, chunk), embedding in zip(batch, embeddings)
+                    ]
+                    await self._bulk_insert_archival_passages_async(passages, actor)
+                    return batch, [passage.id for passage in passages], None
+                except Exception as e:
+                    logger.warning(f"Bulk archival insert batch of {len(batch)} chunks failed for agent {agent_state.id}: {e}")
+                    return batch, [], e
+
+        tasks = [asyncio.create_task(process_batch(batch)) for batch in batches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                batch, batch_passage_ids, error = await next_done
+                for position, (index, _) in enumerate(batch):
+                    outstanding[index] -= 1
+                    if error is not None:
+                        errors.setdefault(index, str(error))
+                    else:
+                        passage_ids[index].append(batch_passage_ids[position])
+                    if outstanding[index] == 0:
+                        if index in errors:
+                            yield ArchivalMemoryInsertResult(
+                                index=index, status="failed", passage_ids=passage_ids[index], error=errors[index]
+                            )
+                        else:
+                            yield ArchivalMemoryInsertResult(index=index, status="created", passage_ids=passage_ids[index])
+        finally:
+            # the caller stopped consuming (e.g. the client disconnected), don't keep embedding on its behalf
+            for task in tasks:
+                task.cancel()
+
+    async def _get_existing_archival_texts_async(self, archive_id: str, texts: Set[str], actor: PydanticUser) -> Set[str]:
+        """Find which of `texts` are already stored as passages in the archive."""
+        existing = set()
+        texts = list(texts)
+        async with db_registry.async_session() as session:
+            for i in range(0, len(texts), 500):
+                query = select(ArchivalPassage.text).where(
+                    ArchivalPassage.archive_id == archive_id,
+                    ArchivalPassage.organization_id == actor.organization_id,
+                    ArchivalPassage.is_deleted == False,
+                    ArchivalPassage.text.in_(texts[i : i + 500]),
+                )
+                existing.update((await session.execute(query)).scalars())
+        return existing
+
+    async def embed_texts_async(self, texts: List[str], embedding_config, actor: PydanticUser) -> List[List[float]]:
+        """Embed texts in batches of `embedding_config.batch_size`, in the order given."""
+        batch_size = max(1, embedding_config.batch_size)
+        batches = await asyncio.gather(
+            *[self._embed_batch_async(texts[i : i + batch_size], embedding_config, actor) for i in range(0, len(texts), batch_size)]
+        )
+        return [embedding for batch in batches for embedding in batch]
+
+    async def _embed_batch_async(self, text_chunks: List[str], embedding_config, actor: PydanticUser) -> List[List[float]]:
+        """Embed a batch of chunks, in a single request where the provider supports it."""
+        if embedding_config.embedding_endpoint_type == "openai":
+            client = LLMClient.create(provider_type=ProviderType.openai, put_inner_thoughts_first=False, actor=actor)
+            return await get_embedding_cache().embed(
+                text_chunks, embedding_config, lambda texts: client.request_embeddings(inputs=texts, embedding_config=embedding_config)
+            )
+        return await self._generate_embeddings_concurrent(text_chunks, embedding_config)
+
+    async def _bulk_insert_archival_passages_async(self, passages: List[PydanticPassage], actor: PydanticUser) -> None:
+        """Write archival passages with a single multi-row INSERT, skipping the unit of work and re-reading the created rows."""
+        rows = []
+        for p in passages:
+            data = p.model_dump(to_orm=True)
+            rows.append(
+                {
+                    "id": data["id"],
+                    "text": data["text"],
+                    "embedding": data["embedding"],
+                    "embedding_config": data["embedding_config"],
+                    "organization_id": data["organization_id"],
+                    "metadata_": data.get("metadata", {}),
+                    "is_deleted": False,
+                    "created_at": data.get("created_at") or datetime.now(timezone.utc),
+                    "archive_id": data["archive_id"],
+                    "created_by_id": actor.id,
+                    "last_updated_by_id": actor.id,
+                }
+            )
+
+        async with db_registry.async_session() as session:
+            await session.execute(insert(ArchivalPassage), rows)
+            await self._index_passages_async(session, ARCHIVAL_PASSAGE_INDEX, [row["id"] for row in rows])
+            await session.commit()
+
     async def _generate_embeddings_concurrent(self, text_chunks: List[str], embedding_config) -> List[List[float]]:
-        """Generate embeddings for all text chunks concurrently"""
+        """Generate embeddings for all text chunks concurrently, reusing cached embeddings of identical text"""
+        return await get_embedding_cache().embed(
+            text_chunks, embedding_config, lambda texts: self._generate_embeddings_uncached(texts, embedding_config)
+        )
 
+    async def _generate_embeddings_uncached(self, text_chunks: List[str], embedding_config) -> List[List[float]]:
+        """Generate embeddings for all text chunks concurrently"""
         if embedding_config.embedding_endpoint_type != "openai":
             embed_model = embedding_model(embedding_config)
             loop = asyncio.get_event_loop()
@@ -652,7 +867,10 @@ class PassageManager:
                 setattr(curr_passage, key, value)
 
             # Commit changes
-            await curr_passage.update_async(session, actor=actor)
+            await curr_passage.update_async(session, actor=actor, no_commit=True)
+            if "embedding" in update_data:
+                await self._index_passages_async(session, ARCHIVAL_PASSAGE_INDEX, [curr_passage.id])
+            await session.commit()
             return curr_passage.to_pydantic()
 
     @enforce_types
@@ -708,7 +926,10 @@ class PassageManager:
                 setattr(curr_passage, key, value)
 
             # Commit changes
-            await curr_passage.update_async(session, actor=actor)
+            await curr_passage.update_async(session, actor=actor, no_commit=True)
+            if "embedding" in update_data:
+                await self._index_passages_async(session, SOURCE_PASSAGE_INDEX, [curr_passage.id])
+            await session.commit()
             return curr_passage.to_pydantic()
 
     @enforce_types
@@ -736,6 +957,7 @@ class PassageManager:
         async with db_registry.async_session() as session:
             try:
                 passage = await ArchivalPassage.read_async(db_session=session, identifier=passage_id, actor=actor)
+                await self._remove_passages_from_index_async(session, ARCHIVAL_PASSAGE_INDEX, [passage.id])
                 await passage.hard_delete_async(session, actor=actor)
                 return True
             except NoResultFound:
@@ -766,6 +988,7 @@ class PassageManager:
         async with db_registry.async_session() as session:
             try:
                 passage = await SourcePassage.read_async(db_session=session, identifier=passage_id, actor=actor)
+                await self._remove_passages_from_index_async(session, SOURCE_PASSAGE_INDEX, [passage.id])
                 await passage.hard_delete_async(session, actor=actor)
                 return True
             except NoResultFound:
@@ -864,12 +1087,14 @@ class PassageManager:
             # Try source passages first
             try:
                 passage = await SourcePassage.read_async(db_session=session, identifier=passage_id, actor=actor)
+                await self._remove_passages_from_index_async(session, SOURCE_PASSAGE_INDEX, [passage.id])
                 await passage.hard_delete_async(session, actor=actor)
                 return True
             except NoResultFound:
                 # Try archival passages
                 try:
                     passage = await ArchivalPassage.read_async(db_session=session, identifier=passage_id, actor=actor)
+                    await self._remove_passages_from_index_async(session, ARCHIVAL_PASSAGE_INDEX, [passage.id])
                     await passage.hard_delete_async(session, actor=actor)
                     return True
                 except NoResultFound:
@@ -898,6 +1123,7 @@ class PassageManager:
     ) -> bool:
         """Delete multiple agent passages."""
         async with db_registry.async_session() as session:
+            await self._remove_passages_from_index_async(session, ARCHIVAL_PASSAGE_INDEX, [p.id for p in passages])
             await ArchivalPassage.bulk_hard_delete_async(db_session=session, identifiers=[p.id for p in passages], actor=actor)
             return True
 
@@ -923,6 +1149,7 @@ class PassageManager:
         passages: List[PydanticPassage],
     ) -> bool:
         async with db_registry.async_session() as session:
+            await self._remove_passages_from_index_async(session, SOURCE_PASSAGE_INDEX, [p.id for p in passages])
             await SourcePassage.bulk_hard_delete_async(db_session=session, identifiers=[p.id for p in passages], actor=actor)
             return True
 
@@ -1080,13 +1307,39 @@ class PassageManager:
 
     @enforce_types
     @trace_method
-    async def list_passages_by_file_id_async(self, file_id: str, actor: PydanticUser) -> List[PydanticPassage]:
+    async def list_passages_by_file_id_async(
+        self, file_id: str, actor: PydanticUser, after: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[PydanticPassage]:
         """
         List all source passages associated with a given file_id.
+
+        With `limit`, passages are paged in id order; `after` is the id of the last passage of the previous page.
         """
         async with db_registry.async_session() as session:
-            result = await session.execute(
+            query = (
                 select(SourcePassage).where(SourcePassage.file_id == file_id).where(SourcePassage.organization_id == actor.organization_id)
             )
+            if after:
+                query = query.where(SourcePassage.id > after)
+            if limit is not None:
+                query = query.order_by(SourcePassage.id).limit(limit)
+            result = await session.execute(query)
             passages = result.scalars().all()
             return [p.to_pydantic() for p in passages]
+
+    @enforce_types
+    @trace_method
+    async def list_passages_by_archive_id_async(
+        self, archive_id: str, actor: PydanticUser, after: Optional[str] = None, limit: Optional[int] = 100
+    ) -> List[PydanticPassage]:
+        """List the archival passages of an archive in id order; `after` is the id of the last passage of the previous page."""
+        async with db_registry.async_session() as session:
+            query = select(ArchivalPassage).where(
+                ArchivalPassage.archive_id == archive_id,
+                ArchivalPassage.organization_id == actor.organization_id,
+                ArchivalPassage.is_deleted == False,
+            )
+            if after:
+                query = query.where(ArchivalPassage.id > after)
+            result = await session.execute(query.order_by(ArchivalPassage.id).limit(limit))
+            return [p.to_pydantic() for p in result.scalars().all()]
@@ -1,22 +1,355 @@
-import threading
-from collections import defaultdict
+"""
+Serializes runs of the same agent, within a process and across processes and replicas.
 
-from letta.otel.tracing import trace_method
+Two overlapping runs of one agent both read its in-context `message_ids`, and whichever writes them last drops the
+other's messages. With `settings.agent_lock_backend` set, `LettaAgent` runs hold the agent's lock for their whole
+duration, and concurrent sends to the same agent queue up in arrival order instead:
+
+- `local`: an asyncio lock per agent, for deployments with a single API process.
+- `postgres`: a session-level advisory lock, held on a dedicated connection for the duration of the run. Waiters
+  queue in Postgres' lock queue, and the lock is released if the holder's connection drops.
+- `redis`: a lease with a fencing token. Runs take increasing tickets (the fencing tokens) and are let in in ticket
+  order. Holders keep renewing their lease and waiters their place in the queue; entries that stop being renewed
+  (e.g. the process crashed) expire after `agent_lock_lease_ttl`.
+
+Runs in the same process always queue on the local lock first, so only one run per agent and process waits on the
+shared backend. Before a run writes the agent's message ids, `ensure_agent_lock_held` checks that its lock is still
+held (for Redis, that the lease still carries its fencing token), so a run whose lease expired fails instead of
+overwriting the messages of the run that took over.
+
+The locks are not reentrant: a run that (directly, or through other agents) sends a message to an agent whose lock is
+held further up its own call chain fails with `AgentLockReentryError` instead of waiting for itself forever.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import re
+import time
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import AsyncIterator, Dict, Optional
+
+from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.errors import AgentLockLostError, AgentLockReentryError, AgentLockTimeoutError
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.otel.metric_registry import MetricRegistry
+from letta.settings import AgentLockBackend, settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+AGENT_LOCK_KEY_PREFIX = "agent_lock"
+REDIS_POLL_INTERVAL_S = 0.1
+
+# agents whose locks are held by the current call chain; tasks started by a run inherit them
+_held_agent_ids: ContextVar[frozenset] = ContextVar("held_agent_ids", default=frozenset())
+
+# Scripts share a prelude that drops queue entries whose lease was not renewed in time.
+_REDIS_EXPIRE_STALE = """
+redis.replicate_commands()
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local ttl_ms = tonumber(ARGV[2])
+for _, stale in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now_ms)) do
+    redis.call('ZREM', KEYS[1], stale)
+    redis.call('ZREM', KEYS[2], stale)
+end
+"""
+
+# KEYS: queue, expiries, lease, ticket counter; ARGV: ticket (0 to take a new one), ttl ms
+# Returns {ticket, position}; position 0 means the lease was granted.
+_REDIS_ACQUIRE = (
+    _REDIS_EXPIRE_STALE
+    + """
+local ticket = tonumber(ARGV[1])
+if ticket == 0 then
+    ticket = redis.call('INCR', KEYS[4])
+    redis.call('PEXPIRE', KEYS[4], 86400000)
+end
+redis.call('ZADD', KEYS[1], 'NX', ticket, ticket)
+redis.call('ZADD', KEYS[2], now_ms + ttl_ms, ticket)
+redis.call('PEXPIRE', KEYS[1], ttl_ms * 2)
+redis.call('PEXPIRE', KEYS[2], ttl_ms * 2)
+local position = redis.call('ZRANK', KEYS[1], ticket)
+if position == 0 then
+    redis.call('SET', KEYS[3], ticket, 'PX', ttl_ms)
+end
+return {ticket, position}
+"""
+)
+
+# KEYS: queue, expiries, lease; ARGV: ticket, ttl ms. Returns 0 if the lease is no longer held with this ticket.
+_REDIS_RENEW = (
+    _REDIS_EXPIRE_STALE
+    + """
+if redis.call('GET', KEYS[3]) ~= ARGV[1] then
+    return 0
+end
+redis.call('PEXPIRE', KEYS[3], ttl_ms)
+redis.call('ZADD', KEYS[2], now_ms + ttl_ms, ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ttl_ms * 2)
+redis.call('PEXPIRE', KEYS[2], ttl_ms * 2)
+return 1
+"""
+)
+
+# KEYS: lease
+_REDIS_GET_LEASE = "return redis.call('GET', KEYS[1])"
+
+# KEYS: queue, expiries, lease; ARGV: ticket
+_REDIS_RELEASE = """
+if redis.call('GET', KEYS[3]) == ARGV[1] then
+    redis.call('DEL', KEYS[3])
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+def _advisory_lock_key(agent_id: str) -> int:
+    return int.from_bytes(hashlib.sha256(agent_id.encode()).digest()[:8], "big", signed=True)
+
+
+def _redis_keys(agent_id: str) -> list:
+    # the hash tag keeps all keys of an agent in one cluster slot, as scripts require
+    prefix = f"{AGENT_LOCK_KEY_PREFIX}:{{{agent_id}}}"
+    return [f"{prefix}:queue", f"{prefix}:expiries", f"{prefix}:lease", f"{prefix}:ticket"]
+
+
+class AgentLease:
+    """A held agent lock. `token` is the fencing token for Redis leases and None otherwise."""
+
+    def __init__(self, agent_id: str, token: Optional[int] = None):
+        self.agent_id = agent_id
+        self.token = token
+
+    async def ensure_held(self) -> None:
+        pass
+
+    async def release(self) -> None:
+        pass
+
+
+class _PostgresLease(AgentLease):
+    def __init__(self, agent_id: str, connection):
+        super().__init__(agent_id)
+        self.connection = connection
+
+    async def ensure_held(self) -> None:
+        # the advisory lock lives exactly as long as the session that took it
+        if self.connection.is_closed():
+            raise AgentLockLostError(self.agent_id)
+
+    async def release(self) -> None:
+        try:
+            await self.connection.execute("SELECT pg_advisory_unlock($1)", _advisory_lock_key(self.agent_id))
+        except Exception as e:
+            logger.warning(f"Failed to release advisory lock of agent {self.agent_id}: {e}")
+        finally:
+            await self.connection.close()
+
+
+class _RedisLease(AgentLease):
+    def __init__(self, agent_id: str, token: int, redis_client):
+        super().__init__(agent_id, token)
+        self.redis_client = redis_client
+        self.lost = False
+        self._renewer = safe_create_task(self._renew(), logger=logger, label=f"renew lease of agent {agent_id}")
+
+    async def _renew(self) -> None:
+        ttl_ms = int(settings.agent_lock_lease_ttl * 1000)
+        while True:
+            await asyncio.sleep(settings.agent_lock_lease_ttl / 3)
+            try:
+                renewed = await self.redis_client.eval(_REDIS_RENEW, _redis_keys(self.agent_id)[:3], [self.token, ttl_ms])
+            except Exception as e:
+                # keep trying; the lease survives until its ttl runs out
+                logger.warning(f"Failed to renew lease of agent {self.agent_id}: {e}")
+                continue
+            if not renewed:
+                logger.error(f"Lease of agent {self.agent_id} (token {self.token}) expired while the run was still going")
+                self.lost = True
+                return
+
+    async def ensure_held(self) -> None:
+        if self.lost or await self.redis_client.eval(_REDIS_GET_LEASE, _redis_keys(self.agent_id)[2:3], []) != str(self.token):
+            self.lost = True
+            raise AgentLockLostError(self.agent_id)
+
+    async def release(self) -> None:
+        self._renewer.cancel()
+        await asyncio.gather(self._renewer, return_exceptions=True)
+        try:
+            await self.redis_client.eval(_REDIS_RELEASE, _redis_keys(self.agent_id)[:3], [self.token])
+        except Exception as e:
+            # the lease and queue entry expire on their own
+            logger.warning(f"Failed to release lease of agent {self.agent_id}: {e}")
 
 
 class PerAgentLockManager:
-    """Manages per-agent locks."""
+    """FIFO per-agent locks for one event loop, shared with other processes through Postgres or Redis if configured."""
+
+    def __init__(self, backend: AgentLockBackend):
+        self.backend = backend
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # runs holding or waiting for each agent's lock; locks are dropped once nobody uses them
+        self._num_queued: Dict[str, int] = {}
+        self._leases: Dict[str, AgentLease] = {}
+
+    @asynccontextmanager
+    async def lock(self, agent_id: str) -> AsyncIterator[AgentLease]:
+        """Hold the agent's lock, waiting behind earlier runs for up to `agent_lock_wait_timeout` seconds."""
+        if agent_id in _held_agent_ids.get() and agent_id in self._leases:
+            # waiting would deadlock: the lock is only released once this call returns
+            raise AgentLockReentryError(agent_id)
+        attributes = {"backend": self.backend.value}
+        MetricRegistry().agent_lock_queue_depth_histogram.record(self._num_queued.get(agent_id, 0), {**attributes, "scope": "process"})
+        local_lock = self._locks.setdefault(agent_id, asyncio.Lock())
+        self._num_queued[agent_id] = self._num_queued.get(agent_id, 0) + 1
+        wait_start = time.perf_counter()
+        try:
+            try:
+                async with asyncio.timeout(settings.agent_lock_wait_timeout):
+                    await local_lock.acquire()
+                    try:
+                        lease = await self._acquire_shared(agent_id)
+                    except BaseException:
+                        local_lock.release()
+                        raise
+            except TimeoutError:
+                raise AgentLockTimeoutError(agent_id, settings.agent_lock_wait_timeout)
+            MetricRegistry().agent_lock_wait_ms_histogram.record((time.perf_counter() - wait_start) * 1000, attributes)
+
+            self._leases[agent_id] = lease
+            _held_agent_ids.set(_held_agent_ids.get() | {agent_id})
+            try:
+                yield lease
+            finally:
+                # not reset by token: streamed runs may be closed from another context than the one that started them
+                _held_agent_ids.set(_held_agent_ids.get() - {agent_id})
+                self._leases.pop(agent_id, None)
+                try:
+                    await lease.release()
+                finally:
+                    local_lock.release()
+        finally:
+            self._num_queued[agent_id] -= 1
+            if not self._num_queued[agent_id]:
+                del self._num_queued[agent_id]
+                del self._locks[agent_id]
+
+    def get_lease(self, agent_id: str) -> Optional[AgentLease]:
+        """The lease held by a run of this agent in this event loop, if any."""
+        return self._leases.get(agent_id)
+
+    async def _acquire_shared(self, agent_id: str) -> AgentLease:
+        if self.backend == AgentLockBackend.POSTGRES:
+            return await self._acquire_postgres(agent_id)
+        if self.backend == AgentLockBackend.REDIS:
+            redis_client = await get_redis_client()
+            if not isinstance(redis_client, NoopAsyncRedisClient):
+                return await self._acquire_redis(agent_id, redis_client)
+            logger.warning(f"Redis is not configured; agent {agent_id} is only locked within this process")
+        return AgentLease(agent_id)
+
+    async def _acquire_postgres(self, agent_id: str) -> AgentLease:
+        import asyncpg
+
+        # asyncpg takes plain postgresql:// URIs, without the SQLAlchemy driver suffix
+        connection = await asyncpg.connect(re.sub(r"^postgresql\+\w+://", "postgresql://", settings.letta_pg_uri))
+        try:
+            await connection.execute("SELECT pg_advisory_lock($1)", _advisory_lock_key(agent_id))
+        except BaseException:
+            # closing the session also abandons the lock request
+            await connection.close()
+            raise
+        return _PostgresLease(agent_id, connection)
+
+    async def _acquire_redis(self, agent_id: str, redis_client) -> AgentLease:
+        keys = _redis_keys(agent_id)
+        ttl_ms = int(settings.agent_lock_lease_ttl * 1000)
+        ticket, waiting = 0, False
+        try:
+            while True:
+                ticket, position = await redis_client.eval(_REDIS_ACQUIRE, keys, [ticket, ttl_ms])
+                if not waiting:
+                    MetricRegistry().agent_lock_queue_depth_histogram.record(position, {"backend": self.backend.value, "scope": "shared"})
+                    waiting = True
+                if position == 0:
+                    return _RedisLease(agent_id, ticket, redis_client)
+                await asyncio.sleep(REDIS_POLL_INTERVAL_S)
+        except BaseException:
+            if ticket:
+                # leave the queue; on failure the entry expires on its own
+                await asyncio.shield(redis_client.eval(_REDIS_RELEASE, keys[:3], [ticket]))
+            raise
+
+    async def close(self) -> None:
+        for lease in list(self._leases.values()):
+            await lease.release()
+        self._leases.clear()
+
+
+_managers: EventLoopRegistry[PerAgentLockManager] = EventLoopRegistry()
+
+
+def get_per_agent_lock_manager() -> Optional[PerAgentLockManager]:
+    """Get the lock manager of the running event loop (asyncio locks are loop-bound), or None if runs are not serialized."""
+    if settings.agent_lock_backend == AgentLockBackend.NONE:
+        return None
+    manager = _managers.get()
+    if manager is None:
+        manager = _managers.set(PerAgentLockManager(settings.agent_lock_backend))
+    return manager
+
+
+async def close_per_agent_lock_managers() -> None:
+    managers = _managers.pop_all()
+    await asyncio.gather(*[manager.close() for manager in managers], return_exceptions=True)
+
+
+async def ensure_agent_lock_held(agent_id: str) -> None:
+    """Raise `AgentLockLostError` if a run of this agent in this event loop holds a lease that it has since lost."""
+    manager = get_per_agent_lock_manager()
+    lease = manager.get_lease(agent_id) if manager else None
+    if lease is not None:
+        await lease.ensure_held()
+
+
+def forget_held_agent_locks() -> None:
+    """
+    Let the current task queue on the agent locks held by the run that started it, instead of failing as reentrant.
+    For tasks the run does not wait on (e.g. fire-and-forget sends), which can wait until the run releases its lock.
+    """
+    _held_agent_ids.set(frozenset())
+
+
+def serialize_agent_runs(func):
+    """Run an agent method (a coroutine or an async generator) while holding the lock of `self.agent_id`."""
+    if inspect.isasyncgenfunction(func):
+
+        @wraps(func)
+        async def generator_wrapper(self, *args, **kwargs):
+            manager = get_per_agent_lock_manager()
+            async with manager.lock(self.agent_id) if manager else nullcontext():
+                stream = func(self, *args, **kwargs)
+                try:
+                    async for chunk in stream:
+                        yield chunk
+                finally:
+                    # finish the run (e.g. when the client disconnected) before the next one starts
+                    await stream.aclose()
 
-    def __init__(self):
-        self.locks = defaultdict(threading.Lock)
+        return generator_wrapper
 
-    @trace_method
-    def get_lock(self, agent_id: str) -> threading.Lock:
-        """Retrieve the lock for a specific agent_id."""
-        return self.locks[agent_id]
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        manager = get_per_agent_lock_manager()
+        async with manager.lock(self.agent_id) if manager else nullcontext():
+            return await func(self, *args, **kwargs)
 
-    @trace_method
-    def clear_lock(self, agent_id: str):
-        """Optionally remove a lock if no longer needed (to prevent unbounded growth)."""
-        if agent_id in self.locks:
-            del self.locks[agent_id]
+    return wrapper
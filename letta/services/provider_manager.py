@@ -1,4 +1,5 @@
-from typing import List, Optional, Tuple, Union
+import time
+from typing import Dict, List, Optional, Tuple, Union
 
 from letta.orm.provider import Provider as ProviderModel
 from letta.otel.tracing import trace_method
@@ -7,8 +8,30 @@ from letta.schemas.providers import Provider as PydanticProvider
 from letta.schemas.providers import ProviderCheck, ProviderCreate, ProviderUpdate
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.settings import model_settings
 from letta.utils import enforce_types
 
+# (organization_id, provider_name) -> (api_key, expires_at), so LLM requests don't read the providers table every step.
+# The cache is per-process: other workers see provider changes once their entries expire.
+_override_key_cache: Dict[Tuple[str, Optional[str]], Tuple[Optional[str], float]] = {}
+
+
+def _get_cached_override_key(organization_id: str, provider_name: Optional[str]) -> Tuple[bool, Optional[str]]:
+    entry = _override_key_cache.get((organization_id, provider_name))
+    if entry is None or entry[1] < time.monotonic():
+        return False, None
+    return True, entry[0]
+
+
+def _cache_override_key(organization_id: str, provider_name: Optional[str], api_key: Optional[str]) -> None:
+    if model_settings.byok_override_key_cache_ttl > 0:
+        _override_key_cache[(organization_id, provider_name)] = (api_key, time.monotonic() + model_settings.byok_override_key_cache_ttl)
+
+
+def invalidate_override_key_cache(organization_id: str) -> None:
+    for key in [key for key in _override_key_cache if key[0] == organization_id]:
+        _override_key_cache.pop(key, None)
+
 
 class ProviderManager:
 
@@ -31,6 +54,7 @@ class ProviderManager:
 
             new_provider = ProviderModel(**provider.model_dump(to_orm=True, exclude_unset=True))
             new_provider.create(session, actor=actor)
+            invalidate_override_key_cache(actor.organization_id)
             return new_provider.to_pydantic()
 
     @enforce_types
@@ -52,6 +76,7 @@ class ProviderManager:
 
             new_provider = ProviderModel(**provider.model_dump(to_orm=True, exclude_unset=True))
             await new_provider.create_async(session, actor=actor)
+            invalidate_override_key_cache(actor.organization_id)
             return new_provider.to_pydantic()
 
     @enforce_types
@@ -69,6 +94,7 @@ class ProviderManager:
 
             # Commit the updated provider
             existing_provider.update(session, actor=actor)
+            invalidate_override_key_cache(actor.organization_id)
             return existing_provider.to_pydantic()
 
     @enforce_types
@@ -88,6 +114,7 @@ class ProviderManager:
 
             # Commit the updated provider
             await existing_provider.update_async(session, actor=actor)
+            invalidate_override_key_cache(actor.organization_id)
             return existing_provider.to_pydantic()
 
     @enforce_types
@@ -104,6 +131,7 @@ class ProviderManager:
             existing_provider.delete(session, actor=actor)
 
             session.commit()
+            invalidate_override_key_cache(actor.organization_id)
 
     @enforce_types
     @trace_method
@@ -121,6 +149,7 @@ class ProviderManager:
             await existing_provider.delete_async(session, actor=actor)
 
             await session.commit()
+            invalidate_override_key_cache(actor.organization_id)
 
     @enforce_types
     @trace_method
@@ -185,14 +214,24 @@ class ProviderManager:
     @enforce_types
     @trace_method
     def get_override_key(self, provider_name: Union[str, None], actor: PydanticUser) -> Optional[str]:
+        cached, api_key = _get_cached_override_key(actor.organization_id, provider_name)
+        if cached:
+            return api_key
         providers = self.list_providers(name=provider_name, actor=actor)
-        return providers[0].api_key if providers else None
+        api_key = providers[0].api_key if providers else None
+        _cache_override_key(actor.organization_id, provider_name, api_key)
+        return api_key
 
     @enforce_types
     @trace_method
     async def get_override_key_async(self, provider_name: Union[str, None], actor: PydanticUser) -> Optional[str]:
+        cached, api_key = _get_cached_override_key(actor.organization_id, provider_name)
+        if cached:
+            return api_key
         providers = await self.list_providers_async(name=provider_name, actor=actor)
-        return providers[0].api_key if providers else None
+        api_key = providers[0].api_key if providers else None
+        _cache_override_key(actor.organization_id, provider_name, api_key)
+        return api_key
 
     @enforce_types
     @trace_method
@@ -0,0 +1,176 @@
+"""
+Push-based signalling of run cancellations.
+
+By default agents re-read their run from the jobs table at the start of every step to find out whether it was
+cancelled. With `settings.run_cancellation_backend` set to anything but `poll`, cancellations are instead published
+on a bus when the run is marked cancelled, and every process keeps the ids of recently cancelled runs in memory, so
+checking for cancellation costs no queries:
+
+- `local`: in-process only, for single-process deployments.
+- `redis`: Redis pub/sub, through `AsyncRedisClient`.
+- `postgres`: Postgres LISTEN/NOTIFY on a dedicated connection.
+
+A cancellation published while a process is not listening (e.g. while reconnecting) is missed by that process, so
+every time the Redis and Postgres listeners (re)subscribe they reload the runs cancelled in the jobs table since the
+subscription was lost. The jobs table remains the source of truth for the run's status.
+"""
+
+import asyncio
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, text
+
+from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.helpers.datetime_helpers import get_utc_time
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.orm.job import Job as JobModel
+from letta.schemas.enums import JobStatus
+from letta.server.db import db_registry
+from letta.settings import RunCancellationBackend, settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+RUN_CANCELLATION_CHANNEL = "letta_run_cancellation"
+# run ids remembered per process; runs are cancelled while they are running, so only recent ones matter
+MAX_CANCELLED_RUNS = 10000
+RECONNECT_DELAY_S = 1.0
+# how far before a lost subscription (or the first one) cancelled runs are reloaded, allowing for clock skew
+CANCELLED_RUNS_RELOAD_WINDOW = timedelta(minutes=10)
+
+# shared by the buses of all event loops in this process
+_cancelled_runs: "OrderedDict[str, None]" = OrderedDict()
+
+
+def mark_run_cancelled(run_id: str) -> None:
+    _cancelled_runs[run_id] = None
+    _cancelled_runs.move_to_end(run_id)
+    while len(_cancelled_runs) > MAX_CANCELLED_RUNS:
+        _cancelled_runs.popitem(last=False)
+
+
+class RunCancellationBus:
+    """Publishes run cancellations and, for cross-process backends, listens for those published elsewhere."""
+
+    def __init__(self, backend: RunCancellationBackend):
+        self.backend = backend
+        self._listener: Optional[asyncio.Task] = None
+        # when the last subscription was lost, until the runs cancelled since then are reloaded
+        self._subscription_lost_at: Optional[datetime] = None
+
+    def start(self) -> None:
+        if self._listener is None and self.backend in (RunCancellationBackend.REDIS, RunCancellationBackend.POSTGRES):
+            listen = self._listen_redis if self.backend == RunCancellationBackend.REDIS else self._listen_postgres
+            self._listener = safe_create_task(listen(), logger=logger, label=f"listen for run cancellations ({self.backend.value})")
+
+    def is_cancelled(self, run_id: str) -> bool:
+        return run_id in _cancelled_runs
+
+    async def publish(self, run_id: str) -> None:
+        """Notify every process (including this one) that `run_id` was cancelled."""
+        mark_run_cancelled(run_id)
+        try:
+            if self.backend == RunCancellationBackend.REDIS:
+                await (await get_redis_client()).publish(RUN_CANCELLATION_CHANNEL, run_id)
+            elif self.backend == RunCancellationBackend.POSTGRES:
+                async with db_registry.async_session() as session:
+                    await session.execute(
+                        text("SELECT pg_notify(:channel, :run_id)"), {"channel": RUN_CANCELLATION_CHANNEL, "run_id": run_id}
+                    )
+                    await session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to publish cancellation of run {run_id}: {e}")
+
+    async def _listen_redis(self) -> None:
+        while True:
+            redis_client = await get_redis_client()
+            if isinstance(redis_client, NoopAsyncRedisClient):
+                logger.warning("Redis is not configured; run cancellations are only seen by the process that requested them")
+                return
+            try:
+                pubsub = await redis_client.subscribe(RUN_CANCELLATION_CHANNEL)
+                try:
+                    await self._reload_cancelled_runs()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            mark_run_cancelled(message["data"])
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Lost run cancellation subscription, reconnecting: {e}")
+                self._subscription_lost_at = self._subscription_lost_at or get_utc_time()
+                await asyncio.sleep(RECONNECT_DELAY_S)
+
+    async def _listen_postgres(self) -> None:
+        import asyncpg
+
+        # asyncpg takes plain postgresql:// URIs, without the SQLAlchemy driver suffix
+        dsn = re.sub(r"^postgresql\+\w+://", "postgresql://", settings.letta_pg_uri)
+        while True:
+            try:
+                connection = await asyncpg.connect(dsn)
+                try:
+                    lost = asyncio.Event()
+                    connection.add_termination_listener(lambda _: lost.set())
+                    await connection.add_listener(
+                        RUN_CANCELLATION_CHANNEL, lambda _conn, _pid, _channel, payload: mark_run_cancelled(payload)
+                    )
+                    await self._reload_cancelled_runs()
+                    await lost.wait()
+                finally:
+                    if not connection.is_closed():
+                        await connection.close()
+                logger.warning("Lost run cancellation listener connection, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to listen for run cancellations, reconnecting: {e}")
+            self._subscription_lost_at = self._subscription_lost_at or get_utc_time()
+            await asyncio.sleep(RECONNECT_DELAY_S)
+
+    async def _reload_cancelled_runs(self) -> None:
+        """Remember the runs cancelled while this process was not subscribed, whose notifications it missed."""
+        since = (self._subscription_lost_at or get_utc_time()) - CANCELLED_RUNS_RELOAD_WINDOW
+        async with db_registry.async_session() as session:
+            result = await session.execute(
+                select(JobModel.id)
+                .where(JobModel.status == JobStatus.cancelled, JobModel.updated_at >= since)
+                .order_by(JobModel.updated_at.desc())
+                .limit(MAX_CANCELLED_RUNS)
+            )
+            run_ids = result.scalars().all()
+        # oldest first, so the most recent cancellations are the last to be evicted
+        for run_id in reversed(run_ids):
+            mark_run_cancelled(run_id)
+        self._subscription_lost_at = None
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+_buses: EventLoopRegistry[RunCancellationBus] = EventLoopRegistry()
+
+
+def get_run_cancellation_bus() -> Optional[RunCancellationBus]:
+    """Get the bus for the running event loop (listeners are loop-bound), or None when cancellations are polled."""
+    if settings.run_cancellation_backend == RunCancellationBackend.POLL:
+        return None
+    bus = _buses.get()
+    if bus is None:
+        bus = _buses.set(RunCancellationBus(settings.run_cancellation_backend))
+        bus.start()
+    return bus
+
+
+async def close_run_cancellation_buses() -> None:
+    buses = _buses.pop_all()
+    await asyncio.gather(*[bus.close() for bus in buses], return_exceptions=True)
@@ -3,6 +3,7 @@ from typing import List, Optional, Union
 
 from sqlalchemy import and_, exists, select
 
+from letta.helpers.agent_state_cache import invalidates_all_agent_states
 from letta.orm import Agent as AgentModel
 from letta.orm.errors import NoResultFound
 from letta.orm.source import Source as SourceModel
@@ -177,6 +178,7 @@ class SourceManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def update_source(self, source_id: str, source_update: SourceUpdate, actor: PydanticUser) -> PydanticSource:
         """Update a source by its ID with the given SourceUpdate object."""
         async with db_registry.async_session() as session:
@@ -200,6 +202,7 @@ class SourceManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def delete_source(self, source_id: str, actor: PydanticUser) -> PydanticSource:
         """Delete a source by its ID."""
         async with db_registry.async_session() as session:
@@ -18,6 +18,8 @@ from letta.schemas.openai.chat_completion_response import UsageStatistics
 from letta.schemas.step import Step as PydanticStep
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.telemetry_buffer import get_telemetry_buffer
+from letta.settings import settings
 from letta.utils import enforce_types
 
 
@@ -227,7 +229,7 @@ class StepManager:
 
     @enforce_types
     @trace_method
-    async def update_step_stop_reason(self, actor: PydanticUser, step_id: str, stop_reason: StopReasonType) -> PydanticStep:
+    async def update_step_stop_reason(self, actor: PydanticUser, step_id: str, stop_reason: StopReasonType) -> Optional[PydanticStep]:
         """Update the stop reason for a step.
 
         Args:
@@ -236,11 +238,15 @@ class StepManager:
             stop_reason: The stop reason to set
 
         Returns:
-            The updated step
+            The updated step, or None if the update was handed to the telemetry write-behind buffer
 
         Raises:
             NoResultFound: If the step does not exist
         """
+        if settings.telemetry_write_behind_enabled:
+            get_telemetry_buffer().add_step_update(actor, step_id, {"stop_reason": stop_reason})
+            return None
+
         async with db_registry.async_session() as session:
             step = await session.get(StepModel, step_id)
             if not step:
@@ -263,7 +269,7 @@ class StepManager:
         error_traceback: str,
         error_details: Optional[Dict] = None,
         stop_reason: Optional[LettaStopReason] = None,
-    ) -> PydanticStep:
+    ) -> Optional[PydanticStep]:
         """Update a step with error information.
 
         Args:
@@ -276,11 +282,22 @@ class StepManager:
             stop_reason: The stop reason to set
 
         Returns:
-            The updated step
+            The updated step, or None if the update was handed to the telemetry write-behind buffer
 
         Raises:
             NoResultFound: If the step does not exist
         """
+        if settings.telemetry_write_behind_enabled:
+            values = {
+                "status": StepStatus.FAILED,
+                "error_type": error_type,
+                "error_data": {"message": error_message, "traceback": error_traceback, "details": error_details},
+            }
+            if stop_reason:
+                values["stop_reason"] = stop_reason.stop_reason
+            get_telemetry_buffer().add_step_update(actor, step_id, values)
+            return None
+
         async with db_registry.async_session() as session:
             step = await session.get(StepModel, step_id)
             if not step:
@@ -305,7 +322,7 @@ class StepManager:
         step_id: str,
         usage: UsageStatistics,
         stop_reason: Optional[LettaStopReason] = None,
-    ) -> PydanticStep:
+    ) -> Optional[PydanticStep]:
         """Update a step with success status and final usage statistics.
 
         Args:
@@ -315,11 +332,23 @@ class StepManager:
             stop_reason: The stop reason to set
 
         Returns:
-            The updated step
+            The updated step, or None if the update was handed to the telemetry write-behind buffer
 
         Raises:
             NoResultFound: If the step does not exist
         """
+        if settings.telemetry_write_behind_enabled:
+            values = {
+                "status": StepStatus.SUCCESS,
+                "completion_tokens": usage.completion_tokens,
+                "prompt_tokens": usage.prompt_tokens,
+                "total_tokens": usage.total_tokens,
+            }
+            if stop_reason:
+                values["stop_reason"] = stop_reason.stop_reason
+            get_telemetry_buffer().add_step_update(actor, step_id, values)
+            return None
+
         async with db_registry.async_session() as session:
             step = await session.get(StepModel, step_id)
             if not step:
@@ -344,7 +373,7 @@ class StepManager:
         actor: PydanticUser,
         step_id: str,
         stop_reason: Optional[LettaStopReason] = None,
-    ) -> PydanticStep:
+    ) -> Optional[PydanticStep]:
         """Update a step with cancelled status.
 
         Args:
@@ -353,11 +382,18 @@ class StepManager:
             stop_reason: The stop reason to set
 
         Returns:
-            The updated step
+            The updated step, or None if the update was handed to the telemetry write-behind buffer
 
         Raises:
             NoResultFound: If the step does not exist
         """
+        if settings.telemetry_write_behind_enabled:
+            values = {"status": StepStatus.CANCELLED}
+            if stop_reason:
+                values["stop_reason"] = stop_reason.stop_reason
+            get_telemetry_buffer().add_step_update(actor, step_id, values)
+            return None
+
         async with db_registry.async_session() as session:
             step = await session.get(StepModel, step_id)
             if not step:
@@ -0,0 +1,101 @@
+"""
+Speculative compaction: summaries of the oldest in-context messages, prepared before the context window overflows.
+
+Partial-evict summarization runs when a turn finds the context window exceeded, so the turn that trips it waits for an
+extra LLM call. With `summarizer_settings.speculative_compaction` enabled, a turn that ends above
+`speculative_compaction_threshold` of the window summarizes the messages the next eviction would drop in a background
+task instead, and keeps the summary as a pending checkpoint of the agent. A later turn swaps it in, without calling the
+LLM, if the agent's context still starts with the summarized messages; otherwise the checkpoint is dropped and
+summarization happens inline as before.
+
+Checkpoints are kept in memory, per event loop, so a turn served by another process summarizes inline.
+"""
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.schemas.message import Message
+
+logger = get_logger(__name__)
+
+# checkpoints kept at most; those of the agents that went the longest without stepping are dropped first
+MAX_PENDING_CHECKPOINTS = 10_000
+
+
+@dataclass(frozen=True)
+class CompactionCheckpoint:
+    # the in-context messages summarized (those right after the system message), and the first one kept
+    summarized_message_ids: Tuple[str, ...]
+    first_kept_message_id: str
+    # not persisted until the checkpoint is swapped in
+    summary_message: Message
+
+    def matches(self, in_context_messages: List[Message]) -> bool:
+        cutoff = len(self.summarized_message_ids) + 1
+        return (
+            len(in_context_messages) > cutoff
+            and tuple(message.id for message in in_context_messages[1:cutoff]) == self.summarized_message_ids
+            and in_context_messages[cutoff].id == self.first_kept_message_id
+        )
+
+
+class CompactionCheckpointStore:
+    """The pending checkpoints of this event loop's agents, and the tasks preparing them."""
+
+    def __init__(self):
+        self._checkpoints: "OrderedDict[str, CompactionCheckpoint]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def prepare(self, agent_id: str, summarize: Callable[[], Awaitable[CompactionCheckpoint]]) -> None:
+        """Prepare a checkpoint of the agent in the background, unless one is already pending or being prepared."""
+        if agent_id in self._checkpoints or agent_id in self._tasks:
+            return
+        self._tasks[agent_id] = asyncio.create_task(self._prepare(agent_id, summarize))
+
+    async def _prepare(self, agent_id: str, summarize: Callable[[], Awaitable[CompactionCheckpoint]]) -> None:
+        try:
+            self._checkpoints[agent_id] = await summarize()
+            if len(self._checkpoints) > MAX_PENDING_CHECKPOINTS:
+                self._checkpoints.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Failed to prepare a compaction checkpoint for agent {agent_id}, it will be summarized inline: {e}")
+        finally:
+            self._tasks.pop(agent_id, None)
+
+    def take(self, agent_id: str, in_context_messages: List[Message]) -> Optional[CompactionCheckpoint]:
+        """
+        Remove the agent's checkpoint and return it if it applies to `in_context_messages`. A checkpoint that does not
+        apply (the context was compacted or reset since) never will, so it is dropped.
+        """
+        checkpoint = self._checkpoints.pop(agent_id, None)
+        if checkpoint is None or checkpoint.matches(in_context_messages):
+            return checkpoint
+        logger.info(f"Dropping the compaction checkpoint of agent {agent_id}, its context changed")
+        return None
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._checkpoints.clear()
+
+
+_stores: EventLoopRegistry[CompactionCheckpointStore] = EventLoopRegistry()
+
+
+def get_compaction_checkpoints() -> CompactionCheckpointStore:
+    """Get the checkpoint store of the running event loop."""
+    store = _stores.get()
+    if store is None:
+        store = _stores.set(CompactionCheckpointStore())
+    return store
+
+
+async def close_compaction_checkpoint_stores() -> None:
+    stores = _stores.pop_all()
+    await asyncio.gather(*[store.close() for store in stores], return_exceptions=True)
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import traceback
+from functools import partial
 from typing import List, Optional, Tuple, Union
 
 from letta.agents.ephemeral_summary_agent import EphemeralSummaryAgent
@@ -10,11 +11,13 @@ from letta.llm_api.llm_client import LLMClient
 from letta.log import get_logger
 from letta.otel.tracing import trace_method
 from letta.prompts import gpt_summarize
+from letta.schemas.agent import AgentState
 from letta.schemas.enums import MessageRole
 from letta.schemas.letta_message_content import TextContent
 from letta.schemas.llm_config import LLMConfig
 from letta.schemas.message import Message, MessageCreate
 from letta.schemas.user import User
+from letta.services.summarizer.compaction_checkpoints import CompactionCheckpoint, get_compaction_checkpoints
 from letta.services.summarizer.enums import SummarizationMode
 from letta.system import package_summarize_message_no_counts
 from letta.templates.template_helper import render_template
@@ -124,7 +127,28 @@ class Summarizer:
         # Very ugly code to pull LLMConfig etc from the SummarizerAgent if we're not using it for anything else
         assert self.summarizer_agent is not None
 
-        # First step: determine how many messages to retain
+        # The sequence to summarize is index 1 -> assistant_message_index
+        assistant_message_index = self._partial_evict_cutoff(all_in_context_messages)
+        messages_to_summarize = all_in_context_messages[1:assistant_message_index]
+
+        # Dynamically get the LLMConfig from the summarizer agent
+        # Pretty cringe code here that we need the agent for this but we don't use it
+        agent_state = await self.summarizer_agent.agent_manager.get_agent_by_id_async(
+            agent_id=self.summarizer_agent.agent_id, actor=self.summarizer_agent.actor
+        )
+        summary_message_obj = await self._summary_message(messages_to_summarize, agent_state)
+
+        # Create the message in the DB
+        await self.summarizer_agent.message_manager.create_many_messages_async(
+            pydantic_msgs=[summary_message_obj],
+            actor=self.summarizer_agent.actor,
+        )
+
+        updated_in_context_messages = all_in_context_messages[assistant_message_index:]
+        return [all_in_context_messages[0], summary_message_obj] + updated_in_context_messages, True
+
+    def _partial_evict_cutoff(self, all_in_context_messages: List[Message]) -> int:
+        """Index of the first message a partial eviction keeps; the messages between the system message and it are summarized."""
         total_message_count = len(all_in_context_messages)
         assert self.partial_evict_summarizer_percentage >= 0.0 and self.partial_evict_summarizer_percentage <= 1.0
         target_message_start = round((1.0 - self.partial_evict_summarizer_percentage) * total_message_count)
@@ -141,16 +165,11 @@ class Summarizer:
         else:
             raise ValueError(f"No assistant message found from indices {target_message_start} to {total_message_count}")
 
-        # The sequence to summarize is index 1 -> assistant_message_index
-        messages_to_summarize = all_in_context_messages[1:assistant_message_index]
         logger.info(f"Eviction indices: {1}->{assistant_message_index}(/{total_message_count})")
+        return assistant_message_index
 
-        # Dynamically get the LLMConfig from the summarizer agent
-        # Pretty cringe code here that we need the agent for this but we don't use it
-        agent_state = await self.summarizer_agent.agent_manager.get_agent_by_id_async(
-            agent_id=self.summarizer_agent.agent_id, actor=self.summarizer_agent.actor
-        )
-
+    async def _summary_message(self, messages_to_summarize: List[Message], agent_state: AgentState) -> Message:
+        """Summarize the evicted messages into the message replacing them (not persisted yet)."""
         # TODO if we do this via the "agent", then we can more easily allow toggling on the memory block version
         summary_message_str = await simple_summary(
             messages=messages_to_summarize,
@@ -183,15 +202,55 @@ class Summarizer:
             wrap_user_message=False,
             wrap_system_message=False,
         )[0]
+        return summary_message_obj
 
-        # Create the message in the DB
+    def prepare_compaction_checkpoint(self, in_context_messages: List[Message]) -> None:
+        """
+        Summarize in the background what the next partial eviction of `in_context_messages` would evict, so that a
+        later turn can swap the summary in without waiting on the LLM (see `compact_from_checkpoint`).
+        """
+        if self.mode != SummarizationMode.PARTIAL_EVICT_MESSAGE_BUFFER or self.summarizer_agent is None:
+            return
+        try:
+            assistant_message_index = self._partial_evict_cutoff(in_context_messages)
+        except ValueError:
+            assistant_message_index = 1
+        if assistant_message_index <= 1:
+            # nothing can be evicted yet
+            return
+        get_compaction_checkpoints().prepare(
+            self.summarizer_agent.agent_id, partial(self._compaction_checkpoint, list(in_context_messages), assistant_message_index)
+        )
+
+    async def _compaction_checkpoint(self, in_context_messages: List[Message], assistant_message_index: int) -> CompactionCheckpoint:
+        messages_to_summarize = in_context_messages[1:assistant_message_index]
+        agent_state = await self.summarizer_agent.agent_manager.get_agent_by_id_async(
+            agent_id=self.summarizer_agent.agent_id, actor=self.summarizer_agent.actor
+        )
+        return CompactionCheckpoint(
+            summarized_message_ids=tuple(message.id for message in messages_to_summarize),
+            first_kept_message_id=in_context_messages[assistant_message_index].id,
+            summary_message=await self._summary_message(messages_to_summarize, agent_state),
+        )
+
+    async def compact_from_checkpoint(
+        self, in_context_messages: List[Message], new_letta_messages: List[Message]
+    ) -> Optional[List[Message]]:
+        """Swap in the agent's pending compaction checkpoint, if it still applies; returns the compacted messages."""
+        if self.mode != SummarizationMode.PARTIAL_EVICT_MESSAGE_BUFFER or self.summarizer_agent is None:
+            return None
+        all_in_context_messages = in_context_messages + new_letta_messages
+        checkpoint = get_compaction_checkpoints().take(self.summarizer_agent.agent_id, all_in_context_messages)
+        if checkpoint is None:
+            return None
+
+        logger.info(f"Swapping in the compaction checkpoint summarizing {len(checkpoint.summarized_message_ids)} messages")
         await self.summarizer_agent.message_manager.create_many_messages_async(
-            pydantic_msgs=[summary_message_obj],
+            pydantic_msgs=[checkpoint.summary_message],
             actor=self.summarizer_agent.actor,
         )
-
-        updated_in_context_messages = all_in_context_messages[assistant_message_index:]
-        return [all_in_context_messages[0], summary_message_obj] + updated_in_context_messages, True
+        updated_in_context_messages = all_in_context_messages[len(checkpoint.summarized_message_ids) + 1 :]
+        return [all_in_context_messages[0], checkpoint.summary_message] + updated_in_context_messages
 
     def _static_buffer_summarization(
         self,
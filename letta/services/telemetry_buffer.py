@@ -0,0 +1,339 @@
+"""
+Write-behind buffering of step telemetry.
+
+With `settings.telemetry_write_behind_enabled`, provider traces and step status updates are taken off the agent
+step's critical path: `TelemetryManager.create_provider_trace_async` and the `StepManager.update_step_*` methods
+hand them to the `TelemetryBuffer` of the running event loop and return immediately. The buffer writes everything
+pending in one transaction per flush: provider traces as multi-row INSERTs, step updates coalesced per step and
+applied as executemany UPDATEs. A flush runs every `telemetry_flush_interval_ms`, as soon as
+`telemetry_flush_max_records` records are pending, and once more on shutdown.
+
+Steps themselves are still inserted by `StepManager.log_step_async` before the LLM call: the step's messages
+reference it through a foreign key, so it has to exist before they are written.
+
+At most `telemetry_max_buffered_records` records are held in memory. Past that, records are appended to a spill
+file (JSON lines) and written once the database catches up. Spill files left behind by a process that died are
+claimed and written by the next buffer that starts.
+
+Buffered telemetry becomes visible to readers once it is flushed, so a finished step can briefly read as pending.
+"""
+
+import asyncio
+import base64
+import os
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import DataError, IntegrityError
+
+from letta.constants import LETTA_DIR
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.helpers.json_helpers import json_dumps, json_loads
+from letta.log import get_logger
+from letta.orm.provider_trace import ProviderTrace as ProviderTraceModel
+from letta.orm.step import Step as StepModel
+from letta.schemas.enums import StepStatus
+from letta.schemas.letta_stop_reason import StopReasonType
+from letta.schemas.provider_trace import ProviderTrace as PydanticProviderTrace
+from letta.schemas.provider_trace import ProviderTraceCreate
+from letta.schemas.user import User as PydanticUser
+from letta.server.db import db_registry
+from letta.settings import settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+SPILL_FILE_PREFIX = "telemetry"
+
+# spill file tokens of the buffers alive in this process, so that their files are not claimed as orphans
+_live_spill_tokens = set()
+
+
+def get_telemetry_spill_dir() -> Path:
+    return Path(settings.telemetry_spill_dir or os.path.join(LETTA_DIR, "telemetry_spill"))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _encode_record(record: Dict[str, Any]) -> str:
+    if record["kind"] == "trace":
+        payload = record["payload"]
+        if isinstance(payload, bytes):
+            payload = {"zlib": base64.b64encode(payload).decode("ascii")}
+        record = {**record, "row": {**record["row"], "created_at": record["row"]["created_at"].isoformat()}, "payload": payload}
+    return json_dumps(record, indent=None)
+
+
+def _decode_record(line: str) -> Dict[str, Any]:
+    record = json_loads(line)
+    if record["kind"] == "trace":
+        record["row"]["created_at"] = datetime.fromisoformat(record["row"]["created_at"])
+        if "zlib" in record["payload"]:
+            record["payload"] = base64.b64decode(record["payload"]["zlib"])
+    else:
+        values = record["values"]
+        if values.get("status") is not None:
+            values["status"] = StepStatus(values["status"])
+        if values.get("stop_reason") is not None:
+            values["stop_reason"] = StopReasonType(values["stop_reason"])
+    return record
+
+
+def _trace_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    payload = record["payload"]
+    if isinstance(payload, bytes):
+        payload = json_loads(zlib.decompress(payload))
+    else:
+        # same normalization as TelemetryManager (datetimes, bytes), but off the request path
+        payload = json_loads(json_dumps(payload, indent=None))
+    return {**record["row"], **payload}
+
+
+class TelemetryBuffer:
+    """Buffers provider traces and step updates for one event loop and writes them in batches."""
+
+    def __init__(self):
+        self._traces: List[Dict[str, Any]] = []
+        # step id -> coalesced update; later updates of a column win
+        self._step_updates: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+        self._spill_token = uuid.uuid4().hex[:12]
+        self._spill_dir = get_telemetry_spill_dir()
+        self._spill_path = self._spill_dir / f"{SPILL_FILE_PREFIX}-{os.getpid()}-{self._spill_token}.jsonl"
+        # spill files waiting to be written, oldest first; new records go to the spill file while any are pending,
+        # so that everything is written in the order it was recorded
+        self._replay_paths: List[Path] = []
+        self._num_claimed = 0
+        self._spilling = False
+
+    def start(self) -> None:
+        if self._flusher is None:
+            _live_spill_tokens.add(self._spill_token)
+            self._claim_orphaned_spill_files()
+            self._flusher = safe_create_task(self._run(), logger=logger, label="flush buffered telemetry")
+
+    @property
+    def num_pending(self) -> int:
+        return len(self._traces) + len(self._step_updates)
+
+    def add_provider_trace(self, actor: PydanticUser, provider_trace_create: ProviderTraceCreate) -> PydanticProviderTrace:
+        provider_trace = PydanticProviderTrace(
+            request_json=provider_trace_create.request_json,
+            response_json=provider_trace_create.response_json,
+            step_id=provider_trace_create.step_id,
+            organization_id=provider_trace_create.organization_id,
+        )
+        payload = {"request_json": provider_trace.request_json, "response_json": provider_trace.response_json}
+        if settings.telemetry_compress_payloads:
+            payload = zlib.compress(json_dumps(payload, indent=None).encode("utf-8"))
+        row = {
+            "id": provider_trace.id,
+            "step_id": provider_trace.step_id,
+            "organization_id": provider_trace.organization_id,
+            "created_at": provider_trace.created_at,
+            "_created_by_id": actor.id,
+            "_last_updated_by_id": actor.id,
+        }
+        self._add({"kind": "trace", "row": row, "payload": payload})
+        return provider_trace
+
+    def add_step_update(self, actor: PydanticUser, step_id: str, values: Dict[str, Any]) -> None:
+        values = {**values, "_last_updated_by_id": actor.id}
+        self._add({"kind": "step", "step_id": step_id, "organization_id": actor.organization_id, "values": values})
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        if self._spilling or self.num_pending >= settings.telemetry_max_buffered_records:
+            self._spill([record])
+            return
+        if record["kind"] == "trace":
+            self._traces.append(record)
+        else:
+            self._merge_step_update(self._step_updates, record)
+        if self.num_pending >= settings.telemetry_flush_max_records:
+            self._wakeup.set()
+
+    @staticmethod
+    def _merge_step_update(step_updates: "OrderedDict[str, Dict[str, Any]]", record: Dict[str, Any]) -> None:
+        pending = step_updates.get(record["step_id"])
+        if pending is None:
+            step_updates[record["step_id"]] = {**record, "values": dict(record["values"])}
+        else:
+            pending["values"].update(record["values"])
+
+    def _spill(self, records: List[Dict[str, Any]]) -> None:
+        if not self._spilling:
+            logger.warning(f"Telemetry buffer is full, spilling to {self._spill_path}")
+            self._spilling = True
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._spill_path, "a", encoding="utf-8") as f:
+            f.writelines(_encode_record(record) + "\n" for record in records)
+
+    def _next_replay_path(self) -> Path:
+        self._num_claimed += 1
+        return self._spill_dir / f"{SPILL_FILE_PREFIX}-{os.getpid()}-{self._spill_token}-{self._num_claimed}.jsonl"
+
+    def _claim_orphaned_spill_files(self) -> None:
+        if not self._spill_dir.is_dir():
+            return
+        for path in sorted(self._spill_dir.glob(f"{SPILL_FILE_PREFIX}-*.jsonl")):
+            try:
+                _, pid, token = path.stem.split("-", 2)
+                pid = int(pid)
+            except ValueError:
+                continue
+            # a restarted process can reuse the pid of the one that died, so also check the token
+            if _pid_alive(pid) and (pid != os.getpid() or token.split("-")[0] in _live_spill_tokens):
+                continue
+            claimed = self._next_replay_path()
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                # claimed by another process
+                continue
+            logger.info(f"Claimed telemetry spill file {path} left behind by process {pid}")
+            self._replay_paths.append(claimed)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.telemetry_flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush buffered telemetry: {e}", exc_info=True)
+
+    async def flush(self) -> None:
+        """Write everything buffered so far, including spill files; records that cannot be written yet are kept."""
+        async with self._flush_lock:
+            traces, step_updates = self._traces, self._step_updates
+            self._traces, self._step_updates = [], OrderedDict()
+            if (traces or step_updates) and not await self._write_batch(traces, step_updates):
+                # keep them ahead of anything recorded since
+                self._traces = traces + self._traces
+                for record in self._step_updates.values():
+                    self._merge_step_update(step_updates, record)
+                self._step_updates = step_updates
+                return
+
+            if self._spilling:
+                claimed = self._next_replay_path()
+                if self._spill_path.exists():
+                    os.rename(self._spill_path, claimed)
+                    self._replay_paths.append(claimed)
+            while self._replay_paths:
+                if not await self._replay(self._replay_paths[0]):
+                    return
+                self._replay_paths.pop(0)
+            if self._spilling and not self._spill_path.exists():
+                self._spilling = False
+
+    async def _replay(self, path: Path) -> bool:
+        lines = (await asyncio.to_thread(path.read_text, encoding="utf-8")).splitlines()
+        batch_size = settings.telemetry_flush_max_records
+        for start in range(0, len(lines), batch_size):
+            traces, step_updates = [], OrderedDict()
+            for line in lines[start : start + batch_size]:
+                record = _decode_record(line)
+                if record["kind"] == "trace":
+                    traces.append(record)
+                else:
+                    self._merge_step_update(step_updates, record)
+            if not await self._write_batch(traces, step_updates):
+                # keep only what is left, so that written batches are not written again
+                remaining = "".join(line + "\n" for line in lines[start:])
+                await asyncio.to_thread(path.write_text, remaining, encoding="utf-8")
+                return False
+        path.unlink(missing_ok=True)
+        return True
+
+    async def _write_batch(self, traces: List[Dict[str, Any]], step_updates: "OrderedDict[str, Dict[str, Any]]") -> bool:
+        """Write a batch, dropping records that violate a constraint. Returns False if it should be retried later."""
+        try:
+            await self._write(traces, list(step_updates.values()))
+            return True
+        except (IntegrityError, DataError) as e:
+            logger.warning(f"Telemetry batch rejected, writing its records one by one: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to write {len(traces) + len(step_updates)} telemetry records, will retry: {e}")
+            return False
+
+        # e.g. a trace whose organization was deleted, or one already written before a retry
+        batches = [([trace], []) for trace in traces] + [([], [step_update]) for step_update in step_updates.values()]
+        for trace_batch, step_update_batch in batches:
+            try:
+                await self._write(trace_batch, step_update_batch)
+            except (IntegrityError, DataError) as e:
+                logger.warning(f"Dropping telemetry record that cannot be written: {e}")
+            except Exception as e:
+                logger.warning(f"Failed to write telemetry records, will retry: {e}")
+                return False
+        return True
+
+    async def _write(self, traces: List[Dict[str, Any]], step_updates: List[Dict[str, Any]]) -> None:
+        trace_rows = [_trace_row(record) for record in traces]
+
+        # executemany needs the same columns in every row
+        update_groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for record in step_updates:
+            columns = tuple(sorted(record["values"]))
+            row = {"b_step_id": record["step_id"], "b_organization_id": record["organization_id"], **record["values"]}
+            update_groups.setdefault(columns, []).append(row)
+
+        async with db_registry.async_session() as session:
+            batch_size = settings.telemetry_flush_max_records
+            for start in range(0, len(trace_rows), batch_size):
+                await session.execute(insert(ProviderTraceModel.__table__).values(trace_rows[start : start + batch_size]))
+            table = StepModel.__table__
+            for rows in update_groups.values():
+                stmt = update(table).where(table.c.id == bindparam("b_step_id"), table.c.organization_id == bindparam("b_organization_id"))
+                await session.execute(stmt, rows)
+            await session.commit()
+
+    async def close(self) -> None:
+        """Stop the periodic flush and write everything that is still buffered."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        if self.num_pending:
+            # the database is unavailable; keep the records on disk for the next process to claim
+            self._spill(self._traces + list(self._step_updates.values()))
+            self._traces, self._step_updates = [], OrderedDict()
+        _live_spill_tokens.discard(self._spill_token)
+
+
+_buffers: EventLoopRegistry[TelemetryBuffer] = EventLoopRegistry()
+
+
+def get_telemetry_buffer() -> TelemetryBuffer:
+    """Get the buffer for the running event loop, which owns its flush task."""
+    buffer = _buffers.get()
+    if buffer is None:
+        buffer = _buffers.set(TelemetryBuffer())
+        buffer.start()
+    return buffer
+
+
+async def close_telemetry_buffers() -> None:
+    buffers = _buffers.pop_all()
+    await asyncio.gather(*[buffer.close() for buffer in buffers], return_exceptions=True)
@@ -7,6 +7,8 @@ from letta.schemas.provider_trace import ProviderTraceCreate
 from letta.schemas.step import Step as PydanticStep
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.telemetry_buffer import get_telemetry_buffer
+from letta.settings import settings
 from letta.utils import enforce_types
 
 
@@ -26,6 +28,10 @@ class TelemetryManager:
     @enforce_types
     @trace_method
     async def create_provider_trace_async(self, actor: PydanticUser, provider_trace_create: ProviderTraceCreate) -> PydanticProviderTrace:
+        if settings.telemetry_write_behind_enabled:
+            # written in the background, in a batch with the traces of other steps
+            return get_telemetry_buffer().add_provider_trace(actor, provider_trace_create)
+
         async with db_registry.async_session() as session:
             provider_trace = ProviderTraceModel(**provider_trace_create.model_dump())
             if provider_trace_create.request_json:
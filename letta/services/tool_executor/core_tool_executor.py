@@ -9,6 +9,7 @@ from letta.constants import (
 )
 from letta.helpers.json_helpers import json_dumps
 from letta.schemas.agent import AgentState
+from letta.schemas.enums import MessageRole
 from letta.schemas.sandbox_config import SandboxConfig
 from letta.schemas.tool import Tool
 from letta.schemas.tool_execution_result import ToolExecutionResult
@@ -17,6 +18,7 @@ from letta.services.agent_manager import AgentManager
 from letta.services.message_manager import MessageManager
 from letta.services.passage_manager import PassageManager
 from letta.services.tool_executor.tool_executor_base import ToolExecutor
+from letta.settings import settings
 from letta.utils import get_friendly_error_msg
 
 
@@ -99,12 +101,31 @@ class LettaCoreToolExecutor(ToolExecutor):
             raise ValueError("'page' argument must be an integer")
 
         count = RETRIEVAL_QUERY_DEFAULT_PAGE_SIZE
-        messages = await MessageManager().list_user_messages_for_agent_async(
-            agent_id=agent_state.id,
-            actor=actor,
-            query_text=query,
-            limit=count,
-        )
+        if settings.message_embeddings:
+            # semantic results are fused with keyword matches, which also cover the messages not embedded (yet)
+            messages = await MessageManager().hybrid_search_messages_for_agent_async(
+                agent_id=agent_state.id,
+                actor=actor,
+                query_text=query,
+                embedding_config=agent_state.embedding_config,
+                roles=[MessageRole.user],
+                limit=count,
+            )
+        elif settings.full_text_search:
+            messages = await MessageManager().search_messages_for_agent_async(
+                agent_id=agent_state.id,
+                actor=actor,
+                query_text=query,
+                roles=[MessageRole.user],
+                limit=count,
+            )
+        else:
+            messages = await MessageManager().list_user_messages_for_agent_async(
+                agent_id=agent_state.id,
+                actor=actor,
+                query_text=query,
+                limit=count,
+            )
 
         total = len(messages)
         num_pages = math.ceil(total / count) - 1  # 0 index
@@ -143,14 +164,23 @@ class LettaCoreToolExecutor(ToolExecutor):
 
         try:
             # Get results using passage manager
-            all_results = await AgentManager().list_agent_passages_async(
-                actor=actor,
-                agent_id=agent_state.id,
-                query_text=query,
-                limit=count + start,  # Request enough results to handle offset
-                embedding_config=agent_state.embedding_config,
-                embed_query=True,
-            )
+            if settings.full_text_search:
+                all_results = await AgentManager().hybrid_search_agent_passages_async(
+                    actor=actor,
+                    agent_id=agent_state.id,
+                    query_text=query,
+                    embedding_config=agent_state.embedding_config,
+                    limit=count + start,  # Request enough results to handle offset
+                )
+            else:
+                all_results = await AgentManager().list_agent_passages_async(
+                    actor=actor,
+                    agent_id=agent_state.id,
+                    query_text=query,
+                    limit=count + start,  # Request enough results to handle offset
+                    embedding_config=agent_state.embedding_config,
+                    embed_query=True,
+                )
 
             # Apply pagination
             end = min(count + start, len(all_results))
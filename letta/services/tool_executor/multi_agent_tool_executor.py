@@ -1,5 +1,6 @@
 import asyncio
 import os
+from functools import partial
 from typing import Any, Dict, List, Optional
 
 from letta.log import get_logger
@@ -12,7 +13,10 @@ from letta.schemas.sandbox_config import SandboxConfig
 from letta.schemas.tool import Tool
 from letta.schemas.tool_execution_result import ToolExecutionResult
 from letta.schemas.user import User
+from letta.services.fan_out_scheduler import FanOutCall, get_fan_out_scheduler
+from letta.services.per_agent_lock_manager import forget_held_agent_locks
 from letta.services.tool_executor.tool_executor_base import ToolExecutor
+from letta.settings import settings
 
 logger = get_logger(__name__)
 
@@ -35,6 +39,7 @@ class LettaMultiAgentToolExecutor(ToolExecutor):
             "send_message_to_agent_and_wait_for_reply": self.send_message_to_agent_and_wait_for_reply,
             "send_message_to_agent_async": self.send_message_to_agent_async,
             "send_message_to_agents_matching_tags": self.send_message_to_agents_matching_tags_async,
+            "send_message_to_all_agents_in_group": self.send_message_to_all_agents_in_group_async,
         }
 
         if function_name not in function_map:
@@ -60,9 +65,11 @@ class LettaMultiAgentToolExecutor(ToolExecutor):
     async def send_message_to_agents_matching_tags_async(
         self, agent_state: AgentState, message: str, match_all: List[str], match_some: List[str]
     ) -> str:
-        # Find matching agents
+        from letta.agents.letta_agent import STEP_AGENT_RELATIONSHIPS
+
+        # Find matching agents, loaded with what their steps need so that the steps do not load them one by one
         matching_agents = await self.agent_manager.list_agents_matching_tags_async(
-            actor=self.actor, match_all=match_all, match_some=match_some
+            actor=self.actor, match_all=match_all, match_some=match_some, include_relationships=STEP_AGENT_RELATIONSHIPS
         )
         if not matching_agents:
             return str([])
@@ -73,14 +80,54 @@ class LettaMultiAgentToolExecutor(ToolExecutor):
             "the sender of your response] "
             f"{message}"
         )
+        return str(await self._fan_out(matching_agents, augmented_message))
 
-        tasks = [
-            asyncio.create_task(self._process_agent(agent_id=agent_state.id, message=augmented_message)) for agent_state in matching_agents
-        ]
-        results = await asyncio.gather(*tasks)
-        return str(results)
+    async def send_message_to_all_agents_in_group_async(self, agent_state: AgentState, message: str) -> str:
+        from letta.agents.letta_agent import STEP_AGENT_RELATIONSHIPS
 
-    async def _process_agent(self, agent_id: str, message: str) -> Dict[str, Any]:
+        # the sender is the supervisor of the group, which steps are not loaded with
+        supervisor = await self.agent_manager.get_agent_by_id_async(
+            agent_id=agent_state.id, actor=self.actor, include_relationships=["multi_agent_group"]
+        )
+        if supervisor.multi_agent_group is None:
+            raise ValueError(f"Agent {agent_state.id} does not manage a group")
+        worker_agents = await self.agent_manager.get_agents_by_ids_async(
+            agent_ids=supervisor.multi_agent_group.agent_ids, actor=self.actor, include_relationships=STEP_AGENT_RELATIONSHIPS
+        )
+
+        augmented_message = (
+            f"[Incoming message from agent with ID '{agent_state.id}' - to reply to this message, "
+            f"make sure to use the 'send_message' at the end, and the system will notify the sender of your response] "
+            f"{message}"
+        )
+        # the workers do not depend on each other's replies, so they run concurrently
+        return str(await self._fan_out(worker_agents, augmented_message))
+
+    async def _fan_out(self, agents: List[AgentState], message: str) -> List[Any]:
+        """Send `message` to each of `agents`, through the fan-out scheduler, and collect their replies."""
+        calls = [
+            FanOutCall(
+                key=agent.id,
+                provider=agent.llm_config.provider_name or agent.llm_config.model_endpoint_type,
+                call=partial(self._process_agent, agent_id=agent.id, message=message, agent_state=agent),
+                # the state loaded up front may be outdated once a queued step starts, so that step loads it again
+                queued_call=partial(self._process_agent, agent_id=agent.id, message=message),
+            )
+            for agent in agents
+        ]
+        results = []
+        async for result in get_fan_out_scheduler().fan_out(
+            calls, timeout_s=settings.multi_agent_send_message_timeout, deadline_s=settings.multi_agent_broadcast_deadline_s
+        ):
+            if result.status == "success":
+                results.append(result.value)
+            elif result.status == "pending":
+                results.append({"agent_id": result.key, "status": "pending", "detail": "Still processing the message, no reply yet"})
+            else:
+                results.append({"agent_id": result.key, "error": str(result.error), "type": type(result.error).__name__})
+        return results
+
+    async def _process_agent(self, agent_id: str, message: str, agent_state: Optional[AgentState] = None) -> Dict[str, Any]:
         from letta.agents.letta_agent import LettaAgent
 
         try:
@@ -94,7 +141,9 @@ class LettaMultiAgentToolExecutor(ToolExecutor):
                 actor=self.actor,
             )
 
-            letta_response = await letta_agent.step([MessageCreate(role=MessageRole.system, content=[TextContent(text=message)])])
+            letta_response = await letta_agent.step(
+                [MessageCreate(role=MessageRole.system, content=[TextContent(text=message)])], agent_state=agent_state
+            )
             messages = letta_response.messages
 
             send_message_content = [message.content for message in messages if isinstance(message, AssistantMessage)]
@@ -123,7 +172,12 @@ class LettaMultiAgentToolExecutor(ToolExecutor):
             f"{message}"
         )
 
-        task = asyncio.create_task(self._process_agent(agent_id=other_agent_id, message=prefixed))
+        async def process_detached():
+            # this run does not wait for the reply, so the recipient can queue for a lock it holds (e.g. when replying)
+            forget_held_agent_locks()
+            return await self._process_agent(agent_id=other_agent_id, message=prefixed)
+
+        task = asyncio.create_task(process_detached())
 
         task.add_done_callback(lambda t: (logger.error(f"Async send_message task failed: {t.exception()}") if t.exception() else None))
 
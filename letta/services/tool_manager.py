@@ -21,6 +21,7 @@ from letta.constants import (
 )
 from letta.errors import LettaToolNameConflictError
 from letta.functions.functions import derive_openai_json_schema, load_function_set
+from letta.helpers.agent_state_cache import invalidates_all_agent_states
 from letta.log import get_logger
 
 # TODO: Remove this once we translate all of these to the ORM
@@ -184,6 +185,7 @@ class ToolManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def bulk_upsert_tools_async(self, pydantic_tools: List[PydanticTool], actor: PydanticUser) -> List[PydanticTool]:
         """
         Bulk create or update multiple tools in a single database transaction.
@@ -396,6 +398,7 @@ class ToolManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     def update_tool_by_id(
         self,
         tool_id: str,
@@ -464,6 +467,7 @@ class ToolManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def update_tool_by_id_async(
         self,
         tool_id: str,
@@ -547,6 +551,7 @@ class ToolManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     def delete_tool_by_id(self, tool_id: str, actor: PydanticUser) -> None:
         """Delete a tool by its ID."""
         with db_registry.session() as session:
@@ -558,6 +563,7 @@ class ToolManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def delete_tool_by_id_async(self, tool_id: str, actor: PydanticUser) -> None:
         """Delete a tool by its ID."""
         async with db_registry.async_session() as session:
@@ -635,6 +641,7 @@ class ToolManager:
 
     @enforce_types
     @trace_method
+    @invalidates_all_agent_states
     async def upsert_base_tools_async(
         self,
         actor: PydanticUser,
@@ -85,6 +85,33 @@ class AsyncToolSandboxBase(ABC):
         # Select the appropriate template based on whether the function is async
         TEMPLATE_NAME = "sandbox_code_file_async.py.j2" if self.is_async_function else "sandbox_code_file.py.j2"
 
+        future_import, schema_code, tool_args = self.generate_tool_args_code()
+
+        agent_state_pickle = pickle.dumps(agent_state) if self.inject_agent_state else None
+
+        return await render_template_in_thread(
+            TEMPLATE_NAME,
+            future_import=future_import,
+            inject_agent_state=self.inject_agent_state,
+            schema_imports=schema_code,
+            agent_state_pickle=agent_state_pickle,
+            tool_args=tool_args,
+            tool_source_code=self.tool.source_code,
+            local_sandbox_result_var_name=self.LOCAL_SANDBOX_RESULT_VAR_NAME,
+            invoke_function_call=self.invoke_function_call(),
+            wrap_print_with_markers=wrap_print_with_markers,
+            start_marker=self.LOCAL_SANDBOX_RESULT_START_MARKER,
+            use_top_level_await=self.use_top_level_await(),
+        )
+
+    def generate_tool_args_code(self) -> tuple[bool, Optional[str], str]:
+        """
+        Generate the code that defines the args schema (if any) and initializes the tool arguments.
+
+        Returns:
+            (future_import, schema_code, tool_args): whether `from __future__ import annotations` is needed,
+            the pydantic schema definitions for the args, and the argument initialization code.
+        """
         future_import = False
         schema_code = None
 
@@ -105,22 +132,7 @@ class AsyncToolSandboxBase(ABC):
             for param in self.args:
                 tool_args += self.initialize_param(param, self.args[param])
 
-        agent_state_pickle = pickle.dumps(agent_state) if self.inject_agent_state else None
-
-        return await render_template_in_thread(
-            TEMPLATE_NAME,
-            future_import=future_import,
-            inject_agent_state=self.inject_agent_state,
-            schema_imports=schema_code,
-            agent_state_pickle=agent_state_pickle,
-            tool_args=tool_args,
-            tool_source_code=self.tool.source_code,
-            local_sandbox_result_var_name=self.LOCAL_SANDBOX_RESULT_VAR_NAME,
-            invoke_function_call=self.invoke_function_call(),
-            wrap_print_with_markers=wrap_print_with_markers,
-            start_marker=self.LOCAL_SANDBOX_RESULT_START_MARKER,
-            use_top_level_await=self.use_top_level_await(),
-        )
+        return future_import, schema_code, tool_args
 
     def initialize_param(self, name: str, raw_value: JsonValue) -> str:
         """
@@ -1,6 +1,7 @@
 import asyncio
 import hashlib
 import os
+import pickle
 import struct
 import sys
 import tempfile
@@ -22,6 +23,7 @@ from letta.services.helpers.tool_execution_helper import (
 )
 from letta.services.helpers.tool_parser_helper import parse_stdout_best_effort
 from letta.services.tool_sandbox.base import AsyncToolSandboxBase
+from letta.services.tool_sandbox.local_worker_pool import get_local_sandbox_worker_pool
 from letta.settings import tool_settings
 from letta.utils import get_friendly_error_msg, parse_stderr_error_msg
 
@@ -91,6 +93,18 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
             venv_path = str(os.path.join(sandbox_dir, local_configs.venv_name))
             venv_preparation_task = asyncio.create_task(self._prepare_venv(local_configs, venv_path, env))
 
+        if tool_settings.tool_sandbox_use_worker_pool:
+            if venv_preparation_task:
+                await venv_preparation_task
+            python_executable, exec_env = self._get_python_executable_and_env(local_configs, sandbox_dir, env)
+            return await self._execute_tool_worker_pool(
+                sbx_config=sbx_config,
+                python_executable=python_executable,
+                agent_state=agent_state,
+                env=exec_env,
+                cwd=sandbox_dir,
+            )
+
         # Generate and write execution script (always with markers, since we rely on stdout)
         code = await self.generate_execution_script(agent_state=agent_state, wrap_print_with_markers=True)
 
@@ -111,29 +125,7 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
                 await venv_preparation_task
 
             # Determine the python executable and environment for the subprocess
-            exec_env = env.copy()
-            if use_venv:
-                venv_path = str(os.path.join(sandbox_dir, local_configs.venv_name))
-                python_executable = find_python_executable(local_configs)
-                exec_env["VIRTUAL_ENV"] = venv_path
-                exec_env["PATH"] = os.path.join(venv_path, "bin") + ":" + exec_env["PATH"]
-            else:
-                # If not using venv, use whatever Python we are running on
-                python_executable = sys.executable
-                # For embedded/desktop environments, preserve Python paths
-                # This ensures the subprocess can find bundled modules
-                if "PYTHONPATH" in os.environ:
-                    exec_env["PYTHONPATH"] = os.environ["PYTHONPATH"]
-
-            # handle unwanted terminal behavior
-            exec_env.update(
-                {
-                    "PYTHONWARNINGS": "ignore",
-                    "NO_COLOR": "1",
-                    "TERM": "dumb",
-                    "PYTHONUNBUFFERED": "1",
-                }
-            )
+            python_executable, exec_env = self._get_python_executable_and_env(local_configs, sandbox_dir, env)
 
             # Execute in subprocess
             return await self._execute_tool_subprocess(
@@ -155,6 +147,35 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
             if not settings.debug:
                 await asyncio.to_thread(os.remove, temp_file_path)
 
+    def _get_python_executable_and_env(self, local_configs, sandbox_dir: str, env: Dict[str, str]) -> tuple[str, Dict[str, str]]:
+        """
+        Determine the python executable and environment used to run the tool.
+        """
+        exec_env = env.copy()
+        if local_configs.use_venv:
+            venv_path = str(os.path.join(sandbox_dir, local_configs.venv_name))
+            python_executable = find_python_executable(local_configs)
+            exec_env["VIRTUAL_ENV"] = venv_path
+            exec_env["PATH"] = os.path.join(venv_path, "bin") + ":" + exec_env["PATH"]
+        else:
+            # If not using venv, use whatever Python we are running on
+            python_executable = sys.executable
+            # For embedded/desktop environments, preserve Python paths
+            # This ensures the subprocess can find bundled modules
+            if "PYTHONPATH" in os.environ:
+                exec_env["PYTHONPATH"] = os.environ["PYTHONPATH"]
+
+        # handle unwanted terminal behavior
+        exec_env.update(
+            {
+                "PYTHONWARNINGS": "ignore",
+                "NO_COLOR": "1",
+                "TERM": "dumb",
+                "PYTHONUNBUFFERED": "1",
+            }
+        )
+        return python_executable, exec_env
+
     @trace_method
     async def _prepare_venv(self, local_configs, venv_path: str, env: Dict[str, str]):
         """
@@ -254,6 +275,79 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
                 sandbox_config_fingerprint=sbx_config.fingerprint(),
             )
 
+    def generate_worker_request(self, agent_state: Optional[AgentState], env: Dict[str, str], cwd: str) -> Dict[str, Any]:
+        """
+        Build the request sent to a pooled sandbox worker. The tool definition (imports, args schema and source) is
+        split from the per-call invocation so workers can cache the compiled tool module by its source hash.
+        """
+        future_import, schema_code, tool_args = self.generate_tool_args_code()
+        module_source = "\n".join(
+            part
+            for part in [
+                "from __future__ import annotations" if future_import else None,
+                "from typing import *",
+                "import letta\nfrom letta import *" if self.inject_agent_state else None,
+                schema_code,
+                self.tool.source_code,
+            ]
+            if part
+        )
+        return {
+            "source_hash": hashlib.sha256(module_source.encode("utf-8")).hexdigest(),
+            "module_source": module_source,
+            "invocation_source": f"{tool_args}\n_function_result = {self.invoke_function_call()}\n",
+            "agent_state_pickle": pickle.dumps(agent_state) if self.inject_agent_state else None,
+            "env": env,
+            "cwd": cwd,
+        }
+
+    @trace_method
+    async def _execute_tool_worker_pool(
+        self, sbx_config, python_executable: str, agent_state: Optional[AgentState], env: Dict[str, str], cwd: str
+    ) -> ToolExecutionResult:
+        """
+        Execute the tool on a warm worker from the local sandbox worker pool instead of a fresh subprocess.
+        """
+        pool = get_local_sandbox_worker_pool(
+            sandbox_config_fingerprint=sbx_config.fingerprint(), python_executable=python_executable, env=env, cwd=cwd
+        )
+        request = self.generate_worker_request(agent_state=agent_state, env=env, cwd=cwd)
+
+        log_event(name="start worker execution")
+        worker = await pool.acquire()
+        try:
+            response = await worker.execute(request, timeout=tool_settings.tool_sandbox_timeout)
+        except asyncio.TimeoutError:
+            await pool.discard(worker)
+            raise TimeoutError(f"Executing tool {self.tool_name} timed out after {tool_settings.tool_sandbox_timeout} seconds.")
+        except Exception as e:
+            await pool.discard(worker)
+            logger.error(f"Sandbox worker execution for tool {self.tool_name} encountered an error: {e}")
+            return ToolExecutionResult(
+                func_return=get_friendly_error_msg(function_name=self.tool_name, exception_name=type(e).__name__, exception_message=str(e)),
+                agent_state=None,
+                stdout=[],
+                stderr=[str(e)],
+                status="error",
+                sandbox_config_fingerprint=sbx_config.fingerprint(),
+            )
+        await pool.release(worker)
+        log_event(name="finish worker execution")
+
+        func_return = response["func_return"]
+        if response["error"]:
+            exception_name, msg = response["error"]
+            func_return = get_friendly_error_msg(function_name=self.tool_name, exception_name=exception_name, exception_message=msg)
+
+        return ToolExecutionResult(
+            func_return=func_return,
+            agent_state=response["agent_state"],
+            stdout=[response["stdout"]] if response["stdout"] else [],
+            stderr=[response["stderr"]] if response["stderr"] else [],
+            status="error" if response["error"] else "success",
+            sandbox_config_fingerprint=sbx_config.fingerprint(),
+        )
+
     def parse_out_function_results_markers(self, data: bytes) -> tuple[bytes, str]:
         """
         Parse the function results out of the stdout using special markers.
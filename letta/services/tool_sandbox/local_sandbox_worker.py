@@ -0,0 +1,143 @@
+"""
+Long-lived worker process for the local tool sandbox.
+
+This file is executed directly by the sandbox interpreter (which may be a venv without letta installed),
+so it must only depend on the standard library. Requests and responses are length-prefixed pickles
+exchanged over the process' stdin/stdout; anything a tool writes to the raw stdout fd is redirected to
+stderr so it cannot corrupt the protocol stream.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import inspect
+import io
+import os
+import pickle
+import resource
+import struct
+import sys
+import traceback
+from typing import Optional
+
+HEADER_FORMAT = ">I"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+def _read_frame(stream) -> Optional[bytes]:
+    header = stream.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        return None
+    (length,) = struct.unpack(HEADER_FORMAT, header)
+    return stream.read(length)
+
+
+def _write_frame(stream, payload: bytes) -> None:
+    stream.write(struct.pack(HEADER_FORMAT, len(payload)) + payload)
+    stream.flush()
+
+
+def _serialize_result(result):
+    # Mirrors the pydantic wrapper used by the one-shot sandbox script
+    try:
+        from typing import Any
+
+        from pydantic import BaseModel
+
+        class _TempResultWrapper(BaseModel):
+            result: Any
+
+            class Config:
+                arbitrary_types_allowed = True
+
+        return _TempResultWrapper(result=result).model_dump()["result"]
+    except ImportError:
+        print("Pydantic not available in sandbox environment, falling back to string conversion")
+        return str(result)
+    except Exception as e:
+        print(f"Failed to serialize result with Pydantic wrapper: {e}")
+        return str(result)
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+class ToolModuleCache:
+    """Compiled tool modules keyed by the hash of their source code."""
+
+    def __init__(self):
+        self._modules: dict[str, dict] = {}
+
+    def get_namespace(self, source_hash: str, module_source: str) -> dict:
+        namespace = self._modules.get(source_hash)
+        if namespace is None:
+            namespace = {"__name__": f"letta_tool_{source_hash[:16]}"}
+            exec(compile(module_source, f"<tool {source_hash[:16]}>", "exec"), namespace)
+            self._modules[source_hash] = namespace
+        return namespace
+
+
+def handle_request(request: dict, cache: ToolModuleCache) -> dict:
+    os.environ.clear()
+    os.environ.update(request["env"])
+    if request.get("cwd"):
+        os.chdir(request["cwd"])
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    func_return, agent_state, error = None, None, None
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            agent_state = pickle.loads(request["agent_state_pickle"]) if request.get("agent_state_pickle") else None
+            source_hash = request["source_hash"]
+            if hashlib.sha256(request["module_source"].encode("utf-8")).hexdigest() != source_hash:
+                raise ValueError("Tool source does not match its hash")
+
+            namespace = dict(cache.get_namespace(source_hash, request["module_source"]))
+            namespace["agent_state"] = agent_state
+            exec(compile(request["invocation_source"], "<tool invocation>", "exec"), namespace)
+            result = namespace["_function_result"]
+            if inspect.iscoroutine(result):
+                result = asyncio.run(result)
+            func_return = _serialize_result(result)
+        except Exception as e:
+            traceback.print_exc()
+            error = (type(e).__name__, str(e))
+
+    return {
+        "func_return": func_return,
+        "agent_state": agent_state,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "error": error,
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+
+def main() -> None:
+    # Keep private handles on the protocol pipes, then point the raw fds away from them
+    protocol_in = os.fdopen(os.dup(sys.stdin.fileno()), "rb")
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, sys.stdin.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    cache = ToolModuleCache()
+    while True:
+        frame = _read_frame(protocol_in)
+        if frame is None:
+            break
+        response = handle_request(pickle.loads(frame), cache)
+        try:
+            payload = pickle.dumps(response)
+        except Exception as e:
+            # e.g. a tool mutated agent_state into something unpicklable
+            response.update(agent_state=None, func_return=str(response["func_return"]), error=(type(e).__name__, str(e)))
+            payload = pickle.dumps(response)
+        _write_frame(protocol_out, payload)
+
+
+if __name__ == "__main__":
+    main()
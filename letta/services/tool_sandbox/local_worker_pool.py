@@ -0,0 +1,154 @@
+import asyncio
+import os
+import pickle
+import struct
+from typing import Any, Dict
+
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.log import get_logger
+from letta.settings import tool_settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+WORKER_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_sandbox_worker.py")
+HEADER_FORMAT = ">I"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+class LocalSandboxWorker:
+    """A warm sandbox interpreter that executes tool calls sent over its stdin/stdout pipes."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.num_calls = 0
+        self.max_rss_mb = 0.0
+
+    @classmethod
+    async def spawn(cls, python_executable: str, env: Dict[str, str], cwd: str) -> "LocalSandboxWorker":
+        process = await asyncio.create_subprocess_exec(
+            python_executable,
+            WORKER_SCRIPT_PATH,
+            env=env,
+            cwd=cwd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        return cls(process)
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process.returncode is None
+
+    def should_recycle(self) -> bool:
+        return (
+            not self.is_alive
+            or self.num_calls >= tool_settings.tool_sandbox_worker_max_calls
+            or self.max_rss_mb >= tool_settings.tool_sandbox_worker_max_memory_mb
+        )
+
+    async def execute(self, request: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Send one request to the worker and wait for its response."""
+        payload = pickle.dumps(request)
+        self.process.stdin.write(struct.pack(HEADER_FORMAT, len(payload)) + payload)
+        await self.process.stdin.drain()
+
+        async def _read_response():
+            header = await self.process.stdout.readexactly(HEADER_SIZE)
+            (length,) = struct.unpack(HEADER_FORMAT, header)
+            return pickle.loads(await self.process.stdout.readexactly(length))
+
+        try:
+            response = await asyncio.wait_for(_read_response(), timeout=timeout)
+        except asyncio.IncompleteReadError:
+            raise RuntimeError(f"Sandbox worker exited unexpectedly with code {await self.process.wait()}")
+
+        self.num_calls += 1
+        self.max_rss_mb = response.get("max_rss_mb", 0.0)
+        return response
+
+    async def close(self) -> None:
+        if not self.is_alive:
+            return
+        try:
+            self.process.stdin.close()
+            await asyncio.wait_for(self.process.wait(), timeout=5)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.process.kill()
+            await self.process.wait()
+
+
+class LocalSandboxWorkerPool:
+    """
+    Pool of warm sandbox workers for one (sandbox config, interpreter) pair.
+
+    Workers are reused across tool calls and recycled after `tool_sandbox_worker_max_calls` calls or once their peak
+    memory crosses `tool_sandbox_worker_max_memory_mb`. A replacement is forked in the background so the next call
+    finds a warm worker.
+    """
+
+    def __init__(self, python_executable: str, env: Dict[str, str], cwd: str):
+        self.python_executable = python_executable
+        self.env = env
+        self.cwd = cwd
+        self._idle_workers: list[LocalSandboxWorker] = []
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> LocalSandboxWorker:
+        async with self._lock:
+            while self._idle_workers:
+                worker = self._idle_workers.pop()
+                if worker.is_alive:
+                    return worker
+        return await LocalSandboxWorker.spawn(self.python_executable, self.env, self.cwd)
+
+    async def release(self, worker: LocalSandboxWorker) -> None:
+        if worker.should_recycle():
+            await self.discard(worker)
+            return
+        async with self._lock:
+            if len(self._idle_workers) < tool_settings.tool_sandbox_worker_pool_size:
+                self._idle_workers.append(worker)
+                return
+        await worker.close()
+
+    async def discard(self, worker: LocalSandboxWorker) -> None:
+        """Close a worker that must not be reused and fork a warm replacement."""
+        await worker.close()
+        safe_create_task(self._replenish(), logger=logger, label="replenish local sandbox worker pool")
+
+    async def _replenish(self) -> None:
+        async with self._lock:
+            if len(self._idle_workers) >= tool_settings.tool_sandbox_worker_pool_size:
+                return
+        worker = await LocalSandboxWorker.spawn(self.python_executable, self.env, self.cwd)
+        await self.release(worker)
+
+    async def close(self) -> None:
+        async with self._lock:
+            workers, self._idle_workers = self._idle_workers, []
+        await asyncio.gather(*[worker.close() for worker in workers])
+
+
+_worker_pools: EventLoopRegistry[Dict[tuple, LocalSandboxWorkerPool]] = EventLoopRegistry()
+
+
+def get_local_sandbox_worker_pool(
+    sandbox_config_fingerprint: str, python_executable: str, env: Dict[str, str], cwd: str
+) -> LocalSandboxWorkerPool:
+    """Get (or create) the worker pool for a sandbox config and interpreter on the running event loop."""
+    # worker pipes are bound to the loop that created them
+    pools = _worker_pools.get()
+    if pools is None:
+        pools = _worker_pools.set({})
+    key = (sandbox_config_fingerprint, python_executable, cwd)
+    pool = pools.get(key)
+    if pool is None:
+        pool = pools[key] = LocalSandboxWorkerPool(python_executable=python_executable, env=env, cwd=cwd)
+    return pool
+
+
+async def close_local_sandbox_worker_pools() -> None:
+    pools = [pool for loop_pools in _worker_pools.pop_all() for pool in loop_pools.values()]
+    await asyncio.gather(*[pool.close() for pool in pools], return_exceptions=True)
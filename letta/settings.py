@@ -1,9 +1,9 @@
 import os
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
-from pydantic import AliasChoices, Field
+from pydantic import AliasChoices, Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from letta.local_llm.constants import DEFAULT_WRAPPER_NAME, INNER_THOUGHTS_KWARG
@@ -30,12 +30,22 @@ class ToolSettings(BaseSettings):
     tool_exec_venv_name: Optional[str] = None
     tool_exec_autoreload_venv: bool = True
 
+    # Local sandbox worker pool (reuses warm interpreters instead of spawning one per tool call)
+    tool_sandbox_use_worker_pool: bool = False
+    tool_sandbox_worker_pool_size: int = 4  # max idle workers per sandbox config / interpreter
+    tool_sandbox_worker_max_calls: int = 100  # recycle a worker after this many tool calls
+    tool_sandbox_worker_max_memory_mb: int = 512  # recycle a worker once its peak RSS crosses this
+
     # MCP settings
     mcp_connect_to_server_timeout: float = 30.0
     mcp_list_tools_timeout: float = 30.0
     mcp_execute_tool_timeout: float = 60.0
     mcp_read_from_config: bool = False  # if False, will throw if attempting to read/write from file
     mcp_disable_stdio: bool = False
+    mcp_enable_session_pool: bool = False  # reuse long-lived MCP connections across tool calls
+    mcp_session_pool_max_sessions: int = 32
+    mcp_session_idle_timeout: float = 300.0  # seconds before an unused pooled session is closed
+    mcp_session_health_check_interval: float = 60.0  # ping pooled sessions idle for longer than this before reuse
 
     @property
     def sandbox_type(self) -> SandboxType:
@@ -61,6 +71,11 @@ class SummarizerSettings(BaseSettings):
     # eviction based on percentage of message count, not token count
     partial_evict_summarizer_percentage: float = 0.30
 
+    # summarize ahead of context window overflow in the background, see letta/services/summarizer/compaction_checkpoints.py
+    speculative_compaction: bool = False
+    # fraction of the context window above which a turn prepares the next summary
+    speculative_compaction_threshold: float = Field(default=0.8, gt=0, le=1)
+
     # TODO(cliandy): the below settings are tied to old summarization and should be deprecated or moved
     # Controls if we should evict all messages
     # TODO: Can refactor this into an enum if we have a bunch of different kinds of summarizers
@@ -130,6 +145,19 @@ class ModelSettings(BaseSettings):
     anthropic_api_key: Optional[str] = None
     anthropic_max_retries: int = 3
 
+    # shared provider SDK clients with keep-alive connection pools
+    llm_client_pool_enabled: bool = Field(
+        default=False, description="Share LLM provider clients and their connection pools across requests"
+    )
+    llm_client_pool_max_clients: int = Field(default=256, ge=1, description="Maximum number of pooled clients per event loop")
+    llm_client_pool_max_connections: int = 100
+    llm_client_pool_max_keepalive_connections: int = 20
+    llm_client_pool_keepalive_expiry: float = 60.0
+    llm_client_pool_http2: bool = Field(default=True, description="Use HTTP/2 for pooled clients when the h2 package is installed")
+    byok_override_key_cache_ttl: float = Field(
+        default=60.0, ge=0, description="Seconds to cache BYOK provider API keys in-process (0 disables the cache)"
+    )
+
     # ollama
     ollama_base_url: Optional[str] = None
 
@@ -198,6 +226,24 @@ class DatabaseChoice(str, Enum):
     SQLITE = "sqlite"
 
 
+class RunCancellationBackend(str, Enum):
+    # re-read the run from the database at every check
+    POLL = "poll"
+    # in-process only; cancellations must be requested on the process running the agent
+    LOCAL = "local"
+    REDIS = "redis"
+    POSTGRES = "postgres"
+
+
+class AgentLockBackend(str, Enum):
+    # runs of the same agent are not serialized
+    NONE = "none"
+    # in-process only; correct for a single API process
+    LOCAL = "local"
+    POSTGRES = "postgres"
+    REDIS = "redis"
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="letta_", extra="ignore")
 
@@ -229,16 +275,145 @@ class Settings(BaseSettings):
     pool_use_lifo: bool = True
     disable_sqlalchemy_pooling: bool = False
     db_max_concurrent_sessions: Optional[int] = None
+    sqlite_vector_index: bool = Field(
+        default=False, description="Serve SQLite passage and message vector search from sqlite-vec indexes instead of a full table scan"
+    )
+    # keyword and hybrid search in archival_memory_search / conversation_search through full-text indexes
+    full_text_search: bool = Field(
+        default=False,
+        description="Rank conversation_search by full-text relevance and fuse full-text and vector rankings in archival_memory_search",
+    )
+    hybrid_search_rrf_k: int = Field(
+        default=60, ge=1, description="Rank constant of the reciprocal rank fusion of full-text and vector search results"
+    )
+    # semantic recall: messages are embedded in the background after they are written
+    message_embeddings: bool = Field(
+        default=False,
+        description=(
+            "Embed user and assistant messages with the agent's embedding config so conversation_search can rank by similarity, "
+            "fused with keyword matches. Postgres searches them through an hnsw index, SQLite through sqlite-vec with "
+            "sqlite_vector_index and with an exact scan otherwise"
+        ),
+    )
+    message_embedding_concurrency: int = Field(
+        default=2, ge=1, description="Batches of new messages embedded concurrently in the background, per event loop"
+    )
+    run_cancellation_backend: RunCancellationBackend = Field(
+        default=RunCancellationBackend.POLL,
+        description="How run cancellations reach agents and open streams: poll the jobs table, or push through an in-process, "
+        "Redis pub/sub or Postgres LISTEN/NOTIFY bus",
+    )
+    agent_lock_backend: AgentLockBackend = Field(
+        default=AgentLockBackend.NONE,
+        description="Queue concurrent runs of the same agent instead of letting them race on its in-context messages: within this "
+        "process, or across processes through Postgres advisory locks or Redis leases",
+    )
+    agent_lock_wait_timeout: float = Field(
+        default=600.0, gt=0, description="Seconds a run waits for earlier runs of the same agent before it fails"
+    )
+    agent_lock_lease_ttl: float = Field(
+        default=30.0, gt=0, description="Seconds a Redis agent lease outlives its last renewal; holders renew it every third of this"
+    )
+    # durable file ingestion queue (jobs table) instead of processing uploads on the API event loop
+    file_ingestion_queue_enabled: bool = False
+    file_ingestion_run_worker: bool = Field(
+        default=True, description="Run a file ingestion worker in each API process; disable when running `letta ingest-worker` separately"
+    )
+    file_ingestion_worker_concurrency: int = Field(default=4, ge=1, description="Files processed concurrently by one worker")
+    file_ingestion_max_concurrent_per_org: int = Field(default=2, ge=1, description="Files processed concurrently per organization")
+    file_ingestion_max_attempts: int = Field(default=3, ge=1)
+    file_ingestion_retry_base_delay: float = Field(default=10.0, ge=0, description="Seconds before the first retry, doubled per attempt")
+    file_ingestion_poll_interval: float = 2.0
+    file_ingestion_lease_timeout: float = Field(
+        default=300.0, gt=0, description="Seconds without a heartbeat after which a running ingestion job is queued again"
+    )
+    file_ingestion_spool_dir: Optional[str] = Field(
+        default=None, description="Where uploads wait for a worker (default: LETTA_DIR/file_ingestion); must be shared by all workers"
+    )
+    # parse and chunk uploads in worker processes instead of on the event loop
+    file_parsing_process_pool_enabled: bool = False
+    file_parsing_process_pool_size: int = Field(default=2, ge=1, description="Maximum number of parse worker processes per API process")
+    file_parsing_inline_max_bytes: int = Field(
+        default=1024 * 1024, ge=0, description="Plain text files (and extracted text) up to this size are parsed and chunked inline"
+    )
+    file_parsing_timeout: float = Field(default=300.0, gt=0, description="Seconds a parse worker may spend on one file before it is killed")
+    file_parsing_max_memory_mb: int = Field(
+        default=2048, ge=64, description="Memory a parse worker may allocate on top of its baseline; larger files fail with MemoryError"
+    )
+    file_parsing_worker_max_files: int = Field(default=50, ge=1, description="Recycle a parse worker after this many files")
+    archival_bulk_insert_max_texts: int = Field(
+        default=10000, ge=1, description="Maximum number of texts accepted by one bulk archival insert"
+    )
+    archival_bulk_embedding_concurrency: int = Field(
+        default=4, ge=1, description="Embedding batches requested concurrently by one bulk archival insert"
+    )
 
     redis_host: Optional[str] = Field(default=None, description="Host for Redis instance")
     redis_port: Optional[int] = Field(default=6379, description="Port for Redis instance")
+    store_message_token_counts: bool = Field(
+        default=False,
+        description="Count tokens when messages are written and use the stored counts to decide when to summarize, "
+        "instead of provider usage summed over every step of a request",
+    )
+    token_count_cache_size: int = Field(
+        default=4096, ge=0, description="Entries in the in-process token count cache, in front of Redis when configured (0 disables)"
+    )
+    embedding_cache_size: int = Field(
+        default=0, ge=0, description="Entries in the in-process embedding cache, keyed by embedding config and text hash (0 disables)"
+    )
+    embedding_cache_redis_ttl_s: int = Field(
+        default=0, ge=0, description="Also cache embeddings in Redis for this many seconds, shared across processes (0 disables)"
+    )
+    # serve model listings and handle lookups from a cached per-provider catalog instead of calling provider APIs per request
+    model_catalog_enabled: bool = False
+    model_catalog_ttl_s: float = Field(
+        default=600.0, gt=0, description="Seconds before a provider's cached model list is refreshed in the background"
+    )
+    model_catalog_provider_ttls: Dict[str, float] = Field(
+        default_factory=dict, description="Per-provider overrides of model_catalog_ttl_s, keyed by provider name or type"
+    )
+    model_catalog_snapshot_dir: Optional[str] = Field(
+        default=None, description="Where last-known-good model lists are persisted for cold starts (default: LETTA_DIR/model_catalog)"
+    )
+    agent_state_cache_size: int = Field(
+        default=0, ge=0, description="Agent states kept in the in-process read-through cache behind get_agent_by_id_async (0 disables)"
+    )
+    agent_state_cache_ttl_s: float = Field(
+        default=60.0, gt=0, description="Seconds a cached agent state is served without a mutation having invalidated it"
+    )
+    agent_state_cache_redis_invalidation: bool = Field(
+        default=False,
+        description="Check agent state versions in Redis on every cache lookup so mutations on any process invalidate every cache",
+    )
 
     plugin_register: Optional[str] = None
 
     # multi agent settings
     multi_agent_send_message_max_retries: int = 3
     multi_agent_send_message_timeout: int = 20 * 60
-    multi_agent_concurrent_sends: int = 50
+    multi_agent_concurrent_sends: int = Field(
+        default=50, ge=1, description="Messages multi-agent tools process on other agents at the same time, across all sends of a process"
+    )
+    multi_agent_concurrent_sends_per_provider: int = Field(
+        default=10, ge=1, description="Messages multi-agent tools process at the same time on agents using the same LLM provider"
+    )
+    multi_agent_broadcast_deadline_s: float = Field(
+        default=5 * 60,
+        gt=0,
+        description="Seconds send_message_to_agents_matching_tags waits for replies; agents that have not replied by then keep processing the message",
+    )
+    async_group_runtimes: bool = Field(
+        default=False,
+        description="Run round-robin, dynamic and supervisor groups on the async agent loop instead of the legacy sync agent",
+    )
+
+    # parallel tool calling
+    enable_parallel_tool_calls: bool = Field(
+        default=False, description="Allow the model to emit several tool calls per response and execute them concurrently"
+    )
+    parallel_tool_calls_max_concurrency: int = Field(
+        default=4, ge=1, description="Maximum number of tool calls from a single response that execute at the same time"
+    )
 
     # telemetry logging
     otel_exporter_otlp_endpoint: str | None = None  # otel default: "http://localhost:4317"
@@ -251,6 +426,17 @@ class Settings(BaseSettings):
     track_errored_messages: bool = Field(default=True, description="Enable tracking for errored messages")
     track_stop_reason: bool = Field(default=True, description="Enable tracking stop reason on steps.")
     track_agent_run: bool = Field(default=True, description="Enable tracking agent run with cancellation support")
+    # write provider traces and step status updates in background batches instead of on each step
+    telemetry_write_behind_enabled: bool = False
+    telemetry_flush_interval_ms: int = Field(default=500, ge=1, description="Milliseconds between flushes of buffered telemetry")
+    telemetry_flush_max_records: int = Field(default=200, ge=1, description="Flush as soon as this many telemetry records are buffered")
+    telemetry_max_buffered_records: int = Field(
+        default=10000, ge=1, description="Telemetry records held in memory; further records spill to a local file until flushed"
+    )
+    telemetry_compress_payloads: bool = Field(
+        default=False, description="zlib-compress provider trace payloads while they are buffered or spilled"
+    )
+    telemetry_spill_dir: Optional[str] = Field(default=None, description="Where telemetry spills to (default: LETTA_DIR/telemetry_spill)")
 
     # FastAPI Application Settings
     uvicorn_workers: int = 1
@@ -302,6 +488,15 @@ class Settings(BaseSettings):
     file_processing_timeout_minutes: int = 30
     file_processing_timeout_error_message: str = "File processing timed out after {} minutes. Please try again."
 
+    @model_validator(mode="after")
+    def check_run_cancellation_backend(self) -> "Settings":
+        if self.run_cancellation_backend == RunCancellationBackend.LOCAL and self.uvicorn_workers > 1:
+            raise ValueError(
+                "run_cancellation_backend 'local' only reaches the process that requested the cancellation; "
+                "use 'poll', 'redis' or 'postgres' with more than one uvicorn worker"
+            )
+        return self
+
     @property
     def letta_pg_uri(self) -> str:
         if self.pg_uri:
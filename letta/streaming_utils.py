@@ -1,4 +1,5 @@
-from typing import Optional, Tuple
+import re
+from typing import Dict, List, Optional, Set, Tuple
 
 from letta.constants import DEFAULT_MESSAGE_TOOL_KWARG
 from letta.local_llm.constants import INNER_THOUGHTS_KWARG
@@ -275,3 +276,233 @@ class FunctionArgumentsStreamHandler:
             return None
 
         return None
+
+
+_STRING_RUN = re.compile(r'[^"\\]+')
+_NESTED_RUN = re.compile(r'[^"{}\[\]]+')
+_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class StreamingJSONFieldParser:
+    """
+    Resumable parser for the JSON object of streamed tool call arguments.
+
+    Re-parsing the accumulated arguments on every delta and diffing against the previous parse costs O(n) per delta,
+    so O(n^2) per tool call. This parser keeps its state across fragments (position in the object, the key being read,
+    an escape sequence cut off by the end of a fragment) and reports the decoded text each fragment adds to the
+    top-level string values, so every character is only looked at once.
+
+    Only the top level of the object is tracked: nested objects and arrays, numbers and literals are skipped over.
+
+    **Usage:**
+
+    ```python
+    parser = StreamingJSONFieldParser()
+    for fragment in fragments:
+        deltas = parser.process_fragment(fragment)  # e.g. {"message": "Hel"}
+    ```
+    """
+
+    def __init__(self):
+        self.state = "start"  # Possible states: start, key_or_end, key, colon, value, string, nested, primitive, comma_or_end, end
+        # top-level keys whose value has started, in order, and those whose value is complete
+        self.keys: List[str] = []
+        self.completed_keys: Set[str] = set()
+        self.current_key: Optional[str] = None
+        self._key_parts: List[str] = []
+        self._value_parts: Dict[str, List[str]] = {}
+        # escape sequence read so far without its backslash (e.g. "u00"), while it spans fragments
+        self._escape: Optional[str] = None
+        # a \uXXXX high surrogate waiting for the low surrogate that may follow it
+        self._high_surrogate: Optional[int] = None
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escaped = False
+
+    def process_fragment(self, fragment: str) -> Dict[str, str]:
+        """Consume the next fragment of the arguments, returning the decoded text it adds to each top-level string value."""
+        deltas: Dict[str, str] = {}
+        mark = len(self._value_parts[self.current_key]) if self.state == "string" else 0
+        i, n = 0, len(fragment)
+        while i < n:
+            state = self.state
+            if state == "string":
+                parts = self._value_parts[self.current_key]
+                i, closed = self._read_string(fragment, i, parts)
+                if closed:
+                    self._add_delta(deltas, parts, mark)
+                    self.completed_keys.add(self.current_key)
+                    self.state = "comma_or_end"
+                continue
+            if state == "key":
+                i, closed = self._read_string(fragment, i, self._key_parts)
+                if closed:
+                    self.current_key = "".join(self._key_parts)
+                    self.state = "colon"
+                continue
+            if state == "nested":
+                i = self._skip_nested(fragment, i)
+                continue
+            if state == "end":
+                break
+
+            c = fragment[i]
+            i += 1
+            if c in " \t\r\n":
+                if state == "primitive":
+                    self._complete_primitive("comma_or_end")
+                continue
+            if state == "start":
+                if c == "{":
+                    self.state = "key_or_end"
+            elif state == "key_or_end":
+                if c == '"':
+                    self._key_parts = []
+                    self.state = "key"
+                elif c == "}":
+                    self.state = "end"
+            elif state == "colon":
+                if c == ":":
+                    self.state = "value"
+            elif state == "value":
+                if self.current_key not in self._value_parts:
+                    self.keys.append(self.current_key)
+                self._value_parts[self.current_key] = []
+                if c == '"':
+                    mark = 0
+                    self.state = "string"
+                elif c in "{[":
+                    self._depth = 1
+                    self.state = "nested"
+                else:
+                    self._value_parts[self.current_key].append(c)
+                    self.state = "primitive"
+            elif state == "primitive":
+                if c == ",":
+                    self._complete_primitive("key_or_end")
+                elif c == "}":
+                    self._complete_primitive("end")
+                else:
+                    self._value_parts[self.current_key].append(c)
+            elif state == "comma_or_end":
+                if c == ",":
+                    self.state = "key_or_end"
+                elif c == "}":
+                    self.state = "end"
+
+        if self.state == "string":
+            self._add_delta(deltas, self._value_parts[self.current_key], mark)
+        return deltas
+
+    def value(self, key: str) -> Optional[str]:
+        """The decoded value of a top-level string, or the raw text of a top-level number or literal, read so far."""
+        parts = self._value_parts.get(key)
+        return None if parts is None else "".join(parts)
+
+    def _add_delta(self, deltas: Dict[str, str], parts: List[str], mark: int) -> None:
+        delta = "".join(parts[mark:])
+        if delta:
+            deltas[self.current_key] = deltas.get(self.current_key, "") + delta
+
+    def _complete_primitive(self, next_state: str) -> None:
+        self.completed_keys.add(self.current_key)
+        self.state = next_state
+
+    def _read_string(self, fragment: str, i: int, parts: List[str]) -> Tuple[int, bool]:
+        """Decode string contents from `fragment[i:]` into `parts`; returns where reading stopped, and whether the string closed."""
+        n = len(fragment)
+        while i < n:
+            if self._escape is not None:
+                i = self._read_escape(fragment, i, parts)
+                continue
+            run = _STRING_RUN.match(fragment, i)
+            if run:
+                self._flush_surrogate(parts)
+                parts.append(run.group())
+                i = run.end()
+                continue
+            c = fragment[i]
+            i += 1
+            if c == '"':
+                self._flush_surrogate(parts)
+                return i, True
+            self._escape = ""
+        return i, False
+
+    def _read_escape(self, fragment: str, i: int, parts: List[str]) -> int:
+        if not self._escape:
+            c = fragment[i]
+            if c != "u":
+                self._escape = None
+                self._flush_surrogate(parts)
+                parts.append(_SIMPLE_ESCAPES.get(c, c))
+                return i + 1
+            self._escape = "u"
+            i += 1
+        digits = fragment[i : i + 5 - len(self._escape)]
+        self._escape += digits
+        i += len(digits)
+        if len(self._escape) == 5:
+            escape, self._escape = self._escape, None
+            try:
+                code_point = int(escape[1:], 16)
+            except ValueError:
+                # not valid JSON; keep the text rather than failing the stream
+                self._flush_surrogate(parts)
+                parts.append("\\" + escape)
+                return i
+            self._append_code_point(code_point, parts)
+        return i
+
+    def _append_code_point(self, code_point: int, parts: List[str]) -> None:
+        if 0xD800 <= code_point < 0xDC00:
+            self._flush_surrogate(parts)
+            self._high_surrogate = code_point
+            return
+        if 0xDC00 <= code_point < 0xE000 and self._high_surrogate is not None:
+            code_point = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code_point - 0xDC00)
+            self._high_surrogate = None
+        else:
+            self._flush_surrogate(parts)
+        parts.append(chr(code_point))
+
+    def _flush_surrogate(self, parts: List[str]) -> None:
+        # a high surrogate that is not followed by a low one is kept as is, like `json.loads` does
+        if self._high_surrogate is not None:
+            parts.append(chr(self._high_surrogate))
+            self._high_surrogate = None
+
+    def _skip_nested(self, fragment: str, i: int) -> int:
+        n = len(fragment)
+        while i < n:
+            if self._nested_in_string:
+                if self._nested_escaped:
+                    self._nested_escaped = False
+                    i += 1
+                    continue
+                run = _STRING_RUN.match(fragment, i)
+                if run:
+                    i = run.end()
+                    continue
+                if fragment[i] == '"':
+                    self._nested_in_string = False
+                else:
+                    self._nested_escaped = True
+                i += 1
+                continue
+            run = _NESTED_RUN.match(fragment, i)
+            if run:
+                i = run.end()
+                continue
+            c = fragment[i]
+            i += 1
+            if c == '"':
+                self._nested_in_string = True
+            elif c in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete_primitive("comma_or_end")
+                    return i
+        return i
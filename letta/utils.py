@@ -15,7 +15,7 @@ import uuid
 from collections.abc import Coroutine
 from contextlib import contextmanager
 from datetime import datetime, timezone
-from functools import wraps
+from functools import lru_cache, wraps
 from logging import Logger
 from typing import Any, Coroutine, Optional, Union, _GenericAlias, get_args, get_origin, get_type_hints
 from urllib.parse import urljoin, urlparse
@@ -808,13 +808,18 @@ class OpenAIBackcompatUnpickler(pickle.Unpickler):
         return super().find_class(module, name)
 
 
-def count_tokens(s: str, model: str = "gpt-4") -> int:
+@lru_cache(maxsize=128)
+def get_tiktoken_encoding(model: str) -> tiktoken.Encoding:
+    """Memoized `tiktoken.encoding_for_model`, falling back to cl100k_base for unknown models."""
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
         print("Falling back to cl100k base for token counting.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(s))
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(s: str, model: str = "gpt-4") -> int:
+    return len(get_tiktoken_encoding(model).encode(s))
 
 
 def printd(*args, **kwargs):
@@ -1138,6 +1143,13 @@ class CancellationSignal:
         if not self.job_manager or not self.job_id or not self.actor:
             return False
 
+        from letta.services.run_cancellation_bus import get_run_cancellation_bus
+
+        cancellation_bus = get_run_cancellation_bus()
+        if cancellation_bus is not None:
+            self._is_cancelled = cancellation_bus.is_cancelled(self.job_id)
+            return self._is_cancelled
+
         try:
             job = await self.job_manager.get_job_by_id_async(job_id=self.job_id, actor=self.actor)
             self._is_cancelled = job.status == JobStatus.cancelled
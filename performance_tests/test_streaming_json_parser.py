@@ -0,0 +1,81 @@
+"""
+Micro-benchmark of parsing streamed tool call arguments.
+
+Simulates a `send_message` tool call streamed in token-sized deltas, and compares re-parsing the accumulated arguments
+on every delta (`OptimisticJSONParser`, `PydanticJSONParser`, as the streaming interfaces used to) with feeding each
+delta to `StreamingJSONFieldParser`. Run with `pytest -s performance_tests/test_streaming_json_parser.py`, or as a script.
+"""
+
+import json
+import time
+
+import pytest
+
+from letta.constants import DEFAULT_MESSAGE_TOOL_KWARG
+from letta.local_llm.constants import INNER_THOUGHTS_KWARG
+from letta.server.rest_api.json_parser import OptimisticJSONParser, PydanticJSONParser
+from letta.streaming_utils import StreamingJSONFieldParser
+
+# roughly the length of a token
+DELTA_SIZE = 4
+MESSAGE_LENGTHS = [100, 1_000, 10_000]
+
+
+def _deltas(message_length: int):
+    sentence = 'The quick brown fox said "hi" and jumped over the lazy dog. 🦊\n'
+    message = (sentence * (message_length // len(sentence) + 1))[:message_length]
+    arguments = json.dumps({INNER_THOUGHTS_KWARG: "The user greeted me, I should reply.", DEFAULT_MESSAGE_TOOL_KWARG: message})
+    return message, [arguments[i : i + DELTA_SIZE] for i in range(0, len(arguments), DELTA_SIZE)]
+
+
+def _stream_reparsing(parser, deltas) -> str:
+    accumulated, previous, streamed = "", "", []
+    for delta in deltas:
+        accumulated += delta
+        current = parser.parse(accumulated).get(DEFAULT_MESSAGE_TOOL_KWARG) or ""
+        streamed.append(current[len(previous) :])
+        previous = current
+    return "".join(streamed)
+
+
+def _stream_incremental(deltas) -> str:
+    parser = StreamingJSONFieldParser()
+    return "".join(parser.process_fragment(delta).get(DEFAULT_MESSAGE_TOOL_KWARG, "") for delta in deltas)
+
+
+STREAMERS = {
+    "optimistic": lambda deltas: _stream_reparsing(OptimisticJSONParser(), deltas),
+    "pydantic": lambda deltas: _stream_reparsing(PydanticJSONParser(), deltas),
+    "incremental": _stream_incremental,
+}
+
+
+def _time(streamer, deltas, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        streamer(deltas)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize("message_length", MESSAGE_LENGTHS)
+def test_streaming_json_parser_benchmark(message_length):
+    message, deltas = _deltas(message_length)
+    timings = {}
+    # re-parsing can misreport escapes split across deltas, so only the incremental output is checked
+    assert _stream_incremental(deltas) == message
+    for name, streamer in STREAMERS.items():
+        timings[name] = _time(streamer, deltas)
+
+    print(
+        f"\n{message_length} chars in {len(deltas)} deltas: "
+        + ", ".join(f"{name} {seconds * 1e6 / len(deltas):.1f}us/delta" for name, seconds in timings.items())
+    )
+    if message_length >= 10_000:
+        assert timings["incremental"] < min(timings["optimistic"], timings["pydantic"])
+
+
+if __name__ == "__main__":
+    for length in MESSAGE_LENGTHS:
+        test_streaming_json_parser_benchmark(length)
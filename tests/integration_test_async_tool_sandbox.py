@@ -597,6 +597,43 @@ async def test_local_sandbox_per_agent_env(disable_e2b_api_key, get_env_tool, ag
     assert correct_val in result.func_return
 
 
+@pytest.mark.asyncio
+@pytest.mark.local_sandbox
+async def test_local_sandbox_worker_pool_reuses_worker(disable_e2b_api_key, add_integers_tool, test_user):
+    from letta.services.tool_sandbox.local_worker_pool import LocalSandboxWorkerPool, close_local_sandbox_worker_pools
+
+    args = {"x": 10, "y": 5}
+    with patch("letta.services.tool_sandbox.local_sandbox.tool_settings.tool_sandbox_use_worker_pool", True):
+        with patch.object(LocalSandboxWorkerPool, "acquire", autospec=True, side_effect=LocalSandboxWorkerPool.acquire) as mock_acquire:
+            for _ in range(3):
+                sandbox = AsyncToolSandboxLocal(add_integers_tool.name, args, user=test_user)
+                result = await sandbox.run()
+                assert result.func_return == args["x"] + args["y"]
+                assert result.status == "success"
+
+        pool = mock_acquire.call_args_list[0].args[0]
+        worker = await pool.acquire()
+        assert worker.num_calls == 3, "All calls should have been served by the same warm worker"
+        await worker.close()
+
+    await close_local_sandbox_worker_pools()
+
+
+@pytest.mark.asyncio
+@pytest.mark.local_sandbox
+async def test_local_sandbox_worker_pool_stateful_tool(disable_e2b_api_key, clear_core_memory_tool, test_user, agent_state):
+    from letta.services.tool_sandbox.local_worker_pool import close_local_sandbox_worker_pools
+
+    with patch("letta.services.tool_sandbox.local_sandbox.tool_settings.tool_sandbox_use_worker_pool", True):
+        sandbox = AsyncToolSandboxLocal(clear_core_memory_tool.name, {}, user=test_user)
+        result = await sandbox.run(agent_state=agent_state)
+
+    assert result.agent_state.memory.get_block("human").value == ""
+    assert result.agent_state.memory.get_block("persona").value == ""
+    assert result.func_return is None
+    await close_local_sandbox_worker_pools()
+
+
 @pytest.mark.asyncio
 @pytest.mark.local_sandbox
 async def test_local_sandbox_external_codebase_with_venv(
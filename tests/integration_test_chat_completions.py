@@ -198,3 +198,21 @@ async def test_chat_completions_streaming_openai_client(disable_e2b_api_key, cli
 
     # Ensure the last chunk is the expected stop chunk
     assert last_chunk is not None, "No last chunk received."
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("message", ["Tell me something interesting about bananas."])
+@pytest.mark.parametrize("endpoint", ["openai/v1"])
+async def test_chat_completions_openai_client(disable_e2b_api_key, client, agent, message, endpoint):
+    """Tests non-streaming chat completions using the Async OpenAI client."""
+    request = _get_chat_request(message, stream=False)
+
+    async_client = AsyncOpenAI(base_url=f"http://localhost:8283/{endpoint}/{agent.id}", max_retries=0)
+    response = await async_client.chat.completions.create(**request.model_dump(exclude_none=True))
+
+    assert response.object == "chat.completion"
+    assert len(response.choices) == 1
+    assert response.choices[0].finish_reason == "stop"
+    assert response.choices[0].message.role == "assistant"
+    assert response.choices[0].message.content, "The completion has no content."
+    assert response.usage.total_tokens > 0
@@ -0,0 +1,99 @@
+import anyio
+import pytest
+
+from letta.functions.mcp_client.types import SSEServerConfig
+from letta.schemas.user import User
+from letta.services.mcp.session_pool import MCPSessionPool
+
+
+class FakeMCPClient:
+    def __init__(self):
+        self.initialized = False
+        self.connect_calls = 0
+        self.cleanup_calls = 0
+        self.broken = False
+
+    async def connect_to_server(self):
+        self.connect_calls += 1
+        self.initialized = True
+
+    async def execute_tool(self, tool_name: str, tool_args: dict):
+        if self.broken:
+            raise anyio.ClosedResourceError()
+        return f"{tool_name}:{tool_args}", True
+
+    async def cleanup(self):
+        self.cleanup_calls += 1
+        self.initialized = False
+
+
+@pytest.fixture
+def actor():
+    return User(name="test", organization_id="org-00000000-0000-4000-8000-000000000000")
+
+
+@pytest.fixture
+def server_config():
+    return SSEServerConfig(server_name="test_server", server_url="http://localhost:9999/sse")
+
+
+@pytest.mark.asyncio
+async def test_session_pool_reuses_connection(actor, server_config):
+    pool = MCPSessionPool()
+    clients = []
+
+    async def client_factory(config, actor):
+        clients.append(FakeMCPClient())
+        return clients[-1]
+
+    for _ in range(3):
+        result, success = await pool.run(server_config, actor, client_factory, lambda client: client.execute_tool("echo", {"x": 1}))
+        assert success
+        assert result == "echo:{'x': 1}"
+
+    assert len(clients) == 1, "Repeated calls should share one pooled connection"
+    assert clients[0].connect_calls == 1
+
+    await pool.close()
+    assert clients[0].cleanup_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_session_pool_reconnects_broken_session(actor, server_config):
+    pool = MCPSessionPool()
+    clients = []
+
+    async def client_factory(config, actor):
+        clients.append(FakeMCPClient())
+        return clients[-1]
+
+    await pool.run(server_config, actor, client_factory, lambda client: client.execute_tool("echo", {}))
+    clients[0].broken = True
+
+    result, success = await pool.run(server_config, actor, client_factory, lambda client: client.execute_tool("echo", {}))
+
+    assert success
+    assert len(clients) == 2, "A broken pooled session should be replaced by a fresh connection"
+    assert clients[0].cleanup_calls == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_session_pool_keeps_remote_sessions_per_user(actor, server_config):
+    pool = MCPSessionPool()
+    clients = []
+
+    async def client_factory(config, actor):
+        clients.append(FakeMCPClient())
+        return clients[-1]
+
+    other_actor = User(name="other", organization_id=actor.organization_id)
+    await pool.run(server_config, actor, client_factory, lambda client: client.execute_tool("echo", {}))
+    await pool.run(server_config, other_actor, client_factory, lambda client: client.execute_tool("echo", {}))
+    assert len(clients) == 2, "Remote sessions may carry a user's OAuth tokens and must not be shared across users"
+
+    # locks of discarded sessions are dropped with them
+    await pool.invalidate(pool.make_key(server_config, actor))
+    assert list(pool._key_locks) == [pool.make_key(server_config, other_actor)]
+    await pool.close()
+    assert not pool._key_locks
@@ -1,4 +1,6 @@
 import asyncio
+import io
+import json
 from typing import List, Optional
 
 import pytest
@@ -9,6 +11,7 @@ from letta.helpers.pinecone_utils import should_use_pinecone
 from letta.orm import Base
 from letta.schemas.agent import CreateAgent
 from letta.schemas.agent_file import (
+    AgentFileEmbeddings,
     AgentFileSchema,
     AgentSchema,
     BlockSchema,
@@ -22,13 +25,15 @@ from letta.schemas.block import Block, CreateBlock
 from letta.schemas.embedding_config import EmbeddingConfig
 from letta.schemas.enums import MessageRole
 from letta.schemas.group import ManagerType
+from letta.schemas.letta_message_content import TextContent
 from letta.schemas.llm_config import LLMConfig
-from letta.schemas.message import MessageCreate
+from letta.schemas.message import Message, MessageCreate
 from letta.schemas.organization import Organization
+from letta.schemas.passage import Passage
 from letta.schemas.source import Source
 from letta.schemas.user import User
 from letta.server.server import SyncServer
-from letta.services.agent_serialization_manager import AgentSerializationManager
+from letta.services.agent_serialization_manager import AgentSerializationManager, iter_agent_file_lines
 from tests.utils import create_tool_from_func
 
 # ------------------------------
@@ -1737,5 +1742,162 @@ class TestMCPServerSerialization:
         assert agent_file.mcp_servers[0].server_name == "test_mcp_server"
 
 
+class TestAgentFileStream:
+    """Tests for streamed (newline-delimited JSON) agent file export and import."""
+
+    async def _create_agent_with_history(self, server, user):
+        source = await create_test_source(server, "stream-source", user)
+        file_metadata = await create_test_file(server, "stream.txt", source.id, user, content="Streamed file content.")
+        agent = await create_test_agent_with_files(server, "stream-agent", user, [(source.id, file_metadata.id)])
+
+        messages = [Message(agent_id=agent.id, role=MessageRole.user, content=[TextContent(text=f"message {i}")]) for i in range(7)]
+        await server.message_manager.create_many_messages_async(messages, actor=user)
+        await server.agent_manager.update_message_ids_async(
+            agent_id=agent.id, message_ids=agent.message_ids + [messages[-1].id], actor=user
+        )
+
+        embedding_config = agent.embedding_config
+        archive = await server.archive_manager.get_or_create_default_archive_for_agent_async(
+            agent_id=agent.id, agent_name=agent.name, actor=user
+        )
+        await server.passage_manager.create_many_archival_passages_async(
+            [
+                Passage(
+                    text=f"memory {i}",
+                    embedding=[i / 10] * embedding_config.embedding_dim,
+                    embedding_config=embedding_config,
+                    organization_id=user.organization_id,
+                    archive_id=archive.id,
+                )
+                for i in range(5)
+            ],
+            actor=user,
+        )
+        await server.passage_manager.create_many_source_passages_async(
+            [
+                Passage(
+                    text="Streamed file content.",
+                    embedding=[0.5] * embedding_config.embedding_dim,
+                    embedding_config=embedding_config,
+                    organization_id=user.organization_id,
+                    source_id=source.id,
+                    file_id=file_metadata.id,
+                )
+            ],
+            file_metadata=file_metadata,
+            actor=user,
+        )
+        return agent
+
+    @pytest.mark.parametrize("embeddings", [AgentFileEmbeddings.inline, AgentFileEmbeddings.sidecar])
+    async def test_stream_roundtrip(self, server, agent_serialization_manager, default_user, other_user, embeddings):
+        """Messages, in-context messages and passages (with their embeddings) survive a streamed export and import."""
+        agent = await self._create_agent_with_history(server, default_user)
+        sidecar = io.BytesIO() if embeddings == AgentFileEmbeddings.sidecar else None
+
+        lines = [
+            line
+            async for line in agent_serialization_manager.export_stream(
+                [agent.id], default_user, embeddings=embeddings, sidecar=sidecar, batch_size=3
+            )
+        ]
+        records = [json.loads(line) for line in lines]
+        assert records[0]["type"] == "header"
+        assert records[-1]["type"] == "end"
+        original_messages = await server.message_manager.list_messages_for_agent_async(agent.id, default_user, limit=None)
+        assert sum(record["type"] == "message" for record in records) == len(original_messages) > 7
+        agent_record = next(record["data"] for record in records if record["type"] == "agent")
+        assert agent_record["messages"] == []
+
+        async def read_lines():
+            for line in lines:
+                yield line
+
+        if sidecar is not None:
+            sidecar.seek(0)
+        result = await agent_serialization_manager.import_stream(read_lines(), other_user, sidecar=sidecar, batch_size=4)
+        assert result.success
+
+        imported_agent_id = result.id_mappings["agent-0"]
+        original_agent = await server.agent_manager.get_agent_by_id_async(agent.id, default_user)
+        imported_agent = await server.agent_manager.get_agent_by_id_async(imported_agent_id, other_user)
+        imported_messages = await server.message_manager.list_messages_for_agent_async(imported_agent_id, other_user, limit=None)
+        assert [m.content[0].text for m in imported_messages] == [m.content[0].text for m in original_messages]
+        original_in_context = [
+            m.content[0].text for m in await server.message_manager.get_messages_by_ids_async(original_agent.message_ids, default_user)
+        ]
+        imported_in_context = [
+            m.content[0].text for m in await server.message_manager.get_messages_by_ids_async(imported_agent.message_ids, other_user)
+        ]
+        assert imported_in_context == original_in_context
+
+        archive_ids = await server.agent_manager.get_agent_archive_ids_async(imported_agent_id, other_user)
+        passages = await server.passage_manager.list_passages_by_archive_id_async(archive_ids[0], other_user)
+        assert sorted(p.text for p in passages) == [f"memory {i}" for i in range(5)]
+        for passage in passages:
+            value = int(passage.text.split()[-1]) / 10
+            assert passage.embedding[: agent.embedding_config.embedding_dim] == pytest.approx(
+                [value] * agent.embedding_config.embedding_dim
+            )
+
+        if not should_use_pinecone():
+            imported_file_id = result.id_mappings["file-0"]
+            imported_file = await server.file_manager.get_file_by_id(imported_file_id, other_user)
+            assert imported_file.processing_status.value == "completed"
+            source_passages = await server.passage_manager.list_passages_by_file_id_async(imported_file_id, other_user)
+            assert [p.text for p in source_passages] == ["Streamed file content."]
+
+    async def test_truncated_stream_import(self, server, agent_serialization_manager, default_user, other_user):
+        """A streamed agent file missing its end record is rejected."""
+        agent = await self._create_agent_with_history(server, default_user)
+        lines = [
+            line
+            async for line in agent_serialization_manager.export_stream([agent.id], default_user, embeddings=AgentFileEmbeddings.inline)
+        ]
+
+        async def read_lines():
+            for line in lines[:-1]:
+                yield line
+
+        with pytest.raises(AgentFileImportError, match="no end record"):
+            await agent_serialization_manager.import_stream(read_lines(), other_user)
+
+    async def test_failed_stream_import_is_rolled_back(self, server, agent_serialization_manager, default_user, other_user):
+        """A streamed import that fails after creating agents deletes them, rather than leaving them half imported."""
+        agent = await server.agent_manager.create_agent_async(
+            CreateAgent(
+                name="stream-agent",
+                memory_blocks=[CreateBlock(label="human", value="The human's name is Sarah.")],
+                llm_config=LLMConfig.default_config("gpt-4o-mini"),
+                embedding_config=EmbeddingConfig.default_config(provider="openai"),
+            ),
+            default_user,
+        )
+        lines = [line async for line in agent_serialization_manager.export_stream([agent.id], default_user)]
+        end_record = json.loads(lines[-1])
+        end_record["data"]["counts"]["message"] += 1
+
+        async def read_lines():
+            for line in lines[:-1]:
+                yield line
+            yield json.dumps(end_record)
+
+        with pytest.raises(AgentFileImportError, match="do not match its end record"):
+            await agent_serialization_manager.import_stream(read_lines(), other_user)
+        assert await server.agent_manager.list_agents_async(actor=other_user) == []
+        assert await server.block_manager.get_blocks_async(actor=other_user) == []
+
+    async def test_iter_agent_file_lines(self):
+        """Lines are reassembled from chunks that split them anywhere, including lines spanning many chunks."""
+        long_line = b"x" * 1000
+
+        async def read_chunks():
+            data = b"first\n\n" + long_line + b"\nlast"
+            for start in range(0, len(data), 7):
+                yield data[start : start + 7]
+
+        assert [line async for line in iter_agent_file_lines(read_chunks())] == [b"first", b"", long_line, b"last"]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
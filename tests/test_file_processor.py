@@ -291,3 +291,116 @@ class TestFileProcessorWithPinecone:
                         assert call_args.kwargs["file_id"] == mock_file.id
                         assert call_args.kwargs["source_id"] == mock_file.source_id
                         assert len(call_args.kwargs["chunks"]) > 0
+
+
+class TestFileParseWorkerPool:
+    """Test suite for parsing and chunking files in worker processes"""
+
+    @pytest.fixture
+    def process_pool(self, monkeypatch):
+        from letta.settings import settings
+
+        monkeypatch.setattr(settings, "file_parsing_process_pool_enabled", True)
+        monkeypatch.setattr(settings, "file_parsing_inline_max_bytes", 1024)
+        return settings
+
+    @pytest.mark.asyncio
+    async def test_streaming_file_processing(self, process_pool):
+        """Pages are chunked in a worker and embedded in batches as they arrive"""
+        from letta.schemas.enums import FileProcessingStatus
+        from letta.schemas.file import FileMetadata
+        from letta.schemas.passage import Passage
+        from letta.services.file_processor.file_processor import FileProcessor
+        from letta.services.file_processor.parser.markitdown_parser import MarkitdownFileParser
+        from letta.services.file_processor.parser.parse_pool import close_file_parse_worker_pools
+
+        mock_actor = Mock()
+        mock_actor.organization_id = "test_org"
+        embedding_config = EmbeddingConfig.default_config(provider="openai")
+
+        async def embed(file_id, source_id, chunks, actor):
+            return [
+                Passage(text=chunk, file_id=file_id, source_id=source_id, embedding=[0.1] * 4, embedding_config=embedding_config)
+                for chunk in chunks
+            ]
+
+        embedder = Mock()
+        embedder.embedding_config = embedding_config
+        embedder.generate_embedded_passages = AsyncMock(side_effect=embed)
+
+        file_metadata = FileMetadata(file_name="memgpt_paper.pdf", file_type="application/pdf", source_id="source-87654321")
+        with open("tests/data/memgpt_paper.pdf", "rb") as f:
+            content = f.read()
+
+        file_processor = FileProcessor(file_parser=MarkitdownFileParser(), embedder=embedder, actor=mock_actor, using_pinecone=False)
+        status_updates = []
+
+        async def track_update(**kwargs):
+            status_updates.append(kwargs)
+            return file_metadata
+
+        try:
+            with (
+                patch.object(file_processor.file_manager, "create_file", new=AsyncMock(return_value=file_metadata)),
+                patch.object(file_processor.file_manager, "upsert_file_content", new=AsyncMock(return_value=file_metadata)) as upsert,
+                patch.object(file_processor.file_manager, "update_file_status", new=track_update),
+                patch.object(file_processor.agent_manager, "insert_file_into_context_windows", new=AsyncMock()),
+                patch.object(
+                    file_processor.passage_manager,
+                    "create_many_source_passages_async",
+                    new=AsyncMock(side_effect=lambda passages, file_metadata, actor: passages),
+                ),
+            ):
+                passages = await file_processor.process(
+                    agent_states=[], source_id="source-87654321", content=content, file_metadata=file_metadata
+                )
+        finally:
+            await close_file_parse_worker_pools()
+
+        assert len(passages) > 0
+        # embedding started per batch of streamed pages rather than once for the whole file
+        assert embedder.generate_embedded_passages.await_count > 1
+        assert "MemGPT" in upsert.call_args.kwargs["text"]
+        assert status_updates[-1]["processing_status"] == FileProcessingStatus.COMPLETED
+        assert status_updates[-1]["chunks_embedded"] == len(passages)
+
+    @pytest.mark.asyncio
+    async def test_parse_timeout_kills_worker(self, process_pool, monkeypatch):
+        from letta.services.file_processor.parser.parse_pool import (
+            chunk_text_in_process_pool,
+            close_file_parse_worker_pools,
+            get_file_parse_worker_pool,
+        )
+
+        monkeypatch.setattr(process_pool, "file_parsing_timeout", 0.01)
+        try:
+            with pytest.raises(TimeoutError):
+                await chunk_text_in_process_pool("hello world. " * 1000, None, chunk_size=512, chunk_overlap=50)
+            # the timed out worker is not handed out again
+            assert all(worker.is_alive and worker.idle for worker in get_file_parse_worker_pool()._idle_workers)
+        finally:
+            await close_file_parse_worker_pools()
+
+
+@pytest.mark.asyncio
+async def test_stream_pages_falls_back_to_whole_file_parse():
+    """Parsers without page streaming yield the pages of a whole-file parse, leaving chunking to the caller"""
+    from mistralai import OCRPageObject, OCRResponse, OCRUsageInfo
+
+    from letta.services.file_processor.parser.base_parser import FileParser
+
+    class WholeFileParser(FileParser):
+        async def extract_text(self, content: bytes, mime_type: str):
+            pages = [
+                OCRPageObject(index=i, markdown=text, images=[], dimensions=None) for i, text in enumerate(content.decode().split("|"))
+            ]
+            return OCRResponse(model="test", pages=pages, usage_info=OCRUsageInfo(pages_processed=len(pages)), document_annotation=None)
+
+    parsed = [
+        page
+        async for page in WholeFileParser().stream_pages(
+            b"one|two", mime_type="text/plain", file_type=None, chunk_size=512, chunk_overlap=50
+        )
+    ]
+    assert [page.page.markdown for page in parsed] == ["one", "two"]
+    assert all(page.chunks is None for page in parsed)
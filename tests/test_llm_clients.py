@@ -5,9 +5,12 @@ import pytest
 
 # Import your AnthropicClient and related types
 from letta.llm_api.anthropic_client import AnthropicClient
+from letta.llm_api.client_registry import LLMClientRegistry, close_llm_client_registries, get_async_openai_client
+from letta.llm_api.openai_client import OpenAIClient
 from letta.schemas.enums import MessageRole
 from letta.schemas.llm_config import LLMConfig
 from letta.schemas.message import Message as PydanticMessage
+from letta.settings import model_settings, settings
 
 
 @pytest.fixture
@@ -101,3 +104,50 @@ async def test_send_llm_batch_request_async_mismatched_keys(anthropic_client, mo
     mismatched_tools = {"agent-2": []}  # Different agent ID than in the messages mapping.
     with pytest.raises(ValueError, match="Agent mappings for messages and tools must use the same agent_ids."):
         await anthropic_client.send_llm_batch_request_async(mock_agent_messages, mismatched_tools, mock_agent_llm_config)
+
+
+@pytest.mark.asyncio
+async def test_llm_client_registry_shares_clients(monkeypatch):
+    """
+    With client pooling enabled, clients are shared per (provider, base_url, api key) and evicted in LRU order.
+    """
+    monkeypatch.setattr(model_settings, "llm_client_pool_enabled", True)
+    monkeypatch.setattr(model_settings, "llm_client_pool_max_clients", 2)
+
+    client = get_async_openai_client(api_key="sk-a", base_url="https://api.openai.com/v1")
+    assert get_async_openai_client(api_key="sk-a", base_url="https://api.openai.com/v1") is client
+    assert get_async_openai_client(api_key="sk-b", base_url="https://api.openai.com/v1") is not client
+
+    registry = LLMClientRegistry()
+    for api_key in ("sk-a", "sk-b", "sk-c"):
+        registry.get_or_create(
+            LLMClientRegistry.make_key("openai", None, api_key), lambda http_client: object(), lambda **kwargs: AsyncMock()
+        )
+    stats = registry.stats()
+    assert stats["clients"] == 2
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+    assert LLMClientRegistry.make_key("openai", None, "sk-a") not in registry._clients
+
+    await registry.close()
+    await close_llm_client_registries()
+
+
+def test_streaming_requests_disable_parallel_tool_calls(anthropic_client, llm_config, mock_agent_messages, mock_agent_tools, monkeypatch):
+    """
+    Parallel tool calls stay enabled for regular requests but can be switched off per request, for token streaming.
+    """
+    monkeypatch.setattr(settings, "enable_parallel_tool_calls", True)
+    messages, tools = mock_agent_messages["agent-1"], mock_agent_tools["agent-1"]
+
+    request_data = anthropic_client.build_request_data(messages, llm_config, tools)
+    assert request_data["tool_choice"]["disable_parallel_tool_use"] is False
+    assert anthropic_client.disable_parallel_tool_calls(request_data)["tool_choice"]["disable_parallel_tool_use"] is True
+
+    openai_config = LLMConfig(
+        model="gpt-4o", model_endpoint_type="openai", model_endpoint="https://api.openai.com/v1", context_window=128000
+    )
+    openai_client = OpenAIClient()
+    request_data = openai_client.build_request_data(messages, openai_config, tools)
+    assert request_data["parallel_tool_calls"] is True
+    assert openai_client.disable_parallel_tool_calls(request_data)["parallel_tool_calls"] is False
@@ -4,6 +4,7 @@ import logging
 import os
 import random
 import re
+import sqlite3
 import string
 import time
 from datetime import datetime, timedelta, timezone
@@ -29,21 +30,28 @@ from letta.constants import (
     BASE_VOICE_SLEEPTIME_CHAT_TOOLS,
     BASE_VOICE_SLEEPTIME_TOOLS,
     BUILTIN_TOOLS,
+    DEFAULT_MESSAGE_TOOL,
+    DEFAULT_MESSAGE_TOOL_KWARG,
     DEFAULT_ORG_ID,
     DEFAULT_ORG_NAME,
     FILES_TOOLS,
     LETTA_TOOL_EXECUTION_DIR,
     LETTA_TOOL_SET,
     LOCAL_ONLY_MULTI_AGENT_TOOLS,
+    MAX_EMBEDDING_DIM,
     MCP_TOOL_TAG_NAME_PREFIX,
     MULTI_AGENT_TOOLS,
 )
 from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.errors import AgentLockReentryError, AgentLockTimeoutError
 from letta.functions.functions import derive_openai_json_schema, parse_source_code
 from letta.functions.mcp_client.types import MCPTool
 from letta.helpers import ToolRulesSolver
+from letta.helpers.agent_state_cache import AgentStateCache
 from letta.helpers.datetime_helpers import AsyncTimer
+from letta.helpers.message_helper import TIKTOKEN_TOKEN_COUNT_KEY, count_in_context_tokens
 from letta.jobs.types import ItemUpdateInfo, RequestStatusUpdateInfo, StepStatusUpdateInfo
+from letta.local_llm.utils import num_tokens_from_functions
 from letta.orm import Base, Block
 from letta.orm.block_history import BlockHistory
 from letta.orm.errors import NoResultFound, UniqueConstraintViolationError
@@ -86,6 +94,7 @@ from letta.schemas.organization import Organization as PydanticOrganization
 from letta.schemas.organization import OrganizationUpdate
 from letta.schemas.passage import Passage as PydanticPassage
 from letta.schemas.pip_requirement import PipRequirement
+from letta.schemas.provider_trace import ProviderTraceCreate
 from letta.schemas.run import Run as PydanticRun
 from letta.schemas.sandbox_config import E2BSandboxConfig, LocalSandboxConfig, SandboxConfigCreate, SandboxConfigUpdate
 from letta.schemas.source import Source as PydanticSource
@@ -98,10 +107,19 @@ from letta.schemas.user import UserUpdate
 from letta.server.db import db_registry
 from letta.server.server import SyncServer
 from letta.services.block_manager import BlockManager
+from letta.services.context_window_calculator.token_counter import TiktokenCounter
+from letta.services.file_processor.ingestion_queue import FileIngestionWorker, enqueue_file_ingestion
 from letta.services.helpers.agent_manager_helper import calculate_base_tools, calculate_multi_agent_tools, validate_agent_exists_async
+from letta.services.helpers.passage_vector_index import ARCHIVAL_PASSAGE_INDEX, MESSAGE_INDEX, rebuild_scope_async
+from letta.services.message_embedder import get_message_embedder
+from letta.services.passage_manager import PassageManager
+from letta.services.per_agent_lock_manager import forget_held_agent_locks, get_per_agent_lock_manager, serialize_agent_runs
+from letta.services.run_cancellation_bus import RunCancellationBus
 from letta.services.step_manager import FeedbackType
-from letta.settings import tool_settings
-from letta.utils import calculate_file_defaults_based_on_context_window
+from letta.services.telemetry_buffer import close_telemetry_buffers
+from letta.services.tool_executor.core_tool_executor import LettaCoreToolExecutor
+from letta.settings import AgentLockBackend, RunCancellationBackend, Settings, settings, tool_settings
+from letta.utils import CancellationSignal, calculate_file_defaults_based_on_context_window, get_tiktoken_encoding
 from tests.helpers.utils import comprehensive_agent_checks, validate_context_window_overview
 from tests.utils import random_string
 
@@ -1259,6 +1277,55 @@ async def test_update_agent_file_fields(server: SyncServer, comprehensive_test_a
     assert updated_agent.per_file_view_window_char_limit == 150_000
 
 
+@pytest.mark.asyncio
+async def test_agent_state_cache(
+    server: SyncServer, sarah_agent, default_block, print_tool, default_user, other_user_different_org, monkeypatch, event_loop
+):
+    """Test that agent states are served from the cache until a mutation of the agent or its blocks and tools invalidates them."""
+    monkeypatch.setattr("letta.helpers.agent_state_cache._agent_state_cache", AgentStateCache(max_size=16, ttl_s=60))
+    agent_manager = server.agent_manager
+    loads = []
+    read_agent_by_id_async = agent_manager._read_agent_by_id_async
+
+    async def counting_read(**kwargs):
+        loads.append(kwargs["agent_id"])
+        return await read_agent_by_id_async(**kwargs)
+
+    monkeypatch.setattr(agent_manager, "_read_agent_by_id_async", counting_read)
+
+    agent = await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)
+    cached = await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)
+    assert len(loads) == 1
+    assert cached == agent and cached is not agent
+
+    # callers get copies, so mutating one does not leak into the cache
+    cached.memory.blocks.clear()
+    assert (await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)).memory.blocks == agent.memory.blocks
+    assert len(loads) == 1
+
+    # relationships and organizations are cached separately
+    await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user, include_relationships=["tools"])
+    with pytest.raises(NoResultFound):
+        await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=other_user_different_org)
+    assert len(loads) == 3
+
+    await agent_manager.update_agent_async(sarah_agent.id, UpdateAgent(name="sarah_renamed"), actor=default_user)
+    assert (await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)).name == "sarah_renamed"
+
+    await agent_manager.attach_block_async(agent_id=sarah_agent.id, block_id=default_block.id, actor=default_user)
+    await server.block_manager.update_block_async(default_block.id, BlockUpdate(value="cached no more"), actor=default_user)
+    agent = await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)
+    assert agent.memory.get_block(default_block.label).value == "cached no more"
+
+    await agent_manager.attach_tool_async(agent_id=sarah_agent.id, tool_id=print_tool.id, actor=default_user)
+    agent = await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)
+    assert print_tool.id in [tool.id for tool in agent.tools]
+    assert len(loads) == 6
+
+    await agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)
+    assert len(loads) == 6
+
+
 # ======================================================================================================================
 # AgentManager Tests - Listing
 # ======================================================================================================================
@@ -2077,6 +2144,20 @@ async def test_list_agents_matching_no_tags(server: SyncServer, default_user, ag
     assert len(agents) == 0  # No agent should match
 
 
+@pytest.mark.asyncio
+async def test_list_agents_matching_tags_with_relationships(server: SyncServer, default_user, agent_with_tags, event_loop):
+    """Matching agents can be loaded with only the relationships a step needs, e.g. to prefetch broadcast recipients."""
+    agents = await server.agent_manager.list_agents_matching_tags_async(
+        actor=default_user,
+        match_all=["primary_agent"],
+        match_some=["benefit_1", "benefit_2"],
+        include_relationships=["tools", "memory"],
+    )
+    assert {a.name for a in agents} == {"agent1", "agent2", "agent3"}
+    assert all(a.tags == [] for a in agents)
+    assert all(a.memory is not None for a in agents)
+
+
 @pytest.mark.asyncio
 async def test_list_agents_by_tags_match_all(server: SyncServer, sarah_agent, charles_agent, default_user, event_loop):
     """Test listing agents that have ALL specified tags."""
@@ -2906,6 +2987,181 @@ async def test_agent_list_passages_vector_search(
     assert agent_only_results[1].text == "blue shoes"
 
 
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not USING_SQLITE or not hasattr(sqlite3.Connection, "enable_load_extension"),
+    reason="requires SQLite built with extension loading for sqlite-vec",
+)
+async def test_agent_list_passages_vector_index(server, default_user, sarah_agent, event_loop, monkeypatch):
+    """Test that archival vector search served from the sqlite-vec index matches the exact scan"""
+    monkeypatch.setattr(settings, "sqlite_vector_index", True)
+    rng = random.Random(0)
+
+    def random_embedding():
+        return [rng.uniform(-1, 1) for _ in range(1536)]
+
+    query_embedding = random_embedding()
+    monkeypatch.setattr(
+        "letta.services.agent_manager.embed_query_text",
+        lambda query_text, embedding_config: query_embedding + [0.0] * (MAX_EMBEDDING_DIM - len(query_embedding)),
+    )
+
+    archive = await server.archive_manager.get_or_create_default_archive_for_agent_async(
+        agent_id=sarah_agent.id, agent_name=sarah_agent.name, actor=default_user
+    )
+    passages = await server.passage_manager.create_many_archival_passages_async(
+        [
+            PydanticPassage(
+                text=f"passage {i}",
+                organization_id=default_user.organization_id,
+                archive_id=archive.id,
+                embedding_config=DEFAULT_EMBEDDING_CONFIG,
+                embedding=random_embedding(),
+            )
+            for i in range(20)
+        ],
+        default_user,
+    )
+
+    async def search(limit=5):
+        return await server.agent_manager.list_agent_passages_async(
+            actor=default_user,
+            agent_id=sarah_agent.id,
+            query_text="query",
+            limit=limit,
+            embedding_config=DEFAULT_EMBEDDING_CONFIG,
+            embed_query=True,
+        )
+
+    # The archive has no index yet, so the first search falls back to the exact scan
+    exact_results = await search()
+    await rebuild_scope_async(ARCHIVAL_PASSAGE_INDEX, archive.id)
+    indexed_results = await search()
+    assert [p.id for p in indexed_results] == [p.id for p in exact_results]
+
+    # New passages are indexed as they are written
+    closest = await server.passage_manager.create_agent_passage_async(
+        PydanticPassage(
+            text="closest",
+            organization_id=default_user.organization_id,
+            archive_id=archive.id,
+            embedding_config=DEFAULT_EMBEDDING_CONFIG,
+            embedding=query_embedding,
+        ),
+        default_user,
+    )
+    assert (await search(limit=1))[0].id == closest.id
+
+    # Deleted passages are dropped from the index
+    await server.passage_manager.delete_agent_passage_by_id_async(closest.id, default_user)
+    await server.passage_manager.delete_agent_passages_async(default_user, [exact_results[0]])
+    results = await search()
+    assert closest.id not in [p.id for p in results]
+    assert exact_results[0].id not in [p.id for p in results]
+    assert len(results) == 5
+    assert {p.id for p in passages} >= {p.id for p in results}
+
+
+@pytest.mark.asyncio
+async def test_agent_passages_hybrid_search(server, default_user, sarah_agent, event_loop, monkeypatch):
+    """Test that hybrid archival search fuses the full-text and vector rankings"""
+    monkeypatch.setattr(settings, "full_text_search", True)
+
+    def embedding(direction):
+        return direction + [0.0] * (MAX_EMBEDDING_DIM - len(direction))
+
+    # the vector ranking prefers "closest" over "close"; neither mentions the query's words
+    query_embedding = embedding([1.0, 0.0, 0.0])
+    monkeypatch.setattr(
+        "letta.services.helpers.agent_manager_helper.embed_query_text", lambda query_text, embedding_config: query_embedding
+    )
+
+    archive = await server.archive_manager.get_or_create_default_archive_for_agent_async(
+        agent_id=sarah_agent.id, agent_name=sarah_agent.name, actor=default_user
+    )
+    texts_and_embeddings = [
+        ("closest", [1.0, 0.0, 0.0]),
+        ("close", [0.9, 0.1, 0.0]),
+        ("the user's favorite fruit is bananas", [0.0, 0.0, 1.0]),
+        ("bananas are yellow", [0.0, 1.0, 0.0]),
+    ]
+    await server.passage_manager.create_many_archival_passages_async(
+        [
+            PydanticPassage(
+                text=text,
+                organization_id=default_user.organization_id,
+                archive_id=archive.id,
+                embedding_config=DEFAULT_EMBEDDING_CONFIG,
+                embedding=embedding(direction),
+            )
+            for text, direction in texts_and_embeddings
+        ],
+        default_user,
+    )
+
+    keyword_results = await server.agent_manager.keyword_search_agent_passages_async(
+        actor=default_user, agent_id=sarah_agent.id, query_text="favorite banana?", limit=5
+    )
+    assert [p.text for p in keyword_results] == ["the user's favorite fruit is bananas", "bananas are yellow"]
+
+    hybrid_results = await server.agent_manager.hybrid_search_agent_passages_async(
+        actor=default_user, agent_id=sarah_agent.id, query_text="favorite banana?", embedding_config=DEFAULT_EMBEDDING_CONFIG, limit=2
+    )
+    # top of the full-text ranking and top of the vector ranking tie, and ties keep the vector ranking's order
+    assert [p.text for p in hybrid_results] == ["closest", "the user's favorite fruit is bananas"]
+
+
+@pytest.mark.asyncio
+async def test_insert_passages_bulk(server: SyncServer, default_user, sarah_agent, event_loop, monkeypatch):
+    """Test that bulk archival inserts dedupe texts, batch embeddings and report a result per text"""
+    embedded_batches = []
+
+    async def fake_embed_batch(text_chunks, embedding_config, actor):
+        embedded_batches.append(text_chunks)
+        if "poison" in text_chunks:
+            raise RuntimeError("embedding failed")
+        return [[0.1] * embedding_config.embedding_dim for _ in text_chunks]
+
+    monkeypatch.setattr(server.passage_manager, "_embed_batch_async", fake_embed_batch)
+    agent_state = sarah_agent.model_copy(update={"embedding_config": sarah_agent.embedding_config.model_copy(update={"batch_size": 2})})
+
+    archive = await server.archive_manager.get_or_create_default_archive_for_agent_async(
+        agent_id=sarah_agent.id, agent_name=sarah_agent.name, actor=default_user
+    )
+    await server.passage_manager.create_agent_passage_async(
+        PydanticPassage(
+            text="already stored",
+            organization_id=default_user.organization_id,
+            archive_id=archive.id,
+            embedding_config=agent_state.embedding_config,
+            embedding=[0.1] * agent_state.embedding_config.embedding_dim,
+        ),
+        default_user,
+    )
+
+    texts = ["alpha", "beta", "alpha", "already stored", "", "gamma", "delta", "poison"]
+    results = [r async for r in server.passage_manager.insert_passages_bulk_async(agent_state=agent_state, texts=texts, actor=default_user)]
+    results = {r.index: r for r in results}
+
+    assert sorted(results) == list(range(len(texts)))
+    assert results[2].status == "duplicate" and results[2].duplicate_of == 0
+    assert results[3].status == "duplicate"
+    assert results[4].status == "failed"
+    assert results[7].status == "failed"
+    for index in (0, 1, 5, 6):
+        assert results[index].status == "created"
+        assert len(results[index].passage_ids) == 1
+
+    # only new chunks are embedded, packed into batches of embedding_config.batch_size
+    assert all(len(batch) <= 2 for batch in embedded_batches)
+    assert sorted(chunk for batch in embedded_batches for chunk in batch) == ["alpha", "beta", "delta", "gamma", "poison"]
+
+    passages = await server.agent_manager.list_agent_passages_async(actor=default_user, agent_id=sarah_agent.id)
+    assert sorted(p.text for p in passages) == ["alpha", "already stored", "beta", "delta", "gamma"]
+    created = next(p for p in passages if p.id == results[0].passage_ids[0])
+    assert created.text == "alpha"
+
+
 @pytest.mark.asyncio
 async def test_list_source_passages_only(server: SyncServer, default_user, default_source, agent_passages_setup, event_loop):
     """Test listing passages from a source without specifying an agent."""
@@ -4299,6 +4555,37 @@ def test_message_update(server: SyncServer, hello_world_message_fixture, default
     assert retrieved.last_updated_by_id == other_user.id
 
 
+@pytest.mark.asyncio
+async def test_message_token_counts(server: SyncServer, default_user, sarah_agent, monkeypatch, event_loop):
+    """Token counts are stored when messages are written, match a full recount, and are dropped on update"""
+    try:
+        get_tiktoken_encoding("gpt-4")
+    except Exception:
+        pytest.skip("tiktoken encodings are not available")
+    monkeypatch.setattr(settings, "store_message_token_counts", True)
+
+    messages = await server.message_manager.create_many_messages_async(
+        [PydanticMessage(agent_id=sarah_agent.id, role="user", content=[TextContent(text=f"Test message number {i}")]) for i in range(3)],
+        actor=default_user,
+    )
+    retrieved = await server.message_manager.get_messages_by_ids_async([m.id for m in messages], actor=default_user)
+    assert all(m.token_counts and m.token_counts[TIKTOKEN_TOKEN_COUNT_KEY] > 0 for m in retrieved)
+
+    token_counter = TiktokenCounter("gpt-4")
+    expected = await token_counter.count_message_tokens(token_counter.convert_messages(retrieved))
+    assert count_in_context_tokens(retrieved) == expected
+    # the agent's tool definitions are sent with every request and count towards the total
+    tool_tokens = num_tokens_from_functions([tool.json_schema for tool in sarah_agent.tools])
+    assert tool_tokens > 0
+    assert count_in_context_tokens(retrieved, tools=sarah_agent.tools) == expected + tool_tokens
+
+    updated = await server.message_manager.update_message_by_id_async(
+        messages[0].id, MessageUpdate(content="A much longer message than the one before it"), actor=default_user
+    )
+    assert updated.token_counts is None
+    assert count_in_context_tokens([updated]) > count_in_context_tokens([retrieved[0]])
+
+
 def test_message_delete(server: SyncServer, hello_world_message_fixture, default_user):
     """Test deleting a message"""
     server.message_manager.delete_message_by_id(hello_world_message_fixture.id, actor=default_user)
@@ -4434,6 +4721,248 @@ def test_message_listing_text_search(server: SyncServer, hello_world_message_fix
     assert len(search_results) == 0
 
 
+@pytest.mark.asyncio
+async def test_message_full_text_search(server: SyncServer, default_user, sarah_agent, event_loop, monkeypatch):
+    """Test that full-text message search ranks by relevance and follows message updates and deletes"""
+    monkeypatch.setattr(settings, "full_text_search", True)
+    messages = await server.message_manager.create_many_messages_async(
+        [
+            PydanticMessage(agent_id=sarah_agent.id, role=MessageRole.user, content=[TextContent(text=text)])
+            for text in ["I went running in the park", "The park was closed today", "Lunch was great", "Traffic was bad"]
+        ],
+        actor=default_user,
+    )
+    await server.message_manager.create_many_messages_async(
+        [
+            PydanticMessage(
+                agent_id=sarah_agent.id, role=MessageRole.assistant, content=[TextContent(text="Running in the park sounds fun")]
+            )
+        ],
+        actor=default_user,
+    )
+
+    async def search(query_text, roles=(MessageRole.user,)):
+        results = await server.message_manager.search_messages_for_agent_async(
+            agent_id=sarah_agent.id, actor=default_user, query_text=query_text, roles=list(roles), limit=10
+        )
+        return [msg.content[0].text for msg in results]
+
+    # words are stemmed and matched separately, and messages matching more of them rank higher
+    assert await search("run, park!") == ["I went running in the park", "The park was closed today"]
+    assert await search("run park", roles=[MessageRole.user, MessageRole.assistant]) == [
+        "I went running in the park",
+        "Running in the park sounds fun",
+        "The park was closed today",
+    ]
+    assert await search("sushi") == []
+
+    await server.message_manager.update_message_by_id_async(messages[2].id, MessageUpdate(content="Lunch in the park"), actor=default_user)
+    server.message_manager.delete_message_by_id(messages[0].id, actor=default_user)
+    assert sorted(await search("park")) == ["Lunch in the park", "The park was closed today"]
+    assert await search("running") == []
+
+    # queries without words fall back to substring matching
+    assert await search("...") == []
+
+
+@pytest.mark.asyncio
+async def test_message_semantic_search(server: SyncServer, default_user, sarah_agent, event_loop, monkeypatch):
+    """Test that messages are embedded in the background and searched by similarity with role and date filters"""
+    monkeypatch.setattr(settings, "message_embeddings", True)
+
+    def embedding(direction):
+        return direction + [0.0] * (MAX_EMBEDDING_DIM - len(direction))
+
+    directions = {
+        "I love hiking": [1.0, 0.0, 0.0],
+        "Mountains are great": [0.8, 0.2, 0.0],
+        "Hiking sounds fun": [0.9, 0.1, 0.0],
+        "Lunch was great": [0.0, 1.0, 0.0],
+        "I love climbing": [-1.0, 0.0, 0.0],
+    }
+    embedded_texts = []
+
+    async def embed_texts(self, texts, embedding_config, actor):
+        embedded_texts.extend(texts)
+        return [directions[text] for text in texts]
+
+    monkeypatch.setattr(PassageManager, "embed_texts_async", embed_texts)
+    monkeypatch.setattr("letta.services.message_manager.embed_query_text", lambda query_text, embedding_config: embedding([1.0, 0.0, 0.0]))
+
+    def user_message(text):
+        packed = json.dumps({"type": "user_message", "message": text, "time": "2025-01-01 12:00:00 PM"})
+        return PydanticMessage(agent_id=sarah_agent.id, role=MessageRole.user, content=[TextContent(text=packed)])
+
+    def assistant_message(text):
+        # as written by the agent loop: the reply is sent with the message tool, the content is the reasoning
+        send_message = OpenAIFunction(name=DEFAULT_MESSAGE_TOOL, arguments=json.dumps({DEFAULT_MESSAGE_TOOL_KWARG: text}))
+        return PydanticMessage(
+            agent_id=sarah_agent.id,
+            role=MessageRole.assistant,
+            content=[TextContent(text="The user wants to talk about the outdoors")],
+            tool_calls=[OpenAIToolCall(id="call_1", type="function", function=send_message)],
+        )
+
+    messages = await server.message_manager.create_many_messages_async(
+        [
+            user_message("Lunch was great"),
+            user_message("I love hiking"),
+            user_message("Mountains are great"),
+            assistant_message("Hiking sounds fun"),
+            PydanticMessage(agent_id=sarah_agent.id, role=MessageRole.tool, content=[TextContent(text="Hiking sounds fun")]),
+            PydanticMessage(
+                agent_id=sarah_agent.id,
+                role=MessageRole.user,
+                content=[TextContent(text=json.dumps({"type": "heartbeat", "reason": "continue"}))],
+            ),
+        ],
+        actor=default_user,
+    )
+    await get_message_embedder().flush()
+    # user messages are embedded unpacked, assistant messages by their reply; tool messages and heartbeats are not embedded
+    assert sorted(embedded_texts) == ["Hiking sounds fun", "I love hiking", "Lunch was great", "Mountains are great"]
+
+    async def search(roles=(MessageRole.user,), limit=10, **kwargs):
+        results = await server.message_manager.semantic_search_messages_for_agent_async(
+            agent_id=sarah_agent.id,
+            actor=default_user,
+            query_text="outdoors",
+            embedding_config=DEFAULT_EMBEDDING_CONFIG,
+            roles=list(roles),
+            limit=limit,
+            **kwargs,
+        )
+        return [message.id for message in results]
+
+    assert await search(limit=2) == [messages[1].id, messages[2].id]
+    assert await search(roles=[MessageRole.user, MessageRole.assistant], limit=3) == [messages[1].id, messages[3].id, messages[2].id]
+    assert await search(end_date=messages[0].created_at - timedelta(days=1)) == []
+    assert await search(start_date=messages[0].created_at - timedelta(days=1), limit=1) == [messages[1].id]
+
+    # edited messages are embedded again
+    await server.message_manager.update_message_by_id_async(messages[1].id, MessageUpdate(content="I love climbing"), actor=default_user)
+    await get_message_embedder().flush()
+    assert await search(limit=2) == [messages[2].id, messages[0].id]
+
+    # conversation_search fuses the semantic and full-text rankings
+    monkeypatch.setattr(settings, "full_text_search", True)
+    results = await server.message_manager.hybrid_search_messages_for_agent_async(
+        agent_id=sarah_agent.id,
+        actor=default_user,
+        query_text="lunch",
+        embedding_config=DEFAULT_EMBEDDING_CONFIG,
+        roles=[MessageRole.user],
+        limit=2,
+    )
+    assert [message.id for message in results] == [messages[0].id, messages[2].id]
+
+
+@pytest.mark.asyncio
+async def test_conversation_search_finds_unembedded_messages(server: SyncServer, default_user, sarah_agent, event_loop, monkeypatch):
+    """Test that conversation_search still finds the messages semantic search cannot, by matching them as substrings"""
+
+    async def embed_texts(self, texts, embedding_config, actor):
+        return [[1.0, 0.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(PassageManager, "embed_texts_async", embed_texts)
+    monkeypatch.setattr(
+        "letta.services.message_manager.embed_query_text",
+        lambda query_text, embedding_config: [1.0, 0.0, 0.0] + [0.0] * (MAX_EMBEDDING_DIM - 3),
+    )
+
+    def user_message(text):
+        packed = json.dumps({"type": "user_message", "message": text, "time": "2025-01-01 12:00:00 PM"})
+        return PydanticMessage(agent_id=sarah_agent.id, role=MessageRole.user, content=[TextContent(text=packed)])
+
+    # written before message embeddings were enabled, so never embedded
+    await server.message_manager.create_many_messages_async([user_message("I went to Yosemite last summer")], actor=default_user)
+    monkeypatch.setattr(settings, "message_embeddings", True)
+    await server.message_manager.create_many_messages_async([user_message("Hiking sounds fun")], actor=default_user)
+    await get_message_embedder().flush()
+
+    executor = LettaCoreToolExecutor(
+        message_manager=server.message_manager,
+        agent_manager=server.agent_manager,
+        block_manager=server.block_manager,
+        job_manager=server.job_manager,
+        passage_manager=server.passage_manager,
+        actor=default_user,
+    )
+    result = await executor.conversation_search(sarah_agent, default_user, query="Yosemite")
+    assert "I went to Yosemite last summer" in result and "Hiking sounds fun" in result
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not USING_SQLITE or not hasattr(sqlite3.Connection, "enable_load_extension"),
+    reason="requires SQLite built with extension loading for sqlite-vec",
+)
+async def test_message_semantic_search_vector_index(server: SyncServer, default_user, sarah_agent, event_loop, monkeypatch):
+    """Test that message semantic search served from the sqlite-vec index matches the exact scan"""
+    monkeypatch.setattr(settings, "message_embeddings", True)
+    monkeypatch.setattr(settings, "sqlite_vector_index", True)
+    rng = random.Random(0)
+
+    def random_embedding():
+        return [rng.uniform(-1, 1) for _ in range(1536)]
+
+    embeddings = {}
+
+    async def embed_texts(self, texts, embedding_config, actor):
+        return [embeddings.setdefault(text, random_embedding()) for text in texts]
+
+    query_embedding = random_embedding()
+    monkeypatch.setattr(PassageManager, "embed_texts_async", embed_texts)
+    monkeypatch.setattr(
+        "letta.services.message_manager.embed_query_text",
+        lambda query_text, embedding_config: query_embedding + [0.0] * (MAX_EMBEDDING_DIM - len(query_embedding)),
+    )
+
+    def user_message(text):
+        packed = json.dumps({"type": "user_message", "message": text, "time": "2025-01-01 12:00:00 PM"})
+        return PydanticMessage(agent_id=sarah_agent.id, role=MessageRole.user, content=[TextContent(text=packed)])
+
+    def assistant_message(text):
+        send_message = OpenAIFunction(name=DEFAULT_MESSAGE_TOOL, arguments=json.dumps({DEFAULT_MESSAGE_TOOL_KWARG: text}))
+        return PydanticMessage(
+            agent_id=sarah_agent.id,
+            role=MessageRole.assistant,
+            content=[TextContent(text="thinking")],
+            tool_calls=[OpenAIToolCall(id=f"call_{text}", type="function", function=send_message)],
+        )
+
+    await server.message_manager.create_many_messages_async(
+        [user_message(f"question {i}") if i % 2 == 0 else assistant_message(f"answer {i}") for i in range(20)], actor=default_user
+    )
+    await get_message_embedder().flush()
+
+    async def search(roles=(MessageRole.user, MessageRole.assistant), limit=5):
+        results = await server.message_manager.semantic_search_messages_for_agent_async(
+            agent_id=sarah_agent.id,
+            actor=default_user,
+            query_text="query",
+            embedding_config=DEFAULT_EMBEDDING_CONFIG,
+            roles=list(roles),
+            limit=limit,
+        )
+        return [message.id for message in results]
+
+    # The agent's messages were written before its index was built, so the first searches fall back to the exact scan
+    exact_results = await search()
+    exact_user_results = await search(roles=[MessageRole.user])
+    await rebuild_scope_async(MESSAGE_INDEX, sarah_agent.id)
+    assert await search() == exact_results
+    # filtered searches over-fetch candidates from the index, and fall back to the exact scan when they run out
+    assert await search(roles=[MessageRole.user]) == exact_user_results
+    assert len(await search(roles=[MessageRole.user], limit=10)) == 10
+
+    # New messages are indexed as they are embedded
+    embeddings["closest"] = query_embedding
+    closest = await server.message_manager.create_many_messages_async([user_message("closest")], actor=default_user)
+    await get_message_embedder().flush()
+    assert await search(limit=1) == [closest[0].id]
+
+
 # ======================================================================================================================
 # Block Manager Tests - Basic
 # ======================================================================================================================
@@ -7548,6 +8077,249 @@ async def test_e2e_job_callback(monkeypatch, server: SyncServer, default_user):
     assert updated.callback_status_code == 202
 
 
+@pytest.mark.asyncio
+async def test_run_cancellation_bus(server: SyncServer, default_run, default_user, monkeypatch, event_loop):
+    """Cancelling a run publishes it on the bus, so cancellation checks no longer read the job."""
+    monkeypatch.setattr(settings, "run_cancellation_backend", RunCancellationBackend.LOCAL)
+    signal = CancellationSignal(job_manager=server.job_manager, job_id=default_run.id, actor=default_user)
+    assert not await signal.is_cancelled()
+
+    assert await server.job_manager.safe_update_job_status_async(job_id=default_run.id, new_status=JobStatus.cancelled, actor=default_user)
+
+    monkeypatch.setattr(server.job_manager, "get_job_by_id_async", Mock(side_effect=AssertionError("cancellation was polled")))
+    assert await signal.is_cancelled()
+    assert not await CancellationSignal(job_manager=server.job_manager, job_id=default_run.id + "x", actor=default_user).is_cancelled()
+
+
+@pytest.mark.asyncio
+async def test_run_cancellation_bus_reloads_missed_cancellations(server: SyncServer, default_run, default_user, event_loop):
+    """Runs cancelled while a cross-process bus was not subscribed are reloaded from the jobs table on (re)subscribe."""
+    # cancelled with the poll backend, so nothing is published
+    assert await server.job_manager.safe_update_job_status_async(job_id=default_run.id, new_status=JobStatus.cancelled, actor=default_user)
+
+    bus = RunCancellationBus(RunCancellationBackend.REDIS)
+    assert not bus.is_cancelled(default_run.id)
+    await bus._reload_cancelled_runs()
+    assert bus.is_cancelled(default_run.id)
+
+
+def test_local_run_cancellation_backend_requires_single_worker():
+    with pytest.raises(ValueError, match="more than one uvicorn worker"):
+        Settings(run_cancellation_backend=RunCancellationBackend.LOCAL, uvicorn_workers=2)
+
+
+@pytest.mark.asyncio
+async def test_per_agent_lock_manager(monkeypatch, event_loop):
+    """Concurrent runs of the same agent are queued in arrival order, and idle agent locks are dropped."""
+    monkeypatch.setattr(settings, "agent_lock_backend", AgentLockBackend.LOCAL)
+    monkeypatch.setattr(settings, "agent_lock_wait_timeout", 0.5)
+
+    class FakeAgentLoop:
+        agent_id = "agent-1"
+        running, order = [], []
+
+        @serialize_agent_runs
+        async def step_stream(self, name):
+            self.running.append(name)
+            assert len(self.running) == 1, "runs of the same agent overlapped"
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield f"{name}-{i}"
+            self.order.append(name)
+            self.running.remove(name)
+
+    async def consume(name):
+        return [chunk async for chunk in FakeAgentLoop().step_stream(name)]
+
+    tasks = []
+    for name in ["first", "second", "third"]:
+        tasks.append(asyncio.create_task(consume(name)))
+        await asyncio.sleep(0)
+    results = await asyncio.gather(*tasks)
+    assert FakeAgentLoop.order == ["first", "second", "third"]
+    assert results[1] == ["second-0", "second-1", "second-2"]
+
+    manager = get_per_agent_lock_manager()
+    assert manager._locks == {} and manager._num_queued == {}
+
+    async def wait_for_lock(agent_id):
+        # a run outside the lock holder's call chain
+        forget_held_agent_locks()
+        async with manager.lock(agent_id):
+            pass
+
+    async with manager.lock("agent-1"):
+        with pytest.raises(AgentLockTimeoutError):
+            await asyncio.create_task(wait_for_lock("agent-1"))
+        # other agents are not blocked
+        async with manager.lock("agent-2"):
+            pass
+    assert manager._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_per_agent_lock_manager_rejects_reentrant_runs(monkeypatch, event_loop):
+    """Runs that message an agent locked further up their own call chain fail fast instead of deadlocking."""
+    monkeypatch.setattr(settings, "agent_lock_backend", AgentLockBackend.LOCAL)
+    monkeypatch.setattr(settings, "agent_lock_wait_timeout", 5)
+
+    class FakeAgentLoop:
+        def __init__(self, agent_id):
+            self.agent_id = agent_id
+
+        @serialize_agent_runs
+        async def step(self, *recipients):
+            if not recipients:
+                return [self.agent_id]
+            # recipients run in tasks of their own, as fan-outs do
+            return [self.agent_id] + await asyncio.create_task(FakeAgentLoop(recipients[0]).step(*recipients[1:]))
+
+    assert await FakeAgentLoop("agent-1").step("agent-2") == ["agent-1", "agent-2"]
+    with pytest.raises(AgentLockReentryError):
+        await FakeAgentLoop("agent-1").step("agent-1")
+    with pytest.raises(AgentLockReentryError):
+        await FakeAgentLoop("agent-1").step("agent-2", "agent-1")
+
+    # runs that are not waited on queue behind the run that started them
+    background = []
+
+    class FireAndForgetLoop(FakeAgentLoop):
+        @serialize_agent_runs
+        async def step(self, *recipients):
+            async def detached():
+                forget_held_agent_locks()
+                return await FakeAgentLoop(self.agent_id).step()
+
+            background.append(asyncio.create_task(detached()))
+            await asyncio.sleep(0.01)
+            return [self.agent_id]
+
+    assert await FireAndForgetLoop("agent-1").step() == ["agent-1"]
+    assert await asyncio.wait_for(background[0], timeout=1) == ["agent-1"]
+    assert get_per_agent_lock_manager()._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_file_ingestion_queue(server: SyncServer, default_user, default_source, tmp_path, monkeypatch, event_loop):
+    """Test that queued uploads are claimed once, retried with resumable stages and settled through the jobs table."""
+    monkeypatch.setattr(settings, "file_ingestion_spool_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "file_ingestion_retry_base_delay", 0)
+    monkeypatch.setattr(settings, "file_ingestion_max_attempts", 2)
+
+    file_metadata = await server.file_manager.create_file(
+        PydanticFileMetadata(
+            file_name="queued.txt",
+            file_type="text/plain",
+            source_id=default_source.id,
+            processing_status=FileProcessingStatus.PENDING,
+        ),
+        actor=default_user,
+    )
+    job = await enqueue_file_ingestion(content=b"hello world", file_metadata=file_metadata, actor=default_user)
+    assert job.job_type == JobType.FILE_INGESTION
+    assert (tmp_path / f"{file_metadata.id}.bin").read_bytes() == b"hello world"
+
+    calls = []
+
+    class FlakyProcessor:
+        async def parse(self, agent_states, source_id, content, file_metadata):
+            calls.append(("parse", content))
+            stored = await server.file_manager.upsert_file_content(file_id=file_metadata.id, text=content.decode(), actor=default_user)
+            return stored, None
+
+        async def embed_and_persist(self, file_metadata, source_id, ocr_response):
+            calls.append(("embed", None))
+            raise RuntimeError("embedding provider unavailable")
+
+        async def embed_and_persist_stored_content(self, file_metadata, source_id):
+            calls.append(("resume", file_metadata.content))
+            await server.file_manager.update_file_status(
+                file_id=file_metadata.id, actor=default_user, processing_status=FileProcessingStatus.EMBEDDING
+            )
+            await server.file_manager.update_file_status(
+                file_id=file_metadata.id, actor=default_user, processing_status=FileProcessingStatus.COMPLETED
+            )
+            return []
+
+    monkeypatch.setattr(
+        "letta.services.file_processor.ingestion_queue.build_file_processor", lambda embedding_config, actor: FlakyProcessor()
+    )
+    worker = FileIngestionWorker()
+
+    claimed = await worker.queue.claim()
+    assert claimed.id == job.id
+    assert await worker.queue.claim() is None, "A running job must not be handed to a second worker"
+
+    # the first attempt fails after parsing, so the file is not marked as errored and the job is queued again
+    await worker.process_job(claimed)
+    retried = await server.job_manager.get_job_by_id_async(job.id, actor=default_user)
+    assert retried.status == JobStatus.created
+    assert retried.metadata["stage"] == "parsed"
+    assert retried.metadata["attempts"] == 1
+    assert (
+        await server.file_manager.get_file_by_id(file_metadata.id, actor=default_user)
+    ).processing_status == FileProcessingStatus.PARSING
+
+    # the retry resumes from the stored content instead of parsing the upload again
+    await worker.process_job(await worker.queue.claim())
+    assert calls == [("parse", b"hello world"), ("embed", None), ("resume", "hello world")]
+    completed = await server.job_manager.get_job_by_id_async(job.id, actor=default_user)
+    assert completed.status == JobStatus.completed
+    assert completed.metadata["stage"] == "persisted"
+    assert not (tmp_path / f"{file_metadata.id}.bin").exists()
+    assert (
+        await server.file_manager.get_file_by_id(file_metadata.id, actor=default_user)
+    ).processing_status == FileProcessingStatus.COMPLETED
+
+
+@pytest.mark.asyncio
+async def test_file_ingestion_queue_counts_lost_workers(
+    server: SyncServer, default_user, default_source, tmp_path, monkeypatch, event_loop
+):
+    """Test that expired leases and failures to load a job count as attempts, so such a file ends up errored."""
+    monkeypatch.setattr(settings, "file_ingestion_spool_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "file_ingestion_retry_base_delay", 0)
+    monkeypatch.setattr(settings, "file_ingestion_max_attempts", 3)
+
+    file_metadata = await server.file_manager.create_file(
+        PydanticFileMetadata(
+            file_name="poison.pdf",
+            file_type="application/pdf",
+            source_id=default_source.id,
+            processing_status=FileProcessingStatus.PENDING,
+        ),
+        actor=default_user,
+    )
+    job = await enqueue_file_ingestion(content=b"%PDF", file_metadata=file_metadata, actor=default_user)
+    worker = FileIngestionWorker()
+
+    async def get_source_by_id(source_id, actor):
+        raise ConnectionError("database unavailable")
+
+    # a failure to load the job's file or source is a failed attempt, the job does not stay running
+    monkeypatch.setattr(worker.source_manager, "get_source_by_id", get_source_by_id)
+    await worker.process_job(await worker.queue.claim())
+    retried = await server.job_manager.get_job_by_id_async(job.id, actor=default_user)
+    assert retried.status == JobStatus.created and retried.metadata["attempts"] == 1
+    assert retried.metadata["error"] == "database unavailable"
+
+    # a worker that dies or hangs on the file lets its lease expire, which counts as an attempt too
+    monkeypatch.setattr(settings, "file_ingestion_lease_timeout", -1)
+    assert (await worker.queue.claim()).id == job.id
+    assert await worker.queue.requeue_expired() == 1
+    retried = await server.job_manager.get_job_by_id_async(job.id, actor=default_user)
+    assert retried.status == JobStatus.created and retried.metadata["attempts"] == 2
+
+    assert (await worker.queue.claim()).id == job.id
+    assert await worker.queue.requeue_expired() == 1
+    failed = await server.job_manager.get_job_by_id_async(job.id, actor=default_user)
+    assert failed.status == JobStatus.failed and failed.metadata["attempts"] == 3
+    assert await worker.queue.claim() is None
+    assert not (tmp_path / f"{file_metadata.id}.bin").exists()
+    errored = await server.file_manager.get_file_by_id(file_metadata.id, actor=default_user)
+    assert errored.processing_status == FileProcessingStatus.ERROR
+
+
 # ======================================================================================================================
 # JobManager Tests - Messages
 # ======================================================================================================================
@@ -8294,6 +9066,66 @@ async def test_step_manager_error_tracking_edge_cases(server: SyncServer, sarah_
     assert step2.error_type == "PostCancellationError"
 
 
+@pytest.mark.asyncio
+async def test_telemetry_write_behind(server: SyncServer, sarah_agent, default_job, default_user, tmp_path, monkeypatch, event_loop):
+    """Test that step updates and provider traces are buffered, spilled past the memory bound and written on flush."""
+    monkeypatch.setattr(settings, "telemetry_write_behind_enabled", True)
+    monkeypatch.setattr(settings, "telemetry_flush_interval_ms", 60 * 1000)
+    monkeypatch.setattr(settings, "telemetry_max_buffered_records", 2)
+    monkeypatch.setattr(settings, "telemetry_compress_payloads", True)
+    monkeypatch.setattr(settings, "telemetry_spill_dir", str(tmp_path))
+
+    step_manager = server.step_manager
+    step = await step_manager.log_step_async(
+        agent_id=sarah_agent.id,
+        provider_name="openai",
+        provider_category="base",
+        model="gpt-4o-mini",
+        model_endpoint="https://api.openai.com/v1",
+        context_window_limit=8192,
+        job_id=default_job.id,
+        usage=UsageStatistics(completion_tokens=0, prompt_tokens=0, total_tokens=0),
+        actor=default_user,
+        project_id=sarah_agent.project_id,
+        status=StepStatus.PENDING,
+    )
+    usage = UsageStatistics(completion_tokens=5, prompt_tokens=10, total_tokens=15)
+    assert await step_manager.update_step_success_async(default_user, step.id, usage) is None
+    assert await step_manager.update_step_stop_reason(default_user, step.id, StopReasonType.end_turn) is None
+
+    sent_at = datetime.now(timezone.utc)
+    traces = []
+    for step_id in [step.id, "step-unlogged"]:
+        traces.append(
+            await server.telemetry_manager.create_provider_trace_async(
+                actor=default_user,
+                provider_trace_create=ProviderTraceCreate(
+                    request_json={"messages": [{"role": "user", "content": "hi"}], "sent_at": sent_at},
+                    response_json={"id": f"response-for-{step_id}"},
+                    step_id=step_id,
+                    organization_id=default_user.organization_id,
+                ),
+            )
+        )
+
+    # nothing is written until a flush, and the second trace is over the memory bound
+    assert (await step_manager.get_step_async(step.id, actor=default_user)).status == StepStatus.PENDING
+    assert len(list(tmp_path.glob("*.jsonl"))) == 1
+
+    await close_telemetry_buffers()
+
+    written_step = await step_manager.get_step_async(step.id, actor=default_user)
+    assert written_step.status == StepStatus.SUCCESS
+    assert written_step.stop_reason == StopReasonType.end_turn
+    assert written_step.total_tokens == 15
+    for trace in traces:
+        written_trace = await server.telemetry_manager.get_provider_trace_by_step_id_async(step_id=trace.step_id, actor=default_user)
+        assert written_trace.id == trace.id
+        assert written_trace.request_json["sent_at"] == sent_at.isoformat()
+        assert written_trace.response_json == {"id": f"response-for-{trace.step_id}"}
+    assert list(tmp_path.glob("*.jsonl")) == []
+
+
 @pytest.mark.asyncio
 async def test_step_manager_list_steps_with_status_filter(server: SyncServer, sarah_agent, default_job, default_user, event_loop):
     """Test listing steps with status filters."""
@@ -56,3 +56,15 @@ def test_memory_jinja2_set_template(sample_memory: Memory):
     )
     with pytest.raises(ValueError):
         sample_memory.set_prompt_template(prompt_template=template_bad_memory_structure)
+
+
+def test_memory_fingerprint(sample_memory: Memory):
+    """Test that the fingerprint tracks everything the compiled memory is rendered from"""
+    fingerprint = sample_memory.fingerprint(tool_usage_rules="rule")
+    assert sample_memory.fingerprint(tool_usage_rules="rule") == fingerprint
+    assert sample_memory.fingerprint(tool_usage_rules="other rule") != fingerprint
+
+    compiled = sample_memory.compile(tool_usage_rules="rule")
+    sample_memory.update_block_value(label="human", value="A different user")
+    assert sample_memory.fingerprint(tool_usage_rules="rule") != fingerprint
+    assert sample_memory.compile(tool_usage_rules="rule") != compiled
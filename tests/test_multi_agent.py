@@ -1,22 +1,37 @@
+import json
 import os
+from types import SimpleNamespace
 
 import pytest
+from openai.types.chat.chat_completion_message_tool_call import ChatCompletionMessageToolCall, Function
 
+from letta.agents.base_agent import BaseAgent
+from letta.agents.letta_agent import LettaAgent
 from letta.config import LettaConfig
-from letta.schemas.agent import CreateAgent
+from letta.groups.dynamic_multi_agent_v2 import CHOOSE_PARTICIPANT_MESSAGE, DynamicMultiAgentV2
+from letta.groups.multi_agent_group_v2 import GroupParticipantAgent, message_text
+from letta.groups.round_robin_multi_agent_v2 import RoundRobinMultiAgentV2
+from letta.groups.supervisor_multi_agent_v2 import SUPERVISOR_TOOL_RULES, SupervisorAgent, SupervisorMultiAgentV2
+from letta.schemas.agent import AgentState, CreateAgent
 from letta.schemas.block import CreateBlock
 from letta.schemas.group import (
     DynamicManager,
     DynamicManagerUpdate,
+    Group,
     GroupCreate,
     GroupUpdate,
     ManagerType,
     RoundRobinManagerUpdate,
     SupervisorManager,
 )
-from letta.schemas.message import MessageCreate
+from letta.schemas.letta_message_content import TextContent
+from letta.schemas.letta_response import LettaResponse
+from letta.schemas.letta_stop_reason import LettaStopReason
+from letta.schemas.message import Message, MessageCreate
+from letta.schemas.usage import LettaUsageStatistics
 from letta.server.db import db_registry
 from letta.server.server import SyncServer
+from letta.services.tool_executor.multi_agent_tool_executor import LettaMultiAgentToolExecutor
 
 
 # Disable SQLAlchemy connection pooling for tests to prevent event loop issues
@@ -473,3 +488,278 @@ async def test_dynamic_group_chat(server, default_user, manager_agent, four_part
 
     finally:
         await server.group_manager.delete_group_async(group_id=group.id, actor=default_user)
+
+
+def send_message_response(agent_id: str, call_id: str, text: str) -> Message:
+    tool_call = ChatCompletionMessageToolCall(
+        id=call_id, type="function", function=Function(name="send_message", arguments=json.dumps({"message": text}))
+    )
+    return Message(role="assistant", agent_id=agent_id, tool_calls=[tool_call])
+
+
+class FakeParticipant:
+    """Stands in for a participant's loop in the V2 group runtimes, replying with `reply(agent_id, step_count)`."""
+
+    def __init__(self, agent_id, steps, reply):
+        self.agent_id = agent_id
+        self.steps = steps
+        self.reply = reply
+        self.group_context = None
+        self.response_messages = []
+
+    async def step_stream(self, input_messages, **kwargs):
+        self.steps.append(
+            SimpleNamespace(
+                agent_id=self.agent_id,
+                inputs=[message_text(message) for message in input_messages],
+                loaded_state=kwargs["agent_state"] is not None,
+                context=self.group_context,
+            )
+        )
+        reply = self.reply(self.agent_id, len(self.steps))
+        self.response_messages = [send_message_response(self.agent_id, f"call-{len(self.steps)}", reply)]
+        yield f"data: {reply}\n\n"
+        yield f"data: {LettaStopReason(stop_reason='end_turn').model_dump_json()}\n\n"
+        yield f"data: {LettaUsageStatistics(total_tokens=10, step_count=1).model_dump_json()}\n\n"
+        yield "data: [DONE]\n\n"
+
+
+class FakeMessageManager:
+    def __init__(self):
+        self.persisted = []
+
+    async def create_many_messages_async(self, pydantic_msgs, actor):
+        self.persisted.extend(pydantic_msgs)
+
+
+def fake_agent_state(agent_id):
+    persona = SimpleNamespace(label="persona", value=f"{agent_id} persona")
+    return SimpleNamespace(
+        id=agent_id,
+        name=agent_id,
+        llm_config=SimpleNamespace(model_endpoint_type="openai"),
+        memory=SimpleNamespace(get_blocks=lambda: [persona]),
+        tool_rules=[],
+    )
+
+
+def fake_group_runtime(runtime_class, steps, reply):
+    """A V2 group runtime whose participants are `FakeParticipant`s, and whose agent states are loaded from nowhere."""
+
+    class Runtime(runtime_class):
+        async def _load_agent_states(self, agent_ids):
+            self.agent_states = {agent_id: fake_agent_state(agent_id) for agent_id in agent_ids}
+            self._unused_agent_states = set(self.agent_states)
+
+        def _create_agent(self, agent_id, agent_class=None):
+            return FakeParticipant(agent_id, steps, reply)
+
+    return Runtime
+
+
+def group_runtime_kwargs(group, agent_id="agent-a"):
+    return dict(
+        agent_id=agent_id,
+        message_manager=FakeMessageManager(),
+        agent_manager=None,
+        block_manager=None,
+        passage_manager=None,
+        group_manager=None,
+        job_manager=None,
+        actor=None,
+        group=group,
+    )
+
+
+@pytest.mark.asyncio
+async def test_round_robin_v2_streams_whole_turn():
+    """The async round-robin runtime streams every participant's step, folds their finish chunks into the turn's, and
+    persists the chat history participants have not seen."""
+    steps = []
+    RoundRobin = fake_group_runtime(RoundRobinMultiAgentV2, steps, lambda agent_id, step: f"{agent_id} replied to {step} steps")
+
+    group = Group(id="group-1", manager_type=ManagerType.round_robin, agent_ids=["agent-a", "agent-b"], description="friends", max_turns=3)
+    runtime = RoundRobin(**group_runtime_kwargs(group))
+    chunks = [chunk async for chunk in runtime.step_stream([MessageCreate(role="user", content="hello")])]
+
+    assert chunks[:3] == [
+        "data: agent-a replied to 1 steps\n\n",
+        "data: agent-b replied to 2 steps\n\n",
+        "data: agent-a replied to 3 steps\n\n",
+    ]
+    assert json.loads(chunks[3].removeprefix("data: "))["stop_reason"] == "end_turn"
+    usage = json.loads(chunks[4].removeprefix("data: "))
+    assert usage["total_tokens"] == 30 and usage["step_count"] == 3
+    assert chunks[5:] == ["data: [DONE]\n\n"]
+
+    # the group context goes in the participants' system prompt rather than their inputs, and the loaded state is only
+    # used for their first step
+    assert [(step.agent_id, step.inputs, step.loaded_state) for step in steps] == [
+        ("agent-a", ["hello"], True),
+        ("agent-b", ["hello", "agent-a replied to 1 steps"], True),
+        ("agent-a", ["agent-b replied to 2 steps"], False),
+    ]
+    assert all(step.context == runtime._participant_context(step.agent_id) for step in steps)
+    assert [(message.agent_id, message_text(message), message.name) for message in runtime.message_manager.persisted] == [
+        ("agent-b", "agent-a replied to 3 steps", "agent-a")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dynamic_v2_gives_manager_chat_history_in_context():
+    """The dynamic manager is sent a short message on every round, with the options and the chat history in the context
+    of its step, so that they are not saved in its history round after round."""
+    steps = []
+
+    def reply(agent_id, step):
+        if agent_id == "manager":
+            # the speaker of the last round is not an option, so the manager alternates
+            return "agent-b should reply" if step == 1 else "agent-a"
+        return f"{agent_id} says hi"
+
+    Dynamic = fake_group_runtime(DynamicMultiAgentV2, steps, reply)
+    group = Group(
+        id="group-1",
+        manager_type=ManagerType.dynamic,
+        manager_agent_id="manager",
+        agent_ids=["agent-a", "agent-b"],
+        description="friends",
+        max_turns=2,
+    )
+    runtime = Dynamic(**group_runtime_kwargs(group, agent_id="manager"))
+    chunks = [chunk async for chunk in runtime.step_stream([MessageCreate(role="user", content="hello")])]
+
+    assert chunks[:4] == [
+        "data: agent-b should reply\n\n",
+        "data: agent-b says hi\n\n",
+        "data: agent-a\n\n",
+        "data: agent-a says hi\n\n",
+    ]
+    assert [(step.agent_id, step.inputs) for step in steps] == [
+        ("manager", [CHOOSE_PARTICIPANT_MESSAGE]),
+        ("agent-b", ["hello"]),
+        ("manager", [CHOOSE_PARTICIPANT_MESSAGE]),
+        ("agent-a", ["hello", "agent-b says hi"]),
+    ]
+    first_round, second_round = steps[0].context, steps[2].context
+    assert "- agent-a (agent-a): agent-a persona" in first_round and "Chat history:\nuser: hello" in first_round
+    assert "- agent-a (agent-a)" in second_round and "- agent-b (agent-b)" not in second_round
+    assert second_round.endswith("Chat history:\nuser: hello\nagent-b: agent-b says hi")
+    assert steps[1].context == steps[3].context == runtime._participant_context("agent-a")
+
+    # the manager's context is never persisted, only the group chat
+    persisted = [(message.agent_id, message_text(message)) for message in runtime.message_manager.persisted]
+    assert persisted == [
+        ("manager", "hello"),
+        ("manager", "agent-b says hi"),
+        ("manager", "agent-a says hi"),
+        ("agent-b", "agent-a says hi"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_supervisor_v2_steps_supervisor_agent(monkeypatch):
+    """The supervisor steps once per turn on a `SupervisorAgent`, which starts by messaging its group."""
+    steps = []
+
+    class Supervisor(SupervisorMultiAgentV2):
+        async def _load_agent_states(self, agent_ids):
+            self.agent_states = {agent_id: fake_agent_state(agent_id) for agent_id in agent_ids}
+            self._unused_agent_states = set(self.agent_states)
+
+        async def _attach_group_tool(self):
+            self._unused_agent_states.discard(self.agent_id)
+
+    async def step(self, input_messages, run_id=None, **kwargs):
+        steps.append((type(self), [message_text(message) for message in input_messages], kwargs["agent_state"], self.group_context))
+        self.response_messages = [send_message_response(self.agent_id, "call-1", "the workers agree")]
+        return LettaResponse(
+            messages=Message.to_letta_messages_from_list(self.response_messages),
+            stop_reason=LettaStopReason(stop_reason="end_turn"),
+            usage=LettaUsageStatistics(total_tokens=10, step_count=2),
+        )
+
+    monkeypatch.setattr(SupervisorAgent, "step", step)
+    group = Group(
+        id="group-1", manager_type=ManagerType.supervisor, manager_agent_id="supervisor", agent_ids=["agent-a", "agent-b"], description=""
+    )
+    runtime = Supervisor(**group_runtime_kwargs(group, agent_id="supervisor"))
+    response = await runtime.step([MessageCreate(role="user", content="what do you think?")])
+
+    # the state loaded before the group tool was attached is outdated
+    assert steps == [(SupervisorAgent, ["what do you think?"], None, None)]
+    assert [message.content for message in response.messages if message.message_type == "assistant_message"] == ["the workers agree"]
+    assert response.usage.step_count == 2
+    assert type(runtime._create_agent("agent-a")) is GroupParticipantAgent
+
+    async def load_step_agent_state(self, agent_state=None):
+        return AgentState.model_construct(id=self.agent_id, tool_rules=[])
+
+    monkeypatch.setattr(LettaAgent, "_load_step_agent_state", load_step_agent_state)
+    agent_state = await runtime._create_agent("supervisor")._load_step_agent_state()
+    assert agent_state.tool_rules == SUPERVISOR_TOOL_RULES
+
+
+@pytest.mark.asyncio
+async def test_group_participant_agent_adds_context_to_system_prompt(monkeypatch):
+    """The group context is appended to the system prompt sent to the model, the in-context system message is unchanged."""
+
+    async def rebuild_memory(self, in_context_messages, agent_state, **kwargs):
+        return in_context_messages
+
+    monkeypatch.setattr(BaseAgent, "_rebuild_memory_async", rebuild_memory)
+    system_message = Message(role="system", content=[TextContent(text="You are Sam.")])
+    user_message = Message(role="user", content=[TextContent(text="hi")])
+    agent = GroupParticipantAgent(
+        agent_id="agent-a",
+        message_manager=None,
+        agent_manager=None,
+        block_manager=None,
+        job_manager=None,
+        passage_manager=None,
+        actor=None,
+    )
+
+    assert await agent._rebuild_memory_async([system_message, user_message], agent_state=None) == [system_message, user_message]
+    agent.group_context = "You are in a group chat."
+    rebuilt = await agent._rebuild_memory_async([system_message, user_message], agent_state=None)
+    assert [message_text(message) for message in rebuilt] == ["You are Sam.\n\nYou are in a group chat.", "hi"]
+    assert rebuilt[0].id == system_message.id and message_text(system_message) == "You are Sam."
+
+
+@pytest.mark.asyncio
+async def test_send_message_to_all_agents_in_group(monkeypatch):
+    """The supervisor's group tool messages every worker of its group concurrently, with the states loaded up front."""
+    workers = {
+        agent_id: AgentState.model_construct(id=agent_id, llm_config=SimpleNamespace(provider_name="openai")) for agent_id in ["w1", "w2"]
+    }
+
+    class AgentManager:
+        async def get_agent_by_id_async(self, agent_id, actor, include_relationships=None):
+            group = SimpleNamespace(agent_ids=list(workers)) if agent_id == "supervisor" else None
+            return SimpleNamespace(id=agent_id, multi_agent_group=group)
+
+        async def get_agents_by_ids_async(self, agent_ids, actor, include_relationships=None):
+            return [workers[agent_id] for agent_id in agent_ids]
+
+    processed = []
+
+    async def process_agent(self, agent_id, message, agent_state=None):
+        processed.append((agent_id, message, agent_state))
+        return {"agent_id": agent_id, "response": [f"{agent_id} is on it"]}
+
+    monkeypatch.setattr(LettaMultiAgentToolExecutor, "_process_agent", process_agent)
+    executor = LettaMultiAgentToolExecutor(
+        message_manager=None, agent_manager=AgentManager(), block_manager=None, job_manager=None, passage_manager=None, actor=None
+    )
+
+    result = await executor.send_message_to_all_agents_in_group_async(SimpleNamespace(id="supervisor"), "status?")
+    assert sorted(processed, key=lambda call: call[0]) == [
+        ("w1", processed[0][1], workers["w1"]),
+        ("w2", processed[0][1], workers["w2"]),
+    ]
+    assert processed[0][1].startswith("[Incoming message from agent with ID 'supervisor'") and processed[0][1].endswith("status?")
+    assert "'w1 is on it'" in result and "'w2 is on it'" in result
+
+    with pytest.raises(ValueError, match="does not manage a group"):
+        await executor.send_message_to_all_agents_in_group_async(SimpleNamespace(id="w1"), "status?")
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from letta.agents.letta_agent import LettaAgent
+from letta.helpers.tool_rule_solver import ToolRulesSolver
+from letta.schemas.enums import MessageRole, ToolType
+from letta.schemas.openai.chat_completion_response import FunctionCall, ToolCall, UsageStatistics
+from letta.schemas.tool_execution_result import ToolExecutionResult
+from letta.schemas.tool_rule import ChildToolRule, TerminalToolRule
+from letta.settings import settings
+
+
+def tool_call(call_id: str, name: str, **arguments) -> ToolCall:
+    return ToolCall(id=call_id, type="function", function=FunctionCall(name=name, arguments=json.dumps(arguments)))
+
+
+@pytest.fixture
+def agent_state():
+    tools = [
+        ("search_web", ToolType.CUSTOM),
+        ("fetch_page", ToolType.CUSTOM),
+        ("core_memory_append", ToolType.LETTA_MEMORY_CORE),
+        ("core_memory_replace", ToolType.LETTA_MEMORY_CORE),
+        ("send_message", ToolType.LETTA_CORE),
+    ]
+    return SimpleNamespace(
+        id="agent-1",
+        tools=[SimpleNamespace(name=name, tool_type=tool_type, return_char_limit=6000) for name, tool_type in tools],
+        llm_config=SimpleNamespace(model="gpt-4o"),
+        timezone="UTC",
+    )
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """A LettaAgent whose tools sleep briefly and record which calls overlapped."""
+    message_manager = AsyncMock()
+    message_manager.create_many_messages_async.side_effect = lambda messages, actor: messages
+    agent = LettaAgent(
+        agent_id="agent-1",
+        message_manager=message_manager,
+        agent_manager=None,
+        block_manager=None,
+        job_manager=None,
+        passage_manager=None,
+        actor=SimpleNamespace(id="user-1", organization_id="org-1"),
+        enable_summarization=False,
+    )
+    agent.executed = []
+    agent.running = set()
+    agent.overlaps = []
+
+    async def execute_tool(tool_name, tool_args, agent_state, agent_step_span=None, step_id=None):
+        agent.executed.append((tool_name, dict(tool_args)))
+        agent.overlaps.append((tool_name, set(agent.running)))
+        agent.running.add(tool_name)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            agent.running.discard(tool_name)
+        return ToolExecutionResult(status="success", func_return=f"{tool_name} done")
+
+    monkeypatch.setattr(agent, "_execute_tool", execute_tool)
+    return agent
+
+
+async def handle(agent, agent_state, tool_calls, tool_rules=None, valid_tool_names=None):
+    return await agent._handle_parallel_ai_response(
+        tool_calls,
+        valid_tool_names=valid_tool_names or [tool.name for tool in agent_state.tools],
+        agent_state=agent_state,
+        tool_rules_solver=ToolRulesSolver(tool_rules=tool_rules or []),
+        usage=UsageStatistics(),
+        step_id="step-1",
+    )
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls_run_concurrently_and_persist_once(agent, agent_state):
+    messages, continue_stepping, stop_reason = await handle(
+        agent,
+        agent_state,
+        [
+            tool_call("call-1", "search_web", query="letta"),
+            tool_call("call-2", "fetch_page", url="https://letta.com", request_heartbeat=True),
+        ],
+    )
+
+    assert [name for name, _ in agent.executed] == ["search_web", "fetch_page"]
+    assert ("fetch_page", {"search_web"}) in agent.overlaps
+    # heartbeats are popped from the arguments the tools receive
+    assert agent.executed[1][1] == {"url": "https://letta.com"}
+
+    agent.message_manager.create_many_messages_async.assert_awaited_once()
+    assert [message.role for message in messages] == [MessageRole.assistant, MessageRole.tool, MessageRole.tool, MessageRole.user]
+    assert [call.id for call in messages[0].tool_calls] == ["call-1", "call-2"]
+    assert [(message.tool_call_id, message.name) for message in messages[1:3]] == [("call-1", "search_web"), ("call-2", "fetch_page")]
+    assert all(message.step_id == "step-1" for message in messages)
+    assert continue_stepping and stop_reason is None
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls_respect_concurrency_limit_and_serial_tools(agent, agent_state, monkeypatch):
+    await handle(
+        agent,
+        agent_state,
+        [
+            tool_call("call-1", "core_memory_append", label="human", content="likes tea"),
+            tool_call("call-2", "core_memory_replace", label="human", old_content="tea", new_content="coffee"),
+            tool_call("call-3", "search_web", query="coffee"),
+        ],
+    )
+    overlaps = dict(agent.overlaps)
+    # memory tools never overlap each other, other tools still run alongside them
+    assert "core_memory_append" not in overlaps["core_memory_replace"]
+    assert overlaps["search_web"]
+
+    monkeypatch.setattr(settings, "parallel_tool_calls_max_concurrency", 1)
+    agent.overlaps.clear()
+    await handle(agent, agent_state, [tool_call("call-4", "search_web", query="a"), tool_call("call-5", "fetch_page", url="b")])
+    assert all(not running for _, running in agent.overlaps)
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls_reject_rule_violations(agent, agent_state):
+    tool_rules = [TerminalToolRule(tool_name="send_message"), ChildToolRule(tool_name="search_web", children=["fetch_page"])]
+    messages, continue_stepping, stop_reason = await handle(
+        agent,
+        agent_state,
+        [tool_call("call-1", "search_web", query="letta"), tool_call("call-2", "send_message", message="hi")],
+        tool_rules=tool_rules,
+    )
+
+    # send_message cannot follow search_web in the same batch, so it is not executed
+    assert [name for name, _ in agent.executed] == ["search_web"]
+    violation = json.loads(messages[2].content[0].text)
+    assert violation["status"] == "Failed" and "[ToolConstraintError] Cannot call send_message" in violation["message"]
+    assert continue_stepping and stop_reason is None
+    assert "tool rule violation" in messages[-1].content[0].text
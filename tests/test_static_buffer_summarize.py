@@ -1,15 +1,21 @@
+import asyncio
 import json
 from datetime import datetime, timezone
+from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import pytest
 
+import letta.agents.letta_agent as letta_agent_module
 from letta.agents.base_agent import BaseAgent
+from letta.agents.letta_agent import LettaAgent
 from letta.schemas.enums import MessageRole
 from letta.schemas.letta_message_content import TextContent
 from letta.schemas.message import Message
+from letta.services.summarizer.compaction_checkpoints import get_compaction_checkpoints
 from letta.services.summarizer.enums import SummarizationMode
 from letta.services.summarizer.summarizer import Summarizer
+from letta.settings import summarizer_settings
 
 # Constants for test parameters
 MESSAGE_BUFFER_LIMIT = 10
@@ -148,3 +154,71 @@ async def test_static_buffer_summarization_no_assistant_messages_trimmed(mock_su
     assert len(updated_messages) == 1
     assert updated
     mock_summarizer_agent.step.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_partial_evict_compaction_checkpoint(messages):
+    summarizer_agent = AsyncMock()
+    summarizer_agent.agent_id = "agent-1"
+    summarizer = Summarizer(SummarizationMode.PARTIAL_EVICT_MESSAGE_BUFFER, summarizer_agent, partial_evict_summarizer_percentage=0.3)
+    summary = Message(role=MessageRole.user, content=[TextContent(type="text", text=SUMMARY_TEXT)])
+    summarizer._summary_message = AsyncMock(return_value=summary)
+    checkpoints = get_compaction_checkpoints()
+
+    # the checkpoint is prepared in the background, and swapped in by a later turn without summarizing again
+    in_context_messages, new_messages = messages[:10], messages[10:12]
+    summarizer.prepare_compaction_checkpoint(in_context_messages)
+    await asyncio.gather(*checkpoints._tasks.values())
+    compacted = await summarizer.compact_from_checkpoint(in_context_messages, new_messages)
+
+    assert compacted == [in_context_messages[0], summary] + in_context_messages[7:] + new_messages
+    summarizer._summary_message.assert_awaited_once_with(
+        in_context_messages[1:7], summarizer_agent.agent_manager.get_agent_by_id_async.return_value
+    )
+    summarizer_agent.message_manager.create_many_messages_async.assert_awaited_once()
+    assert await summarizer.compact_from_checkpoint(in_context_messages, new_messages) is None
+
+    # a checkpoint is dropped once the context no longer starts with the summarized messages
+    summarizer.prepare_compaction_checkpoint(in_context_messages)
+    await asyncio.gather(*checkpoints._tasks.values())
+    assert await summarizer.compact_from_checkpoint([in_context_messages[0]] + in_context_messages[2:], new_messages) is None
+    assert not checkpoints._checkpoints
+
+
+@pytest.mark.asyncio
+async def test_rebuild_context_window_summarizes_compacted_messages_over_window(messages, monkeypatch):
+    agent = LettaAgent(
+        agent_id="agent-1",
+        message_manager=AsyncMock(),
+        agent_manager=AsyncMock(),
+        block_manager=None,
+        job_manager=None,
+        passage_manager=None,
+        actor=SimpleNamespace(id="user-1", organization_id="org-1"),
+    )
+    compacted = [messages[0], Message(role=MessageRole.user, content=[TextContent(type="text", text=SUMMARY_TEXT)])] + messages[7:12]
+    summarized = [messages[0], messages[11]]
+    agent.summarizer = AsyncMock()
+    agent.summarizer.compact_from_checkpoint.return_value = compacted
+    agent.summarizer.summarize.return_value = (summarized, True)
+    monkeypatch.setattr(summarizer_settings, "speculative_compaction", True)
+    token_counts = {len(messages[:12]): 5000}
+    monkeypatch.setattr(letta_agent_module, "count_in_context_tokens", lambda in_context, tools=None: token_counts[len(in_context)])
+    llm_config = SimpleNamespace(context_window=1000)
+
+    # the checkpoint fits in the window, so it is swapped in as is
+    token_counts[len(compacted)] = 800
+    assert await agent._rebuild_context_window(messages[:10], messages[10:12], llm_config) == compacted
+    agent.summarizer.summarize.assert_not_awaited()
+
+    # it does not, so the compacted messages are summarized further
+    token_counts[len(compacted)] = 1200
+    assert await agent._rebuild_context_window(messages[:10], messages[10:12], llm_config) == summarized
+    agent.summarizer.summarize.assert_awaited_once_with(in_context_messages=compacted, new_letta_messages=[], force=True, clear=True)
+
+    # so are they when summarization is forced
+    token_counts[len(compacted)] = 800
+    agent.summarizer.summarize.reset_mock()
+    assert await agent._rebuild_context_window(messages[:10], messages[10:12], llm_config, force=True) == summarized
+    agent.summarizer.summarize.assert_awaited_once_with(in_context_messages=compacted, new_letta_messages=[], force=True, clear=True)
+    assert agent.agent_manager.update_message_ids_async.await_args.kwargs["message_ids"] == [m.id for m in summarized]
@@ -2,7 +2,7 @@ import json
 
 import pytest
 
-from letta.streaming_utils import JSONInnerThoughtsExtractor
+from letta.streaming_utils import JSONInnerThoughtsExtractor, StreamingJSONFieldParser
 
 
 @pytest.mark.parametrize("wait_for_first_key", [True, False])
@@ -244,3 +244,53 @@ def test_inner_thoughts_not_in_args():
     assert (
         handler2.inner_thoughts == expected_final_inner_thoughts2
     ), f"Test Case 2: Final inner_thoughts mismatch.\nExpected: '{expected_final_inner_thoughts2}'\nGot: '{handler2.inner_thoughts}'"
+
+
+def _stream_fields(arguments: str, chunk_size: int):
+    parser = StreamingJSONFieldParser()
+    streamed = {}
+    for i in range(0, len(arguments), chunk_size):
+        for key, delta in parser.process_fragment(arguments[i : i + chunk_size]).items():
+            streamed[key] = streamed.get(key, "") + delta
+    return parser, streamed
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1000])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_streaming_json_field_parser_matches_json_loads(chunk_size, ensure_ascii):
+    """String fields streamed in chunks of any size add up to what json.loads decodes, escapes split across chunks included"""
+    args = {
+        "inner_thoughts": 'Chad\'s "x2" tradition\nis going strong! 😂 \\o/ \t',
+        "message": "Here we are again, with 'x2'! 🎉 Ünïcödé, 你好",
+        "options": [{"a": '}]"{'}, [1, 2]],
+        "count": -1.5e3,
+        "request_heartbeat": True,
+        "empty": "",
+    }
+    arguments = json.dumps(args, ensure_ascii=ensure_ascii, indent=1)
+
+    parser, streamed = _stream_fields(arguments, chunk_size)
+
+    assert streamed == {"inner_thoughts": args["inner_thoughts"], "message": args["message"]}
+    assert parser.value("message") == args["message"]
+    assert parser.value("empty") == ""
+    assert parser.value("count") == "-1500.0"
+    assert parser.keys == list(args)
+    assert parser.completed_keys == set(args)
+
+
+def test_streaming_json_field_parser_partial_arguments():
+    """Fields are reported as soon as their value starts, and only completed once it ends"""
+    parser = StreamingJSONFieldParser()
+    assert parser.process_fragment('{"inner_thoughts": "Thinking') == {"inner_thoughts": "Thinking"}
+    assert parser.keys == ["inner_thoughts"] and not parser.completed_keys
+
+    # a surrogate pair split mid-escape is held back until it can be decoded
+    assert parser.process_fragment(" \\ud83d\\ude") == {"inner_thoughts": " "}
+    assert parser.process_fragment('00", "message') == {"inner_thoughts": "😀"}
+    assert parser.keys == ["inner_thoughts"] and parser.completed_keys == {"inner_thoughts"}
+
+    assert parser.process_fragment('": ') == {}
+    assert parser.process_fragment('"Hi') == {"message": "Hi"}
+    assert parser.keys == ["inner_thoughts", "message"]
+    assert parser.value("inner_thoughts") == "Thinking 😀"
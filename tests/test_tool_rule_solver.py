@@ -271,3 +271,32 @@ def test_required_before_exit_tool_rule_clear_history():
 
     assert solver.has_required_tools_been_called({SAVE_TOOL}) is False, "Should return False after clearing history"
     assert solver.get_uncalled_required_tools({SAVE_TOOL}) == [SAVE_TOOL], "Should show required tool as uncalled after clearing history"
+
+
+def test_validate_tool_call_batch_applies_rules_within_batch():
+    init_rule = InitToolRule(tool_name=START_TOOL)
+    child_rule = ChildToolRule(tool_name=START_TOOL, children=[NEXT_TOOL])
+    solver = ToolRulesSolver(tool_rules=[init_rule, child_rule])
+    available_tools = {START_TOOL, NEXT_TOOL, HELPER_TOOL}
+
+    allowed = solver.validate_tool_call_batch([START_TOOL, NEXT_TOOL, HELPER_TOOL], available_tools)
+
+    assert allowed == [True, True, True], "Each call should be checked against the calls before it in the batch"
+    assert solver.tool_call_history == [], "Batch validation should not change the tool call history"
+
+    allowed = solver.validate_tool_call_batch([START_TOOL, HELPER_TOOL], available_tools)
+
+    assert allowed == [True, False], "A child rule from an earlier call in the batch should constrain the next call"
+
+
+def test_validate_tool_call_batch_max_count_and_conditional():
+    max_count_rule = MaxCountPerStepToolRule(tool_name=HELPER_TOOL, max_count_limit=1)
+    conditional_rule = ConditionalToolRule(tool_name=START_TOOL, child_output_mapping={"yes": NEXT_TOOL})
+    solver = ToolRulesSolver(tool_rules=[max_count_rule, conditional_rule])
+    available_tools = {START_TOOL, NEXT_TOOL, HELPER_TOOL}
+
+    assert solver.validate_tool_call_batch([HELPER_TOOL, HELPER_TOOL], available_tools) == [True, False]
+    assert solver.validate_tool_call_batch([START_TOOL, NEXT_TOOL], available_tools) == [
+        True,
+        False,
+    ], "Calls after a conditional tool cannot be validated before it returns"
@@ -4,9 +4,19 @@ import pytest
 
 from letta.constants import MAX_FILENAME_LENGTH
 from letta.functions.ast_parsers import coerce_dict_args_by_annotations, get_function_annotations_from_source
+from letta.helpers.decorators import async_redis_cache
+from letta.helpers.embedding_cache import EmbeddingCache
+from letta.helpers.event_loop_registry import EventLoopRegistry
+from letta.schemas.embedding_config import EmbeddingConfig
+from letta.schemas.enums import ProviderCategory, ProviderType
 from letta.schemas.file import FileMetadata
+from letta.schemas.llm_config import LLMConfig
+from letta.schemas.providers import Provider
+from letta.services.fan_out_scheduler import FanOutCall, FanOutScheduler
 from letta.services.file_processor.chunker.line_chunker import LineChunker
 from letta.services.helpers.agent_manager_helper import safe_format
+from letta.services.model_catalog import ModelCatalog
+from letta.settings import settings
 from letta.utils import sanitize_filename, validate_function_response
 
 CORE_MEMORY_VAR = "My core memory is that I like to eat bananas"
@@ -682,3 +692,202 @@ def test_validate_function_response_whitespace():
     """Test whitespace-only string handling"""
     response = validate_function_response("   \n\t  ", return_char_limit=100)
     assert response == "   \n\t  "
+
+
+@pytest.mark.asyncio
+async def test_async_redis_cache_local_tier():
+    """The in-process tier serves repeat calls without Redis and stays bounded."""
+    calls = []
+
+    @async_redis_cache(key_func=lambda text: text, prefix="test_local_tier", local_cache_size=2)
+    async def count_chars(text: str) -> int:
+        calls.append(text)
+        return len(text)
+
+    assert await count_chars("a") == 1
+    assert await count_chars("a") == 1
+    assert calls == ["a"]
+
+    await count_chars("bb")
+    await count_chars("ccc")
+    await count_chars("a")
+    assert calls == ["a", "bb", "ccc", "a"], "Least recently used entry should have been evicted"
+
+    await count_chars.cache_invalidate("ccc")
+    await count_chars("ccc")
+    assert calls[-1] == "ccc"
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache():
+    """Only texts missing from the cache reach the provider, once each, and vectors are scoped to the embedding config."""
+    cache = EmbeddingCache(max_size=16)
+    config = EmbeddingConfig.default_config(model_name="text-embedding-3-small", provider="openai")
+    requests = []
+
+    async def embed(texts):
+        requests.append(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+    assert await cache.embed(["a", "bb", "a"], config, embed) == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+    assert requests == [["a", "bb"]]
+
+    assert await cache.embed(["bb", "ccc"], config, embed) == [[2.0, 0.5], [3.0, 0.5]]
+    assert requests[-1] == ["ccc"]
+
+    assert await cache.embed(["a", "ccc"], config, embed) == [[1.0, 0.5], [3.0, 0.5]]
+    assert len(requests) == 2
+    assert cache.stats.saved_requests == 1
+
+    other_config = config.model_copy(update={"embedding_dim": 512})
+    await cache.embed(["a"], other_config, embed)
+    assert requests[-1] == ["a"], "Vectors from a different embedding config must not be reused"
+    assert cache.get_local(config, "bb") == [2.0, 0.5]
+
+
+@pytest.mark.asyncio
+async def test_model_catalog(tmp_path, monkeypatch):
+    """Model lists are listed once, served stale while refreshed in the background, and survive restarts and failures."""
+    monkeypatch.setattr(settings, "model_catalog_snapshot_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "model_catalog_provider_ttls", {})
+    listed = []
+    served = [["model-a", "model-b"]]
+
+    class ListingProvider(Provider):
+        async def list_llm_models_async(self):
+            listed.append(self.name)
+            if isinstance(served[-1], Exception):
+                raise served[-1]
+            return [
+                LLMConfig(model=model, model_endpoint_type="openai", context_window=8192, handle=f"{self.name}/{model}")
+                for model in served[-1]
+            ]
+
+    provider = ListingProvider(name="test", provider_type=ProviderType.openai, provider_category=ProviderCategory.base)
+    catalog = ModelCatalog()
+
+    configs = await catalog.find_llm_configs(provider, "test/model-a", "model-a")
+    assert [config.model for config in configs] == ["model-a"]
+    assert [config.model for config in await catalog.find_llm_configs(provider, "other/model-b", "model-b")] == ["model-b"]
+    configs[0].context_window = 1
+    assert (await catalog.list_llm_models(provider))[0].context_window == 8192, "Callers must get copies"
+    assert listed == ["test"]
+
+    # a restarted process serves the persisted list without listing the provider
+    assert [config.handle for config in await ModelCatalog().list_llm_models(provider)] == ["test/model-a", "test/model-b"]
+    assert listed == ["test"]
+
+    # stale lists are served while a single background refresh replaces them
+    monkeypatch.setattr(settings, "model_catalog_provider_ttls", {"test": 0})
+    served.append(["model-c"])
+    assert len(await catalog.list_llm_models(provider)) == 2
+    assert len(await catalog.list_llm_models(provider)) == 2
+    await asyncio.gather(*catalog._refreshes.values())
+    assert listed == ["test", "test"]
+    assert [config.model for config in await catalog.list_llm_models(provider)] == ["model-c"]
+
+    # a failed refresh keeps the last known good list
+    served.append(RuntimeError("provider is down"))
+    await asyncio.gather(*catalog._refreshes.values())
+    assert [config.model for config in await catalog.list_llm_models(provider)] == ["model-c"]
+    assert listed == ["test", "test", "test"]
+
+
+@pytest.mark.asyncio
+async def test_fan_out_scheduler():
+    """Fan-outs stay within their budgets, report results as they complete and, at the deadline, the rest as pending."""
+    scheduler = FanOutScheduler(max_concurrency=3, max_concurrency_per_provider=2)
+    running = {"openai": 0, "anthropic": 0}
+    peaks = {"total": 0, "openai": 0, "anthropic": 0}
+    release = asyncio.Event()
+
+    def step(provider, seconds, fail=False):
+        async def call():
+            running[provider] += 1
+            peaks[provider] = max(peaks[provider], running[provider])
+            peaks["total"] = max(peaks["total"], sum(running.values()))
+            try:
+                await asyncio.sleep(seconds)
+                if seconds >= 1:
+                    await release.wait()
+                if fail:
+                    raise ValueError("step failed")
+                return f"reply after {seconds}"
+            finally:
+                running[provider] -= 1
+
+        return call
+
+    calls = [FanOutCall(key=f"openai-{i}", provider="openai", call=step("openai", 0.01 * i)) for i in range(4)]
+    calls += [FanOutCall(key="anthropic-fails", provider="anthropic", call=step("anthropic", 0, fail=True))]
+    calls += [FanOutCall(key="anthropic-slow", provider="anthropic", call=step("anthropic", 1))]
+    results = [result async for result in scheduler.fan_out(calls, timeout_s=5, deadline_s=0.5)]
+
+    assert peaks["total"] == 3 and peaks["openai"] == 2
+    by_key = {result.key: result for result in results}
+    assert [by_key[f"openai-{i}"].status for i in range(4)] == ["success"] * 4
+    assert by_key["openai-3"].value == "reply after 0.03"
+    assert by_key["anthropic-fails"].status == "error" and isinstance(by_key["anthropic-fails"].error, ValueError)
+    assert results[-1].key == "anthropic-slow" and results[-1].status == "pending"
+
+    # pending calls keep running after the fan-out returned
+    assert len(scheduler._tasks) == 1
+    release.set()
+    await asyncio.gather(*scheduler._tasks)
+
+    # calls that run past their timeout are cancelled
+    [result] = [
+        result async for result in scheduler.fan_out([FanOutCall("slow", "openai", step("openai", 1))], timeout_s=0.05, deadline_s=5)
+    ]
+    assert result.status == "timeout"
+    await scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_fan_out_scheduler_queued_and_nested_calls():
+    """Queued calls run their queued variant, and fan-outs nested in a fan-out call do not wait for the outer budgets."""
+    scheduler = FanOutScheduler(max_concurrency=1, max_concurrency_per_provider=1)
+
+    async def reply(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    calls = [
+        FanOutCall(key=str(i), provider="openai", call=lambda i=i: reply(f"prefetched {i}"), queued_call=lambda i=i: reply(f"reloaded {i}"))
+        for i in range(2)
+    ]
+    results = [result.value async for result in scheduler.fan_out(calls, timeout_s=5, deadline_s=5)]
+    assert results == ["prefetched 0", "reloaded 1"]
+
+    async def broadcast():
+        inner = [FanOutCall(key="inner", provider="openai", call=lambda: reply("inner reply"))]
+        return [result.value async for result in scheduler.fan_out(inner, timeout_s=5, deadline_s=5)]
+
+    [result] = [result async for result in scheduler.fan_out([FanOutCall("outer", "openai", broadcast)], timeout_s=1, deadline_s=5)]
+    assert result.status == "success" and result.value == ["inner reply"]
+    await scheduler.close()
+
+
+def test_event_loop_registry_drops_closed_loops():
+    registry = EventLoopRegistry()
+
+    async def get_or_create():
+        instance = registry.get()
+        if instance is None:
+            instance = registry.set(object())
+        return instance, registry.get()
+
+    first_loop, second_loop = asyncio.new_event_loop(), asyncio.new_event_loop()
+    try:
+        first, first_again = first_loop.run_until_complete(get_or_create())
+        assert first is first_again
+        first_loop.close()
+
+        second, _ = second_loop.run_until_complete(get_or_create())
+        assert second is not first
+        # the closed loop's instance was dropped when the second loop registered its own
+        assert registry.pop_all() == [second]
+        assert len(registry) == 0
+    finally:
+        first_loop.close()
+        second_loop.close()